@@ -1,5 +1,4 @@
 from __future__ import annotations
-from .application import Termnal
 
 import json
 import os
@@ -95,4 +94,13 @@ def _ensure_supported_python_signature() -> None:
 _ensure_supported_python_signature()
 
 
+def __getattr__(name: str):
+    # Termnal 会拉起整个 Qt；引擎子进程只 import terminal.pipeline 等子包，用不到 Qt。
+    if name == "Termnal":
+        from .application import Termnal
+
+        return Termnal
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ["Termnal"]
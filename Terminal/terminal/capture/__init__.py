@@ -1,4 +1,15 @@
+from .capture_loop import CaptureLoop, locate_capture_region
 from .capture_screen import build_monitor_dict, capture_screen, get_monitors
 from .find_template_bounds import find_template_bounds
+from .frame_ring import FrameRing, FrameSlot
 
-__all__ = ['build_monitor_dict', 'capture_screen', 'find_template_bounds', 'get_monitors']
+__all__ = [
+    'CaptureLoop',
+    'FrameRing',
+    'FrameSlot',
+    'build_monitor_dict',
+    'capture_screen',
+    'find_template_bounds',
+    'get_monitors',
+    'locate_capture_region',
+]
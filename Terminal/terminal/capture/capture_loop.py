@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+from .capture_screen import build_monitor_dict, capture_screen
+from .find_template_bounds import find_template_bounds
+
+__all__ = ["CaptureLoop", "locate_capture_region"]
+
+
+def locate_capture_region(monitor_region: dict[str, int], capture: Callable[..., np.ndarray] = capture_screen) -> dict[str, int] | None:
+    """整屏截一张图找标志位，返回相对于显示器的小区域；没找到返回 None。"""
+    full_frame = capture(monitor_region=monitor_region, region=None)
+    bounds = find_template_bounds(full_frame)
+    if bounds is None:
+        return None
+    left, top, right, bottom = bounds
+    return build_monitor_dict(left=left, top=top, right=right, bottom=bottom)
+
+
+class CaptureLoop(object):
+    """不依赖 Qt 的截图循环，headless 运行时代替 CaptureWorker。
+
+    一个普通线程按 FPS 截已经锁定的小区域，每一帧直接 target.write_frame 写进 FrameRing 槽位。
+    截图失败时调用 on_error 并退出循环，和 CaptureWorker 的“失败即停机”一致。
+    """
+
+    def __init__(
+        self,
+        target: Any,
+        monitor_region: dict[str, int],
+        capture_region: dict[str, int],
+        fps: int = 15,
+        *,
+        on_error: Callable[[str], None] | None = None,
+        capture: Callable[..., np.ndarray] = capture_screen,
+    ) -> None:
+        self._target = target
+        self._monitor_region = dict(monitor_region)
+        self._capture_region = dict(capture_region)
+        self._on_error = on_error or (lambda message: None)
+        self._capture = capture
+        self._interval = 1.0 / max(1, int(fps))
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.frames = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_fps(self, value: int) -> None:
+        self._interval = 1.0 / max(1, int(value))
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="CaptureLoop", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(2.0)
+
+    def _run(self) -> None:
+        height = self._capture_region['height']
+        width = self._capture_region['width']
+        next_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                self._target.write_frame(height, width, self._capture_into)
+            except Exception as error:  # pragma: no cover - 具体系统错误文字依赖 Windows API
+                self._on_error(f'小区域截图失败: {error}')
+                return
+            self.frames += 1
+            # 按固定节拍排下一帧；落后超过一帧就从现在重新起算，不连发补帧。
+            next_tick += self._interval
+            delay = next_tick - time.perf_counter()
+            if delay < -self._interval:
+                next_tick = time.perf_counter()
+                continue
+            if delay > 0:
+                self._stop_event.wait(delay)
+
+    def _capture_into(self, out: np.ndarray) -> None:
+        self._capture(monitor_region=self._monitor_region, region=self._capture_region, out=out)
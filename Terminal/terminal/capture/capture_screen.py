@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import ctypes
+import threading
 from ctypes import wintypes
 
 import numpy as np
@@ -125,8 +126,21 @@ def build_capture_rect(monitor_region: dict, region: dict | None = None) -> dict
     )
 
 
-def _bitmap_to_rgb(mem_dc: int, bitmap: int, width: int, height: int) -> np.ndarray:
-    pixel_buffer = (ctypes.c_ubyte * (width * height * 4))()
+# GetDIBits 用的 BGRA 缓冲区，按线程和尺寸复用，截图循环里不用每帧重新分配。
+_pixel_buffers = threading.local()
+
+
+def _get_pixel_buffer(width: int, height: int) -> ctypes.Array:
+    cached = getattr(_pixel_buffers, "buffer", None)
+    if cached is None or getattr(_pixel_buffers, "size", None) != (width, height):
+        cached = (ctypes.c_ubyte * (width * height * 4))()
+        _pixel_buffers.buffer = cached
+        _pixel_buffers.size = (width, height)
+    return cached
+
+
+def _bitmap_to_rgb(mem_dc: int, bitmap: int, width: int, height: int, out: np.ndarray | None = None) -> np.ndarray:
+    pixel_buffer = _get_pixel_buffer(width, height)
     bitmap_info = BITMAPINFOHEADER()
     bitmap_info.biSize = ctypes.sizeof(BITMAPINFOHEADER)
     bitmap_info.biWidth = width
@@ -149,13 +163,20 @@ def _bitmap_to_rgb(mem_dc: int, bitmap: int, width: int, height: int) -> np.ndar
 
     pixels = np.frombuffer(pixel_buffer, dtype=np.uint8)
     pixels = pixels.reshape((height, width, 4))
-    return pixels[:, :, [2, 1, 0]]
+    # BGRA -> RGB 用步长为 -1 的视图，不走花式索引的临时数组。
+    if out is None:
+        return pixels[:, :, 2::-1].copy()
+    np.copyto(out, pixels[:, :, 2::-1])
+    return out
 
 
-def capture_screen(monitor_region: dict, region: dict | None = None) -> np.ndarray:
+def capture_screen(monitor_region: dict, region: dict | None = None, out: np.ndarray | None = None) -> np.ndarray:
+    """截取区域并返回 (H, W, 3) 的 RGB 数组；传入 out 时直接写进 out（例如 FrameRing 的槽位）。"""
     capture_rect = build_capture_rect(monitor_region=monitor_region, region=region)
     width = capture_rect["width"]
     height = capture_rect["height"]
+    if out is not None and out.shape != (height, width, 3):
+        raise ValueError(f"out 的形状应为 {(height, width, 3)}，当前是 {out.shape}")
 
     screen_dc = user32.GetDC(0)
     if not screen_dc:
@@ -187,7 +208,7 @@ def capture_screen(monitor_region: dict, region: dict | None = None) -> np.ndarr
             SRCCOPY,
         ):
             raise ctypes.WinError()
-        return _bitmap_to_rgb(mem_dc, bitmap, width, height)
+        return _bitmap_to_rgb(mem_dc, bitmap, width, height, out)
     finally:
         gdi32.SelectObject(mem_dc, old_bitmap)
         gdi32.DeleteObject(bitmap)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+__all__ = [
+    "FrameRing",
+    "FrameSlot",
+    "SLOT_FREE",
+    "SLOT_READING",
+    "SLOT_READY",
+    "SLOT_WRITING",
+]
+
+# 每个槽位的状态，写在共享内存头部，跨进程也能看到。
+SLOT_FREE = 0
+SLOT_WRITING = 1
+SLOT_READY = 2
+SLOT_READING = 3
+
+# 头部: [槽位数, 高, 宽, 最近一次提交的序号]，随后是每个槽位的序号和状态，都是 int64。
+_HEADER_FIELDS = 4
+
+
+@dataclass(frozen=True, slots=True)
+class FrameSlot:
+    index: int
+    seq: int
+    frame: np.ndarray
+
+
+class FrameRing(object):
+    """固定数量、预先分配好的帧槽位，放在 multiprocessing.shared_memory 里。
+
+    截图线程 begin_write 拿到一个空闲槽位的 (H, W, 3) 视图，原地写完后 end_write 提交并分配序号；
+    解码线程 acquire_latest 拿到序号最大的已就绪槽位，直接在视图上解码，用完 release。
+    正在读的槽位不会被覆盖，写入方总是挑序号最小的空闲槽位，所以读方同时占着
+    当前帧和上一帧（增量解码要用）也不会阻塞写入。
+
+    状态切换都在 lock 里完成，像素拷贝不在锁里。跨进程使用时传入 multiprocessing.Lock，
+    另一端用 FrameRing.attach(name, lock) 挂上同一块内存。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool, lock: Any = None) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._lock = lock if lock is not None else threading.Lock()
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        slots, height, width = (int(value) for value in header[:3])
+        self.slots: int = slots
+        self.shape: tuple[int, int, int] = (height, width, 3)
+        self._header = header
+        self._seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=_HEADER_FIELDS * 8)
+        self._states = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=(_HEADER_FIELDS + slots) * 8)
+        self._frames = np.ndarray(
+            (slots, height, width, 3),
+            dtype=np.uint8,
+            buffer=shm.buf,
+            offset=_data_offset(slots),
+        )
+
+    @classmethod
+    def create(cls, height: int, width: int, slots: int = 4, lock: Any = None) -> "FrameRing":
+        if slots < 3:
+            raise ValueError("FrameRing 至少需要 3 个槽位：写入中、当前帧、上一帧")
+        size = _data_offset(slots) + slots * height * width * 3
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((_HEADER_FIELDS + 2 * slots,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[:3] = (slots, height, width)
+        del header
+        return cls(shm, owner=True, lock=lock)
+
+    @classmethod
+    def attach(cls, name: str, lock: Any = None) -> "FrameRing":
+        return cls(shared_memory.SharedMemory(name=name), owner=False, lock=lock)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self._header[3])
+
+    def matches(self, height: int, width: int) -> bool:
+        return self.shape[:2] == (height, width)
+
+    def reset(self) -> None:
+        """序号清零，除正在写入的槽位外全部置为空闲；只在没有读方时调用。"""
+        with self._lock:
+            self._header[3] = 0
+            idle = self._states != SLOT_WRITING
+            self._seqs[idle] = 0
+            self._states[idle] = SLOT_FREE
+
+    def begin_write(self) -> FrameSlot:
+        with self._lock:
+            writable = np.flatnonzero((self._states == SLOT_FREE) | (self._states == SLOT_READY))
+            if writable.size == 0:
+                raise RuntimeError("FrameRing 没有可写的槽位")
+            index = int(writable[np.argmin(self._seqs[writable])])
+            self._states[index] = SLOT_WRITING
+        return FrameSlot(index, 0, self._frames[index])
+
+    def end_write(self, slot: FrameSlot) -> int:
+        """提交写好的槽位，返回分配给这一帧的序号。"""
+        with self._lock:
+            seq = int(self._header[3]) + 1
+            self._header[3] = seq
+            self._seqs[slot.index] = seq
+            self._states[slot.index] = SLOT_READY
+        return seq
+
+    def abort_write(self, slot: FrameSlot) -> None:
+        with self._lock:
+            self._seqs[slot.index] = 0
+            self._states[slot.index] = SLOT_FREE
+
+    def acquire_latest(self, after_seq: int = 0) -> FrameSlot | None:
+        """拿到序号最大且大于 after_seq 的已就绪槽位，标为正在读；没有就返回 None。"""
+        with self._lock:
+            ready = np.flatnonzero(self._states == SLOT_READY)
+            if ready.size == 0:
+                return None
+            index = int(ready[np.argmax(self._seqs[ready])])
+            seq = int(self._seqs[index])
+            if seq <= after_seq:
+                return None
+            self._states[index] = SLOT_READING
+        return FrameSlot(index, seq, self._frames[index])
+
+    def release(self, slot: FrameSlot) -> None:
+        with self._lock:
+            if self._states[slot.index] == SLOT_READING and self._seqs[slot.index] == slot.seq:
+                self._states[slot.index] = SLOT_FREE
+
+    def view(self, index: int) -> np.ndarray:
+        """直接按下标取槽位视图，不改状态；给只负责读、由另一端管理槽位状态的进程用。"""
+        return self._frames[index]
+
+    def slot_states(self) -> list[int]:
+        with self._lock:
+            return self._states.tolist()
+
+    def dispose(self) -> None:
+        """关闭共享内存；创建方还会 unlink。调用前要确保没有人还拿着槽位视图。"""
+        del self._header, self._seqs, self._states, self._frames
+        try:
+            self._shm.close()
+        except BufferError:
+            # 外面还有槽位视图没释放，映射留给 GC 回收，名字照样 unlink 掉。
+            pass
+        if self._owner:
+            self._shm.unlink()
+
+
+def _data_offset(slots: int) -> int:
+    # 像素区按 64 字节对齐。
+    header_bytes = (_HEADER_FIELDS + 2 * slots) * 8
+    return (header_bytes + 63) // 64 * 64
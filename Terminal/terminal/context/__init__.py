@@ -1,9 +1,12 @@
 
 from .context import Context
+from .history import FrameHistory, HistoryView
 from .unit import Unit
 
 __all__ = [
     "Context",
+    "FrameHistory",
+    "HistoryView",
     "Unit",
 
 ]
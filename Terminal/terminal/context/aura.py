@@ -1,4 +1,4 @@
-from typing import Any
+from ..pixelcalc.snapshot import AuraSnapshot
 
 __all__ = [
     "Aura",
@@ -6,41 +6,36 @@ __all__ = [
 
 
 class Aura:
-    def __init__(self, aura: dict[str, Any]) -> None:
+    __slots__ = ("aura",)
+
+    def __init__(self, aura: AuraSnapshot) -> None:
         """
-        aura的结构如下: 
-        auraData = {
-            "title": icon_cell.title,
-            "remain": remain_cell.remaining,
-            "color_string": type_cell.color_string,
-            "type": COLOR_MAP["SPELL_TYPE"].get(type_cell.color_string, "UNKNOWN"),
-            "count": count_cell,
-        }
+        aura 是解码器产出的 AuraSnapshot，字段见 pixelcalc/snapshot.py。
         """
         self.aura = aura
 
     def __str__(self) -> str:
-        return self.aura["title"]
+        return self.aura.title
 
     @property
     def title(self) -> str:
-        return self.aura["title"]
+        return self.aura.title
 
     @property
     def remain(self) -> float:
-        return float(self.aura.get("remain", 999.0))
+        return self.aura.remain
 
     @property
     def type(self) -> str:
-        return self.aura.get("type", "UNKNOWN")
+        return self.aura.type
 
     @property
     def count(self) -> int:
-        count = self.aura.get("count", 1)
+        count = self.aura.count
         if count == 0:
             return 1
         return count
 
     @property
     def color_string(self) -> str:
-        return self.aura.get("color_string", "0,0,0")
+        return self.aura.color_string
@@ -1,6 +1,6 @@
-from typing import Any
-
+from ..pixelcalc.snapshot import CellSnapshot
 from .error import ContextError
+from .tracking import AccessLog
 
 __all__ = [
     "Cell",
@@ -9,56 +9,57 @@ __all__ = [
 
 
 class Cell:
-    def __init__(self, cell: dict[str, Any]) -> None:
+    __slots__ = ("cell",)
+
+    def __init__(self, cell: CellSnapshot) -> None:
         """
-        cell的结构如下: 
-        cellData = {
-            "pure": True,  # 固定为True
-            "mean": cell.mean,
-            "percent": cell.percent,
-            "decimal": cell.decimal,
-            "is_black": cell.is_black,
-            "is_white": cell.is_white,
-            "color_string": cell.color_string,
-                }
+        cell 是解码器产出的 CellSnapshot，字段见 pixelcalc/snapshot.py。
         """
         self.cell = cell
 
     @property
     def pure(self) -> bool:
-        return self.cell["pure"]
+        return self.cell.pure
 
     @property
     def mean(self) -> float:
-        return self.cell["mean"]
+        return self.cell.mean
 
     @property
     def percent(self) -> float:
-        return self.cell["percent"]
+        return self.cell.percent
 
     @property
     def decimal(self) -> float:
-        return self.cell["decimal"]
+        return self.cell.decimal
 
     @property
     def is_black(self) -> bool:
-        return self.cell["is_black"]
+        return self.cell.is_black
 
     @property
     def is_white(self) -> bool:
-        return self.cell["is_white"]
+        return self.cell.is_white
 
     @property
     def color_string(self) -> str:
-        return self.cell["color_string"]
+        return self.cell.color_string
 
 
 class CellDict:
-    def __init__(self, cell_dict: dict[str, Any]) -> None:
+    __slots__ = ("cell_dict", "_access_log", "_name")
+
+    def __init__(self, cell_dict: list[CellSnapshot | None], access_log: AccessLog | None = None, name: str = "") -> None:
+        # 下标就是 cell 序号；名字沿用以前按 "0"、"1" 取值的 dict。
         self.cell_dict = cell_dict
+        # name 是 FrameSnapshot 上的字段名（spec / setting），追踪时按 cell 序号记。
+        self._access_log = access_log
+        self._name = name
 
     def cell(self, index: int) -> Cell | None:
-        entry = self.cell_dict.get(f"{index}", None)
+        entry = self.cell_dict[index] if 0 <= index < len(self.cell_dict) else None
+        if self._access_log is not None:
+            self._access_log.record(("cells", self._name, index), entry)
         if entry is None:
             return None
         return Cell(entry)
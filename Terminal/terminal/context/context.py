@@ -1,9 +1,13 @@
 from typing import Any
 
+from ..pixelcalc.extractor import LazyFrameSnapshot
+from ..pixelcalc.snapshot import FrameSnapshot
 from .spell import Spell
 from .unit import Unit
 from .error import ContextError
 from .cell import CellDict
+from .tracking import AccessLog
+from .history import FrameHistory, HistoryView
 
 
 __all__ = [
@@ -12,24 +16,101 @@ __all__ = [
 
 
 class Context:
-    def __init__(self, decoded_data: dict[str, Any]) -> None:
-        self._decoded_data: dict[str, Any] = decoded_data
+    """一帧解码结果的查询入口，每帧新建一个。
+
+    解码器给的是 FrameSnapshot，按需解码模式下是 LazyFrameSnapshot（属性名一样，读到哪个字段才解码哪个）；
+    老代码和测试手写的 dict 也能传进来，会先转成 FrameSnapshot。
+    rotation 一帧里会反复查同一个技能、单位和光环；按名字的索引和 Spell/Unit 包装对象在第一次用到时建一次，
+    之后同一帧里的查询都是字典查找，拿到的也是同一个对象。
+
+    传入 access_log 时，读过的每个字段（技能、单位的 exists/status/光环、杂项字段、spec/setting 的 cell）
+    连同读到的值记进去，流水线据此判断下一帧要不要重新跑 rotation，见 RotationResultCache。
+    history 是 rotation 持有的最近若干帧的数值历史，通过 ctx.history 查趋势，见 FrameHistory。
+    """
+
+    __slots__ = ("_decoded_data", "_snapshot", "_spells", "_units", "_parties", "_access_log", "_history", "_decoded_dict")
+
+    def __init__(
+        self,
+        decoded_data: FrameSnapshot | LazyFrameSnapshot | dict[str, Any],
+        access_log: AccessLog | None = None,
+        history: FrameHistory | None = None,
+    ) -> None:
+        self._decoded_data: FrameSnapshot | LazyFrameSnapshot | dict[str, Any] = decoded_data
+        self._access_log = access_log
+        self._history = history
+        self._snapshot: FrameSnapshot | LazyFrameSnapshot | None
+        if isinstance(decoded_data, dict):
+            self._snapshot = FrameSnapshot.from_dict(decoded_data)
+        else:
+            self._snapshot = decoded_data
+        self._spells: dict[str, Spell] | None = None
+        self._units: dict[str, Unit] = {}
+        self._parties: list[Unit] | None = None
+        self._decoded_dict: dict[str, Any] | None = None
+
+    @property
+    def snapshot(self) -> FrameSnapshot | LazyFrameSnapshot:
+        self._read_everything()
+        return self._snapshot
+
+    @property
+    def history(self) -> HistoryView:
+        """最近若干帧的数值历史，例如 ctx.history.slope("party1.health", 2.0)、ctx.history.since_changed("player.buff.救赎")。
+
+        没有传 history 时（测试里直接构造 Context）只有当前这一帧。
+        """
+        # 趋势取决于之前的帧，不能只凭这一帧读过的字段判断结果能不能沿用。
+        self._read_everything()
+        if self._history is None:
+            self._history = FrameHistory(capacity=1)
+            self._history.record(self._snapshot)
+        return HistoryView(self._history)
 
     @property
     def decoded_data(self) -> dict[str, Any]:
-        return self._decoded_data
+        """原来的嵌套 dict；传进来的是快照时转一份（按需解码的快照会整帧解完），同一个 Context 只转一次。"""
+        self._read_everything()
+        if self._decoded_data is None or isinstance(self._decoded_data, dict):
+            return self._decoded_data
+        if self._decoded_dict is None:
+            self._decoded_dict = self._decoded_data.to_dict()
+        return self._decoded_dict
 
     @property
     def raw_data(self) -> dict[str, Any]:
-        return self._decoded_data
+        return self.decoded_data
+
+    def _read_everything(self) -> None:
+        # 直接拿整帧数据的读法没法逐字段追踪，这次评估的结果就不能沿用。
+        if self._access_log is not None:
+            self._access_log.opaque = True
+
+    def _field(self, name: str) -> Any:
+        value = getattr(self._snapshot, name)
+        if self._access_log is not None:
+            self._access_log.record(("frame", name), value)
+        return value
 
     def spell(self, spell_name: str) -> Spell | None:
-        if self.decoded_data is None:
+        spell = self._spell(spell_name)
+        if self._access_log is not None:
+            self._access_log.record(("spell", spell_name), None if spell is None else spell.spell)
+            if spell is not None:
+                self._access_log.note_countdown(spell.cooldown)
+        return spell
+
+    def _spell(self, spell_name: str) -> Spell | None:
+        if self._snapshot is None:
             return None
-        for spell in self.decoded_data["spell"]:
-            if spell["title"] == spell_name:
-                return Spell(spell)
-        return None
+        if self._spells is None:
+            # 同名技能以第一个为准，和原来逐个扫描的结果一致。
+            spells: dict[str, Spell] = {}
+            for spell in self._snapshot.spell:
+                if spell.title not in spells:
+                    spells[spell.title] = Spell(spell)
+            self._spells = spells
+        return self._spells.get(spell_name)
 
     def gcd_ready(self, queue_window: float = 0.2) -> bool:
         gcd_spell = self.spell("公共冷却时间")
@@ -72,83 +153,87 @@ class Context:
             return False
         return spell.is_known
 
+    def _unit(self, key: str) -> Unit:
+        unit = self._units.get(key)
+        if unit is None:
+            unit = Unit(self._snapshot.unit(key), self._access_log)
+            self._units[key] = unit
+        return unit
+
     @property
     def player(self) -> Unit:
-        return Unit(self.decoded_data["player"])
+        return self._unit("player")
 
     @property
     def target(self) -> Unit:
-        return Unit(self.decoded_data["target"])
+        return self._unit("target")
 
     @property
     def focus(self) -> Unit:
-        return Unit(self.decoded_data["focus"])
+        return self._unit("focus")
 
     @property
     def mouseover(self) -> Unit:
-        return Unit(self.decoded_data["mouseover"])
+        return self._unit("mouseover")
 
     @property
     def parties(self) -> list[Unit]:
-        units = []
-        for i in range(1, 5):
-            party_key: str = f'party{i}'
-            unit = Unit(self.decoded_data["party"][party_key])
-            if unit.exists:
-                units.append(unit)
-        return units
+        if self._parties is None:
+            self._parties = [unit for unit in (self.party(i) for i in range(1, 5)) if unit.exists]
+        # 调用方可能会改这个列表，每次给一份拷贝。
+        return list(self._parties)
 
     def party(self, party_index: int) -> Unit:
-        return Unit(self.decoded_data["party"][f'party{party_index}'])
+        return self._unit(f'party{party_index}')
 
     @property
     def burst_time(self) -> float:
-        return self.decoded_data['burst_time']
+        return self._field("burst_time")
 
     @property
     def combat_time(self) -> float:
-        return self.decoded_data['misc']['combat_time']
+        return self._field("combat_time")
 
     @property
     def use_mouse(self) -> bool:
-        return self.decoded_data['misc']['use_mouse']
+        return self._field("use_mouse")
 
     @property
     def assisted_combat(self) -> str:
-        return self.decoded_data['assisted_combat']
+        return self._field("assisted_combat")
 
     @property
     def delay(self) -> bool:
-        return self.decoded_data['delay']
+        return self._field("delay")
 
     @property
     def enable(self) -> bool:
-        return self.decoded_data['enable']
+        return self._field("enable")
 
     @property
     def dispel_blacklist(self) -> list[str]:
-        return self.decoded_data['dispel_blacklist']
+        return self._field("dispel_blacklist")
 
     @property
     def interrupt_blacklist(self) -> list[str]:
-        return self.decoded_data['interrupt_blacklist']
+        return self._field("interrupt_blacklist")
 
     @property
     def spell_stop_list(self) -> list[str]:
-        return self.decoded_data['spell_stop_list']
+        return self._field("spell_stop_list")
 
     @property
     def spell_queue_window(self) -> float:
-        return self.decoded_data['spell_queue_window']
+        return self._field("spell_queue_window")
 
     @property
     def spec(self) -> CellDict:
-        return CellDict(self.decoded_data['spec'])
+        return CellDict(self._snapshot.spec, self._access_log, "spec")
 
     @property
     def setting(self) -> CellDict:
-        return CellDict(self.decoded_data['setting'])
+        return CellDict(self._snapshot.setting, self._access_log, "setting")
 
     @property
     def latest_succeeded_cast(self) -> str:
-        return self.decoded_data['latest_succeeded_cast']
+        return self._field("latest_succeeded_cast")
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+from .error import ContextError
+
+__all__ = [
+    "FrameHistory",
+    "HistoryView",
+    "HISTORY_CAPACITY",
+]
+
+# 默认保留的帧数，20 FPS 下大约 25 秒。
+HISTORY_CAPACITY = 512
+
+_UNIT_TOKENS = ("player", "target", "focus", "mouseover", "party1", "party2", "party3", "party4")
+_FRAME_FIELDS = ("combat_time", "burst_time", "spell_queue_window")
+_STATUS_ALIASES = {"health": "unitHealthPercent", "power": "unitPowerPercent"}
+
+
+def _number(value: Any) -> float:
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _first_aura(auras: list[Any] | None, title: str) -> Any:
+    for aura in auras or ():
+        if aura.title == title:
+            return aura
+    return None
+
+
+def _reader(key: str) -> Callable[[Any], float]:
+    """把字段名解析成 snapshot -> float 的读取函数，读不到（单位不存在之类）时是 NaN。
+
+    支持的写法：
+      combat_time / burst_time / spell_queue_window
+      spell.<技能名>.cooldown / spell.<技能名>.charges
+      <单位>.health / <单位>.power / <单位>.exists / <单位>.status.<字段名>
+      <单位>.buff.<光环名> / <单位>.debuff.<光环名>：层数，没有这个光环时是 0
+      <单位>.buff.<光环名>.remain / <单位>.debuff.<光环名>.remain：剩余秒数，没有时是 0
+    单位是 player / target / focus / mouseover / party1..party4。
+    """
+    if key in _FRAME_FIELDS:
+        return lambda snapshot: _number(getattr(snapshot, key))
+
+    head, _, rest = key.partition(".")
+    if head == "spell":
+        title, _, attribute = rest.rpartition(".")
+        if title and attribute in ("cooldown", "charges"):
+            def read_spell(snapshot: Any) -> float:
+                for spell in snapshot.spell:
+                    if spell.title == title:
+                        return _number(getattr(spell, attribute))
+                return math.nan
+            return read_spell
+
+    elif head in _UNIT_TOKENS:
+        part, _, name = rest.partition(".")
+        if part == "exists" and not name:
+            return lambda snapshot: _number(snapshot.unit(head).exists)
+        if (part in _STATUS_ALIASES and not name) or (part == "status" and name):
+            field = _STATUS_ALIASES.get(part, name)
+
+            def read_status(snapshot: Any) -> float:
+                unit = snapshot.unit(head)
+                return _number(unit.status.get(field)) if unit.exists else math.nan
+            return read_status
+        if part in ("buff", "debuff") and name:
+            attribute = "count"
+            if name.endswith(".remain"):
+                name, attribute = name[:-len(".remain")], "remain"
+
+            def read_aura(snapshot: Any) -> float:
+                unit = snapshot.unit(head)
+                if not unit.exists:
+                    return math.nan
+                aura = _first_aura(getattr(unit, part), name)
+                return 0.0 if aura is None else _number(getattr(aura, attribute))
+            return read_aura
+
+    raise ContextError(f"history 不支持的字段: {key}")
+
+
+class FrameHistory(object):
+    """最近若干帧数值字段的环形缓冲区，每个字段一列预先分配好的 numpy 数组，时间戳是 time.monotonic()。
+
+    每列分配 2 * capacity，写入时同时写 i 和 i + capacity 两处，最近的 count 帧总是一段连续切片，
+    查询直接在切片上算，不用拷贝和拼接；since_changed 在写入时顺手记下变化时间，查询是 O(1)。
+    字段在第一次被查询时才开始记录（之前的帧是 NaN），按需解码时也只多解这些字段。
+    rotation 实例持有一份，BaseRotation.record_frame 每帧调用 record（RotationResultCache 沿用结果的帧也算）。只在跑 rotation 的那个线程里使用。
+    """
+
+    __slots__ = ("capacity", "_times", "_columns", "_readers", "_last_values", "_changed_at", "_head", "_count", "_latest")
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY) -> None:
+        if capacity < 1:
+            raise ValueError("capacity 至少为 1")
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._columns: dict[str, np.ndarray] = {}
+        self._readers: dict[str, Callable[[Any], float]] = {}
+        self._last_values: dict[str, float] = {}
+        self._changed_at: dict[str, float] = {}
+        # 下一次写入的位置，以及已经写了多少帧（最多 capacity）。
+        self._head = 0
+        self._count = 0
+        # 最近一次 record 的快照，新字段开始记录时用它补上当前帧的值。
+        self._latest: Any = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return tuple(self._columns)
+
+    def clear(self) -> None:
+        """丢掉所有帧，已经关注的字段保留。"""
+        self._head = 0
+        self._count = 0
+        self._latest = None
+        self._last_values.clear()
+        self._changed_at.clear()
+        for column in self._columns.values():
+            column.fill(math.nan)
+
+    def record(self, snapshot: Any, now: float | None = None) -> None:
+        """写入一帧：时间戳和所有已关注字段的当前值。"""
+        now = time.monotonic() if now is None else now
+        index = self._head
+        self._times[index] = self._times[index + self.capacity] = now
+        for key, column in self._columns.items():
+            self._write(key, column, index, self._readers[key](snapshot), now)
+        self._head = (index + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self._latest = snapshot
+
+    def watch(self, key: str) -> None:
+        """开始记录这个字段；已经有帧的话，当前帧的值马上补上。"""
+        if key in self._columns:
+            return
+        reader = _reader(key)
+        column = np.full(2 * self.capacity, math.nan, dtype=np.float64)
+        self._readers[key] = reader
+        self._columns[key] = column
+        if self._count:
+            index = (self._head - 1) % self.capacity
+            self._write(key, column, index, reader(self._latest), float(self._times[index]))
+
+    def _write(self, key: str, column: np.ndarray, index: int, value: float, now: float) -> None:
+        column[index] = column[index + self.capacity] = value
+        previous = self._last_values.get(key)
+        # NaN 和 NaN 算没变。
+        if previous is None or not (previous == value or (math.isnan(previous) and math.isnan(value))):
+            self._changed_at[key] = now
+        self._last_values[key] = value
+
+    def window(self, key: str, seconds: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """最近 seconds 秒（含最新一帧）的 (时间戳, 值)，是内部数组的只读视图；seconds 为 None 时给全部帧。"""
+        self.watch(key)
+        end = self._head + self.capacity
+        start = end - self._count
+        times = self._times[start:end]
+        values = self._columns[key][start:end]
+        if seconds is not None and self._count:
+            start = int(np.searchsorted(times, times[-1] - seconds, side="left"))
+            times, values = times[start:], values[start:]
+        times = times.view()
+        values = values.view()
+        times.flags.writeable = False
+        values.flags.writeable = False
+        return times, values
+
+    def latest(self, key: str) -> float:
+        self.watch(key)
+        return self._last_values.get(key, math.nan)
+
+    def slope(self, key: str, seconds: float) -> float:
+        """最近 seconds 秒内的最小二乘斜率，单位是“每秒”；有效点不足两个时为 0。"""
+        times, values = self._valid(key, seconds)
+        if len(values) < 2:
+            return 0.0
+        dt = times - times.mean()
+        denominator = float(np.dot(dt, dt))
+        if denominator <= 0.0:
+            return 0.0
+        return float(np.dot(dt, values - values.mean()) / denominator)
+
+    def delta(self, key: str, seconds: float) -> float:
+        """最近 seconds 秒内最后一个有效值减第一个有效值；不足两个有效点时为 0。"""
+        _, values = self._valid(key, seconds)
+        if len(values) < 2:
+            return 0.0
+        return float(values[-1] - values[0])
+
+    def mean(self, key: str, seconds: float) -> float:
+        _, values = self._valid(key, seconds)
+        if not len(values):
+            return math.nan
+        return float(values.mean())
+
+    def since_changed(self, key: str) -> float:
+        """当前值已经保持了多少秒（到最新一帧为止）。
+
+        从开始关注这个字段算起：第一次查询时返回 0，之后才会慢慢长上去。
+        """
+        self.watch(key)
+        changed_at = self._changed_at.get(key)
+        if changed_at is None or not self._count:
+            return 0.0
+        return float(self._times[(self._head - 1) % self.capacity] - changed_at)
+
+    def _valid(self, key: str, seconds: float) -> tuple[np.ndarray, np.ndarray]:
+        times, values = self.window(key, seconds)
+        mask = ~np.isnan(values)
+        if mask.all():
+            return times, values
+        return times[mask], values[mask]
+
+
+class HistoryView(object):
+    """ctx.history：把查询转给 rotation 持有的 FrameHistory。
+
+    趋势取决于之前的帧，查过 history 的评估不会被 RotationResultCache 沿用。
+    """
+
+    __slots__ = ("_history",)
+
+    def __init__(self, history: FrameHistory) -> None:
+        self._history = history
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def watch(self, *keys: str) -> None:
+        """提前开始记录，等真正要用的时候已经攒了一段历史。"""
+        for key in keys:
+            self._history.watch(key)
+
+    def window(self, key: str, seconds: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        return self._history.window(key, seconds)
+
+    def latest(self, key: str) -> float:
+        return self._history.latest(key)
+
+    def slope(self, key: str, seconds: float) -> float:
+        return self._history.slope(key, seconds)
+
+    def delta(self, key: str, seconds: float) -> float:
+        return self._history.delta(key, seconds)
+
+    def mean(self, key: str, seconds: float) -> float:
+        return self._history.mean(key, seconds)
+
+    def since_changed(self, key: str) -> float:
+        return self._history.since_changed(key)
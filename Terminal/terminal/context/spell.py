@@ -1,4 +1,4 @@
-from typing import Any
+from ..pixelcalc.snapshot import SpellSnapshot
 
 __all__ = [
     "Spell",
@@ -6,48 +6,41 @@ __all__ = [
 
 
 class Spell:
-    def __init__(self, spell: dict[str, Any]) -> None:
+    __slots__ = ("spell",)
+
+    def __init__(self, spell: SpellSnapshot) -> None:
         """
-        spell的结构如下: 
-        spell = {
-            "is_charge": True,
-            "charges": charge_cell,
-            "title": icon_cell.title,
-            "cooldown": cooldown_cell.remaining,
-            "highlight": highlight_cell.is_not_black,
-            "is_usable": usable_cell.is_not_black,
-            "is_known": known_cell.is_not_black,
-        }
+        spell 是解码器产出的 SpellSnapshot，字段见 pixelcalc/snapshot.py。
         """
         self.spell = spell
 
     def __str__(self) -> str:
-        return self.spell["title"]
+        return self.spell.title
 
     @property
     def title(self) -> str:
-        return self.spell["title"]
+        return self.spell.title
 
     @property
     def cooldown(self) -> float:
-        return float(self.spell.get("cooldown", 999.0))
+        return self.spell.cooldown
 
     @property
     def is_usable(self) -> bool:
-        return bool(self.spell.get("is_usable", False))
+        return self.spell.is_usable
 
     @property
     def is_known(self) -> bool:
-        return bool(self.spell.get("is_known", False))
+        return self.spell.is_known
 
     @property
     def is_charge(self) -> bool:
-        return bool(self.spell.get("is_charge", False))
+        return self.spell.is_charge
 
     @property
     def charges(self) -> int:
-        return int(self.spell.get("charges", 0))
+        return self.spell.charges
 
     @property
     def highlight(self) -> bool:
-        return bool(self.spell.get("highlight", False))
+        return self.spell.highlight
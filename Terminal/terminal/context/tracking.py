@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from typing import TYPE_CHECKING, Any
+
+from .error import ContextError
+
+if TYPE_CHECKING:
+    from .context import Context
+
+__all__ = [
+    "AccessLog",
+    "TrackedStatus",
+]
+
+# status 里没有这个 key 时记下的值，和真实的 None 区分开。
+_MISSING = object()
+
+
+class AccessLog(object):
+    """一次 rotation 评估从 Context 读过的字段：key -> 当时读到的值。
+
+    key 是元组，例如 ("frame", "combat_time")、("spell", "真言术：盾")、("unit", "party1", "status", "unitHealthPercent")、
+    ("unit", "player", "buff", "救赎")、("cells", "setting", 3)。值都是解码器给的不可变快照或普通值，可以直接比较。
+    countdown 是读到的技能冷却、光环剩余时间里最小的正数；opaque 表示读过整帧数据（decoded_data 之类），没法逐字段追踪。
+    """
+
+    __slots__ = ("reads", "countdown", "opaque")
+
+    def __init__(self) -> None:
+        self.reads: dict[tuple[Any, ...], Any] = {}
+        self.countdown: float | None = None
+        self.opaque = False
+
+    def record(self, key: tuple[Any, ...], value: Any) -> None:
+        # 同一帧里同一个字段的值不会变，记第一次就够了。
+        self.reads.setdefault(key, value)
+
+    def note_countdown(self, seconds: float) -> None:
+        if seconds > 0 and (self.countdown is None or seconds < self.countdown):
+            self.countdown = seconds
+
+    def unchanged(self, ctx: Context) -> bool:
+        """在新一帧的 Context 上重新读一遍记下的字段，全都和上次一样才返回 True。
+
+        按记录的顺序比较：exists 总是先于这个单位的光环和 status 被读到，单位没了就在这里停下。
+        """
+        if self.opaque:
+            return False
+        for key, value in self.reads.items():
+            try:
+                current = _lookup(ctx, key)
+            except (ContextError, LookupError):
+                return False
+            if current != value:
+                return False
+        return True
+
+
+def _lookup(ctx: Context, key: tuple[Any, ...]) -> Any:
+    kind = key[0]
+    snapshot = ctx._snapshot
+    if kind == "frame":
+        return getattr(snapshot, key[1])
+    if kind == "spell":
+        spell = ctx.spell(key[1])
+        return None if spell is None else spell.spell
+    if kind == "cells":
+        cells = getattr(snapshot, key[1])
+        return cells[key[2]] if 0 <= key[2] < len(cells) else None
+
+    unit = ctx._unit(key[1])
+    part = key[2]
+    if part == "exists":
+        return unit.unit.exists
+    if part == "status":
+        return unit.unit.status.get(key[3], _MISSING)
+    if part == "buff":
+        if len(key) == 3:
+            return tuple(unit.unit.buff)
+        aura = unit.buffByName(key[3])
+        return None if aura is None else aura.aura
+    if part == "debuff":
+        if len(key) == 3:
+            return tuple(unit.unit.debuff)
+        aura = unit.debuffByName(key[3])
+        return None if aura is None else aura.aura
+    if part == "hasBuff":
+        return unit.hasBuff(key[3])
+    if part == "hasDebuff":
+        return unit.hasDebuff(key[3])
+    raise KeyError(key)
+
+
+class TrackedStatus(Mapping):
+    """Unit.status 在追踪打开时给出的只读视图，每读一个 key 记一笔。"""
+
+    __slots__ = ("_status", "_access_log", "_unit_token")
+
+    def __init__(self, status: dict[str, Any], access_log: AccessLog, unit_token: str) -> None:
+        self._status = status
+        self._access_log = access_log
+        self._unit_token = unit_token
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._status.get(key, _MISSING)
+        self._access_log.record(("unit", self._unit_token, "status", key), value)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._status)
+
+    def __len__(self) -> int:
+        return len(self._status)
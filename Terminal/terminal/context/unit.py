@@ -1,22 +1,46 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from typing import Any
 
+from ..pixelcalc.snapshot import UnitSnapshot
 from .aura import Aura
 from .error import ContextError
+from .tracking import AccessLog, TrackedStatus
 
 __all__ = [
     "Unit",
 ]
 
 
+def _index_by_title(auras: list[Aura]) -> dict[str, Aura]:
+    # 同名光环以第一个为准，和原来逐个扫描的结果一致。
+    index: dict[str, Aura] = {}
+    for aura in auras:
+        index.setdefault(aura.title, aura)
+    return index
+
+
 class Unit:
-    def __init__(self, unit: dict[str, Any]) -> None:
+    """一帧里的一个单位。Context 每帧对同一个单位只建一个 Unit，buff/debuff 列表和按名字的索引在第一次用到时建好。
+
+    治疗 rotation 会在队友身上挂自己算的字段（health_score、dispel_list 等），所以留了 __dict__。
+    access_log 不为 None 时，exists、status 的每个 key、按名字查的光环都会记进去（见 Context）。
+    """
+
+    __slots__ = ("unit", "_buffs", "_debuffs", "_buff_index", "_debuff_index", "_access_log", "__dict__")
+
+    def __init__(self, unit: UnitSnapshot, access_log: AccessLog | None = None) -> None:
         self.unit = unit
+        self._access_log = access_log
+        self._buffs: list[Aura] | None = None
+        self._debuffs: list[Aura] | None = None
+        self._buff_index: dict[str, Aura] | None = None
+        self._debuff_index: dict[str, Aura] | None = None
 
     @property
     def unitToken(self) -> str:
-        return self.unit["unitToken"]
+        return self.unit.unitToken
 
     @property
     def unitType(self) -> str:
@@ -29,36 +53,64 @@ class Unit:
 
     @property
     def exists(self) -> bool:
-        return bool(self.unit["exists"])
+        exists = self.unit.exists
+        if self._access_log is not None:
+            self._access_log.record(("unit", self.unitToken, "exists"), exists)
+        return exists
 
     @property
-    def status(self) -> dict[str, Any]:
-        return self.unit["status"]
+    def status(self) -> Mapping[str, Any]:
+        if self._access_log is not None:
+            return TrackedStatus(self.unit.status, self._access_log, self.unitToken)
+        return self.unit.status
 
-    @property
-    def buff(self) -> list[Aura]:
+    def _record_auras(self, kind: str, auras: list[Aura]) -> None:
+        if self._access_log is not None:
+            self._access_log.record(("unit", self.unitToken, kind), tuple(aura.aura for aura in auras))
+            for aura in auras:
+                self._access_log.note_countdown(aura.remain)
+
+    def _record_aura(self, kind: str, name: str, aura: Aura | None) -> None:
+        if self._access_log is not None:
+            self._access_log.record(("unit", self.unitToken, kind, name), None if aura is None else aura.aura)
+            if aura is not None:
+                self._access_log.note_countdown(aura.remain)
+
+    def _buff_list(self) -> list[Aura]:
         if not self.exists:
             raise ContextError("unit does not exist")
         if self.unitType in ["player", "party"]:
-            return [Aura(aura) for aura in self.unit["buff"]]
+            if self._buffs is None:
+                self._buffs = [Aura(aura) for aura in self.unit.buff]
+            return self._buffs
         raise ContextError("enemy unit has no buff")
 
+    @property
+    def buff(self) -> list[Aura]:
+        buffs = self._buff_list()
+        self._record_auras("buff", buffs)
+        # 给副本，调用方改了也不会弄乱缓存的列表和按名字的索引。
+        return list(buffs)
+
+    def _buffs_by_title(self) -> dict[str, Aura]:
+        if self._buff_index is None:
+            self._buff_index = _index_by_title(self._buff_list())
+        return self._buff_index
+
     def hasBuff(self, buff_name: str) -> bool:
         if not self.exists:
             raise ContextError("unit does not exist")
         if self.unitType in ["enemy", ]:
             raise ContextError("enemy unit has no buff")
-        for aura in self.buff:
-            if aura.title == buff_name:
-                return True
-        return False
+        has_buff = buff_name in self._buffs_by_title()
+        if self._access_log is not None:
+            self._access_log.record(("unit", self.unitToken, "hasBuff", buff_name), has_buff)
+        return has_buff
 
     def buffByName(self, name: str) -> Aura | None:
-        if self.hasBuff(name):
-            for aura in self.buff:
-                if aura.title == name:
-                    return aura
-        return None
+        buff = self._buffs_by_title()[name] if self.hasBuff(name) else None
+        self._record_aura("buff", name, buff)
+        return buff
 
     def buffRemain(self, name: str) -> float:
         buff = self.buffByName(name)
@@ -72,26 +124,36 @@ class Unit:
             return 0  # 这会让用法非常方便，如果buff不存在，0就是了
         return buff.count
 
-    @property
-    def debuff(self) -> list[Aura]:
+    def _debuff_list(self) -> list[Aura]:
         if not self.exists:
             raise ContextError("unit does not exist")
-        return [Aura(aura) for aura in self.unit["debuff"]]
+        if self._debuffs is None:
+            self._debuffs = [Aura(aura) for aura in self.unit.debuff]
+        return self._debuffs
+
+    @property
+    def debuff(self) -> list[Aura]:
+        debuffs = self._debuff_list()
+        self._record_auras("debuff", debuffs)
+        return list(debuffs)
+
+    def _debuffs_by_title(self) -> dict[str, Aura]:
+        if self._debuff_index is None:
+            self._debuff_index = _index_by_title(self._debuff_list())
+        return self._debuff_index
 
     def hasDebuff(self, debuff_name: str) -> bool:
         if not self.exists:
             raise ContextError("unit does not exist")
-        for aura in self.debuff:
-            if aura.title == debuff_name:
-                return True
-        return False
+        has_debuff = debuff_name in self._debuffs_by_title()
+        if self._access_log is not None:
+            self._access_log.record(("unit", self.unitToken, "hasDebuff", debuff_name), has_debuff)
+        return has_debuff
 
     def debuffByName(self, name: str) -> Aura | None:
-        if self.hasDebuff(name):
-            for aura in self.debuff:
-                if aura.title == name:
-                    return aura
-        return None
+        debuff = self._debuffs_by_title()[name] if self.hasDebuff(name) else None
+        self._record_aura("debuff", name, debuff)
+        return debuff
 
     def debuffRemain(self, name: str) -> float:
         debuff = self.debuffByName(name)
@@ -0,0 +1,230 @@
+"""不带 Qt 的 Terminal 运行时：python -m terminal.headless
+
+截图、解码、rotation 和发按键全部在普通线程（或 process 模式下的引擎进程）里完成，日志打到 stdout。
+适合没人看窗口的机器，也方便单独对热路径做性能分析。
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Sequence
+
+from .capture.capture_loop import CaptureLoop, locate_capture_region
+from .capture.capture_screen import build_capture_rect, build_monitor_dict, get_monitors
+from .key_dispatch import KeyDispatcher
+from .metrics import MetricsServer, render_metrics
+from .pipeline import PIPELINE_MODE_FUSED, PIPELINE_MODE_PROCESS, PIPELINE_MODE_THREADED, FrameTracer, PipelineRunner
+from .pipeline.tracing import STAGE_KEY_DOWN
+from .pixelcalc.error import TitleError
+from .pixelcalc.title_manager import TitleManager, get_default_title_manager
+from .rotation.base import BaseRotation
+
+__all__ = ["build_parser", "log_to_stdout", "main", "parse_region", "resolve_rotation_class"]
+
+HEADLESS_MODES = (PIPELINE_MODE_THREADED, PIPELINE_MODE_FUSED, PIPELINE_MODE_PROCESS)
+
+
+def log_to_stdout(message: str) -> None:
+    timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+    print(f'{timestamp} {message}', flush=True)
+
+
+def resolve_rotation_class(name: str) -> type[BaseRotation]:
+    """按类名（或 rotation.name）在 ALL_ROTATIONS 里找；也接受 'package.module:ClassName'。"""
+    if ':' in name:
+        module_name, class_name = name.split(':', 1)
+        rotation_class = getattr(importlib.import_module(module_name), class_name, None)
+        if not (isinstance(rotation_class, type) and issubclass(rotation_class, BaseRotation)):
+            raise ValueError(f'{name} 不是 BaseRotation 子类')
+        return rotation_class
+
+    from .rotation import ALL_ROTATIONS
+
+    for rotation_class in ALL_ROTATIONS:
+        if name in (rotation_class.__name__, rotation_class.name):
+            return rotation_class
+    choices = ', '.join(rotation_class.__name__ for rotation_class in ALL_ROTATIONS)
+    raise ValueError(f'找不到 rotation: {name}，可选: {choices}')
+
+
+def parse_region(text: str) -> dict[str, int]:
+    """'left,top,right,bottom'，相对于显示器左上角。"""
+    parts = [part.strip() for part in text.split(',')]
+    if len(parts) != 4:
+        raise ValueError(f'region 需要 4 个整数 left,top,right,bottom: {text}')
+    left, top, right, bottom = (int(part) for part in parts)
+    return {'left': left, 'top': top, 'right': right, 'bottom': bottom}
+
+
+def _parse_window(text: str) -> int | str:
+    if text == 'auto':
+        return text
+    return int(text, 0)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m terminal.headless', description='不带界面运行 Terminal 的截图、解码和 rotation。')
+    parser.add_argument('--rotation', required=True, help='rotation 类名，或 package.module:ClassName')
+    parser.add_argument('--monitor', type=int, default=0, help='显示器序号，从 0 开始（默认 0）')
+    parser.add_argument('--region', type=parse_region, default=None, help='截图区域 left,top,right,bottom；不填则整屏查找标志位')
+    parser.add_argument('--window', type=_parse_window, default='auto', help="游戏窗口句柄（十进制或 0x 十六进制），默认 auto 取第一个魔兽世界窗口")
+    parser.add_argument('--fps', type=int, default=15)
+    parser.add_argument('--mode', choices=HEADLESS_MODES, default=PIPELINE_MODE_FUSED)
+    parser.add_argument('--db', default=None, help='标题库 SQLite 路径，默认和界面版相同')
+    parser.add_argument('--dry-run', action='store_true', help='只解码和跑 rotation，不发按键')
+    parser.add_argument('--status-interval', type=float, default=5.0, help='每隔多少秒打印一次状态，0 表示不打印')
+    parser.add_argument('--duration', type=float, default=0.0, help='运行多少秒后退出，0 表示直到 Ctrl+C')
+    parser.add_argument(
+        '--lazy-decode', action='store_true', help='按需解码：只解码 rotation 读到的字段（process 模式下无效）'
+    )
+    parser.add_argument(
+        '--metrics-port', type=int, default=0, help='在 127.0.0.1 的这个端口提供 Prometheus /metrics，0 表示关闭（默认）'
+    )
+    return parser
+
+
+def _resolve_window_handle(window: int | str, log: Callable[[str], None]) -> int | None:
+    if window != 'auto':
+        return int(window)
+    from .keyboard import get_windows_by_title
+
+    windows = get_windows_by_title()
+    if not windows:
+        log('没有找到游戏窗口，只解码不发按键。')
+        return None
+    log(f"使用游戏窗口: {windows[0]['title']} hwnd={windows[0]['hwnd']}")
+    return windows[0]['hwnd']
+
+
+def _build_key_dispatcher(log: Callable[[str], None], tracer: FrameTracer) -> KeyDispatcher:
+    from .keyboard import PostMessageKeySender
+
+    on_key_down = None
+    if tracer.enabled:
+        on_key_down = lambda latency_ns: tracer.observe(STAGE_KEY_DOWN, latency_ns)
+    return KeyDispatcher(PostMessageKeySender(), log=log, on_key_down=on_key_down)
+
+
+def _close_title_manager(title_manager: TitleManager, log: Callable[[str], None]) -> None:
+    # 退出时还有写入失败没报告过的话，记到日志里，不要在退出路径上抛异常。
+    try:
+        title_manager.close()
+    except TitleError as error:
+        log(str(error))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    log = log_to_stdout
+
+    try:
+        rotation_class = resolve_rotation_class(args.rotation)
+    except (ImportError, ValueError) as error:
+        log(str(error))
+        return 2
+
+    monitors = get_monitors()[1:]
+    if not 0 <= args.monitor < len(monitors):
+        log(f'显示器序号超出范围: {args.monitor}，当前有 {len(monitors)} 块显示器')
+        return 2
+    monitor_region = monitors[args.monitor]
+
+    if args.region is not None:
+        try:
+            build_capture_rect(monitor_region, args.region)
+        except ValueError as error:
+            log(str(error))
+            return 2
+        capture_region = build_monitor_dict(**args.region)
+    else:
+        log('开始整屏查找标志位。')
+        capture_region = locate_capture_region(monitor_region)
+        if capture_region is None:
+            log('未找到标志位，退出。')
+            return 1
+    log(
+        '已锁定截图区域: '
+        f"left={capture_region['left']} top={capture_region['top']} "
+        f"right={capture_region['right']} bottom={capture_region['bottom']}"
+    )
+
+    window_handle = None if args.dry_run else _resolve_window_handle(args.window, log)
+    title_manager = get_default_title_manager(args.db)
+    # 只有开了指标接口才逐帧打时间点，否则流水线拿到的是关掉的 tracer。
+    tracer = FrameTracer(enabled=args.metrics_port > 0)
+    key_dispatcher = _build_key_dispatcher(log, tracer)
+    runner = PipelineRunner(
+        send_key=key_dispatcher.send,
+        log=log,
+        title_manager=title_manager,
+        on_rotation_created=lambda rotation: key_dispatcher.preload_macro_table(rotation.macroTable),
+        tracer=tracer,
+        lazy=args.lazy_decode,
+    )
+    metrics_server: MetricsServer | None = None
+    if args.metrics_port > 0:
+        metrics_server = MetricsServer(
+            lambda: render_metrics(
+                trace_summary=tracer.summary(),
+                title_manager=title_manager,
+                hot_reload_counts=[runner.hot_reload_counts],
+                keys_sent=key_dispatcher.sent,
+            ),
+            args.metrics_port,
+        )
+        try:
+            metrics_server.start()
+        except OSError as error:
+            log(f'指标接口监听 {args.metrics_port} 失败: {error}')
+            runner.close()
+            _close_title_manager(title_manager, log)
+            return 2
+        log(f'指标接口: http://127.0.0.1:{metrics_server.port}/metrics')
+    stopped = threading.Event()
+
+    def handle_capture_error(message: str) -> None:
+        log(message)
+        stopped.set()
+
+    capture_loop = CaptureLoop(runner, monitor_region, capture_region, args.fps, on_error=handle_capture_error)
+    previous_sigint = signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+    runner.start(rotation_class, window_handle, args.mode)
+    capture_loop.start()
+    log(f'headless 已启动: rotation={rotation_class.__name__} mode={args.mode} fps={args.fps}')
+
+    deadline = time.monotonic() + args.duration if args.duration > 0 else None
+    try:
+        while not stopped.is_set():
+            timeout = args.status_interval if args.status_interval > 0 else 1.0
+            if deadline is not None:
+                timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+            if stopped.wait(timeout):
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            if args.status_interval > 0:
+                snapshot = runner.snapshot()
+                log(
+                    f'frame={snapshot.frame_id} state={snapshot.decode_state} '
+                    f'dropped={snapshot.dropped_frames} captured={capture_loop.frames}'
+                )
+    finally:
+        signal.signal(signal.SIGINT, previous_sigint)
+        capture_loop.stop()
+        runner.close()
+        key_dispatcher.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        _close_title_manager(title_manager, log)
+        log('headless 已停止。')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""按键分发：把“发一个热键”从调用方线程挪到专用线程。
+
+调用方（主线程或流水线线程）只把解析好的按键序列放进队列就返回；
+分发线程立刻发 key-down，key-up 挂到按 monotonic 时间走的时间轮上，到点再发，不 sleep。
+真正发消息的后端可替换：Windows 下是 keyboard.PostMessageKeySender，测试里用 RecordingKeySender。
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Generic, Protocol, TypeVar
+
+__all__ = [
+    "KEY_HOLD_SECONDS",
+    "VK_DICT",
+    "KeyDispatcher",
+    "KeyEvent",
+    "KeySender",
+    "KeyStroke",
+    "RecordingKeySender",
+    "TimerWheel",
+    "parse_hot_key",
+]
+
+VK_DICT = {
+    "SHIFT": 0x10, "CTRL": 0x11, "ALT": 0x12,
+    "NUMPAD0": 0x60, "NUMPAD1": 0x61, "NUMPAD2": 0x62,    "NUMPAD3": 0x63, "NUMPAD4": 0x64,
+    "NUMPAD5": 0x65,    "NUMPAD6": 0x66, "NUMPAD7": 0x67, "NUMPAD8": 0x68,    "NUMPAD9": 0x69,
+    "F1": 0x70, "F2": 0x71, "F3": 0x72, "F4": 0x73, "F5": 0x74, "F6": 0x75,
+    "F7": 0x76, "F8": 0x77, "F9": 0x78, "F10": 0x79, "F11": 0x7A, "F12": 0x7B,
+    ",": 0xBC, ".": 0xBE, "/": 0xBF, ";": 0xBA, "'": 0xDE,
+    "[": 0xDB, "]": 0xDD, "=": 0xBB, "-": 0xBD, "`": 0xC0,
+}
+
+# 和原来 send_hot_key 的 time.sleep(0.01) 一样，按下 10ms 后抬起。
+KEY_HOLD_SECONDS = 0.01
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class KeyStroke:
+    """解析好的热键：'SHIFT-F1' -> (0x10, 0x70)，按顺序按下，逆序抬起。"""
+
+    hot_key: str
+    vk_codes: tuple[int, ...]
+
+
+def parse_hot_key(hot_key: str) -> KeyStroke:
+    key_list = hot_key.split("-")
+    vk_codes: list[int] = []
+    for skey in key_list:
+        key = VK_DICT.get(skey)
+        if key is None:
+            raise KeyError(f"Virtual key '{skey}' not found")
+        vk_codes.append(key)
+    return KeyStroke(hot_key, tuple(vk_codes))
+
+
+class KeySender(Protocol):
+    """发按键消息的后端，只在分发线程里调用。"""
+
+    def key_down(self, hwnd: int, vk_code: int) -> None: ...
+
+    def key_up(self, hwnd: int, vk_code: int) -> None: ...
+
+
+@dataclass(frozen=True, slots=True)
+class KeyEvent:
+    monotonic: float
+    hwnd: int
+    vk_code: int
+    down: bool
+
+
+class RecordingKeySender(object):
+    """不发任何消息，只记下每个按键事件和它的 monotonic 时间；用来在 Linux 上测分发吞吐和时序。"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.events: list[KeyEvent] = []
+
+    def key_down(self, hwnd: int, vk_code: int) -> None:
+        self._record(hwnd, vk_code, True)
+
+    def key_up(self, hwnd: int, vk_code: int) -> None:
+        self._record(hwnd, vk_code, False)
+
+    def _record(self, hwnd: int, vk_code: int, down: bool) -> None:
+        event = KeyEvent(self._clock(), hwnd, vk_code, down)
+        with self._lock:
+            self.events.append(event)
+
+
+class TimerWheel(Generic[T]):
+    """单层哈希时间轮：到期时间按 tick 取整放进槽位，advance(now) 一格一格转到 now，取出到期的项。
+
+    不是线程安全的，只在分发线程里用。
+    """
+
+    def __init__(self, tick_seconds: float = 0.001, slots: int = 256) -> None:
+        self.tick_seconds = tick_seconds
+        self._slots: list[list[tuple[int, T]]] = [[] for _ in range(slots)]
+        self._current_tick: int | None = None
+        self.pending = 0
+
+    def schedule(self, due_monotonic: float, item: T) -> None:
+        due_tick = math.ceil(due_monotonic / self.tick_seconds)
+        if self._current_tick is None:
+            self._current_tick = due_tick
+        # 已经转过去的格子不会再看，过期的项放到下一次 advance 会处理的那一格。
+        due_tick = max(due_tick, self._current_tick)
+        self._slots[due_tick % len(self._slots)].append((due_tick, item))
+        self.pending += 1
+
+    def advance(self, now_monotonic: float) -> list[T]:
+        if self._current_tick is None or self.pending == 0:
+            self._current_tick = None
+            return []
+        target_tick = math.floor(now_monotonic / self.tick_seconds)
+        if target_tick < self._current_tick:
+            return []
+        expired: list[T] = []
+        # 落后超过一圈时每个槽位只看一遍。
+        for tick in range(self._current_tick, min(target_tick, self._current_tick + len(self._slots) - 1) + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            remaining = [entry for entry in slot if entry[0] > target_tick]
+            if len(remaining) != len(slot):
+                expired.extend(item for due_tick, item in slot if due_tick <= target_tick)
+                slot[:] = remaining
+        self._current_tick = target_tick + 1
+        self.pending -= len(expired)
+        return expired
+
+    def drain(self) -> list[T]:
+        """不管到没到期，取出全部项并清空。"""
+        items = [item for slot in self._slots for _, item in slot]
+        for slot in self._slots:
+            slot.clear()
+        self._current_tick = None
+        self.pending = 0
+        return items
+
+    def seconds_until_next_tick(self, now_monotonic: float) -> float:
+        if self._current_tick is None:
+            return self.tick_seconds
+        return max(0.0, self._current_tick * self.tick_seconds - now_monotonic)
+
+
+class KeyDispatcher(object):
+    """专用线程发按键。send() 不阻塞，签名和原来的 send_hot_key 一样，可以直接当 send_key 传给流水线。
+
+    - 热键字符串只解析一次：rotation 的 macroTable 加载时 preload_macro_table，没预载的第一次 send 时解析。
+    - key-down 马上发，key-up 挂到时间轮上 hold_seconds 之后发。
+    - 同一个窗口的同一个热键还没抬起又要按时，先把上一次抬起，再按下。
+    - stop() 会把还按着的键全部抬起，不留卡住的键。
+    """
+
+    def __init__(
+        self,
+        sender: KeySender,
+        *,
+        hold_seconds: float = KEY_HOLD_SECONDS,
+        tick_seconds: float = 0.001,
+        log: Callable[[str], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        on_key_down: Callable[[int], None] | None = None,
+    ) -> None:
+        self._sender = sender
+        self._hold_seconds = hold_seconds
+        self._log = log or (lambda message: None)
+        self._clock = clock
+        # 每次发出 key-down 时报告从 send() 入队到现在的纳秒数，用来统计分发延迟。
+        self._on_key_down = on_key_down
+        self._strokes: dict[str, KeyStroke] = {}
+        self._condition = threading.Condition()
+        self._commands: deque[tuple[int, KeyStroke, int]] = deque()
+        self._wheel: TimerWheel[tuple[int, KeyStroke, object]] = TimerWheel(tick_seconds)
+        # (hwnd, 热键) -> 这一次按下的令牌；时间轮里的抬起只在令牌还对得上时生效。
+        self._held: dict[tuple[int, str], object] = {}
+        self._idle = True
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self.sent = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._condition:
+            if self.running:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="KeyDispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(2.0)
+
+    def stroke(self, hot_key: str) -> KeyStroke:
+        stroke = self._strokes.get(hot_key)
+        if stroke is None:
+            stroke = parse_hot_key(hot_key)
+            self._strokes[hot_key] = stroke
+        return stroke
+
+    def preload_macro_table(self, macro_table: dict[str, str]) -> None:
+        """rotation 构造完 macroTable 后调用；解析不了的按键在这里记日志，等到 cast 时 send 仍会抛 KeyError。"""
+        for macro_name, hot_key in macro_table.items():
+            if not hot_key:
+                continue
+            try:
+                self.stroke(hot_key)
+            except KeyError as error:
+                self._log(f'按键配置无法解析: {macro_name} = {hot_key}: {error}')
+
+    def send(self, hwnd: int, hot_key: str) -> None:
+        stroke = self.stroke(hot_key)
+        with self._condition:
+            self._commands.append((hwnd, stroke, time.monotonic_ns()))
+            self._idle = False
+            self._condition.notify()
+        if not self.running:
+            self.start()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """等队列和还没抬起的键都处理完；测试和关机前用。"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._idle, timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._commands and not self._stopping:
+                    if self._wheel.pending == 0:
+                        self._idle = True
+                        self._condition.notify_all()
+                        self._condition.wait()
+                    else:
+                        timeout = self._wheel.seconds_until_next_tick(self._clock())
+                        if timeout > 0:
+                            self._condition.wait(timeout)
+                        break
+                commands = list(self._commands)
+                self._commands.clear()
+                stopping = self._stopping
+
+            for hwnd, stroke, queued_ns in commands:
+                self._press(hwnd, stroke)
+                if self._on_key_down is not None:
+                    self._on_key_down(time.monotonic_ns() - queued_ns)
+            for hwnd, stroke, token in self._wheel.advance(self._clock()):
+                if self._held.get((hwnd, stroke.hot_key)) is token:
+                    del self._held[(hwnd, stroke.hot_key)]
+                    self._release(hwnd, stroke)
+
+            if stopping:
+                self._release_all()
+                with self._condition:
+                    self._idle = True
+                    self._condition.notify_all()
+                return
+
+    def _press(self, hwnd: int, stroke: KeyStroke) -> None:
+        key = (hwnd, stroke.hot_key)
+        if key in self._held:
+            del self._held[key]
+            self._release(hwnd, stroke)
+        try:
+            for vk_code in stroke.vk_codes:
+                self._sender.key_down(hwnd, vk_code)
+        except Exception as error:
+            self._log(f'发送按键失败: {stroke.hot_key}: {error}')
+        token = object()
+        self._held[key] = token
+        self._wheel.schedule(self._clock() + self._hold_seconds, (hwnd, stroke, token))
+        self.sent += 1
+
+    def _release(self, hwnd: int, stroke: KeyStroke) -> None:
+        try:
+            for vk_code in reversed(stroke.vk_codes):
+                self._sender.key_up(hwnd, vk_code)
+        except Exception as error:
+            self._log(f'抬起按键失败: {stroke.hot_key}: {error}')
+
+    def _release_all(self) -> None:
+        held, self._held = self._held, {}
+        for hwnd, stroke, token in self._wheel.drain():
+            if held.get((hwnd, stroke.hot_key)) is token:
+                self._release(hwnd, stroke)
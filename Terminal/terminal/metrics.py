@@ -0,0 +1,180 @@
+"""本机指标接口：Prometheus 文本格式，默认关闭。
+
+MetricsServer 在自己的线程里跑一个 http.server，只有被抓取时才调用 render 现算一次；
+数据全部来自已经存在的计数（FrameTracer 汇总、TitleManager.cache_stats、热重载计数、KeyDispatcher.sent），
+关闭时不起线程、不注册任何回调，取帧路径上没有额外开销。
+"""
+
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable
+
+from .pipeline.tracing import LATENCY_BUCKETS_NS, TraceSummary
+
+__all__ = ["CONTENT_TYPE", "MetricsServer", "render_metrics"]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# histogram 的 le 标签，单位换成秒。
+_BUCKET_BOUNDS = tuple(repr(bound / 1e9) for bound in LATENCY_BUCKETS_NS)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class _MetricWriter(object):
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def family(self, name: str, metric_type: str, help_text: str) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, value: float, **labels: str) -> None:
+        if labels:
+            label_text = ",".join(f'{key}="{_escape_label(str(label))}"' for key, label in labels.items())
+            self.lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+        else:
+            self.lines.append(f"{name} {_format_value(value)}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(
+    *,
+    trace_summary: TraceSummary | None = None,
+    title_manager: Any = None,
+    hot_reload_counts: Iterable[dict[str, int]] = (),
+    keys_sent: int | None = None,
+) -> str:
+    """把各来源的当前计数拼成 Prometheus 文本；没有的来源直接跳过。"""
+    writer = _MetricWriter()
+
+    if trace_summary is not None:
+        writer.family("terminal_capture_fps", "gauge", "Effective capture frame rate over the last 64 frames.")
+        writer.sample("terminal_capture_fps", trace_summary.capture_fps)
+        writer.family("terminal_frames_captured_total", "counter", "Frames captured since the pipeline started.")
+        writer.sample("terminal_frames_captured_total", trace_summary.captured)
+        writer.family("terminal_frames_completed_total", "counter", "Frames that finished the pipeline.")
+        writer.sample("terminal_frames_completed_total", trace_summary.completed)
+
+        # 用 histogram 而不是带分位数的 summary：桶是累计计数，可以跨实例聚合，用 histogram_quantile() 算分位数。
+        writer.family(
+            "terminal_stage_latency_seconds",
+            "histogram",
+            "Per-stage latency since the pipeline started.",
+        )
+        for stage in trace_summary.stages:
+            for bound, count in zip(_BUCKET_BOUNDS, stage.buckets):
+                writer.sample("terminal_stage_latency_seconds_bucket", count, stage=stage.stage, le=bound)
+            writer.sample("terminal_stage_latency_seconds_bucket", stage.count, stage=stage.stage, le="+Inf")
+            writer.sample("terminal_stage_latency_seconds_sum", stage.sum_ms / 1000.0, stage=stage.stage)
+            writer.sample("terminal_stage_latency_seconds_count", stage.count, stage=stage.stage)
+
+        writer.family("terminal_frames_dropped_total", "counter", "Frames overwritten by a newer frame while queued.")
+        for reason, count in trace_summary.drops.items():
+            writer.sample("terminal_frames_dropped_total", count, reason=reason)
+
+        writer.family("terminal_invalid_frames_total", "counter", "Frames rejected by validation, by normalized reason.")
+        for reason, count in sorted(trace_summary.invalid_reasons.items()):
+            writer.sample("terminal_invalid_frames_total", count, reason=reason)
+
+    if title_manager is not None:
+        stats = title_manager.cache_stats()
+        lookups = stats.hits + stats.misses
+        writer.family("terminal_title_cache_hits_total", "counter", "Transient title cache hits.")
+        writer.sample("terminal_title_cache_hits_total", stats.hits)
+        writer.family("terminal_title_cache_misses_total", "counter", "Title lookups that needed similarity matching.")
+        writer.sample("terminal_title_cache_misses_total", stats.misses)
+        writer.family("terminal_title_cache_hit_ratio", "gauge", "hits / (hits + misses), same as the advanced settings tab.")
+        writer.sample("terminal_title_cache_hit_ratio", stats.hits / lookups if lookups else 0.0)
+        writer.family("terminal_title_cache_entries", "gauge", "Transient title cache size.")
+        writer.sample("terminal_title_cache_entries", stats.size)
+
+    totals = {"reloaded": 0, "failed": 0}
+    for counts in hot_reload_counts:
+        for status, count in counts.items():
+            totals[status] = totals.get(status, 0) + count
+    writer.family("terminal_hot_reload_total", "counter", "Rotation hot-reload attempts by result.")
+    for status, count in totals.items():
+        writer.sample("terminal_hot_reload_total", count, status=status)
+
+    if keys_sent is not None:
+        writer.family("terminal_keys_sent_total", "counter", "Hot keys sent by the key dispatcher; use rate() for the dispatch rate.")
+        writer.sample("terminal_keys_sent_total", keys_sent)
+
+    return writer.text()
+
+
+class MetricsServer(object):
+    """只监听本机的指标 HTTP 服务，GET /metrics 返回 render() 的结果。"""
+
+    def __init__(self, render: Callable[[], str], port: int, host: str = "127.0.0.1") -> None:
+        self._render = render
+        self._host = host
+        self._port = port
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    @property
+    def port(self) -> int:
+        """实际监听的端口；构造时传 0 会由系统分配。"""
+        if self._server is None:
+            return self._port
+        return int(self._server.server_address[1])
+
+    def start(self) -> None:
+        """端口被占用等错误直接抛 OSError 给调用方。"""
+        if self._server is not None:
+            return
+        render = self._render
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server 的命名
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                try:
+                    body = render().encode("utf-8")
+                except Exception as error:
+                    self.send_error(500, str(error))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                # 抓取很频繁，不往 stderr 打访问日志。
+                pass
+
+        server = ThreadingHTTPServer((self._host, self._port), Handler)
+        server.daemon_threads = True
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        server, self._server = self._server, None
+        thread, self._thread = self._thread, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        if thread is not None:
+            thread.join(2.0)
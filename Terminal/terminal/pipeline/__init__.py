@@ -0,0 +1,37 @@
+from .async_scheduler import BACKPRESSURE_BLOCK, BACKPRESSURE_LATEST, AsyncPipelineScheduler, LatestAsyncQueue
+from .engine import EngineCrashed, EngineFrameReply, EngineProcess
+from .mailbox import LatestValueMailbox, MailboxClosed
+from .runner import PIPELINE_MODE_ASYNCIO, PIPELINE_MODE_FUSED, PIPELINE_MODE_PROCESS, PIPELINE_MODE_THREADED, PIPELINE_MODE_UI, PIPELINE_MODES, PipelineRunner, PipelineSnapshot
+from .stages import ActionDispatcher, DecodeResult, FrameDecoder, RotationInstances, RotationResult, RotationResultCache, evaluate_rotation, normalize_invalid_reason
+from .tracing import FrameTracer, StageLatency, TraceSummary
+
+__all__ = [
+    "ActionDispatcher",
+    "AsyncPipelineScheduler",
+    "BACKPRESSURE_BLOCK",
+    "BACKPRESSURE_LATEST",
+    "DecodeResult",
+    "EngineCrashed",
+    "EngineFrameReply",
+    "EngineProcess",
+    "FrameDecoder",
+    "FrameTracer",
+    "LatestAsyncQueue",
+    "LatestValueMailbox",
+    "MailboxClosed",
+    "PIPELINE_MODE_ASYNCIO",
+    "PIPELINE_MODE_FUSED",
+    "PIPELINE_MODE_PROCESS",
+    "PIPELINE_MODE_THREADED",
+    "PIPELINE_MODE_UI",
+    "PIPELINE_MODES",
+    "PipelineRunner",
+    "PipelineSnapshot",
+    "RotationInstances",
+    "RotationResult",
+    "RotationResultCache",
+    "StageLatency",
+    "TraceSummary",
+    "evaluate_rotation",
+    "normalize_invalid_reason",
+]
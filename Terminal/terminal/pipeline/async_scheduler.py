@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Generic, TypeVar
+
+import numpy as np
+
+from ..capture.capture_loop import locate_capture_region
+from ..capture.capture_screen import capture_screen
+from ..capture.frame_ring import FrameRing, FrameSlot
+from ..pixelcalc.extractor import LazyFrameSnapshot
+from ..pixelcalc.snapshot import FrameSnapshot
+from ..rotation.base import BaseRotation
+from ..rotation.hot_reload import WatcherFactory
+from .runner import PIPELINE_MODE_ASYNCIO, PipelineRunner
+from .stages import DECODE_SUCCESS
+from .tracing import FrameTracer
+
+__all__ = [
+    "BACKPRESSURE_BLOCK",
+    "BACKPRESSURE_LATEST",
+    "AsyncPipelineScheduler",
+    "LatestAsyncQueue",
+]
+
+# 下游没取走时用新值覆盖旧值，上游从不等待。
+BACKPRESSURE_LATEST = "latest"
+# 下游没取走时上游 await，截图节拍跟着解码速度降下来。
+BACKPRESSURE_BLOCK = "block"
+
+T = TypeVar("T")
+
+
+class LatestAsyncQueue(Generic[T]):
+    """asyncio 版的单槽队列，只能在所属事件循环的线程里使用。"""
+
+    def __init__(self, policy: str = BACKPRESSURE_LATEST) -> None:
+        if policy not in (BACKPRESSURE_LATEST, BACKPRESSURE_BLOCK):
+            raise ValueError(f"不支持的背压策略: {policy}")
+        self.policy = policy
+        self.dropped = 0
+        self._item: T | None = None
+        self._full = False
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def put_nowait(self, item: T) -> None:
+        """不管策略，直接覆盖；用于从别的线程 call_soon_threadsafe 投递。"""
+        if self._full:
+            self.dropped += 1
+        self._item = item
+        self._full = True
+        self._not_empty.set()
+        self._not_full.clear()
+
+    async def put(self, item: T) -> None:
+        if self.policy == BACKPRESSURE_BLOCK:
+            while self._full:
+                await self._not_full.wait()
+        self.put_nowait(item)
+
+    async def get(self) -> T:
+        while not self._full:
+            await self._not_empty.wait()
+        item = self._item
+        self._item = None
+        self._full = False
+        self._not_empty.clear()
+        self._not_full.set()
+        return item  # type: ignore[return-value]
+
+
+class AsyncPipelineScheduler(PipelineRunner):
+    """用 asyncio 调度的流水线：capture、decode、rotation 各是一个协程，之间是单槽队列。
+
+    - 截图节拍由 capture 协程按 FPS 排期，代替 CaptureWorker 的 QTimer；阻塞的 GDI 截图放在专用线程里。
+    - 解码和 rotation（按需解码时包括字段解码和标题查询）也各自放在专用线程里，事件循环只负责交接，不被卡住。
+    - 帧从截图到进入 rotation 超过 max_frame_age_ms 就不再跑 rotation，按过期丢弃计数。
+    - backpressure 决定 capture -> decode 这一跳：latest 覆盖旧帧，block 让截图等解码。
+
+    对外和 CaptureWorker / PipelineRunner 一样：start / stop 管 rotation 和流水线，
+    start_capture / stop_capture / set_fps 管截图，snapshot() 给 UI 取状态。
+    """
+
+    def __init__(
+        self,
+        *,
+        send_key: Callable[[int, str], None],
+        log: Callable[[str], None] | None = None,
+        title_manager: Any = None,
+        on_titles_changed: Callable[[], None] | None = None,
+        incremental: bool = True,
+        lazy: bool = False,
+        ring_slots: int = 4,
+        capture: Callable[..., np.ndarray] = capture_screen,
+        on_capture_started: Callable[[dict[str, int]], None] | None = None,
+        on_capture_failed: Callable[[str], None] | None = None,
+        max_frame_age_ms: float = 200.0,
+        backpressure: str = BACKPRESSURE_LATEST,
+        watcher_factory: WatcherFactory | None = None,
+        on_rotation_created: Callable[[BaseRotation], None] | None = None,
+        tracer: FrameTracer | None = None,
+    ) -> None:
+        super().__init__(
+            send_key=send_key,
+            log=log,
+            title_manager=title_manager,
+            on_titles_changed=on_titles_changed,
+            incremental=incremental,
+            lazy=lazy,
+            ring_slots=ring_slots,
+            watcher_factory=watcher_factory,
+            on_rotation_created=on_rotation_created,
+            tracer=tracer,
+        )
+        if backpressure not in (BACKPRESSURE_LATEST, BACKPRESSURE_BLOCK):
+            raise ValueError(f"不支持的背压策略: {backpressure}")
+        self._capture = capture
+        self._on_capture_started = on_capture_started
+        self._on_capture_failed = on_capture_failed
+        self.max_frame_age_ms = max_frame_age_ms
+        self.backpressure = backpressure
+        self._interval = 1.0 / 15
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: threading.Thread | None = None
+        self._stop_event: asyncio.Event | None = None
+        self._frame_queue: LatestAsyncQueue[tuple[FrameRing, int, float]] | None = None
+        self._data_queue: LatestAsyncQueue[tuple[int, FrameSnapshot | LazyFrameSnapshot, float]] | None = None
+        self._capture_task: asyncio.Task | None = None
+        self._capture_executor: ThreadPoolExecutor | None = None
+        self._decode_executor: ThreadPoolExecutor | None = None
+        self._rotation_executor: ThreadPoolExecutor | None = None
+        self.stale_frames = 0
+
+    def start(
+        self,
+        rotation_class: type[BaseRotation],
+        window_handle: int | None,
+        mode: str = PIPELINE_MODE_ASYNCIO,
+    ) -> None:
+        if mode != PIPELINE_MODE_ASYNCIO:
+            raise ValueError(f"AsyncPipelineScheduler 只支持 {PIPELINE_MODE_ASYNCIO} 模式: {mode}")
+        self.stop()
+        self._prepare_start(rotation_class, window_handle, mode)
+        self.stale_frames = 0
+        ready = threading.Event()
+        self._loop_thread = threading.Thread(target=asyncio.run, args=(self._main(ready),), name="PipelineAsyncio", daemon=True)
+        self._loop_thread.start()
+        ready.wait()
+
+    def stop(self) -> None:
+        loop, self._loop = self._loop, None
+        thread, self._loop_thread = self._loop_thread, None
+        if loop is not None and thread is not None:
+            self._running = False
+            stop_event = self._stop_event
+            if stop_event is not None:
+                loop.call_soon_threadsafe(stop_event.set)
+            if thread is not threading.current_thread():
+                thread.join(2.0)
+        super().stop()
+        self._dispatcher.reset()
+        self._decoder.reset_incremental_state()
+
+    def set_fps(self, value: int) -> None:
+        """下一次排期生效，和 CaptureWorker.set_fps 一致。"""
+        self._interval = 1.0 / max(1, int(value))
+
+    def start_capture(self, monitor_region: dict[str, int], fps: int) -> None:
+        """整屏找标志位，然后按 FPS 截小区域；需要先 start。"""
+        loop = self._loop
+        if loop is None:
+            raise RuntimeError("AsyncPipelineScheduler 还没有 start")
+        self.set_fps(fps)
+        loop.call_soon_threadsafe(self._spawn_capture_task, dict(monitor_region))
+
+    def stop_capture(self) -> None:
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._cancel_capture_task)
+
+    def _frame_written(self, ring: FrameRing, base_frame_id: int) -> None:
+        # 外部截图线程调用 write_frame / submit_frame 时走这里，按 latest 策略投递。
+        loop, queue = self._loop, self._frame_queue
+        if loop is not None and queue is not None:
+            loop.call_soon_threadsafe(queue.put_nowait, (ring, base_frame_id, time.monotonic()))
+
+    def _dropped_frame_count(self) -> int:
+        dropped = self.stale_frames
+        for queue in (self._frame_queue, self._data_queue):
+            if queue is not None:
+                dropped += queue.dropped
+        return dropped
+
+    async def _main(self, ready: threading.Event) -> None:
+        self._stop_event = asyncio.Event()
+        self._frame_queue = LatestAsyncQueue(self.backpressure)
+        self._data_queue = LatestAsyncQueue(BACKPRESSURE_LATEST)
+        self._capture_executor = ThreadPoolExecutor(1, thread_name_prefix="PipelineAsyncCapture")
+        self._decode_executor = ThreadPoolExecutor(1, thread_name_prefix="PipelineAsyncDecode")
+        self._rotation_executor = ThreadPoolExecutor(1, thread_name_prefix="PipelineAsyncRotation")
+        tasks = [asyncio.create_task(self._decode_stage()), asyncio.create_task(self._rotation_stage())]
+        self._loop = asyncio.get_running_loop()
+        ready.set()
+        try:
+            await self._stop_event.wait()
+        finally:
+            self._cancel_capture_task()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # 等还在跑的截图/解码做完，它们手里的槽位视图之后才能释放。
+            self._capture_executor.shutdown(wait=True)
+            self._decode_executor.shutdown(wait=True)
+            self._rotation_executor.shutdown(wait=True)
+
+    def _spawn_capture_task(self, monitor_region: dict[str, int]) -> None:
+        self._cancel_capture_task()
+        self._capture_task = asyncio.get_running_loop().create_task(self._capture_stage(monitor_region))
+
+    def _cancel_capture_task(self) -> None:
+        task, self._capture_task = self._capture_task, None
+        if task is not None:
+            task.cancel()
+
+    def _capture_failed(self, reason: str) -> None:
+        if self._on_capture_failed is not None:
+            self._on_capture_failed(reason)
+        else:
+            self._log(reason)
+
+    async def _capture_stage(self, monitor_region: dict[str, int]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            capture_region = await loop.run_in_executor(self._capture_executor, locate_capture_region, monitor_region, self._capture)
+        except Exception as error:  # pragma: no cover - 具体系统错误文字依赖 Windows API
+            self._capture_failed(f'整屏截图失败: {error}')
+            return
+        if capture_region is None:
+            self._capture_failed('未找到标志位，已自动停机。')
+            return
+        if self._on_capture_started is not None:
+            self._on_capture_started(capture_region)
+
+        height, width = capture_region['height'], capture_region['width']
+
+        def fill(out: np.ndarray) -> None:
+            self._capture(monitor_region=monitor_region, region=capture_region, out=out)
+
+        next_tick = loop.time()
+        while self._running:
+            captured_at = time.monotonic()
+            try:
+                ring, base_frame_id, _ = await loop.run_in_executor(self._capture_executor, self._write_slot, height, width, fill)
+            except Exception as error:  # pragma: no cover - 具体系统错误文字依赖 Windows API
+                self._capture_failed(f'小区域截图失败: {error}')
+                return
+            await self._frame_queue.put((ring, base_frame_id, captured_at))
+            # 固定节拍；落后超过一帧就从现在重新起算，不连发补帧。
+            next_tick += self._interval
+            delay = next_tick - loop.time()
+            if delay < -self._interval:
+                next_tick = loop.time()
+                continue
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _decode_stage(self) -> None:
+        loop = asyncio.get_running_loop()
+        held: tuple[FrameRing, FrameSlot] | None = None
+        last_ring: FrameRing | None = None
+        last_seq = 0
+        try:
+            while True:
+                ring, base_frame_id, captured_at = await self._frame_queue.get()
+                slot = ring.acquire_latest(after_seq=last_seq if ring is last_ring else 0)
+                if slot is None:
+                    continue
+                last_ring, last_seq = ring, slot.seq
+                frame_id = base_frame_id + slot.seq
+                result = await loop.run_in_executor(self._decode_executor, self._decode_frame, slot.frame, frame_id)
+                if held is not None:
+                    held[0].release(held[1])
+                    held = None
+                if result.status == DECODE_SUCCESS and self._decoder.incremental:
+                    held = (ring, slot)
+                else:
+                    ring.release(slot)
+                if not self._running:
+                    return
+                self._publish_decode_result(result)
+                if result.status == DECODE_SUCCESS and result.data is not None:
+                    self._data_queue.put_nowait((frame_id, result.data, captured_at))
+        finally:
+            if held is not None:
+                held[0].release(held[1])
+
+    async def _rotation_stage(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            frame_id, data, captured_at = await self._data_queue.get()
+            if not self._running:
+                return
+            if (time.monotonic() - captured_at) * 1000.0 > self.max_frame_age_ms:
+                self.stale_frames += 1
+                self._tracer.finish(frame_id)
+                continue
+            await loop.run_in_executor(self._rotation_executor, self._run_rotation, frame_id, data)
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import importlib
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from ..capture.frame_ring import FrameRing
+from ..pixelcalc.snapshot import FrameSnapshot, pop_pending_title_record
+from ..rotation.base import BaseRotation
+from ..rotation.hot_reload import RotationHotReloadTracker
+from .stages import DECODE_ERROR, DECODE_SUCCESS, FrameDecoder, RotationInstances, RotationResult, RotationResultCache
+
+__all__ = [
+    "ENGINE_REPLY_TIMEOUT",
+    "EngineCrashed",
+    "EngineFrameReply",
+    "EngineProcess",
+]
+
+# 单帧解码 + rotation 超过这个时间没有回复，就当引擎卡死，杀掉重启。
+ENGINE_REPLY_TIMEOUT = 5.0
+# 子进程要重新 import numpy / 读标题库，启动给宽一点。
+ENGINE_START_TIMEOUT = 30.0
+# 两次重启之间至少隔这么久，引擎反复崩溃时不至于每帧都拉起一个新进程。
+ENGINE_RESTART_INTERVAL = 1.0
+
+
+class EngineCrashed(RuntimeError):
+    """引擎进程退出、管道断开或者回复超时。"""
+
+
+@dataclass(frozen=True, slots=True)
+class EngineFrameReply:
+    """引擎对一帧的回复：只有状态、结构化数据和动作，不带像素和 Matrix。"""
+
+    frame_id: int
+    status: str
+    reason: str
+    data: FrameSnapshot | None
+    keep_slot: bool
+    rotation: RotationResult | None
+    logs: tuple[str, ...]
+    # 引擎这一帧新入库的 UTF 标题（已经写进 SQLite），父进程据此更新自己的内存索引。
+    title_record: dict[str, Any] | None
+
+
+class EngineProcess(object):
+    """父进程一侧的引擎句柄。
+
+    子进程里跑 MatrixDecoder、extract_snapshot 和 rotation，和 Qt 不抢同一个 GIL。
+    帧不走管道：父进程管理 FrameRing 槽位状态，只把 (ring 名字, 槽位下标) 发过去，
+    子进程挂上同一块共享内存直接读；回来的是 EngineFrameReply。
+    同一时间只有一帧在途，decode() 阻塞到回复为止，调用方放在自己的线程里。
+    """
+
+    def __init__(self, *, db_path: str | Path | None = None, incremental: bool = True) -> None:
+        self._context = multiprocessing.get_context("spawn")
+        self._db_path = str(db_path) if db_path is not None else None
+        self._incremental = incremental
+        self._process: Any = None
+        self._connection: Connection | None = None
+        self._rotation: tuple[str, str] | None = None
+        self._started_monotonic = 0.0
+        self.restarts = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    @property
+    def pid(self) -> int | None:
+        return None if self._process is None else self._process.pid
+
+    def start(self) -> None:
+        if self.alive:
+            return
+        self._discard_process()
+        parent_connection, child_connection = self._context.Pipe(duplex=True)
+        process = self._context.Process(
+            target=_engine_main,
+            args=(child_connection, self._db_path, self._incremental),
+            name="TerminalEngine",
+            daemon=True,
+        )
+        self._started_monotonic = time.monotonic()
+        process.start()
+        child_connection.close()
+        self._process = process
+        self._connection = parent_connection
+        self._receive(ENGINE_START_TIMEOUT)
+        if self._rotation is not None:
+            self._send(("rotation", *self._rotation))
+
+    def restart(self) -> None:
+        remaining = ENGINE_RESTART_INTERVAL - (time.monotonic() - self._started_monotonic)
+        if remaining > 0:
+            time.sleep(remaining)
+        self.restarts += 1
+        self._discard_process()
+        self.start()
+
+    def stop(self) -> None:
+        if self._connection is not None and self.alive:
+            try:
+                self._connection.send(("stop",))
+            except (OSError, ValueError):
+                pass
+            self._process.join(2.0)
+        self._discard_process()
+
+    def set_rotation_class(self, rotation_class: type[BaseRotation]) -> None:
+        """子进程按模块名重新 import；热重载由子进程自己盯着 rotation 文件。"""
+        self._rotation = (rotation_class.__module__, rotation_class.__name__)
+        if self.alive:
+            self._send(("rotation", *self._rotation))
+
+    def reload_titles(self) -> None:
+        """标题库在父进程里被改过，让引擎重新从 SQLite 读一遍。"""
+        if self.alive:
+            self._send(("reload_titles",))
+
+    def decode(self, ring_name: str, slot_index: int, frame_id: int, run_rotation: bool) -> EngineFrameReply:
+        self._send(("frame", ring_name, slot_index, frame_id, run_rotation))
+        return self._receive(ENGINE_REPLY_TIMEOUT)
+
+    def _send(self, message: tuple[Any, ...]) -> None:
+        if self._connection is None or not self.alive:
+            raise EngineCrashed(self._describe_exit())
+        try:
+            self._connection.send(message)
+        except (OSError, ValueError) as error:
+            raise EngineCrashed(f"发送失败: {error}") from error
+
+    def _receive(self, timeout: float) -> Any:
+        connection = self._connection
+        if connection is None:
+            raise EngineCrashed(self._describe_exit())
+        deadline = time.monotonic() + timeout
+        try:
+            while not connection.poll(0.05):
+                if not self.alive:
+                    raise EngineCrashed(self._describe_exit())
+                if time.monotonic() > deadline:
+                    raise EngineCrashed(f"{timeout:.1f}s 内没有回复")
+            return connection.recv()
+        except (EOFError, OSError) as error:
+            raise EngineCrashed(self._describe_exit()) from error
+
+    def _describe_exit(self) -> str:
+        if self._process is None:
+            return "引擎进程没有启动"
+        exitcode = self._process.exitcode
+        if exitcode is None:
+            return "引擎进程没有响应"
+        return f"引擎进程已退出，exitcode={exitcode}"
+
+    def _discard_process(self) -> None:
+        process, self._process = self._process, None
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.close()
+        if process is not None:
+            if process.is_alive():
+                process.kill()
+            process.join(2.0)
+
+
+def _engine_main(connection: Connection, db_path: str | None, incremental: bool) -> None:
+    """子进程入口：不 import Qt，只做解码、标题识别和 rotation。"""
+    from ..pixelcalc.title_manager import get_default_title_manager
+
+    title_manager = get_default_title_manager(db_path)
+    decoder = FrameDecoder(incremental=incremental)
+    tracker = RotationHotReloadTracker()
+    rotations = RotationInstances()
+    results = RotationResultCache()
+    ring: FrameRing | None = None
+    pending_logs: list[str] = []
+    connection.send(("ready", os.getpid()))
+    try:
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                return
+            kind = message[0]
+            if kind == "stop":
+                return
+            if kind == "rotation":
+                try:
+                    module = importlib.import_module(message[1])
+                    tracker.set_rotation_class(getattr(module, message[2]))
+                except Exception as error:
+                    pending_logs.append(f"引擎加载 rotation 失败: {message[1]}.{message[2]}: {error}")
+                continue
+            if kind == "reload_titles":
+                title_manager.rebuild_memory()
+                continue
+            if kind != "frame":
+                continue
+
+            _, ring_name, slot_index, frame_id, run_rotation = message
+            if ring is None or ring.name != ring_name:
+                # 上一帧的 Matrix 还引用着旧 ring 的内存，换 ring 前先丢掉。
+                decoder.reset_incremental_state()
+                if ring is not None:
+                    ring.dispose()
+                ring = FrameRing.attach(ring_name)
+            reply = _decode_frame(
+                decoder, tracker, rotations, results, title_manager, ring.view(slot_index), frame_id, run_rotation, pending_logs
+            )
+            pending_logs = []
+            connection.send(reply)
+    finally:
+        decoder.reset_incremental_state()
+        if ring is not None:
+            ring.dispose()
+        title_manager.close()
+
+
+def _decode_frame(
+    decoder: FrameDecoder,
+    tracker: RotationHotReloadTracker,
+    rotations: RotationInstances,
+    results: RotationResultCache,
+    title_manager: Any,
+    frame: Any,
+    frame_id: int,
+    run_rotation: bool,
+    logs: list[str],
+) -> EngineFrameReply:
+    try:
+        result = decoder.decode(frame, frame_id)
+    except Exception as error:
+        decoder.reset_incremental_state()
+        return EngineFrameReply(
+            frame_id, DECODE_ERROR, f'第 {frame_id} 帧解析异常: {error}', None, False, None, tuple(logs), None
+        )
+    if result.status != DECODE_SUCCESS or result.data is None:
+        return EngineFrameReply(frame_id, result.status, result.reason, None, False, None, tuple(logs), None)
+
+    data = result.data
+    title_record: dict[str, Any] | None = None
+    pending_utf_title_record = pop_pending_title_record(data)
+    if pending_utf_title_record is not None:
+        try:
+            title_manager.add_record(
+                valid_array=np.array(pending_utf_title_record['valid_array'], dtype=np.uint8),
+                title_type=str(pending_utf_title_record['title_type']),
+                title=str(pending_utf_title_record['title']),
+                hash=str(pending_utf_title_record['hash']),
+            )
+            # 父进程只更新内存，不再写 SQLite，这里先确保已经落盘。
+            title_manager.flush()
+            title_record = pending_utf_title_record
+        except Exception as error:
+            logs.append(f'保存 UTF 标题失败: {error}')
+
+    rotation: RotationResult | None = None
+    if run_rotation:
+        rotation_class, reload_event = tracker.get_runtime_rotation_class()
+        if reload_event is not None:
+            logs.append(reload_event.message)
+        if rotation_class is not None:
+            try:
+                instance, migrate_message = rotations.get(rotation_class)
+                if migrate_message is not None:
+                    logs.append(migrate_message)
+                rotation = results.evaluate(data, frame_id, instance)
+            except Exception as error:
+                logs.append(f"第 {frame_id} 帧 rotation 异常: {error}")
+
+    return EngineFrameReply(
+        frame_id, DECODE_SUCCESS, '', data, decoder.incremental, rotation, tuple(logs), title_record
+    )
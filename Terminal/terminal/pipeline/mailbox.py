@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+from typing import Generic, TypeVar
+
+__all__ = ["LatestValueMailbox", "MailboxClosed"]
+
+T = TypeVar("T")
+
+
+class MailboxClosed(Exception):
+    """信箱已关闭，消费线程应当退出。"""
+
+
+class LatestValueMailbox(Generic[T]):
+    """只放一个值的信箱，生产者和消费者在不同线程。
+
+    put 会直接覆盖还没被取走的旧值（计入 dropped），消费者永远只处理最新的一帧，
+    不会因为慢了一拍而越积越多。
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._value: T | None = None
+        self._has_value = False
+        self._closed = False
+        self.dropped: int = 0
+
+    def put(self, value: T) -> bool:
+        """放入新值；信箱已关闭时返回 False。"""
+        with self._condition:
+            if self._closed:
+                return False
+            if self._has_value:
+                self.dropped += 1
+            self._value = value
+            self._has_value = True
+            self._condition.notify()
+            return True
+
+    def take(self) -> T:
+        """阻塞到有新值为止；关闭后抛 MailboxClosed。"""
+        with self._condition:
+            while not self._has_value and not self._closed:
+                self._condition.wait()
+            if not self._has_value:
+                raise MailboxClosed()
+            value = self._value
+            self._value = None
+            self._has_value = False
+            return value  # type: ignore[return-value]
+
+    def close(self) -> None:
+        """关闭信箱，丢掉还没取走的值并唤醒等待中的消费者。"""
+        with self._condition:
+            self._closed = True
+            self._value = None
+            self._has_value = False
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
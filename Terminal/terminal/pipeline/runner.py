@@ -0,0 +1,566 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+
+from ..capture.frame_ring import FrameRing, FrameSlot
+from ..pixelcalc.extractor import LazyFrameSnapshot
+from ..pixelcalc.snapshot import FrameSnapshot, pop_pending_title_record
+from ..rotation.base import BaseRotation
+from ..rotation.hot_reload import RotationHotReloadTracker, WatcherFactory
+from .engine import EngineCrashed, EngineFrameReply, EngineProcess
+from .mailbox import LatestValueMailbox, MailboxClosed
+from .stages import (
+    DECODE_ERROR,
+    DECODE_INVALID_FRAME,
+    DECODE_SUCCESS,
+    ActionDispatcher,
+    DecodeResult,
+    FrameDecoder,
+    RotationInstances,
+    RotationResultCache,
+    normalize_invalid_reason,
+)
+from .tracing import EVENT_DECODE_END, EVENT_DECODE_START, EVENT_DISPATCH, EVENT_ROTATION_END, EVENT_ROTATION_START, FrameTracer
+
+__all__ = [
+    "PIPELINE_MODE_ASYNCIO",
+    "PIPELINE_MODE_FUSED",
+    "PIPELINE_MODE_PROCESS",
+    "PIPELINE_MODE_THREADED",
+    "PIPELINE_MODE_UI",
+    "PIPELINE_MODES",
+    "PipelineRunner",
+    "PipelineSnapshot",
+]
+
+# 旧路径：capture / decode / rotation 每一跳都回到 Qt 主线程。
+PIPELINE_MODE_UI = "ui"
+# 解码、rotation 各一个线程，经 LatestValueMailbox 直接交接。
+PIPELINE_MODE_THREADED = "threaded"
+# 解码和 rotation 在同一个线程里串行执行。
+PIPELINE_MODE_FUSED = "fused"
+# 解码和 rotation 放到单独的引擎进程里，本进程只管截图、发按键和 UI。
+PIPELINE_MODE_PROCESS = "process"
+# 截图节拍和各阶段交接都由 asyncio 调度，见 AsyncPipelineScheduler。
+PIPELINE_MODE_ASYNCIO = "asyncio"
+PIPELINE_MODES = (PIPELINE_MODE_UI, PIPELINE_MODE_THREADED, PIPELINE_MODE_FUSED, PIPELINE_MODE_PROCESS, PIPELINE_MODE_ASYNCIO)
+
+
+@dataclass(frozen=True, slots=True)
+class PipelineSnapshot:
+    """UI 定时来取的最新状态。
+
+    不带截图帧和 Matrix：它们都是 FrameRing 槽位上的视图，槽位释放后内容会被下一帧覆盖。
+    """
+
+    frame_id: int
+    decoded_data: FrameSnapshot | LazyFrameSnapshot | None
+    decode_state: str
+    decode_error: str
+    decode_result_is_stale: bool
+    dropped_frames: int
+
+
+class PipelineRunner(object):
+    """capture -> decode -> rotation 的线程直连流水线，每一帧都不经过 Qt 主线程。
+
+    截图帧放在 FrameRing 的共享内存槽位里：截图线程用 write_frame 原地写入
+    （或者 submit_frame 拷一份进去），信箱里只传“有新帧了”的通知，解码线程直接在槽位视图上解码。
+    解码线程占着当前帧和上一帧两个槽位（增量解码要对比上一帧的像素），其余槽位轮流给截图写。
+    threaded 模式下解码线程和 rotation 线程之间再隔一个信箱，谁慢谁丢帧，不会积压；
+    fused 模式下解码完直接在同一个线程里跑 rotation，少一次线程切换。
+    process 模式下本进程的线程只管理槽位并转发给 EngineProcess，解码和 rotation 都在子进程里；
+    子进程崩溃或卡死时自动重启，期间的帧记为解析异常。
+    lazy 打开时解码线程只做校验，字段留到 rotation 读到时才解码（见 LazyFrameSnapshot）；
+    process 模式不受影响，引擎要把整帧数据发回来给界面，本来就得全部解出来。
+    UI 只通过 snapshot() 按自己的刷新节奏取状态，日志走 log 回调。
+    """
+
+    def __init__(
+        self,
+        *,
+        send_key: Callable[[int, str], None],
+        log: Callable[[str], None] | None = None,
+        title_manager: Any = None,
+        on_titles_changed: Callable[[], None] | None = None,
+        incremental: bool = True,
+        lazy: bool = False,
+        ring_slots: int = 4,
+        watcher_factory: WatcherFactory | None = None,
+        on_rotation_created: Callable[[BaseRotation], None] | None = None,
+        tracer: FrameTracer | None = None,
+    ) -> None:
+        self._log = log or (lambda message: None)
+        self._tracer = tracer or FrameTracer(enabled=False)
+        self._title_manager = title_manager
+        self._on_titles_changed = on_titles_changed
+        self._decoder = FrameDecoder(incremental=incremental, lazy=lazy)
+        self._dispatcher = ActionDispatcher(self._log, send_key)
+        self._hot_reload = RotationHotReloadTracker(watcher_factory=watcher_factory)
+        self._rotation_instances = RotationInstances(on_rotation_created)
+        self._rotation_results = RotationResultCache()
+        self._incremental = incremental
+        self._engine: EngineProcess | None = None
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._mode = PIPELINE_MODE_THREADED
+        self._window_handle: int | None = None
+        self._requested_rotation_class: type[BaseRotation] | None = None
+        self._ring_slots = ring_slots
+        self._ring: FrameRing | None = None
+        self._ring_base_frame_id = 0
+        # 尺寸变化后换下来的旧 ring，解码线程可能还占着槽位，close() 时统一释放。
+        self._retired_rings: list[FrameRing] = []
+        self._frame_mailbox: LatestValueMailbox[tuple[FrameRing, int]] = LatestValueMailbox()
+        self._data_mailbox: LatestValueMailbox[tuple[int, FrameSnapshot | LazyFrameSnapshot]] = LatestValueMailbox()
+        self._threads: list[threading.Thread] = []
+
+        self._frame_id = 0
+        self._decoded_data: FrameSnapshot | LazyFrameSnapshot | None = None
+        self._decode_state = 'idle'
+        self._decode_error = '尚未解析'
+        self._decode_result_is_stale = False
+        self._last_invalid_reason_key: str | None = None
+        self._titles_reload_requested = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def lazy(self) -> bool:
+        return self._decoder.lazy
+
+    @lazy.setter
+    def lazy(self, value: bool) -> None:
+        # 解码线程读到的是下一帧生效的值，不用停流水线。
+        self._decoder.lazy = value
+
+    @property
+    def hot_reload_counts(self) -> dict[str, int]:
+        return dict(self._hot_reload.reload_counts)
+
+    def start(
+        self,
+        rotation_class: type[BaseRotation],
+        window_handle: int | None,
+        mode: str = PIPELINE_MODE_THREADED,
+    ) -> None:
+        if mode not in (PIPELINE_MODE_THREADED, PIPELINE_MODE_FUSED, PIPELINE_MODE_PROCESS):
+            raise ValueError(f"不支持的流水线模式: {mode}")
+        self.stop()
+        if mode == PIPELINE_MODE_PROCESS:
+            self._start_engine(rotation_class)
+        self._prepare_start(rotation_class, window_handle, mode)
+        self._start_threads(mode)
+
+    def _prepare_start(self, rotation_class: type[BaseRotation], window_handle: int | None, mode: str) -> None:
+        """重置一次运行的全部状态：帧号、快照、ring、信箱、rotation 等待。"""
+        self._mode = mode
+        self._window_handle = window_handle
+        self._requested_rotation_class = None
+        self._hot_reload.set_rotation_class(rotation_class)
+        self._rotation_instances.clear()
+        self._rotation_results.clear()
+        self._decoder.reset_incremental_state()
+        self._dispatcher.reset()
+        self._reset_snapshot_state()
+        self._tracer.reset()
+        if self._ring is not None:
+            self._ring.reset()
+        self._ring_base_frame_id = 0
+        self._frame_mailbox = LatestValueMailbox()
+        self._data_mailbox = LatestValueMailbox()
+        self._running = True
+
+    def _start_threads(self, mode: str) -> None:
+        if mode == PIPELINE_MODE_PROCESS:
+            self._threads = [threading.Thread(target=self._engine_loop, name="PipelineEngine", daemon=True)]
+        else:
+            self._threads = [threading.Thread(target=self._decode_loop, name="PipelineDecode", daemon=True)]
+        if mode == PIPELINE_MODE_THREADED:
+            self._threads.append(threading.Thread(target=self._rotation_loop, name="PipelineRotation", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        if not self._running and not self._threads:
+            return
+        self._running = False
+        self._frame_mailbox.close()
+        self._data_mailbox.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(2.0)
+        self._threads = []
+        self._dispatcher.reset()
+        if self._engine is not None:
+            self._engine.stop()
+            self._engine = None
+        # 上一帧的 Matrix 引用着槽位内存，线程停下后一并丢掉。
+        self._decoder.reset_incremental_state()
+
+    def close(self) -> None:
+        """停止流水线并释放共享内存；要在截图线程已经不再调用 write_frame 之后调用。"""
+        self.stop()
+        self._hot_reload.close()
+        with self._lock:
+            rings = [*self._retired_rings, *([self._ring] if self._ring is not None else [])]
+            self._ring = None
+            self._retired_rings = []
+        for ring in rings:
+            ring.dispose()
+
+    def write_frame(self, height: int, width: int, fill: Callable[[np.ndarray], Any]) -> None:
+        """截图线程直接调用：fill 把像素原地写进 (height, width, 3) 的槽位视图，不分配新数组。
+
+        fill 抛出的异常原样抛给调用方，这个槽位作废；解码还没取走的旧帧会被更新的帧覆盖。
+        """
+        if not self._running:
+            return
+        ring, base_frame_id, _ = self._write_slot(height, width, fill)
+        self._frame_written(ring, base_frame_id)
+
+    def _write_slot(self, height: int, width: int, fill: Callable[[np.ndarray], Any]) -> tuple[FrameRing, int, int]:
+        """把一帧写进槽位并提交，返回 (ring, 帧号基数, 序号)；不通知解码方。"""
+        ring, base_frame_id = self._ensure_ring(height, width)
+        slot = ring.begin_write()
+        capture_start_ns = time.monotonic_ns()
+        try:
+            fill(slot.frame)
+        except BaseException:
+            ring.abort_write(slot)
+            raise
+        capture_end_ns = time.monotonic_ns()
+        seq = ring.end_write(slot)
+        with self._lock:
+            self._frame_id = base_frame_id + seq
+        self._tracer.capture(base_frame_id + seq, capture_start_ns, capture_end_ns)
+        return ring, base_frame_id, seq
+
+    def _frame_written(self, ring: FrameRing, base_frame_id: int) -> None:
+        self._frame_mailbox.put((ring, base_frame_id))
+
+    def submit_frame(self, frame: np.ndarray) -> None:
+        """已经截好的帧拷进槽位；能原地写的调用方应该用 write_frame。"""
+        height, width = frame.shape[:2]
+        self.write_frame(height, width, lambda out: np.copyto(out, frame))
+
+    def set_rotation_class(self, rotation_class: type[BaseRotation] | None) -> None:
+        """UI 线程切换 rotation，下一次执行 rotation 时生效。
+
+        热重载跟踪器在调用方线程里换类并重新挂文件监视；引擎进程在下一帧请求时再转发过去。
+        """
+        if rotation_class is not None:
+            self._hot_reload.set_rotation_class(rotation_class)
+        with self._lock:
+            self._requested_rotation_class = rotation_class
+
+    def reload_titles(self) -> None:
+        """标题库在本进程被改过（导入、编辑）；引擎进程持有自己的 TitleManager，需要重读。"""
+        engine = self._engine
+        if engine is None:
+            return
+        if self._title_manager is not None:
+            self._title_manager.flush()
+        with self._lock:
+            self._titles_reload_requested = True
+
+    def snapshot(self) -> PipelineSnapshot:
+        with self._lock:
+            return PipelineSnapshot(
+                frame_id=self._frame_id,
+                decoded_data=self._decoded_data,
+                decode_state=self._decode_state,
+                decode_error=self._decode_error,
+                decode_result_is_stale=self._decode_result_is_stale,
+                dropped_frames=self._dropped_frame_count(),
+            )
+
+    def _dropped_frame_count(self) -> int:
+        return self._frame_mailbox.dropped + self._data_mailbox.dropped
+
+    def _ensure_ring(self, height: int, width: int) -> tuple[FrameRing, int]:
+        with self._lock:
+            ring = self._ring
+            if ring is None or not ring.matches(height, width):
+                if ring is not None:
+                    self._retired_rings.append(ring)
+                    self._ring_base_frame_id = self._frame_id
+                ring = FrameRing.create(height, width, slots=self._ring_slots)
+                self._ring = ring
+            return ring, self._ring_base_frame_id
+
+    def _reset_snapshot_state(self) -> None:
+        with self._lock:
+            self._frame_id = 0
+            self._decoded_data = None
+            self._decode_state = 'idle'
+            self._decode_error = '尚未解析'
+            self._decode_result_is_stale = False
+            self._last_invalid_reason_key = None
+
+    def _decode_loop(self) -> None:
+        # 增量解码时上一帧的 Matrix 直接引用槽位像素，这个槽位要一直占到下一帧解码完。
+        held: tuple[FrameRing, FrameSlot] | None = None
+        last_ring: FrameRing | None = None
+        last_seq = 0
+        try:
+            while True:
+                try:
+                    ring, base_frame_id = self._frame_mailbox.take()
+                except MailboxClosed:
+                    return
+                slot = ring.acquire_latest(after_seq=last_seq if ring is last_ring else 0)
+                if slot is None:
+                    continue
+                last_ring, last_seq = ring, slot.seq
+                frame_id = base_frame_id + slot.seq
+                result = self._decode_frame(slot.frame, frame_id)
+                if held is not None:
+                    held[0].release(held[1])
+                    held = None
+                if result.status == DECODE_SUCCESS and self._decoder.incremental:
+                    held = (ring, slot)
+                else:
+                    ring.release(slot)
+                if not self._running:
+                    return
+                self._handle_decode_result(result)
+        finally:
+            if held is not None:
+                held[0].release(held[1])
+
+    def _decode_frame(self, frame: np.ndarray, frame_id: int) -> DecodeResult:
+        """解码一帧并打上 decode 起止时间点；解码器抛出的异常变成 DECODE_ERROR 结果。"""
+        self._tracer.mark(frame_id, EVENT_DECODE_START)
+        try:
+            result = self._decoder.decode(frame, frame_id)
+        except Exception as error:
+            self._decoder.reset_incremental_state()
+            result = DecodeResult(frame_id, DECODE_ERROR, reason=f'第 {frame_id} 帧解析异常: {error}')
+        self._tracer.mark(frame_id, EVENT_DECODE_END)
+        return result
+
+    def _start_engine(self, rotation_class: type[BaseRotation]) -> None:
+        db_path = getattr(self._title_manager, 'db_path', None)
+        engine = EngineProcess(db_path=db_path, incremental=self._incremental)
+        engine.set_rotation_class(rotation_class)
+        engine.start()
+        self._engine = engine
+
+    def _engine_loop(self) -> None:
+        engine = self._engine
+        if engine is None:
+            return
+        # 槽位状态只在本进程里改：引擎回复 keep_slot 时，这个槽位要占到下一帧回来为止。
+        held: tuple[FrameRing, FrameSlot] | None = None
+        last_ring: FrameRing | None = None
+        last_seq = 0
+        try:
+            while True:
+                try:
+                    ring, base_frame_id = self._frame_mailbox.take()
+                except MailboxClosed:
+                    return
+                slot = ring.acquire_latest(after_seq=last_seq if ring is last_ring else 0)
+                if slot is None:
+                    continue
+                last_ring, last_seq = ring, slot.seq
+                frame_id = base_frame_id + slot.seq
+                try:
+                    self._tracer.mark(frame_id, EVENT_DECODE_START)
+                    reply = self._request_engine_frame(engine, ring, slot, frame_id)
+                    # 引擎进程里解码和 rotation 连在一起，这里只能按整段记在 decode 上。
+                    self._tracer.mark(frame_id, EVENT_DECODE_END)
+                except EngineCrashed as error:
+                    ring.release(slot)
+                    if held is not None:
+                        held[0].release(held[1])
+                        held = None
+                    if not self._running:
+                        return
+                    self._restart_engine(engine, frame_id, error)
+                    continue
+                if held is not None:
+                    held[0].release(held[1])
+                    held = None
+                if reply.keep_slot:
+                    held = (ring, slot)
+                else:
+                    ring.release(slot)
+                if not self._running:
+                    return
+                try:
+                    self._handle_engine_reply(reply)
+                except Exception as error:
+                    # 一帧回复处理出错不能让引擎线程退出，记一笔接着处理下一帧。
+                    self._log(f'第 {reply.frame_id} 帧引擎回复处理异常: {error}')
+                    self._tracer.finish(reply.frame_id)
+        finally:
+            if held is not None:
+                held[0].release(held[1])
+
+    def _request_engine_frame(self, engine: EngineProcess, ring: FrameRing, slot: FrameSlot, frame_id: int) -> EngineFrameReply:
+        with self._lock:
+            requested_rotation_class, self._requested_rotation_class = self._requested_rotation_class, None
+            reload_titles, self._titles_reload_requested = self._titles_reload_requested, False
+        if requested_rotation_class is not None:
+            engine.set_rotation_class(requested_rotation_class)
+        if reload_titles:
+            engine.reload_titles()
+        return engine.decode(ring.name, slot.index, frame_id, not self._dispatcher.is_waiting())
+
+    def _restart_engine(self, engine: EngineProcess, frame_id: int, error: EngineCrashed) -> None:
+        self._publish_decode_result(DecodeResult(frame_id, DECODE_ERROR, reason=f'第 {frame_id} 帧引擎进程异常: {error}'))
+        self._tracer.finish(frame_id)
+        self._log('引擎进程异常，正在重启。')
+        try:
+            engine.restart()
+        except EngineCrashed as restart_error:
+            self._log(f'引擎进程重启失败，下一帧再试: {restart_error}')
+            return
+        self._log(f'引擎进程已重启，pid={engine.pid}')
+
+    def _handle_engine_reply(self, reply: EngineFrameReply) -> None:
+        for message in reply.logs:
+            self._log(message)
+        self._publish_decode_result(DecodeResult(reply.frame_id, reply.status, data=reply.data, reason=reply.reason))
+        if reply.title_record is not None:
+            self._apply_engine_title_record(reply.title_record)
+        if reply.rotation is not None:
+            self._dispatcher.dispatch(reply.rotation, self._window_handle)
+            self._tracer.mark(reply.frame_id, EVENT_DISPATCH)
+        self._tracer.finish(reply.frame_id)
+
+    def _apply_engine_title_record(self, record: dict[str, Any]) -> None:
+        """引擎已经把新标题写进 SQLite，这里只更新内存索引；不碰 TitleManager.conn，它属于创建它的 UI 线程。"""
+        if self._title_manager is None:
+            return
+        try:
+            self._title_manager.add_record(
+                valid_array=np.array(record['valid_array'], dtype=np.uint8),
+                title_type=str(record['title_type']),
+                title=str(record['title']),
+                hash=str(record['hash']),
+                persist=False,
+            )
+        except Exception as error:
+            self._log(f'同步引擎的 UTF 标题失败: {error}')
+            return
+        if self._on_titles_changed is not None:
+            self._on_titles_changed()
+
+    def _handle_decode_result(self, result: DecodeResult) -> None:
+        self._publish_decode_result(result)
+        if result.status != DECODE_SUCCESS or result.data is None:
+            return
+        if self._mode == PIPELINE_MODE_FUSED:
+            self._run_rotation(result.frame_id, result.data)
+        else:
+            self._data_mailbox.put((result.frame_id, result.data))
+
+    def _rotation_loop(self) -> None:
+        while True:
+            try:
+                frame_id, data = self._data_mailbox.take()
+            except MailboxClosed:
+                return
+            if not self._running:
+                return
+            self._run_rotation(frame_id, data)
+
+    def _publish_decode_result(self, result: DecodeResult) -> None:
+        if result.status == DECODE_SUCCESS and result.data is not None:
+            self._store_pending_title_record(result.data)
+        elif self._mode != PIPELINE_MODE_PROCESS:
+            # 没解出数据的帧到这里就走完了；process 模式在处理完回复后统一 finish。
+            self._tracer.finish(result.frame_id)
+
+        message: str | None = None
+        reason_key: str | None = None
+        with self._lock:
+            if result.status == DECODE_SUCCESS:
+                self._decoded_data = result.data
+                self._decode_state = DECODE_SUCCESS
+                self._decode_error = ''
+                self._decode_result_is_stale = False
+                self._last_invalid_reason_key = None
+            elif result.status == DECODE_INVALID_FRAME:
+                self._decode_state = DECODE_INVALID_FRAME
+                self._decode_error = result.reason
+                self._decode_result_is_stale = True
+                reason_key = normalize_invalid_reason(result.reason)
+                if reason_key != self._last_invalid_reason_key:
+                    message = result.reason
+                    self._last_invalid_reason_key = reason_key
+            else:
+                self._decode_state = DECODE_ERROR
+                self._decode_error = result.reason
+                self._decode_result_is_stale = True
+                self._last_invalid_reason_key = None
+                message = result.reason
+        if reason_key is not None:
+            self._tracer.count_invalid(reason_key)
+        if message is not None:
+            self._log(message)
+
+    def _store_pending_title_record(self, data: FrameSnapshot | LazyFrameSnapshot) -> None:
+        """UTF 测试徽章产生的新标题直接在解码线程入库，和 get_titles 在同一个线程。"""
+        pending_utf_title_record = pop_pending_title_record(data)
+        if pending_utf_title_record is None or self._title_manager is None:
+            return
+        try:
+            self._title_manager.add_record(
+                valid_array=np.array(pending_utf_title_record['valid_array'], dtype=np.uint8),
+                title_type=str(pending_utf_title_record['title_type']),
+                title=str(pending_utf_title_record['title']),
+                hash=str(pending_utf_title_record['hash']),
+            )
+        except Exception as error:
+            self._log(f'保存 UTF 标题失败: {error}')
+            return
+        if self._on_titles_changed is not None:
+            self._on_titles_changed()
+
+    def _run_rotation(self, frame_id: int, data: FrameSnapshot | LazyFrameSnapshot) -> None:
+        try:
+            self._run_rotation_traced(frame_id, data)
+        finally:
+            self._tracer.finish(frame_id)
+
+    def _run_rotation_traced(self, frame_id: int, data: FrameSnapshot | LazyFrameSnapshot) -> None:
+        if self._dispatcher.is_waiting():
+            return
+
+        rotation_class, reload_event = self._hot_reload.get_runtime_rotation_class()
+        if reload_event is not None:
+            self._log(reload_event.message)
+        if rotation_class is None:
+            return
+
+        self._tracer.mark(frame_id, EVENT_ROTATION_START)
+        try:
+            rotation, migrate_message = self._rotation_instances.get(rotation_class)
+            if migrate_message is not None:
+                self._log(migrate_message)
+            result = self._rotation_results.evaluate(data, frame_id, rotation)
+        except Exception as error:
+            self._log(f"第 {frame_id} 帧 rotation 异常: {error}")
+            return
+        finally:
+            self._tracer.mark(frame_id, EVENT_ROTATION_END)
+        if not self._running:
+            return
+        self._dispatcher.dispatch(result, self._window_handle)
+        self._tracer.mark(frame_id, EVENT_DISPATCH)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable
+
+from ..context import Context
+from ..context.tracking import AccessLog
+
+from ..pixelcalc.extractor import LazyFrameSnapshot, extract_lazy_snapshot, extract_snapshot
+from ..pixelcalc.matrix import MatrixDecoder
+from ..pixelcalc.snapshot import FrameSnapshot
+from ..rotation.base import BaseRotation
+
+__all__ = [
+    "ActionDispatcher",
+    "DECODE_ERROR",
+    "DECODE_INVALID_FRAME",
+    "DECODE_SUCCESS",
+    "DecodeResult",
+    "FrameDecoder",
+    "RotationInstances",
+    "RotationResult",
+    "RotationResultCache",
+    "evaluate_rotation",
+    "normalize_invalid_reason",
+]
+
+DECODE_SUCCESS = "success"
+DECODE_INVALID_FRAME = "invalid_frame"
+DECODE_ERROR = "error"
+
+# 沿用上一次 rotation 结果的最长时间；就算读到的字段一直没变，隔这么久也要真跑一次。
+RESULT_REUSE_MAX_AGE = 0.5
+
+
+@dataclass(frozen=True, slots=True)
+class DecodeResult:
+    frame_id: int
+    status: str
+    matrix: MatrixDecoder | None = None
+    data: FrameSnapshot | LazyFrameSnapshot | None = None
+    reason: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class RotationResult:
+    frame_id: int
+    action: str
+    macro_name: str | None
+    macro_key: str | None
+    wait_seconds: float
+    message: str
+
+
+class FrameDecoder(object):
+    """截图帧 -> Matrix + 结构化数据，不依赖 Qt。
+
+    FrameDecodeWorker 和流水线的解码线程都用它。incremental 打开时保留上一帧成功解码的 Matrix，
+    本帧只重新解码像素变化过的字段；校验失败或解析异常时丢掉上一帧，下一帧整帧重解。
+    lazy 打开时只做校验，data 是 LazyFrameSnapshot，字段等 rotation（或界面）读到时才解码；
+    这时字段解析出错会在 rotation 里抛出，而不是在这里变成 DECODE_ERROR。
+    """
+
+    def __init__(self, incremental: bool = True, lazy: bool = False) -> None:
+        self.incremental = incremental
+        self.lazy = lazy
+        self._previous_matrix: MatrixDecoder | None = None
+
+    def reset_incremental_state(self) -> None:
+        """丢掉上一帧，下一帧整帧重新解码。"""
+        self._previous_matrix = None
+
+    def decode(self, frame: Any, frame_id: int) -> DecodeResult:
+        previous = self._previous_matrix if self.incremental else None
+        self._previous_matrix = None
+        if self.lazy:
+            # 字段要等 rotation 线程读到才解码，那时 FrameRing 的槽位可能已经被截图线程覆盖，先拷一份像素。
+            frame = frame.copy()
+        matrix = MatrixDecoder(frame, previous=previous)
+        flash_cell = matrix.getCell(54, 9)
+
+        if not (flash_cell.is_black or flash_cell.is_white):
+            return DecodeResult(frame_id, DECODE_INVALID_FRAME, reason=f'第 {frame_id} 帧校验失败: flash cell 不是纯黑或纯白。')
+
+        if not matrix.getCell(0, 0).is_pure:
+            return DecodeResult(frame_id, DECODE_INVALID_FRAME, reason=f'第 {frame_id} 帧校验失败: 左上角锚点 cell 不是纯色。')
+
+        if not matrix.getCell(82, 2).is_white:
+            return DecodeResult(frame_id, DECODE_INVALID_FRAME, reason=f'第 {frame_id} 帧校验失败: 右上角锚点 cell 不是白色。')
+
+        if matrix.readCharCell(0, 2) == 0:
+            return DecodeResult(frame_id, DECODE_INVALID_FRAME, reason=f'第 {frame_id} 帧校验失败: 文字检测帧异常。尝试/reload')
+
+        try:
+            data = extract_lazy_snapshot(matrix) if self.lazy else extract_snapshot(matrix)
+        except Exception as error:
+            return DecodeResult(frame_id, DECODE_ERROR, reason=f'第 {frame_id} 帧解析异常: {error}')
+
+        if self.incremental:
+            self._previous_matrix = matrix
+        return DecodeResult(frame_id, DECODE_SUCCESS, matrix=matrix, data=data)
+
+
+class RotationInstances(object):
+    """每个 rotation 类只保留一个活实例，不再每帧重新构造（macroTable、阈值都只建一次）。
+
+    类对象变了才重建：热重载得到同名新类时，新实例接过旧实例的 history，再 migrate_state(旧实例)；
+    换成别的 rotation 时不迁移。只在跑 rotation 的那个线程里使用。
+    on_created 在每次建出新实例后调用（例如让按键分发预先解析 macroTable）。
+    """
+
+    def __init__(self, on_created: Callable[[BaseRotation], None] | None = None) -> None:
+        self._rotation_class: type[BaseRotation] | None = None
+        self._instance: BaseRotation | None = None
+        self._on_created = on_created
+
+    def clear(self) -> None:
+        self._rotation_class = None
+        self._instance = None
+
+    def get(self, rotation_class: type[BaseRotation]) -> tuple[BaseRotation, str | None]:
+        """返回 (实例, 日志)；migrate_state 出错时照样换上新实例，只是状态不迁移。"""
+        if rotation_class is self._rotation_class and self._instance is not None:
+            return self._instance, None
+
+        instance = rotation_class()
+        old_instance = self._instance
+        message: str | None = None
+        if old_instance is not None and _is_same_rotation(type(old_instance), rotation_class):
+            if hasattr(old_instance, "history"):
+                instance.history = old_instance.history
+            try:
+                instance.migrate_state(old_instance)
+            except Exception as error:
+                message = f"rotation 状态迁移失败，使用新实例的初始状态: {rotation_class.__name__}: {error}"
+        self._rotation_class = rotation_class
+        self._instance = instance
+        if self._on_created is not None:
+            self._on_created(instance)
+        return instance, message
+
+
+def _is_same_rotation(old_class: type, new_class: type) -> bool:
+    return (old_class.__module__, old_class.__qualname__) == (new_class.__module__, new_class.__qualname__)
+
+
+def evaluate_rotation(
+    decoded_data: FrameSnapshot | LazyFrameSnapshot,
+    frame_id: int,
+    rotation: BaseRotation | type[BaseRotation],
+    access_log: AccessLog | None = None,
+) -> RotationResult:
+    """跑一次 rotation 并把 macro 名称解析成按键；rotation 自己抛的异常原样抛出。
+
+    传入实例时直接复用（见 RotationInstances）；传入类时临时构造一个。
+    access_log 不为 None 时记下这次评估从 Context 读过的字段。
+    """
+    if isinstance(rotation, type):
+        rotation = rotation()
+    if access_log is None:
+        action, timeout, value = rotation.handle(decoded_data)
+    else:
+        action, timeout, value = rotation.handle(decoded_data, access_log)
+
+    if action == "cast":
+        macro_name = str(value)
+        return RotationResult(frame_id, action, macro_name, rotation.getMacroKey(macro_name), 0.0, macro_name)
+
+    if action == "wait":
+        return RotationResult(frame_id, action, None, None, float(timeout), str(value))
+
+    return RotationResult(frame_id, action, None, None, 0.0, str(value))
+
+
+class RotationResultCache(object):
+    """rotation 打开 track_dependencies 时，相关字段没变的帧直接沿用上一次的结果。
+
+    每次真正跑 rotation 都用 AccessLog 记下读过的字段和值；下一帧先在新数据上把这些字段重新读一遍
+    （按需解码时也只解这几个字段），全都一样就把上次的 RotationResult 换上新帧号交出去。
+    技能冷却、光环剩余时间是倒计时：读到的最小正数就是结果最多能沿用多久，倒计时走完判断可能就变了，
+    哪怕截到的还是同一帧画面。不管读了什么，最多沿用 max_age 秒。
+    沿用时不调用 rotation.handle，main_rotation 的副作用这一帧都不会发生；history 仍然照常记下这一帧。
+    wait 结果、读过整帧数据的评估不缓存。只在跑 rotation 的那个线程里使用。
+    """
+
+    def __init__(self, max_age: float = RESULT_REUSE_MAX_AGE, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_age = max_age
+        self._clock = clock
+        self._rotation: BaseRotation | None = None
+        self._access_log: AccessLog | None = None
+        self._result: RotationResult | None = None
+        self._expires_at = 0.0
+        self.evaluated = 0
+        self.reused = 0
+
+    def clear(self) -> None:
+        self._rotation = None
+        self._access_log = None
+        self._result = None
+
+    def evaluate(self, decoded_data: FrameSnapshot | LazyFrameSnapshot, frame_id: int, rotation: BaseRotation) -> RotationResult:
+        """和 evaluate_rotation 一样，rotation 自己抛的异常原样抛出。"""
+        if not rotation.track_dependencies:
+            self.clear()
+            return evaluate_rotation(decoded_data, frame_id, rotation)
+
+        now = self._clock()
+        if self._reusable(decoded_data, rotation, now):
+            self.reused += 1
+            rotation.record_frame(decoded_data)
+            return replace(self._result, frame_id=frame_id)
+
+        self.clear()
+        access_log = AccessLog()
+        result = evaluate_rotation(decoded_data, frame_id, rotation, access_log)
+        self.evaluated += 1
+        if result.action != "wait" and not access_log.opaque:
+            self._rotation = rotation
+            self._access_log = access_log
+            self._result = result
+            lifetime = self.max_age if access_log.countdown is None else min(self.max_age, access_log.countdown)
+            self._expires_at = now + lifetime
+        return result
+
+    def _reusable(self, decoded_data: FrameSnapshot | LazyFrameSnapshot, rotation: BaseRotation, now: float) -> bool:
+        # 热重载换了实例也算变化：新代码可能读的是另一批字段。
+        if self._result is None or self._rotation is not rotation or now >= self._expires_at:
+            return False
+        return self._access_log.unchanged(Context(decoded_data))
+
+
+def normalize_invalid_reason(reason: str) -> str:
+    """去掉帧号前缀，连续出现的同一种校验失败只记一次日志。"""
+    if ': ' in reason:
+        return reason.split(': ', 1)[1].strip()
+    if ':' in reason:
+        return reason.split(':', 1)[1].strip()
+    return reason.strip()
+
+
+class ActionDispatcher(object):
+    """执行 rotation 结果：cast 发按键，wait 记下截止时间，日志按动作去重。
+
+    log 和 send_key 由调用方传入，主线程路径和流水线线程共用同一套规则。
+    """
+
+    def __init__(self, log: Callable[[str], None], send_key: Callable[[int, str], None]) -> None:
+        self._log = log
+        self._send_key = send_key
+        self.wait_until_monotonic: float = 0.0
+        self.last_action_signature: tuple[str, str] | None = None
+
+    def reset(self) -> None:
+        self.wait_until_monotonic = 0.0
+        self.last_action_signature = None
+
+    def is_waiting(self) -> bool:
+        return self.wait_until_monotonic > time.monotonic()
+
+    def dispatch(self, result: RotationResult, window_handle: int | None) -> None:
+        if result.action == 'cast':
+            macro_name = result.macro_name
+            if macro_name is None:
+                return
+            if result.macro_key is None:
+                self._log(f'cast: {macro_name}，还没配置按键。')
+                return
+            signature = ('cast', macro_name)
+            if signature != self.last_action_signature:
+                self._log(f'cast: {macro_name}')
+                self.last_action_signature = signature
+            if window_handle is not None:
+                self._send_key(window_handle, result.macro_key)
+            return
+
+        if result.action == 'wait':
+            self.wait_until_monotonic = time.monotonic() + result.wait_seconds
+            self._log(f'wait {result.wait_seconds:.2f}s: {result.message}')
+            self.last_action_signature = ('wait', result.message)
+            return
+
+        signature = ('idle', result.message)
+        if signature != self.last_action_signature:
+            self._log(f'idle: {result.message}')
+            self.last_action_signature = signature
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import bisect
+import csv
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+__all__ = [
+    "DROP_DECODE_OVERWRITE",
+    "DROP_EVICTED",
+    "DROP_ROTATION_OVERWRITE",
+    "EVENT_CAPTURE_END",
+    "EVENT_CAPTURE_START",
+    "EVENT_DECODE_END",
+    "EVENT_DECODE_START",
+    "EVENT_DISPATCH",
+    "EVENT_ROTATION_END",
+    "EVENT_ROTATION_START",
+    "FrameTrace",
+    "FrameTracer",
+    "LATENCY_BUCKETS_NS",
+    "RollingHistogram",
+    "STAGE_KEY_DOWN",
+    "STAGES",
+    "StageLatency",
+    "TraceSummary",
+]
+
+# 一帧经过的时间点，按发生顺序排列；FrameTrace.stamps 用同样的下标。
+EVENT_CAPTURE_START = 0
+EVENT_CAPTURE_END = 1
+EVENT_DECODE_START = 2
+EVENT_DECODE_END = 3
+EVENT_ROTATION_START = 4
+EVENT_ROTATION_END = 5
+EVENT_DISPATCH = 6
+EVENT_NAMES = ("capture_start", "capture_end", "decode_start", "decode_end", "rotation_start", "rotation_end", "dispatch")
+
+# 阶段名 -> (起点, 终点)。*_wait 是排队时间：上一阶段做完到下一阶段开始。
+STAGE_SPANS = {
+    "capture": (EVENT_CAPTURE_START, EVENT_CAPTURE_END),
+    "decode_wait": (EVENT_CAPTURE_END, EVENT_DECODE_START),
+    "decode": (EVENT_DECODE_START, EVENT_DECODE_END),
+    "rotation_wait": (EVENT_DECODE_END, EVENT_ROTATION_START),
+    "rotation": (EVENT_ROTATION_START, EVENT_ROTATION_END),
+    "dispatch": (EVENT_ROTATION_END, EVENT_DISPATCH),
+}
+# 按键分发线程从入队到真正发出 key-down，不跟帧号走，由 KeyDispatcher 单独上报。
+STAGE_KEY_DOWN = "key_down"
+STAGE_TOTAL = "total"
+STAGES = (*STAGE_SPANS, STAGE_KEY_DOWN, STAGE_TOTAL)
+
+# 还没开始解码就被更新的帧顶掉（截图信箱 / 待解码帧被覆盖）。
+DROP_DECODE_OVERWRITE = "decode_overwrite"
+# 解码完还没进 rotation 就被更新的帧顶掉。
+DROP_ROTATION_OVERWRITE = "rotation_overwrite"
+# 在途记录太多，最老的直接丢掉；正常运行时应该一直是 0。
+DROP_EVICTED = "evicted"
+
+# 累计直方图的桶上界（纳秒，含上界），指标接口按 Prometheus histogram 导出；超过最后一个的只算进总数。
+LATENCY_BUCKETS_NS = tuple(int(ms * 1_000_000) for ms in (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000))
+
+
+class FrameTrace(object):
+    """一帧的时间点记录，单位是 time.monotonic_ns()，0 表示这一帧没有经过那个点。"""
+
+    __slots__ = ("frame_id", "stamps")
+
+    def __init__(self, frame_id: int) -> None:
+        self.frame_id = frame_id
+        self.stamps = [0] * len(EVENT_NAMES)
+
+    def span_ns(self, start: int, end: int) -> int | None:
+        if self.stamps[start] == 0 or self.stamps[end] == 0:
+            return None
+        return self.stamps[end] - self.stamps[start]
+
+    def total_ns(self) -> int | None:
+        first = next((stamp for stamp in self.stamps if stamp), 0)
+        last = max(self.stamps)
+        if first == 0 or last == first:
+            return None
+        return last - first
+
+
+class RollingHistogram(object):
+    """最近 capacity 个样本（纳秒）的滚动窗口，分位数在取快照时现算。
+
+    另外按 LATENCY_BUCKETS_NS 分桶累计计数，和 count / total_ns 一样从启动（或 clear）算起。
+    """
+
+    def __init__(self, capacity: int = 2048) -> None:
+        self._samples = np.zeros(capacity, dtype=np.int64)
+        self._next = 0
+        self._size = 0
+        self.count = 0
+        self.total_ns = 0
+        # 每个桶自己的计数，最后一格是超过所有上界的。
+        self._bucket_counts = [0] * (len(LATENCY_BUCKETS_NS) + 1)
+
+    def observe(self, value_ns: int) -> None:
+        self._samples[self._next] = value_ns
+        self._next = (self._next + 1) % len(self._samples)
+        self._size = min(self._size + 1, len(self._samples))
+        self.count += 1
+        self.total_ns += value_ns
+        self._bucket_counts[bisect.bisect_left(LATENCY_BUCKETS_NS, value_ns)] += 1
+
+    def cumulative_buckets(self) -> tuple[int, ...]:
+        """每个上界以内（含）的累计样本数，和 LATENCY_BUCKETS_NS 一一对应。"""
+        counts = []
+        running = 0
+        for count in self._bucket_counts[:-1]:
+            running += count
+            counts.append(running)
+        return tuple(counts)
+
+    def percentiles_ms(self, percents: tuple[float, ...] = (50.0, 95.0, 99.0)) -> tuple[float, ...]:
+        if self._size == 0:
+            return tuple(0.0 for _ in percents)
+        values = np.percentile(self._samples[: self._size], percents)
+        return tuple(float(value) / 1e6 for value in values)
+
+    def max_ms(self) -> float:
+        if self._size == 0:
+            return 0.0
+        return float(self._samples[: self._size].max()) / 1e6
+
+    def clear(self) -> None:
+        self._next = 0
+        self._size = 0
+        self.count = 0
+        self.total_ns = 0
+        self._bucket_counts = [0] * (len(LATENCY_BUCKETS_NS) + 1)
+
+
+@dataclass(frozen=True, slots=True)
+class StageLatency:
+    stage: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    # count / sum 是启动以来的累计值，分位数只看最近的窗口。
+    sum_ms: float
+    # 同样是累计值：LATENCY_BUCKETS_NS 每个上界以内的样本数。
+    buckets: tuple[int, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class TraceSummary:
+    stages: tuple[StageLatency, ...]
+    drops: dict[str, int]
+    completed: int
+    in_flight: int
+    captured: int
+    capture_fps: float
+    invalid_reasons: dict[str, int]
+
+
+class FrameTracer(object):
+    """按帧号记录每一帧在 capture -> decode -> rotation -> 发按键 之间的时间点。
+
+    各阶段只调用 mark(frame_id, EVENT_*)；一帧走完（发完按键、解析失败、等待中不跑 rotation）时 finish，
+    这时把各段耗时放进每个阶段的滚动直方图，并把整条记录留给 CSV 导出。
+    帧在排队时被更新的帧顶掉不需要调用方报告：更新的帧开始解码 / 开始 rotation 时，
+    更老的、还停在上一步的记录会按覆盖丢弃计数。
+    enabled=False 时所有方法直接返回，作为流水线的默认值。
+    """
+
+    def __init__(self, *, enabled: bool = True, window: int = 2048, max_in_flight: int = 256, history: int = 4096) -> None:
+        self.enabled = enabled
+        self._window = window
+        self._max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._open: OrderedDict[int, FrameTrace] = OrderedDict()
+        self._histograms = {stage: RollingHistogram(window) for stage in STAGES}
+        self._drops = {DROP_DECODE_OVERWRITE: 0, DROP_ROTATION_OVERWRITE: 0, DROP_EVICTED: 0}
+        self._completed: deque[FrameTrace] = deque(maxlen=history)
+        self._completed_count = 0
+        self._captured = 0
+        # 最近几帧截图完成的时间点，用来算实际截图帧率。
+        self._capture_ends: deque[int] = deque(maxlen=64)
+        self._invalid_reasons: dict[str, int] = {}
+
+    def reset(self) -> None:
+        """帧号从头开始时（重新启动）调用。"""
+        with self._lock:
+            self._open.clear()
+            self._completed.clear()
+            self._completed_count = 0
+            self._captured = 0
+            self._capture_ends.clear()
+            self._invalid_reasons.clear()
+            for histogram in self._histograms.values():
+                histogram.clear()
+            for reason in self._drops:
+                self._drops[reason] = 0
+
+    def capture(self, frame_id: int, start_ns: int, end_ns: int) -> None:
+        """截图已经完成、刚分到帧号时调用，开始这一帧的记录。"""
+        if not self.enabled:
+            return
+        with self._lock:
+            trace = self._open_trace(frame_id)
+            trace.stamps[EVENT_CAPTURE_START] = start_ns
+            trace.stamps[EVENT_CAPTURE_END] = end_ns
+            self._captured += 1
+            self._capture_ends.append(end_ns)
+
+    def mark(self, frame_id: int, event: int, stamp_ns: int | None = None) -> None:
+        if not self.enabled:
+            return
+        if stamp_ns is None:
+            stamp_ns = time.monotonic_ns()
+        with self._lock:
+            trace = self._open.get(frame_id)
+            if trace is None:
+                trace = self._open_trace(frame_id)
+            trace.stamps[event] = stamp_ns
+            if event == EVENT_DECODE_START:
+                self._sweep(frame_id, EVENT_DECODE_START, DROP_DECODE_OVERWRITE)
+            elif event == EVENT_ROTATION_START:
+                self._sweep(frame_id, EVENT_ROTATION_START, DROP_ROTATION_OVERWRITE)
+
+    def finish(self, frame_id: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            trace = self._open.pop(frame_id, None)
+            if trace is None:
+                return
+            for stage, (start, end) in STAGE_SPANS.items():
+                span = trace.span_ns(start, end)
+                if span is not None and span >= 0:
+                    self._histograms[stage].observe(span)
+            total = trace.total_ns()
+            if total is not None:
+                self._histograms[STAGE_TOTAL].observe(total)
+            self._completed.append(trace)
+            self._completed_count += 1
+
+    def count_invalid(self, reason_key: str) -> None:
+        """按 normalize_invalid_reason 归一后的原因给无效帧计数；帧本身仍由调用方 finish。"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._invalid_reasons[reason_key] = self._invalid_reasons.get(reason_key, 0) + 1
+
+    def observe(self, stage: str, value_ns: int) -> None:
+        """不跟帧号走的阶段直接上报一个耗时，例如按键分发线程的 key_down。"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._histograms[stage].observe(value_ns)
+
+    def summary(self) -> TraceSummary:
+        with self._lock:
+            stages = []
+            for stage in STAGES:
+                histogram = self._histograms[stage]
+                p50, p95, p99 = histogram.percentiles_ms()
+                stages.append(StageLatency(
+                    stage,
+                    histogram.count,
+                    p50,
+                    p95,
+                    p99,
+                    histogram.max_ms(),
+                    histogram.total_ns / 1e6,
+                    histogram.cumulative_buckets(),
+                ))
+            capture_fps = 0.0
+            if len(self._capture_ends) > 1 and self._capture_ends[-1] > self._capture_ends[0]:
+                capture_fps = (len(self._capture_ends) - 1) * 1e9 / (self._capture_ends[-1] - self._capture_ends[0])
+            return TraceSummary(
+                tuple(stages),
+                dict(self._drops),
+                self._completed_count,
+                len(self._open),
+                self._captured,
+                capture_fps,
+                dict(self._invalid_reasons),
+            )
+
+    def write_csv(self, path: str | Path) -> int:
+        """把最近走完的帧逐行写出：原始时间点（纳秒）和各阶段耗时（毫秒）。返回写了多少行。"""
+        with self._lock:
+            traces = [(trace.frame_id, list(trace.stamps)) for trace in self._completed]
+        stage_names = list(STAGE_SPANS)
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame_id", *(f"{name}_ns" for name in EVENT_NAMES), *(f"{name}_ms" for name in stage_names), "total_ms"])
+            for frame_id, stamps in traces:
+                row: list[object] = [frame_id, *stamps]
+                for start, end in STAGE_SPANS.values():
+                    row.append(f"{(stamps[end] - stamps[start]) / 1e6:.3f}" if stamps[start] and stamps[end] else "")
+                present = [stamp for stamp in stamps if stamp]
+                row.append(f"{(max(present) - present[0]) / 1e6:.3f}" if len(present) > 1 else "")
+                writer.writerow(row)
+        return len(traces)
+
+    def _open_trace(self, frame_id: int) -> FrameTrace:
+        trace = self._open.get(frame_id)
+        if trace is None:
+            trace = FrameTrace(frame_id)
+            self._open[frame_id] = trace
+            while len(self._open) > self._max_in_flight:
+                self._open.popitem(last=False)
+                self._drops[DROP_EVICTED] += 1
+        return trace
+
+    def _sweep(self, frame_id: int, event: int, reason: str) -> None:
+        # 比 frame_id 老、还没走到 event 这一步的帧，已经被 frame_id 顶掉了。
+        stale = [
+            older_id
+            for older_id, trace in self._open.items()
+            if older_id < frame_id and trace.stamps[event] == 0 and (event != EVENT_ROTATION_START or trace.stamps[EVENT_DECODE_END])
+        ]
+        for older_id in stale:
+            del self._open[older_id]
+            self._drops[reason] += 1
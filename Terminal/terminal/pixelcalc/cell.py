@@ -2,6 +2,7 @@ import numpy as np
 import xxhash
 import logging
 
+from .cell_grid import CellGrid, remaining_from_gray
 from .color_map import COLOR_MAP
 from .title_manager import get_default_title_manager
 
@@ -62,45 +63,83 @@ class CellRegion(object):
 
     @property
     def remaining(self) -> float:
-        gray: int = int(self.mean)
-        if gray <= 0:
-            return 0.0
-        if gray >= 255:
-            return 375.0
-        if gray <= 100:
-            return 5.0 * gray / 100
-        if gray <= 150:
-            return 5.0 + 25.0 * (gray - 100) / 50
-        if gray <= 200:
-            return 30.0 + 125.0 * (gray - 150) / 50
-        return 155.0 + 220.0 * (gray - 200) / 55
-
-
-class Cell(CellRegion):
-    def __init__(self, x: int, y: int, pix_array: np.ndarray) -> None:
+        return remaining_from_gray(int(self.mean))
+
+
+class Cell(object):
+    """CellGrid 上 (x, y) 这个 4x4 cell 的视图，统计量都是整帧预先算好的。"""
+
+    __slots__ = ("x", "y", "_grid")
+
+    def __init__(self, grid: CellGrid, x: int, y: int) -> None:
         self.x: int = x
         self.y: int = y
-        self.pix_array: np.ndarray = pix_array
-        inner = pix_array[1:3, 1:3]
-        super().__init__(inner)
+        self._grid: CellGrid = grid
+
+    @property
+    def pix_array(self) -> np.ndarray:
+        return self._grid.blocks[self.y, self.x]
+
+    @property
+    def valid_array(self) -> np.ndarray:
+        return self._grid.blocks[self.y, self.x, 1:3, 1:3]
+
+    @property
+    def mean(self) -> np.floating:
+        return self._grid.mean[self.y, self.x]
+
+    @property
+    def decimal(self) -> np.floating:
+        return self.mean / 255.0
+
+    @property
+    def percent(self) -> np.floating:
+        return self.mean / 255.0 * 100
+
+    @property
+    def is_pure(self) -> bool:
+        return bool(self._grid.is_pure[self.y, self.x])
+
+    @property
+    def is_not_pure(self) -> bool:
+        return not self.is_pure
+
+    @property
+    def color(self) -> tuple[int, int, int]:
+        pixel: np.ndarray = self._grid.color[self.y, self.x]
+        return (int(pixel[0]), int(pixel[1]), int(pixel[2]))
+
+    @property
+    def color_string(self) -> str:
+        return f"{self.color[0]},{self.color[1]},{self.color[2]}"
+
+    @property
+    def white_count(self) -> int:
+        return int(self._grid.inner_white_count[self.y, self.x])
+
+    @property
+    def remaining(self) -> float:
+        return self._grid.remaining(self.x, self.y)
 
     @property
     def is_black(self) -> bool:
-        return self.is_pure and tuple(self.color) == (0, 0, 0)
+        return bool(self._grid.is_black[self.y, self.x])
 
     @property
     def is_green(self) -> bool:
-        return self.is_pure and tuple(self.color) == (0, 255, 0)
+        return bool(self._grid.is_green[self.y, self.x])
 
     @property
     def is_white(self) -> bool:
-        return self.is_pure and tuple(self.color) == (255, 255, 255)
+        return bool(self._grid.is_white[self.y, self.x])
 
     @property
     def is_not_black(self) -> bool:
-        if (not self.is_green) and (not self.is_black):
+        if self.is_black:
+            return False
+        if not self.is_green:
             logging.warning(f"坐标在 ({self.x}, {self.y}) 的单元格不是二元色, 颜色: {self.color_string}，发生串色，考虑抗锯齿、插帧、缩放异常。")
-        return not self.is_black
+        return True
 
 
 class MegaCell(CellRegion):
@@ -129,27 +168,40 @@ class MegaCell(CellRegion):
 
 
 class BadgeCell(CellRegion):
-    def __init__(self, x: int, y: int, pix_array: np.ndarray) -> None:
+    """CellGrid 上以 (x, y) 为左上角的 8x8 图标 cell。
+
+    角标/中心区域的判断直接读 CellGrid，只有 hash、title 这类需要原始像素的才去切片。
+    """
+
+    def __init__(self, grid: CellGrid, x: int, y: int) -> None:
         self.x: int = x
         self.y: int = y
-        self.pix_array: np.ndarray = pix_array
+        self._grid: CellGrid = grid
+        self.pix_array: np.ndarray = grid.pix_array[y * 4:y * 4 + 8, x * 4:x * 4 + 8]
         self._hash_cache: str | None = None
-        inner = pix_array[1:7, 1:7]
+        inner = self.pix_array[1:7, 1:7]
         super().__init__(inner)
-        self._footnote = CellRegion(self.pix_array[-2:, -2:])
-        self._core = CellRegion(pix_array[3:5, 3:5])  # 一个极中间的区域，判断是否为黑色。
 
     @property
     def is_black(self) -> bool:
-        return self._core.is_black
+        return bool(self._grid.badge_core_is_black[self.y, self.x])
 
     @property
     def footnote(self) -> CellRegion:
-        return self._footnote
+        return CellRegion(self.pix_array[-2:, -2:])
+
+    @property
+    def footnote_is_pure(self) -> bool:
+        return bool(self._grid.footnote_is_pure[self.y + 1, self.x + 1])
+
+    @property
+    def footnote_is_black(self) -> bool:
+        return bool(self._grid.footnote_is_black[self.y + 1, self.x + 1])
 
     @property
     def footnote_color_string(self) -> str:
-        return self._footnote.color_string
+        pixel: np.ndarray = self._grid.footnote_color[self.y + 1, self.x + 1]
+        return f"{int(pixel[0])},{int(pixel[1])},{int(pixel[2])}"
 
     @property
     def cell_type(self) -> str:
@@ -167,20 +219,20 @@ class BadgeCell(CellRegion):
         return manager.get_title(self.valid_array, self.cell_type, self.hash)
 
 
-class CharCell(CellRegion):
-    def __init__(self, x: int, y: int, pix_array: np.ndarray) -> None:
+class CharCell(object):
+    """CellGrid 上以 (x, y) 为左上角的 8x8 字符 cell，数值由白色像素数查表得到。"""
+
+    __slots__ = ("x", "y", "_grid")
+
+    def __init__(self, grid: CellGrid, x: int, y: int) -> None:
         self.x: int = x
         self.y: int = y
-        self.pix_array: np.ndarray = pix_array
-        super().__init__(pix_array)
+        self._grid: CellGrid = grid
+
+    @property
+    def white_count(self) -> int:
+        return int(self._grid.char_white_count[self.y, self.x])
 
     @property
     def count(self) -> int:
-        white_count = self.white_count
-        if white_count <= 9:
-            return white_count
-        if white_count == 10:
-            return 0
-        if white_count >= 11:
-            return 10
-        return 0
+        return self._grid.char_count(self.x, self.y)
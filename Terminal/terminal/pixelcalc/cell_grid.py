@@ -0,0 +1,193 @@
+import numpy as np
+
+__all__ = ["CellGrid", "REMAINING_LUT", "CHAR_COUNT_LUT", "remaining_from_gray", "pack_rgb", "pack_rgb_array"]
+
+
+def remaining_from_gray(gray: int) -> float:
+    """把 cell 的灰度值换算成剩余秒数。"""
+    if gray <= 0:
+        return 0.0
+    if gray >= 255:
+        return 375.0
+    if gray <= 100:
+        return 5.0 * gray / 100
+    if gray <= 150:
+        return 5.0 + 25.0 * (gray - 100) / 50
+    if gray <= 200:
+        return 30.0 + 125.0 * (gray - 150) / 50
+    return 155.0 + 220.0 * (gray - 200) / 55
+
+
+def _char_count_from_white(white_count: int) -> int:
+    if white_count <= 9:
+        return white_count
+    if white_count == 10:
+        return 0
+    return 10
+
+
+def pack_rgb(r: int, g: int, b: int) -> int:
+    return (r << 16) | (g << 8) | b
+
+
+def pack_rgb_array(rgb: np.ndarray) -> np.ndarray:
+    rgb32 = rgb.astype(np.int32)
+    return (rgb32[..., 0] << 16) | (rgb32[..., 1] << 8) | rgb32[..., 2]
+
+
+# 灰度 0~255 -> 剩余秒数，int(mean) 直接查表。
+REMAINING_LUT: tuple[float, ...] = tuple(remaining_from_gray(gray) for gray in range(256))
+# 8x8 区域里白色像素数 0~64 -> 字符 cell 的数值。
+CHAR_COUNT_LUT: tuple[int, ...] = tuple(_char_count_from_white(count) for count in range(65))
+
+
+class CellGrid(object):
+    """整帧一次性算好所有 cell 的统计量。
+
+    把 (rows*4, cols*4, 3) 的矩阵帧 reshape 成 (rows, cols, 4, 4, 3)，
+    再用几次向量化运算得到每个 cell 的纯色/首像素颜色/均值/白色像素数，
+    以及 BadgeCell 用到的角标和中心区域。Cell/BadgeCell/CharCell 只是这些数组的视图。
+
+    传入上一帧的 CellGrid 时，先整帧比较一次找出变化的 cell（changed），
+    变化不多就只重算这些 cell，其余统计量沿用上一帧。
+    """
+
+    # 变化的 cell 超过这个比例就直接整帧重算，gather/scatter 反而更慢。
+    INCREMENTAL_RATIO: float = 0.25
+
+    def __init__(self, martix_pix_array: np.ndarray, previous: "CellGrid | None" = None) -> None:
+        rows: int = martix_pix_array.shape[0] // 4
+        cols: int = martix_pix_array.shape[1] // 4
+        self.rows: int = rows
+        self.cols: int = cols
+        self.pix_array: np.ndarray = martix_pix_array
+
+        trimmed = martix_pix_array[:rows * 4, :cols * 4]
+        # (rows, cols, 4, 4, 3)，只是 view，不复制。
+        self.blocks: np.ndarray = trimmed.reshape(rows, 4, cols, 4, 3).swapaxes(1, 2)
+
+        # 和上一帧比，(rows, cols) 的 bool，任意像素不同即为 True；没有上一帧时为 None。
+        self.changed: np.ndarray | None = None
+        if previous is not None and previous.blocks.shape == self.blocks.shape:
+            self.changed = np.any(self.blocks != previous.blocks, axis=(2, 3, 4))
+
+        if self.changed is not None and np.count_nonzero(self.changed) <= rows * cols * self.INCREMENTAL_RATIO:
+            self._update_cell_stats(previous, np.nonzero(self.changed))
+        else:
+            self._set_cell_stats(*self._cell_stats(self.blocks))
+        self._derive()
+
+    @staticmethod
+    def _cell_stats(blocks: np.ndarray) -> tuple[np.ndarray, ...]:
+        """单个 cell 自己就能算出的统计量，blocks 的形状是 (..., 4, 4, 3)。"""
+        # Cell 的有效区是 4x4 里中间的 2x2。
+        inner = blocks[..., 1:3, 1:3, :]
+        color = inner[..., 0, 0, :]
+        is_pure = np.all(inner == color[..., None, None, :], axis=(-3, -2, -1))
+        mean = inner.mean(axis=(-3, -2, -1))
+
+        white_mask = np.all(blocks == 255, axis=-1)
+        # 整个 4x4 的白色像素数，CharCell 用 2x2 个 cell 相加。
+        white_count = white_mask.sum(axis=(-2, -1))
+        # 中间 2x2 的白色像素数，Cell.white_count 用，和 color/mean 一样只看有效区。
+        inner_white_count = white_mask[..., 1:3, 1:3].sum(axis=(-2, -1))
+        # 中间两行的白色像素数，bar 用。
+        bar_white_count = white_mask[..., 1:3, :].sum(axis=(-2, -1))
+
+        # BadgeCell 的角标是 8x8 右下角 2x2，也就是右下 cell 的右下 2x2。
+        footnote = blocks[..., 2:4, 2:4, :]
+        footnote_color = footnote[..., 0, 0, :]
+        footnote_is_pure = np.all(footnote == footnote_color[..., None, None, :], axis=(-3, -2, -1))
+
+        # 四个角的像素是否为黑，顺序 (0,0) (0,3) (3,0) (3,3)，BadgeCell 中心判断用。
+        corner_is_black = np.all(blocks[..., [0, 0, 3, 3], [0, 3, 0, 3], :] == 0, axis=-1)
+        return color, is_pure, mean, white_count, inner_white_count, bar_white_count, footnote_color, footnote_is_pure, corner_is_black
+
+    def _set_cell_stats(
+        self,
+        color: np.ndarray,
+        is_pure: np.ndarray,
+        mean: np.ndarray,
+        white_count: np.ndarray,
+        inner_white_count: np.ndarray,
+        bar_white_count: np.ndarray,
+        footnote_color: np.ndarray,
+        footnote_is_pure: np.ndarray,
+        corner_is_black: np.ndarray,
+    ) -> None:
+        self.color: np.ndarray = color
+        self.is_pure: np.ndarray = is_pure
+        self.mean: np.ndarray = mean
+        self.white_count: np.ndarray = white_count
+        self.inner_white_count: np.ndarray = inner_white_count
+        self.bar_white_count: np.ndarray = bar_white_count
+        self.footnote_color: np.ndarray = footnote_color
+        self.footnote_is_pure: np.ndarray = footnote_is_pure
+        self.corner_is_black: np.ndarray = corner_is_black
+
+    def _update_cell_stats(self, previous: "CellGrid", index: tuple[np.ndarray, np.ndarray]) -> None:
+        stats = [
+            previous.color.copy(),
+            previous.is_pure.copy(),
+            previous.mean.copy(),
+            previous.white_count.copy(),
+            previous.inner_white_count.copy(),
+            previous.bar_white_count.copy(),
+            previous.footnote_color.copy(),
+            previous.footnote_is_pure.copy(),
+            previous.corner_is_black.copy(),
+        ]
+        if index[0].size:
+            # 均值是整数像素求和再除，和整帧算的结果逐位一致。
+            for target, changed in zip(stats, self._cell_stats(self.blocks[index])):
+                target[index] = changed
+        self._set_cell_stats(*stats)
+
+    def _derive(self) -> None:
+        """由单 cell 统计量拼出的数组，都是 (rows, cols) 级别的小数组，每帧整体重算。"""
+        # r<<16 | g<<8 | b，颜色查表用整数 key，不用拼字符串。
+        self.packed_color: np.ndarray = pack_rgb_array(self.color)
+        self.gray: np.ndarray = self.mean.astype(np.intp)
+
+        color_is_black = np.all(self.color == 0, axis=2)
+        color_is_white = np.all(self.color == 255, axis=2)
+        color_is_green = (self.color[:, :, 0] == 0) & (self.color[:, :, 1] == 255) & (self.color[:, :, 2] == 0)
+        self.is_black: np.ndarray = self.is_pure & color_is_black
+        self.is_white: np.ndarray = self.is_pure & color_is_white
+        self.is_green: np.ndarray = self.is_pure & color_is_green
+
+        self.footnote_is_black: np.ndarray = self.footnote_is_pure & np.all(self.footnote_color == 0, axis=2)
+
+        # BadgeCell 的中心 2x2 横跨四个 cell 的角，锚点只能取到 (rows-1, cols-1)。
+        corner = self.corner_is_black
+        self.badge_core_is_black: np.ndarray = (
+            corner[:-1, :-1, 3]
+            & corner[:-1, 1:, 2]
+            & corner[1:, :-1, 1]
+            & corner[1:, 1:, 0]
+        )
+        # CharCell 是 8x8，白色像素数等于 2x2 个 cell 的和。
+        self.char_white_count: np.ndarray = (
+            self.white_count[:-1, :-1]
+            + self.white_count[:-1, 1:]
+            + self.white_count[1:, :-1]
+            + self.white_count[1:, 1:]
+        )
+
+    def badge_buffer(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """把若干个 BadgeCell 的 6x6 有效区一次性拷进连续的 (N, 108) 缓冲区，每行可直接喂给 xxhash。"""
+        offsets = np.arange(1, 7, dtype=np.intp)
+        pix_rows = (ys * 4)[:, None] + offsets
+        pix_cols = (xs * 4)[:, None] + offsets
+        return self.pix_array[pix_rows[:, :, None], pix_cols[:, None, :]].reshape(len(xs), 6 * 6 * 3)
+
+    def remaining(self, x: int, y: int) -> float:
+        return REMAINING_LUT[self.gray[y, x]]
+
+    def char_count(self, x: int, y: int) -> int:
+        return CHAR_COUNT_LUT[self.char_white_count[y, x]]
+
+    def bar_value(self, x: int, y: int, length: int) -> float:
+        white_count: int = int(self.bar_white_count[y, x:x + length].sum())
+        total_count: int = 2 * 4 * len(self.bar_white_count[y, x:x + length])
+        return 100.0 * white_count / total_count if total_count > 0 else 0.0
@@ -0,0 +1,351 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+
+from . import layout
+from .cell_grid import CHAR_COUNT_LUT, REMAINING_LUT, pack_rgb
+from .color_map import COLOR_MAP
+from .layout import FieldSpec, SequenceSpec
+from .snapshot import AuraSnapshot, CellSnapshot, SpellSnapshot
+
+if TYPE_CHECKING:
+    from .matrix import MatrixDecoder
+
+__all__ = [
+    "PACKED_COLOR_MAP",
+    "CompiledFields",
+    "CompiledSequence",
+    "compile_fields",
+    "compile_sequence",
+    "compile_slots",
+]
+
+
+def _pack_color_key(color_string: str) -> int | None:
+    parts = color_string.split(",")
+    if len(parts) != 3:
+        # TRANSPARENT 之类带 alpha 的 key，矩阵里读不到，跳过。
+        return None
+    r, g, b = (int(part) for part in parts)
+    return pack_rgb(r, g, b)
+
+
+def _build_packed_color_map() -> dict[str, dict[int, str]]:
+    packed: dict[str, dict[int, str]] = {}
+    for map_name, mapping in COLOR_MAP.items():
+        packed[map_name] = {}
+        for color_string, value in mapping.items():
+            key = _pack_color_key(color_string)
+            if key is not None:
+                packed[map_name][key] = value
+    return packed
+
+
+# COLOR_MAP 的整数 key 版本，CellGrid.packed_color 直接查。
+PACKED_COLOR_MAP: dict[str, dict[int, str]] = _build_packed_color_map()
+
+
+def _index(points: list[tuple[int, int]]) -> tuple[np.ndarray, np.ndarray]:
+    ys = np.array([y for _, y in points], dtype=np.intp)
+    xs = np.array([x for x, _ in points], dtype=np.intp)
+    return ys, xs
+
+
+def _color_string(rgb: list[int]) -> str:
+    return f"{rgb[0]},{rgb[1]},{rgb[2]}"
+
+
+def _warn_flags(matrix: "MatrixDecoder", points: Iterable[tuple[int, int]], is_black: np.ndarray, is_green: np.ndarray) -> None:
+    """和 Cell.is_not_black 一样，非黑非绿时打串色警告；只有出问题的 cell 才走单个 Cell。"""
+    for (x, y), black, green in zip(points, is_black.tolist(), is_green.tolist()):
+        if not black and not green:
+            _ = matrix.getCell(x, y).is_not_black
+
+
+def _spec_cells(spec: FieldSpec) -> list[tuple[int, int]]:
+    if spec.cell == layout.CONST:
+        return []
+    if spec.cell in (layout.BADGE, layout.CHAR):
+        return [(spec.x, spec.y), (spec.x + 1, spec.y), (spec.x, spec.y + 1), (spec.x + 1, spec.y + 1)]
+    if spec.cell == layout.BAR:
+        return [(spec.x + i, spec.y) for i in range(spec.length)]
+    return [(spec.x, spec.y)]
+
+
+# 每种序列从 y 开始往下占几行 cell：图标 2 行，下面是剩余时间/flag/层数。
+_SEQUENCE_HEIGHT: dict[str, int] = {
+    layout.AURA: 5,
+    layout.COOLDOWN_SPELL: 4,
+    layout.CHARGE_SPELL: 6,
+    layout.BADGE_LIST: 2,
+    layout.CELL_LIST: 1,
+}
+
+
+class CompiledFields(object):
+    """把一组 FieldSpec 编译成按解码方式分组的 fancy-index。
+
+    decode 时每种解码方式只做一次 gather，再按声明顺序拼出 dict，
+    输出和逐个 getCell 读出来的结果完全一致（包括 numpy 标量类型）。
+    """
+
+    def __init__(self, fields: Iterable[FieldSpec], name: str = "") -> None:
+        self.fields: tuple[FieldSpec, ...] = tuple(fields)
+        self.name: str = name
+        self.names: tuple[str, ...] = tuple(spec.name for spec in self.fields)
+        # 增量解码时上报的字段名，带上分组前缀，例如 player.status.unitHealthPercent。
+        self.qualified_names: tuple[str, ...] = tuple(f"{name}.{field}" if name else field for field in self.names)
+        self._raw_cells: tuple[int, ...] = tuple(
+            position for position, spec in enumerate(self.fields) if spec.decoder == layout.RAW_CELL
+        )
+        self._badges: tuple[FieldSpec, ...] = tuple(
+            spec for spec in self.fields if spec.decoder in (layout.ICON, layout.TITLE)
+        )
+        self._footprint_ys, self._footprint_xs, self._footprint_owner = self._build_footprint()
+
+        groups: dict[str, list[int]] = {}
+        for position, spec in enumerate(self.fields):
+            groups.setdefault(spec.decoder, []).append(position)
+        self._groups: dict[str, tuple[tuple[int, ...], np.ndarray, np.ndarray]] = {}
+        for decoder, positions in groups.items():
+            points = [(self.fields[p].x, self.fields[p].y) for p in positions]
+            ys, xs = _index(points)
+            self._groups[decoder] = (tuple(positions), ys, xs)
+
+        self._color_is_targets: np.ndarray | None = None
+        if layout.COLOR_IS in self._groups:
+            positions = self._groups[layout.COLOR_IS][0]
+            self._color_is_targets = np.array([pack_rgb(*self.fields[p].color) for p in positions], dtype=np.int32)
+
+    def _build_footprint(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """每个字段读到的 cell 坐标；依赖字段（requires）连同被依赖字段的 cell 一起算。"""
+        own: dict[str, list[tuple[int, int]]] = {}
+        for spec in self.fields:
+            own[spec.name] = _spec_cells(spec)
+        points: list[tuple[int, int]] = []
+        owners: list[int] = []
+        for position, spec in enumerate(self.fields):
+            cells = list(own[spec.name])
+            if spec.requires is not None:
+                cells.extend(own[spec.requires])
+            points.extend(cells)
+            owners.extend([position] * len(cells))
+        ys, xs = _index(points)
+        return ys, xs, np.array(owners, dtype=np.intp)
+
+    def changed_names(self, changed_cells: np.ndarray | None) -> tuple[str, ...]:
+        """changed_cells 为 None 表示整帧都重新解码，所有字段都算变化。"""
+        if changed_cells is None:
+            return self.qualified_names
+        hit = changed_cells[self._footprint_ys, self._footprint_xs]
+        if not hit.any():
+            return ()
+        return tuple(self.qualified_names[position] for position in np.unique(self._footprint_owner[hit]).tolist())
+
+    def reuse(self, matrix: "MatrixDecoder", previous: dict[str, Any]) -> dict[str, Any]:
+        """像素没变时直接沿用上一帧的结果，只有 RAW_CELL 要换成本帧的 Cell。"""
+        result = dict(previous)
+        for position in self._raw_cells:
+            spec = self.fields[position]
+            result[spec.name] = matrix.getCell(spec.x, spec.y)
+        return result
+
+    def _gather(self, matrix: "MatrixDecoder") -> list[Any]:
+        grid = matrix.grid
+        values: list[Any] = [None] * len(self.fields)
+
+        for decoder, (positions, ys, xs) in self._groups.items():
+            if decoder == layout.FLAG:
+                is_black = grid.is_black[ys, xs]
+                is_green = grid.is_green[ys, xs]
+                if not np.all(is_black | is_green):
+                    _warn_flags(matrix, zip(xs.tolist(), ys.tolist()), is_black, is_green)
+                decoded: Iterable[Any] = (not black for black in is_black.tolist())
+            elif decoder == layout.PERCENT:
+                decoded = grid.mean[ys, xs] / 255.0 * 100
+            elif decoder == layout.DECIMAL:
+                decoded = grid.mean[ys, xs] / 255.0
+            elif decoder == layout.MEAN:
+                decoded = grid.mean[ys, xs]
+            elif decoder == layout.REMAINING:
+                decoded = (REMAINING_LUT[gray] for gray in grid.gray[ys, xs].tolist())
+            elif decoder == layout.COLOR_MAP:
+                decoded = (
+                    PACKED_COLOR_MAP[self.fields[p].color_map].get(packed, self.fields[p].default)
+                    for p, packed in zip(positions, grid.packed_color[ys, xs].tolist())
+                )
+            elif decoder == layout.COLOR_IS:
+                decoded = (grid.packed_color[ys, xs] == self._color_is_targets).tolist()
+            elif decoder == layout.CHAR_COUNT:
+                decoded = (CHAR_COUNT_LUT[count] for count in grid.char_white_count[ys, xs].tolist())
+            elif decoder == layout.BAR_VALUE:
+                decoded = (grid.bar_value(self.fields[p].x, self.fields[p].y, self.fields[p].length) for p in positions)
+            elif decoder == layout.VALUE:
+                decoded = (self.fields[p].default for p in positions)
+            else:
+                # TITLE / ICON / RAW_CELL 在拼 dict 时按需读取。
+                continue
+            for position, value in zip(positions, decoded):
+                values[position] = value
+        return values
+
+    def decode(self, matrix: "MatrixDecoder") -> dict[str, Any]:
+        grid = matrix.grid
+        values = self._gather(matrix)
+        result: dict[str, Any] = {}
+        # 需要 title 的图标一次批量读。
+        badge_points = [
+            (spec.x, spec.y) for spec in self._badges
+            if spec.decoder == layout.TITLE or not grid.badge_core_is_black[spec.y, spec.x]
+        ]
+        titles = dict(zip(badge_points, matrix.readBadgeTitles(badge_points))) if badge_points else {}
+        for position, spec in enumerate(self.fields):
+            if spec.requires is not None and result[spec.requires] is None:
+                result[spec.name] = spec.default
+                continue
+            if spec.decoder == layout.ICON:
+                value = titles.get((spec.x, spec.y))
+            elif spec.decoder == layout.TITLE:
+                value = titles[(spec.x, spec.y)]
+            elif spec.decoder == layout.RAW_CELL:
+                value = matrix.getCell(spec.x, spec.y)
+            else:
+                value = values[position]
+            if spec.post is not None:
+                value = spec.post(value)
+            result[spec.name] = value
+        return result
+
+
+class CompiledSequence(object):
+    """横向排列的槽位序列，槽位坐标和各个子 cell 的 fancy-index 预先算好。"""
+
+    def __init__(self, kind: str, x: int, y: int, length: int, name: str = "") -> None:
+        self.kind: str = kind
+        self.x: int = x
+        self.y: int = y
+        self.length: int = length
+        self.name: str = name or f"{kind}@{x},{y}"
+        step = 1 if kind == layout.CELL_LIST else 2
+        self.slot_xs: np.ndarray = x + step * np.arange(length, dtype=np.intp)
+        # 整个序列占用的矩形区域，任何一个 cell 变了就整段重新解码（title 仍按槽位复用）。
+        self._rows: slice = slice(y, y + _SEQUENCE_HEIGHT[kind])
+        self._cols: slice = slice(x, x + step * length)
+
+    def changed_names(self, changed_cells: np.ndarray | None) -> tuple[str, ...]:
+        if changed_cells is None or changed_cells[self._rows, self._cols].any():
+            return (self.name,)
+        return ()
+
+    def reuse(self, matrix: "MatrixDecoder", previous: Any) -> Any:
+        # 槽位里是不可变的快照对象，换个列表外壳就能跨帧共享。
+        return list(previous)
+
+    def decode(self, matrix: "MatrixDecoder") -> Any:
+        if self.kind == layout.CELL_LIST:
+            return self._decode_cell_list(matrix)
+
+        grid = matrix.grid
+        # 角标在 8x8 的右下角，也就是 (x+1, y+1) 这个 cell 的右下 2x2。
+        footnote_x = self.slot_xs + 1
+        present = ~grid.footnote_is_black[self.y + 1, footnote_x]
+        if self.kind == layout.BADGE_LIST:
+            present &= grid.footnote_is_pure[self.y + 1, footnote_x]
+        slot_xs = self.slot_xs[present]
+        if slot_xs.size == 0:
+            return []
+
+        if self.kind == layout.BADGE_LIST:
+            return matrix.readBadgeTitles([(pos_x, self.y) for pos_x in slot_xs.tolist()])
+        if self.kind == layout.AURA:
+            return self._decode_aura(matrix, slot_xs)
+        return self._decode_spell(matrix, slot_xs)
+
+    def _decode_aura(self, matrix: "MatrixDecoder", slot_xs: np.ndarray) -> list[AuraSnapshot]:
+        grid = matrix.grid
+        remain_y = self.y + 2
+        remains = grid.gray[remain_y, slot_xs].tolist()
+        type_colors = grid.color[remain_y, slot_xs + 1].tolist()
+        type_packed = grid.packed_color[remain_y, slot_xs + 1].tolist()
+        counts = grid.char_white_count[self.y + 3, slot_xs].tolist()
+        spell_type = PACKED_COLOR_MAP["SPELL_TYPE"]
+
+        positions = slot_xs.tolist()
+        titles = matrix.readBadgeTitles([(pos_x, self.y) for pos_x in positions])
+
+        return [
+            AuraSnapshot(
+                titles[i],
+                REMAINING_LUT[remains[i]],
+                _color_string(type_colors[i]),
+                spell_type.get(type_packed[i], "UNKNOWN"),
+                CHAR_COUNT_LUT[counts[i]],
+            )
+            for i in range(len(positions))
+        ]
+
+    def _decode_spell(self, matrix: "MatrixDecoder", slot_xs: np.ndarray) -> list[SpellSnapshot]:
+        grid = matrix.grid
+        is_charge = self.kind == layout.CHARGE_SPELL
+        cooldown_y = self.y + 2
+        usable_y = self.y + 3
+        cooldowns = grid.gray[cooldown_y, slot_xs].tolist()
+
+        # highlight / is_usable / is_known 三个 flag 一次 gather。
+        flag_ys = np.repeat(np.array([cooldown_y, usable_y, usable_y], dtype=np.intp), slot_xs.size)
+        flag_xs = np.concatenate((slot_xs + 1, slot_xs, slot_xs + 1))
+        is_black = grid.is_black[flag_ys, flag_xs]
+        is_green = grid.is_green[flag_ys, flag_xs]
+        if not np.all(is_black | is_green):
+            _warn_flags(matrix, zip(flag_xs.tolist(), flag_ys.tolist()), is_black, is_green)
+        flags = (~is_black).reshape(3, slot_xs.size).tolist()
+        charges = grid.char_white_count[self.y + 4, slot_xs].tolist() if is_charge else None
+
+        positions = slot_xs.tolist()
+        titles = matrix.readBadgeTitles([(pos_x, self.y) for pos_x in positions])
+
+        return [
+            SpellSnapshot(
+                is_charge,
+                CHAR_COUNT_LUT[charges[i]] if charges is not None else 0,
+                titles[i],
+                REMAINING_LUT[cooldowns[i]],
+                flags[0][i],
+                flags[1][i],
+                flags[2][i],
+            )
+            for i in range(len(positions))
+        ]
+
+    def _decode_cell_list(self, matrix: "MatrixDecoder") -> list[CellSnapshot | None]:
+        grid = matrix.grid
+        xs = self.slot_xs
+        is_pure = grid.is_pure[self.y, xs].tolist()
+        means = grid.mean[self.y, xs]
+        decimals = means / 255.0
+        percents = decimals * 100
+        is_black = grid.is_black[self.y, xs].tolist()
+        is_white = grid.is_white[self.y, xs].tolist()
+        colors = grid.color[self.y, xs].tolist()
+
+        return [
+            CellSnapshot(True, means[i], percents[i], decimals[i], is_black[i], is_white[i], _color_string(colors[i]))
+            if is_pure[i]
+            else None
+            for i in range(self.length)
+        ]
+
+
+@lru_cache(maxsize=None)
+def compile_fields(fields: tuple[FieldSpec, ...], name: str = "") -> CompiledFields:
+    return CompiledFields(fields, name)
+
+
+@lru_cache(maxsize=None)
+def compile_slots(kind: str, x: int, y: int, length: int, name: str = "") -> CompiledSequence:
+    return CompiledSequence(kind, x, y, length, name)
+
+
+def compile_sequence(spec: SequenceSpec) -> CompiledSequence:
+    return compile_slots(spec.kind, spec.x, spec.y, spec.length, spec.name)
@@ -1,257 +1,320 @@
+import threading
 import traceback
 import numpy as np
 from datetime import datetime
-from typing import Any
+from functools import lru_cache
+from typing import Any, Callable
 
 
+from . import layout
+from .compiled_layout import CompiledFields, compile_fields
+from .layout import SequenceSpec
 from .matrix import MatrixDecoder
-from .color_map import COLOR_MAP
+from .snapshot import PARTY_TOKENS, AuraSnapshot, CellSnapshot, FrameSnapshot, SpellSnapshot, UnitSnapshot
 from .title_manager import get_default_title_manager
 
 
+_PLAYER_STATUS: CompiledFields = compile_fields(layout.PLAYER_STATUS_FIELDS, "player.status")
+_FRAME: CompiledFields = compile_fields(layout.FRAME_FIELDS)
+# 增量解码上报变化字段时用的前缀。
+_ENEMY_UNIT_TOKENS: dict[tuple[int, int], str] = {(55, 10): "target", (70, 10): "focus", (70, 12): "mouseover"}
+
+
+@lru_cache(maxsize=None)
+def _enemy_status_layout(x: int, y: int) -> CompiledFields:
+    unit_token = _ENEMY_UNIT_TOKENS.get((x, y), f"enemy@{x},{y}")
+    return compile_fields(layout.enemy_status_fields(x, y), f"{unit_token}.status")
+
+
+@lru_cache(maxsize=None)
+def _party_layout(y: int) -> tuple[CompiledFields, tuple[CompiledFields, ...]]:
+    exists = compile_fields(tuple(layout.party_exists_field(i, y) for i in range(1, 5)), "party")
+    status = tuple(compile_fields(layout.party_status_fields(i, y), f"party.party{i}.status") for i in range(1, 5))
+    return exists, status
+
+
 def get_player_status(matrix: MatrixDecoder) -> dict[str, Any]:
     """
         DejaVu\\05_slots\\31_player_status.lua
         注意事项，变量名采用驼峰法，是为了和lua同步
+        字段布局见 layout.PLAYER_STATUS_FIELDS。
     """
+    return matrix.readFields(_PLAYER_STATUS)
 
-    status: dict[str, Any] = {}
-    status['unitExists'] = True  # 存在
-    status['unitIsAlive'] = matrix.getCell(49, 15).is_not_black  # 单位存在状态
-
-    status['unitClass'] = COLOR_MAP["CLASS"].get(matrix.getCell(50, 14).color_string, "UNKNOWN")   # 职业
-    status['unitRole'] = COLOR_MAP["ROLE"].get(matrix.getCell(50, 15).color_string, "NONE")   # 职责
-
-    status['unitHealthPercent'] = matrix.getCell(51, 14).percent  # 血量百分比
-    status['unitPowerPercent'] = matrix.getCell(51, 15).percent  # 能量百分比
-
-    status['unitIsEnemy'] = False           # 敌人
-    status['unitCanAttack'] = False         # 可以被攻击
-    status['unitIsInRangedRange'] = True    # 在远程范围
-    status['unitIsInMeleeRange'] = True  # 在近战范围
-
-    status['unitIsInCombat'] = matrix.getCell(52, 14).is_not_black  # 在战斗中
-    status['unitIsTarget'] = matrix.getCell(52, 15).is_not_black  # 是当前目标
 
-    status['unitHasBigDefense'] = matrix.getCell(53, 14).is_not_black  # 有大防御值
-    status['unitHasDispellableDebuff'] = matrix.getCell(53, 15).is_not_black  # 有可驱散的减益效果
+def get_enemy_status(matrix: MatrixDecoder, x: int, y: int) -> dict[str, Any]:
+    """
+        DejaVu\\05_slots\\41_enemy_status.lua
+        注意事项，变量名采用驼峰法，是为了和lua同步
+        字段布局见 layout.enemy_status_fields。
+    """
+    return matrix.readFields(_enemy_status_layout(x, y))
 
-    if matrix.getBadgeCell(45, 14).is_black:
-        status['unitCastIcon'] = None
-        status['unitCastDuration'] = None
-    else:
-        status['unitCastIcon'] = matrix.getBadgeCell(45, 14).title     # 正在释放的技能
-        status['unitCastDuration'] = matrix.getCell(54, 14).percent  # 施法持续时间
 
-    if matrix.getBadgeCell(47, 14).is_black:
-        status['unitChannelIcon'] = None
-        status['unitChannelDuration'] = None
-    else:
-        status['unitChannelIcon'] = matrix.getBadgeCell(47, 14).title     # 正在通道法术的技能
-        status['unitChannelDuration'] = matrix.getCell(54, 15).percent  # 通道持续时间
+def get_party_all(matrix: MatrixDecoder, y: int = 19) -> dict[str, UnitSnapshot]:
+    """
+        DejaVu\\05_slots\\51_party_aura.lua
+        DejaVu\\05_slots\\52_party_bar.lua
+        DejaVu\\05_slots\\53_party_status.lua
+    """
+    return {token: _party_unit(matrix, index, y).materialize() for index, token in enumerate(PARTY_TOKENS, start=1)}
 
-    status['unitIsEmpowering'] = matrix.getCell(55, 14).is_not_black     # isEmpowering
-    status['unitEmpoweringStage'] = matrix.getCell(55, 15).percent   # 蓄力阶段
 
-    status['unitIsMoving'] = matrix.getCell(56, 14).is_not_black     # isEmpowering
-    status['unitIsMounted'] = matrix.getCell(56, 15).is_not_black     # isEmpowering
+# 按需解码可能同时发生在 rotation 线程和界面线程（debug 页要整帧数据），这把锁只管同一个 MatrixDecoder 的缓存；
+# 标题库还会被解码线程和界面线程改，由 TitleManager 自己的锁保护。
+_LAZY_DECODE_LOCK = threading.RLock()
 
-    status['unitEnemyCount'] = round(matrix.getCell(57, 14).decimal * 51)  # 近战敌人数量
-    status['unitIsSpellTargeting'] = matrix.getCell(57, 15).is_not_black     # 正在选择目标
 
-    status['unitIsChatInputActive'] = matrix.getCell(58, 14).is_not_black     # 正在聊天输入
-    status['unitIsInGroupOrRaid'] = matrix.getCell(58, 15).is_not_black     # 在队伍/团队中
+class _LazyField(object):
+    """LazyFrameSnapshot / LazyUnitSnapshot 的字段：第一次读的时候才解码，结果记在实例的 _values 里。"""
 
-    status['unitTrinket1CooldownUsable'] = matrix.getCell(59, 14).is_not_black     # 饰品 1可用
-    status['unitTrinket2CooldownUsable'] = matrix.getCell(59, 15).is_not_black     # 饰品 2可用
+    __slots__ = ("name", "loader")
 
-    status['unitHealthstoneCooldownUsable'] = matrix.getCell(60, 14).is_not_black     # 生命石可用
-    status['unitHealingPotionCooldownUsable'] = matrix.getCell(60, 15).is_not_black     # 治疗药水可用
-    status["isPlayerCastingTarget"] = matrix.getCell(61, 14).is_not_black   # 玩家正在被施法选中
+    def __init__(self, loader: Callable[[Any], Any]) -> None:
+        self.name = loader.__name__
+        self.loader = loader
 
-    status['damage_absorbs'] = matrix.readBarValue(43, 16, 20)  # 伤害吸收
-    status['heal_absorbs'] = matrix.readBarValue(64, 14, 20)  # 治疗吸收
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        if instance is None:
+            return self
+        values = instance._values
+        if self.name in values:
+            return values[self.name]
+        with _LAZY_DECODE_LOCK:
+            if self.name not in values:
+                values[self.name] = self.loader(instance)
+            return values[self.name]
 
-    return status
 
+class LazyUnitSnapshot(object):
+    """UnitSnapshot 的按需版本：exists、buff、debuff、status 各自在第一次被读到时才解码。
 
-def get_enemy_status(matrix: MatrixDecoder, x: int, y: int) -> dict[str, Any]:
-    """
-        DejaVu\\05_slots\\41_enemy_status.lua
-        注意事项，变量名采用驼峰法，是为了和lua同步
-    """
-    status: dict[str, Any] = {}
-
-    status['unitExists'] = matrix.getCell(x+0, y+0).is_not_black   # 单位存在状态
-    status['unitIsAlive'] = matrix.getCell(x+0, y+1).is_not_black  # 单位是否存活
-    status['unitClass'] = COLOR_MAP["CLASS"].get(matrix.getCell(x+1, y+0).color_string, "UNKNOWN")   # 职业
-    status['unitRole'] = COLOR_MAP["ROLE"].get(matrix.getCell(x+1, y+1).color_string, "NONE")   # 职责
-    status['unitHealthPercent'] = matrix.getCell(x+2, y+0).percent  # 血量百分比
-    status['unitPowerPercent'] = matrix.getCell(x+2, y+1).percent  # 能量百分比
-    status['unitIsEnemy'] = matrix.getCell(x+3, y+0).is_not_black  # 敌人
-    status['unitCanAttack'] = matrix.getCell(x+3, y+1).is_not_black  # 可以被攻击
-    status['unitIsInRangedRange'] = matrix.getCell(x+4, y+0).is_not_black  # 在远程范围
-    status['unitIsInMeleeRange'] = matrix.getCell(x+4, y+1).is_not_black  # 在近战范围
-    status['unitIsInCombat'] = matrix.getCell(x+5, y+0).is_not_black  # 在战斗中
-    status['unitIsTarget'] = matrix.getCell(x+5, y+1).is_not_black  # 是当前目标
-    if matrix.getBadgeCell(x+6, y+0).is_black:
-        status['unitCastIcon'] = None
-        status['unitCastDuration'] = None
-        status['unitCastIsInterruptible'] = False
-    else:
-        status['unitCastIcon'] = matrix.getBadgeCell(x+6, y+0).title     # 正在释放的技能
-        status['unitCastDuration'] = matrix.getCell(x+10, y+0).percent  # 施法持续时间
-        # status['unitCastIsInterruptible'] = matrix.getCell(x+11, y+0).is_not_black  # 施法是否可中断
-        status['unitCastIsInterruptible'] = bool(matrix.getCell(x+11, y+0).color_string == '255,255,60')  # 施法是否可中断
-
-    if matrix.getBadgeCell(x+8, y+0).is_black:
-        status['unitChannelIcon'] = None
-        status['unitChannelDuration'] = None
-        status['unitChannelIsInterruptible'] = False
-    else:
-        status['unitChannelIcon'] = matrix.getBadgeCell(x+8, y+0).title     # 正在通道法术的技能
-        status['unitChannelDuration'] = matrix.getCell(x+10, y+1).percent  # 通道持续时间
-        # status['unitChannelIsInterruptible'] = matrix.getCell(x+11, y+1).is_not_black  # 通道是否可中断
-        status['unitChannelIsInterruptible'] = bool(matrix.getCell(x+11, y+1).color_string == '255,255,60')  # 通道是否可中断
-
-    return status
-
-
-def get_party_all(matrix: MatrixDecoder, y: int = 19) -> dict[str, Any]:
-    """
-        DejaVu\\05_slots\\51_party_aura.lua
-        DejaVu\\05_slots\\52_party_bar.lua
-        DejaVu\\05_slots\\53_party_status.lua
+    不存在的单位和 UnitSnapshot.missing 一样：buff 为 []（敌方为 None），debuff 为 []，status 为 {}。
     """
-    result = {
-        'party1': {'exists': False, 'unitToken': 'party1', 'buff': [], 'debuff': [],  'status': {}, },
-        'party2': {'exists': False, 'unitToken': 'party2', 'buff': [], 'debuff': [],  'status': {}, },
-        'party3': {'exists': False, 'unitToken': 'party3', 'buff': [], 'debuff': [],  'status': {}, },
-        'party4': {'exists': False, 'unitToken': 'party4', 'buff': [], 'debuff': [],  'status': {}, },
-    }
-    for i in range(1, 5):
-        baseX = 21*i
-        statusY = y + 5
-        party_key: str = f'party{i}'
-        party_exist: bool = matrix.getCell(baseX - 9, statusY).is_not_black
-        # print(f"{party_key}/{party_exist}/{matrix.getCell(baseX - 9, statusY).color_string}")
-        # print(f"{party_key}/{party_exist}/{matrix.getCell(baseX - 8, statusY).color_string}")
-        if party_exist:
-            result[party_key]['exists'] = True
-            # DejaVu\\05_slots\\53_party_status.lua
-            result[party_key]['status']['unitExists'] = True
-            result[party_key]['status']['unitIsAlive'] = matrix.getCell(baseX - 9, statusY+1).is_not_black
-            # unitClass\unitRole
-            result[party_key]['status']['unitClass'] = COLOR_MAP["CLASS"].get(matrix.getCell(baseX - 8, statusY).color_string, "UNKNOWN")  # 职业
-            result[party_key]['status']['unitRole'] = COLOR_MAP["ROLE"].get(matrix.getCell(baseX - 8, statusY+1).color_string, "NONE")   # 职责
-            # unitHealthPercent\unitPowerPercent
-            result[party_key]['status']['unitHealthPercent'] = matrix.getCell(baseX - 7, statusY).percent  # 血量百分比
-            result[party_key]['status']['unitPowerPercent'] = matrix.getCell(baseX - 7, statusY+1).percent  # 能量百分比
-            # unitIsEnemy /unitCanAttack
-            result[party_key]['status']['unitIsEnemy'] = matrix.getCell(baseX - 6, statusY).is_not_black  # 敌人
-            result[party_key]['status']['unitCanAttack'] = matrix.getCell(baseX - 6, statusY+1).is_not_black  # 可以被攻击
-            # unitIsInRangedRange/unitIsInMeleeRange
-            result[party_key]['status']['unitIsInRangedRange'] = matrix.getCell(baseX - 5, statusY).is_not_black  # 在远程范围
-            result[party_key]['status']['unitIsInMeleeRange'] = matrix.getCell(baseX - 5, statusY+1).is_not_black  # 在近战范围
-            # unitIsInCombat/unitIsTarget
-            result[party_key]['status']['unitIsInCombat'] = matrix.getCell(baseX - 4, statusY).is_not_black  # 在战斗中
-            result[party_key]['status']['unitIsTarget'] = matrix.getCell(baseX - 4, statusY+1).is_not_black  # 是当前目标
-            # unitHasBigDefense/unitHasDispellableDebuff
-            result[party_key]['status']['unitHasBigDefense'] = matrix.getCell(baseX - 3, statusY).is_not_black  # 有大防御
-            result[party_key]['status']['unitHasDispellableDebuff'] = matrix.getCell(baseX - 3, statusY+1).is_not_black  # 有可移除的法术
-            result[party_key]['status']['isPlayerCastingTarget'] = matrix.getCell(baseX - 2, statusY).is_not_black   # 玩家正在被施法选中
-            # DejaVu\\05_slots\\52_party_bar.lua
-            result[party_key]['status']['damage_absorbs'] = matrix.readBarValue(baseX - 20, statusY, 10) / 2  # 伤害吸收 # 注意，吸收盾的条最大现在是血量的一半，所以这里除以2映射到百分比。
-            result[party_key]['status']['heal_absorbs'] = matrix.readBarValue(baseX - 20, statusY + 1, 10) / 2  # 治疗吸收# 注意，吸收盾的条最大现在是血量的一半，所以这里除以2映射到百分比。
-            # DejaVu\\05_slots\\51_party_aura.lua
-            result[party_key]['buff'] = matrix.readAura(x=baseX - 20, y=y, length=7)  # buff
-            result[party_key]['debuff'] = matrix.readAura(x=baseX - 6, y=y, length=3)  # debuff
-    return result
 
+    __slots__ = ("unitToken", "_matrix", "_exists_field", "_buff", "_debuff", "_status", "_values")
+
+    def __init__(
+        self,
+        matrix: MatrixDecoder,
+        unit_token: str,
+        exists_field: tuple[CompiledFields, str] | None,
+        buff: SequenceSpec | None,
+        debuff: SequenceSpec,
+        status: Callable[[MatrixDecoder], dict[str, Any]],
+    ) -> None:
+        self.unitToken = unit_token
+        self._matrix = matrix
+        # None 表示单位总是存在（player）。
+        self._exists_field = exists_field
+        self._buff = buff
+        self._debuff = debuff
+        self._status = status
+        self._values: dict[str, Any] = {}
+
+    @_LazyField
+    def exists(self) -> bool:
+        if self._exists_field is None:
+            return True
+        fields, name = self._exists_field
+        return bool(self._matrix.readFields(fields)[name])
+
+    @_LazyField
+    def buff(self) -> list[AuraSnapshot] | None:
+        if self._buff is None:
+            return None
+        return self._matrix.readSequence(self._buff) if self.exists else []
+
+    @_LazyField
+    def debuff(self) -> list[AuraSnapshot]:
+        return self._matrix.readSequence(self._debuff) if self.exists else []
+
+    @_LazyField
+    def status(self) -> dict[str, Any]:
+        return self._status(self._matrix) if self.exists else {}
+
+    def materialize(self) -> UnitSnapshot:
+        return UnitSnapshot(self.unitToken, self.exists, self.buff, self.debuff, self.status)
+
+
+def _frame_field(name: str) -> property:
+    return property(lambda self: self._frame[name])
+
+
+class LazyFrameSnapshot(object):
+    """FrameSnapshot 的按需版本，属性名和 FrameSnapshot 一样，Context 不用区分。
+
+    构造时只读时间戳和 UTF 测试徽章（解码线程马上要取 pending_utf_title_record 入库），其余字段
+    在第一次被读到时才从 Matrix 解码，同一帧里只解一次。rotation 用不到的队友光环、黑名单之类就不解。
+    materialize() / to_dict() 把剩下的字段全部解出来，给 debug 页这类要看整帧的地方用。
+    """
 
-def extract_all_data(matrix: MatrixDecoder) -> dict[str, Any]:
-    data: dict[str, Any] = {
-        'timestamp': datetime.now(),
-        'spell': matrix.readSpell(),
+    __slots__ = (
+        "_matrix",
+        "_values",
+        "timestamp",
+        "player",
+        "target",
+        "focus",
+        "mouseover",
+        "party",
+        "UTF_hash",
+        "UTF_string",
+        "pending_utf_title_record",
+    )
+
+    def __init__(self, matrix: MatrixDecoder) -> None:
+        self._matrix = matrix
+        self._values: dict[str, Any] = {}
+        self.timestamp: datetime | None = datetime.now()
         # Keep unitToken camelCase for game protocol compatibility.
-        'player': {'unitToken': 'player',
-                   'exists': True,
-                   'buff': matrix.readAura(x=1, y=4, length=30),
-                   'debuff': matrix.readAura(x=1, y=9, length=10),
-                   'status': get_player_status(matrix),
-                   },
-        'target': {'unitToken': 'target',
-                   'exists': False,
-                   'debuff': [],
-                   'status': {}
-                   },
-        'focus': {'unitToken': 'focus',
-                  'exists': False,
-                  'debuff': [],
-                  'status': {}
-                  },
-        'mouseover': {'unitToken': 'mouseover',
-                      'exists': False,
-                      'debuff': [],
-                      'status': {}
-                      },
-        'misc': {
-            'combat_time': matrix.getCell(56, 9).mean,
-            'use_mouse': matrix.getCell(58, 9).is_not_black,
-        },
-        'spec': matrix.readCellList(55, 13, 14),
-        'setting': matrix.readCellList(55, 12, 14),
-        'party': get_party_all(matrix),
-        # DejaVu\05_slots\92_assisted_combat.lua
-        'assisted_combat': matrix.getBadgeCell(43, 14).title,   # 一键辅助技能
-        # DejaVu\05_slots\91_global.lua
-        'flash': matrix.getCell(54, 9),             # 一个闪烁的cell
-        'delay': matrix.getCell(55, 9).is_not_black,    # 延迟
-        'testCell': matrix.readCharCell(0, 2),
-        'enable': matrix.getCell(83, 0).is_not_black,
-        'dispel_blacklist': matrix.readBadgeCellList(64, 15, 10),  # 可移除的法术
-        'interrupt_blacklist': matrix.readBadgeCellList(43, 17, 19),  # 可中断的法术
-        'spell_stop_list': matrix.readBadgeCellList(43, 26, 10),  # 可中断的法术
-        'spell_queue_window': matrix.getCell(57, 9).mean / 100,  # 映射到秒，游戏内的毫秒/10。
-        'burst_time': matrix.getCell(82, 0).decimal * 60,
-        'latest_succeeded_cast': matrix.getBadgeCell(82, 17).title     # 最后的施法技能
-    }
-
-    target_exists = matrix.getCell(55, 10).is_not_black
-    focus_exists = matrix.getCell(70, 10).is_not_black
-    mouseover_exists = matrix.getCell(70, 12).is_not_black
-    if target_exists:
-        data["target"]["exists"] = True
-        data["target"]["debuff"] = matrix.readAura(x=22, y=9, length=16)
-        data["target"]["status"] = get_enemy_status(matrix, 55, 10)
-
-    if focus_exists:
-        data["focus"]["exists"] = True
-        data["focus"]["debuff"] = matrix.readAura(x=1, y=14, length=10)
-        data["focus"]["status"] = get_enemy_status(matrix, 70, 10)
-
-    if mouseover_exists:
-        data["mouseover"]["exists"] = True
-        data["mouseover"]["debuff"] = matrix.readAura(x=22, y=14, length=10)
-        data["mouseover"]["status"] = get_enemy_status(matrix, 70, 12)
-
+        self.player = LazyUnitSnapshot(matrix, 'player', None, layout.PLAYER_BUFF, layout.PLAYER_DEBUFF, get_player_status)
+        self.target = _enemy_unit(matrix, 'target', layout.TARGET_DEBUFF, 55, 10)
+        self.focus = _enemy_unit(matrix, 'focus', layout.FOCUS_DEBUFF, 70, 10)
+        self.mouseover = _enemy_unit(matrix, 'mouseover', layout.MOUSEOVER_DEBUFF, 70, 12)
+        self.party: tuple[LazyUnitSnapshot, ...] = tuple(_party_unit(matrix, index) for index in range(1, 5))
+        self.UTF_hash, self.UTF_string, self.pending_utf_title_record = _read_utf_test(matrix)
+
+    def unit(self, unit_token: str) -> LazyUnitSnapshot:
+        """'player' / 'target' / 'focus' / 'mouseover' / 'party1'..'party4'。"""
+        if unit_token in PARTY_TOKENS:
+            return self.party[PARTY_TOKENS.index(unit_token)]
+        return getattr(self, unit_token)
+
+    @_LazyField
+    def _frame(self) -> dict[str, Any]:
+        return self._matrix.readFields(_FRAME)
+
+    @_LazyField
+    def spell(self) -> list[SpellSnapshot]:
+        return self._matrix.readSpell()
+
+    @_LazyField
+    def spec(self) -> list[CellSnapshot | None]:
+        return self._matrix.readSequence(layout.SPEC_CELLS)
+
+    @_LazyField
+    def setting(self) -> list[CellSnapshot | None]:
+        return self._matrix.readSequence(layout.SETTING_CELLS)
+
+    @_LazyField
+    def flash(self) -> CellSnapshot | None:
+        return CellSnapshot.from_cell(self._frame['flash'])  # 一个闪烁的cell
+
+    @_LazyField
+    def dispel_blacklist(self) -> list[str]:
+        return self._matrix.readSequence(layout.DISPEL_BLACKLIST)  # 可移除的法术
+
+    @_LazyField
+    def interrupt_blacklist(self) -> list[str]:
+        return self._matrix.readSequence(layout.INTERRUPT_BLACKLIST)  # 可中断的法术
+
+    @_LazyField
+    def spell_stop_list(self) -> list[str]:
+        return self._matrix.readSequence(layout.SPELL_STOP_LIST)  # 可中断的法术
+
+    combat_time = _frame_field('combat_time')
+    use_mouse = _frame_field('use_mouse')
+    assisted_combat = _frame_field('assisted_combat')  # 一键辅助技能
+    delay = _frame_field('delay')  # 延迟
+    testCell = _frame_field('testCell')
+    enable = _frame_field('enable')
+    spell_queue_window = _frame_field('spell_queue_window')  # 映射到秒，游戏内的毫秒/10。
+    burst_time = _frame_field('burst_time')
+    latest_succeeded_cast = _frame_field('latest_succeeded_cast')  # 最后的施法技能
+
+    def materialize(self) -> FrameSnapshot:
+        """把所有字段解出来，得到普通的 FrameSnapshot。"""
+        return FrameSnapshot(
+            timestamp=self.timestamp,
+            spell=self.spell,
+            player=self.player.materialize(),
+            target=self.target.materialize(),
+            focus=self.focus.materialize(),
+            mouseover=self.mouseover.materialize(),
+            party=tuple(unit.materialize() for unit in self.party),
+            combat_time=self.combat_time,
+            use_mouse=self.use_mouse,
+            spec=self.spec,
+            setting=self.setting,
+            assisted_combat=self.assisted_combat,
+            flash=self.flash,
+            delay=self.delay,
+            testCell=self.testCell,
+            enable=self.enable,
+            dispel_blacklist=self.dispel_blacklist,
+            interrupt_blacklist=self.interrupt_blacklist,
+            spell_stop_list=self.spell_stop_list,
+            spell_queue_window=self.spell_queue_window,
+            burst_time=self.burst_time,
+            latest_succeeded_cast=self.latest_succeeded_cast,
+            UTF_hash=self.UTF_hash,
+            UTF_string=self.UTF_string,
+            pending_utf_title_record=self.pending_utf_title_record,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return self.materialize().to_dict()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # 跨进程传的时候不带 Matrix，先整帧解完。
+        return _identity, (self.materialize(),)
+
+
+def _identity(snapshot: FrameSnapshot) -> FrameSnapshot:
+    return snapshot
+
+
+def _enemy_unit(matrix: MatrixDecoder, unit_token: str, debuff: SequenceSpec, x: int, y: int) -> LazyUnitSnapshot:
+    return LazyUnitSnapshot(
+        matrix, unit_token, (_FRAME, f'{unit_token}_exists'), None, debuff, lambda matrix: get_enemy_status(matrix, x, y)
+    )
+
+
+def _party_unit(matrix: MatrixDecoder, index: int, y: int = 19) -> LazyUnitSnapshot:
+    exists_layout, status_layouts = _party_layout(y)
+    status_layout = status_layouts[index - 1]
+    return LazyUnitSnapshot(
+        matrix,
+        f'party{index}',
+        (exists_layout, f'party{index}'),
+        layout.party_buff_sequence(index, y),
+        layout.party_debuff_sequence(index, y),
+        lambda matrix: matrix.readFields(status_layout),
+    )
+
+
+def _read_utf_test(matrix: MatrixDecoder) -> tuple[str | None, str | None, dict[str, Any] | None]:
     UTF_hash = matrix.readUTFhash(64, 26)  # 用于测试的UTF8编码的hash值
     UTF_string = matrix.readUTFString(66, 26, 16)  # 用于测试的UTF8编码的字符串
 
+    pending_utf_title_record: dict[str, Any] | None = None
     if (UTF_hash is not None) and (UTF_string is not None):
         title_manager = get_default_title_manager()
         if not title_manager.has_persistent_record(UTF_hash):
             utf_badge_cell = matrix.getBadgeCell(64, 26)
-            data["_pending_utf_title_record"] = {
+            pending_utf_title_record = {
                 "hash": UTF_hash,
                 "title": UTF_string,
                 "title_type": utf_badge_cell.cell_type,
                 "valid_array": utf_badge_cell.valid_array.tolist(),
             }
-    data["UTF_hash"] = UTF_hash
-    data["UTF_string"] = UTF_string
+    return UTF_hash, UTF_string, pending_utf_title_record
+
+
+def extract_lazy_snapshot(matrix: MatrixDecoder) -> LazyFrameSnapshot:
+    """按需解码：字段在第一次被读到时才解码，见 LazyFrameSnapshot。"""
+    return LazyFrameSnapshot(matrix)
 
-    return data
+
+def extract_snapshot(matrix: MatrixDecoder) -> FrameSnapshot:
+    """解码一帧，直接装进 FrameSnapshot。"""
+    return LazyFrameSnapshot(matrix).materialize()
+
+
+def extract_all_data(matrix: MatrixDecoder) -> dict[str, Any]:
+    """extract_snapshot 的 dict 版本，结构和以前一样。"""
+    return extract_snapshot(matrix).to_dict()
 
 
 if __name__ == "__main__":
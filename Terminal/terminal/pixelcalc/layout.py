@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+from typing import Any, Callable
+
+__all__ = [
+    "FieldSpec",
+    "SequenceSpec",
+    "PLAYER_STATUS_FIELDS",
+    "FRAME_FIELDS",
+    "enemy_status_fields",
+    "party_status_fields",
+]
+
+# cell 种类
+CELL = "cell"      # 4x4 Cell
+BADGE = "badge"    # 8x8 BadgeCell
+CHAR = "char"      # 8x8 CharCell
+BAR = "bar"        # 一行 length 个 Cell 组成的 bar
+CONST = "const"    # 不读像素，固定值
+
+# 解码方式
+FLAG = "flag"                # Cell.is_not_black
+PERCENT = "percent"          # Cell.percent
+DECIMAL = "decimal"          # Cell.decimal
+MEAN = "mean"                # Cell.mean
+REMAINING = "remaining"      # Cell.remaining
+COLOR_MAP = "color_map"      # COLOR_MAP[color_map].get(color_string, default)
+COLOR_IS = "color_is"        # Cell 颜色是否等于 color
+BAR_VALUE = "bar_value"      # MatrixDecoder.readBarValue
+CHAR_COUNT = "char_count"    # MatrixDecoder.readCharCell
+TITLE = "title"              # BadgeCell.title
+ICON = "icon"                # BadgeCell 中心是黑色时为 None，否则为 title
+RAW_CELL = "raw_cell"        # 直接返回 Cell 对象
+VALUE = "value"              # 返回 default
+
+
+@dataclass(frozen=True, slots=True)
+class FieldSpec:
+    """单个字段的声明：读哪个 cell、怎么解码、对应插件端哪个文件。
+
+    requires: 依赖的字段为 None 时，本字段不读像素，直接取 default。
+    post: 解码后的换算，例如吸收盾 bar 的 /2。
+    """
+
+    name: str
+    cell: str
+    decoder: str
+    x: int = 0
+    y: int = 0
+    lua: str = ""
+    length: int = 1
+    color_map: str | None = None
+    color: tuple[int, int, int] | None = None
+    default: Any = None
+    requires: str | None = None
+    post: Callable[[Any], Any] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class SequenceSpec:
+    """一组横向排列、步长为 2 的 BadgeCell 槽位（aura / 技能 / 黑名单），或连续的 Cell 列表。"""
+
+    name: str
+    kind: str
+    x: int
+    y: int
+    length: int
+    lua: str = ""
+
+
+# 序列种类
+AURA = "aura"
+COOLDOWN_SPELL = "cooldown_spell"
+CHARGE_SPELL = "charge_spell"
+BADGE_LIST = "badge_list"
+CELL_LIST = "cell_list"
+
+
+_PLAYER_STATUS_LUA = "DejaVu_Player\\Status.lua"
+_PLAYER_ABSORBS_LUA = "DejaVu_Player\\Absorbs.lua"
+_ENEMY_STATUS_LUA = "DejaVu_Enemy\\Target.lua"
+_PARTY_STATUS_LUA = "DejaVu_Party\\Status.lua"
+_PARTY_BAR_LUA = "DejaVu_Party\\Absorbs.lua"
+
+
+# 字段顺序就是输出 dict 的 key 顺序，改动时注意和旧数据保持一致。
+PLAYER_STATUS_FIELDS: tuple[FieldSpec, ...] = (
+    FieldSpec("unitExists", CONST, VALUE, default=True),
+    FieldSpec("unitIsAlive", CELL, FLAG, 49, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitClass", CELL, COLOR_MAP, 50, 14, _PLAYER_STATUS_LUA, color_map="CLASS", default="UNKNOWN"),
+    FieldSpec("unitRole", CELL, COLOR_MAP, 50, 15, _PLAYER_STATUS_LUA, color_map="ROLE", default="NONE"),
+    FieldSpec("unitHealthPercent", CELL, PERCENT, 51, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitPowerPercent", CELL, PERCENT, 51, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitIsEnemy", CONST, VALUE, default=False),
+    FieldSpec("unitCanAttack", CONST, VALUE, default=False),
+    FieldSpec("unitIsInRangedRange", CONST, VALUE, default=True),
+    FieldSpec("unitIsInMeleeRange", CONST, VALUE, default=True),
+    FieldSpec("unitIsInCombat", CELL, FLAG, 52, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitIsTarget", CELL, FLAG, 52, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitHasBigDefense", CELL, FLAG, 53, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitHasDispellableDebuff", CELL, FLAG, 53, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitCastIcon", BADGE, ICON, 45, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitCastDuration", CELL, PERCENT, 54, 14, _PLAYER_STATUS_LUA, requires="unitCastIcon"),
+    FieldSpec("unitChannelIcon", BADGE, ICON, 47, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitChannelDuration", CELL, PERCENT, 54, 15, _PLAYER_STATUS_LUA, requires="unitChannelIcon"),
+    FieldSpec("unitIsEmpowering", CELL, FLAG, 55, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitEmpoweringStage", CELL, PERCENT, 55, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitIsMoving", CELL, FLAG, 56, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitIsMounted", CELL, FLAG, 56, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitEnemyCount", CELL, DECIMAL, 57, 14, _PLAYER_STATUS_LUA, post=lambda value: round(value * 51)),
+    FieldSpec("unitIsSpellTargeting", CELL, FLAG, 57, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitIsChatInputActive", CELL, FLAG, 58, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitIsInGroupOrRaid", CELL, FLAG, 58, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitTrinket1CooldownUsable", CELL, FLAG, 59, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitTrinket2CooldownUsable", CELL, FLAG, 59, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("unitHealthstoneCooldownUsable", CELL, FLAG, 60, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("unitHealingPotionCooldownUsable", CELL, FLAG, 60, 15, _PLAYER_STATUS_LUA),
+    FieldSpec("isPlayerCastingTarget", CELL, FLAG, 61, 14, _PLAYER_STATUS_LUA),
+    FieldSpec("damage_absorbs", BAR, BAR_VALUE, 43, 16, _PLAYER_ABSORBS_LUA, length=20),
+    FieldSpec("heal_absorbs", BAR, BAR_VALUE, 64, 14, _PLAYER_ABSORBS_LUA, length=20),
+)
+
+
+def enemy_status_fields(x: int, y: int, lua: str = _ENEMY_STATUS_LUA) -> tuple[FieldSpec, ...]:
+    """target/focus/mouseover 共用的状态布局，(x, y) 是左上角。"""
+    return (
+        FieldSpec("unitExists", CELL, FLAG, x + 0, y + 0, lua),
+        FieldSpec("unitIsAlive", CELL, FLAG, x + 0, y + 1, lua),
+        FieldSpec("unitClass", CELL, COLOR_MAP, x + 1, y + 0, lua, color_map="CLASS", default="UNKNOWN"),
+        FieldSpec("unitRole", CELL, COLOR_MAP, x + 1, y + 1, lua, color_map="ROLE", default="NONE"),
+        FieldSpec("unitHealthPercent", CELL, PERCENT, x + 2, y + 0, lua),
+        FieldSpec("unitPowerPercent", CELL, PERCENT, x + 2, y + 1, lua),
+        FieldSpec("unitIsEnemy", CELL, FLAG, x + 3, y + 0, lua),
+        FieldSpec("unitCanAttack", CELL, FLAG, x + 3, y + 1, lua),
+        FieldSpec("unitIsInRangedRange", CELL, FLAG, x + 4, y + 0, lua),
+        FieldSpec("unitIsInMeleeRange", CELL, FLAG, x + 4, y + 1, lua),
+        FieldSpec("unitIsInCombat", CELL, FLAG, x + 5, y + 0, lua),
+        FieldSpec("unitIsTarget", CELL, FLAG, x + 5, y + 1, lua),
+        FieldSpec("unitCastIcon", BADGE, ICON, x + 6, y + 0, lua),
+        FieldSpec("unitCastDuration", CELL, PERCENT, x + 10, y + 0, lua, requires="unitCastIcon"),
+        FieldSpec("unitCastIsInterruptible", CELL, COLOR_IS, x + 11, y + 0, lua,
+                  color=(255, 255, 60), default=False, requires="unitCastIcon"),
+        FieldSpec("unitChannelIcon", BADGE, ICON, x + 8, y + 0, lua),
+        FieldSpec("unitChannelDuration", CELL, PERCENT, x + 10, y + 1, lua, requires="unitChannelIcon"),
+        FieldSpec("unitChannelIsInterruptible", CELL, COLOR_IS, x + 11, y + 1, lua,
+                  color=(255, 255, 60), default=False, requires="unitChannelIcon"),
+    )
+
+
+def party_exists_field(index: int, y: int = 19) -> FieldSpec:
+    return FieldSpec(f"party{index}", CELL, FLAG, 21 * index - 9, y + 5, _PARTY_STATUS_LUA)
+
+
+def party_status_fields(index: int, y: int = 19) -> tuple[FieldSpec, ...]:
+    """party1~party4 的状态布局，每个队友横向占 21 个 cell。"""
+    base_x = 21 * index
+    status_y = y + 5
+    return (
+        FieldSpec("unitExists", CONST, VALUE, default=True),
+        FieldSpec("unitIsAlive", CELL, FLAG, base_x - 9, status_y + 1, _PARTY_STATUS_LUA),
+        FieldSpec("unitClass", CELL, COLOR_MAP, base_x - 8, status_y, _PARTY_STATUS_LUA, color_map="CLASS", default="UNKNOWN"),
+        FieldSpec("unitRole", CELL, COLOR_MAP, base_x - 8, status_y + 1, _PARTY_STATUS_LUA, color_map="ROLE", default="NONE"),
+        FieldSpec("unitHealthPercent", CELL, PERCENT, base_x - 7, status_y, _PARTY_STATUS_LUA),
+        FieldSpec("unitPowerPercent", CELL, PERCENT, base_x - 7, status_y + 1, _PARTY_STATUS_LUA),
+        FieldSpec("unitIsEnemy", CELL, FLAG, base_x - 6, status_y, _PARTY_STATUS_LUA),
+        FieldSpec("unitCanAttack", CELL, FLAG, base_x - 6, status_y + 1, _PARTY_STATUS_LUA),
+        FieldSpec("unitIsInRangedRange", CELL, FLAG, base_x - 5, status_y, _PARTY_STATUS_LUA),
+        FieldSpec("unitIsInMeleeRange", CELL, FLAG, base_x - 5, status_y + 1, _PARTY_STATUS_LUA),
+        FieldSpec("unitIsInCombat", CELL, FLAG, base_x - 4, status_y, _PARTY_STATUS_LUA),
+        FieldSpec("unitIsTarget", CELL, FLAG, base_x - 4, status_y + 1, _PARTY_STATUS_LUA),
+        FieldSpec("unitHasBigDefense", CELL, FLAG, base_x - 3, status_y, _PARTY_STATUS_LUA),
+        FieldSpec("unitHasDispellableDebuff", CELL, FLAG, base_x - 3, status_y + 1, _PARTY_STATUS_LUA),
+        FieldSpec("isPlayerCastingTarget", CELL, FLAG, base_x - 2, status_y, "DejaVu_Party\\CastingTarget.lua"),
+        # 吸收盾的条最大现在是血量的一半，所以这里除以2映射到百分比。
+        FieldSpec("damage_absorbs", BAR, BAR_VALUE, base_x - 20, status_y, _PARTY_BAR_LUA, length=10, post=lambda value: value / 2),
+        FieldSpec("heal_absorbs", BAR, BAR_VALUE, base_x - 20, status_y + 1, _PARTY_BAR_LUA, length=10, post=lambda value: value / 2),
+    )
+
+
+def party_buff_sequence(index: int, y: int = 19) -> SequenceSpec:
+    return SequenceSpec(f"party.party{index}.buff", AURA, 21 * index - 20, y, 7, "DejaVu_Party\\AuraHelpful.lua")
+
+
+def party_debuff_sequence(index: int, y: int = 19) -> SequenceSpec:
+    return SequenceSpec(f"party.party{index}.debuff", AURA, 21 * index - 6, y, 3, "DejaVu_Party\\AuraHarmful.lua")
+
+
+# extract_all_data 顶层的零散字段。
+FRAME_FIELDS: tuple[FieldSpec, ...] = (
+    FieldSpec("combat_time", CELL, MEAN, 56, 9, "DejaVu_Common\\CombatTime.lua"),
+    FieldSpec("use_mouse", CELL, FLAG, 58, 9, "DejaVu_Common\\UseMouse.lua"),
+    FieldSpec("assisted_combat", BADGE, TITLE, 43, 14, "DejaVu_Common\\AssistedCombat.lua"),
+    FieldSpec("flash", CELL, RAW_CELL, 54, 9, "DejaVu_Common\\Flash.lua"),
+    FieldSpec("delay", CELL, FLAG, 55, 9, "DejaVu_Common\\DelayedUpdate.lua"),
+    FieldSpec("testCell", CHAR, CHAR_COUNT, 0, 2, "DejaVu_Matrix\\Mark.lua"),
+    FieldSpec("enable", CELL, FLAG, 83, 0, "DejaVu_Common\\Enable.lua"),
+    # 映射到秒，游戏内的毫秒/10。
+    FieldSpec("spell_queue_window", CELL, MEAN, 57, 9, "DejaVu_Common\\SpellQueueWindow.lua", post=lambda value: value / 100),
+    FieldSpec("burst_time", CELL, DECIMAL, 82, 0, "DejaVu_Common\\Burst.lua", post=lambda value: value * 60),
+    FieldSpec("latest_succeeded_cast", BADGE, TITLE, 82, 17, "DejaVu_Player\\LatestSucceededCast.lua"),
+    FieldSpec("target_exists", CELL, FLAG, 55, 10, "DejaVu_Enemy\\Target.lua"),
+    FieldSpec("focus_exists", CELL, FLAG, 70, 10, "DejaVu_Enemy\\Focus.lua"),
+    FieldSpec("mouseover_exists", CELL, FLAG, 70, 12, "DejaVu_Enemy\\MouseOver.lua"),
+)
+
+COOLDOWN_SPELLS = SequenceSpec("spell.cooldown", COOLDOWN_SPELL, 2, 0, 40, "DejaVu_Spell\\Cooldown.lua")
+CHARGE_SPELLS = SequenceSpec("spell.charge", CHARGE_SPELL, 62, 4, 11, "DejaVu_Spell\\Charge.lua")
+PLAYER_BUFF = SequenceSpec("player.buff", AURA, 1, 4, 30, "DejaVu_Aura\\PlayerHelpful.lua")
+PLAYER_DEBUFF = SequenceSpec("player.debuff", AURA, 1, 9, 10, "DejaVu_Aura\\PlayerHarmful.lua")
+TARGET_DEBUFF = SequenceSpec("target.debuff", AURA, 22, 9, 16, "DejaVu_Aura\\TargetHarmful.lua")
+FOCUS_DEBUFF = SequenceSpec("focus.debuff", AURA, 1, 14, 10, "DejaVu_Aura\\FocusHarmful.lua")
+MOUSEOVER_DEBUFF = SequenceSpec("mouseover.debuff", AURA, 22, 14, 10, "DejaVu_Aura\\MouseoverHarmful.lua")
+# SPEC/SETTING 每个专精含义不同，见各职业插件的 Spec.lua / Config.lua。
+SPEC_CELLS = SequenceSpec("spec", CELL_LIST, 55, 13, 14, "DejaVu_<Class>\\<Spec>\\Spec.lua")
+SETTING_CELLS = SequenceSpec("setting", CELL_LIST, 55, 12, 14, "DejaVu_<Class>\\<Spec>\\Config.lua")
+DISPEL_BLACKLIST = SequenceSpec("dispel_blacklist", BADGE_LIST, 64, 15, 10, "DejaVu_Common\\DispelBlacklist.lua")
+INTERRUPT_BLACKLIST = SequenceSpec("interrupt_blacklist", BADGE_LIST, 43, 17, 19, "DejaVu_Common\\InterruptBlacklist.lua")
+SPELL_STOP_LIST = SequenceSpec("spell_stop_list", BADGE_LIST, 43, 26, 10, "DejaVu_Common\\SpellStopList.lua")
@@ -1,28 +1,53 @@
-from typing import Any
+from functools import cached_property
+from typing import Any, Sequence
 
 import numpy as np
+import xxhash
 
 from .cell import Cell, MegaCell, BadgeCell, CharCell
-from .color_map import COLOR_MAP
+from .cell_grid import CellGrid
+from .compiled_layout import CompiledFields, CompiledSequence, compile_slots, compile_sequence
+from .layout import AURA, BADGE_LIST, CELL_LIST, CHARGE_SPELL, CHARGE_SPELLS, COOLDOWN_SPELL, COOLDOWN_SPELLS, SequenceSpec
+from .snapshot import AuraSnapshot, CellSnapshot, SpellSnapshot
+from .title_manager import TitleManager, digest_to_hash, get_default_title_manager
 
 __all__ = ['MatrixDecoder']
 
 
+def _current_title_state() -> tuple[TitleManager, int]:
+    manager = get_default_title_manager()
+    return manager, manager.revision
+
+
 class MatrixDecoder(object):
     """矩阵解码器，用于将像素矩阵解码为字符矩阵。
     对应插件端 DejaVu\\03_matrix\\01_matrix_frame.lua"""
 
-    def __init__(self, martix_pix_array: np.ndarray) -> None:
+    def __init__(self, martix_pix_array: np.ndarray, previous: "MatrixDecoder | None" = None) -> None:
         self.martix_pix_array: np.ndarray = martix_pix_array
+        self.grid: CellGrid = CellGrid(martix_pix_array, previous.grid if previous is not None else None)
+
+        # 增量解码：传入上一帧时，像素没变的字段组/序列/图标直接沿用上一帧的结果。
+        # changed_fields 为 None 表示整帧重新解码，应当视为全部变化。
+        self.changed_cells: np.ndarray | None = None
+        self.changed_fields: set[str] | None = None
+        self._results: dict[Any, Any] = {}
+        self._titles: dict[tuple[int, int], str] = {}
+        self._title_state: tuple[TitleManager, int] | None = None
+        self._previous_results: dict[Any, Any] = {}
+        self._previous_titles: dict[tuple[int, int], str] = {}
+        if previous is not None and self.grid.changed is not None:
+            self._title_state = _current_title_state()
+            self.changed_cells = self.grid.changed
+            self.changed_fields = set()
+            # 标题库改过（新增/修改/导入）之后，上一帧解出来的 title 都不能再用。
+            if previous._title_state in (None, self._title_state):
+                self._previous_results = previous._results
+                self._previous_titles = previous._titles
 
     def getCell(self, x: int, y: int) -> Cell:
         """DejaVu\\03_matrix\\02_cell.lua"""
-        start_x: int = x * 4
-        start_y: int = y * 4
-        end_x: int = start_x + 4
-        end_y: int = start_y + 4
-        cell_pix_array: np.ndarray = self.martix_pix_array[start_y:end_y, start_x:end_x]
-        return Cell(x, y, cell_pix_array)
+        return Cell(self.grid, x, y)
 
     def getMegaCell(self, x: int, y: int) -> MegaCell:
         """DejaVu\\03_matrix\\03_mega_cell.lua"""
@@ -35,160 +60,142 @@ class MatrixDecoder(object):
 
     def getBadgeCell(self, x: int, y: int) -> BadgeCell:
         """DejaVu\\03_matrix\\04_badge_cell.lua"""
-        start_x: int = x * 4
-        start_y: int = y * 4
-        end_x: int = start_x + 8
-        end_y: int = start_y + 8
-        cell_pix_array: np.ndarray = self.martix_pix_array[start_y:end_y, start_x:end_x]
-        return BadgeCell(x, y, cell_pix_array)
+        return BadgeCell(self.grid, x, y)
+
+    def readBadgeTitle(self, x: int, y: int) -> str:
+        """BadgeCell(x, y).title，8x8 像素和上一帧一样时复用上一帧的 title。"""
+        return self.readBadgeTitles([(x, y)])[0]
+
+    def readBadgeTitles(self, points: Sequence[tuple[int, int]]) -> list[str]:
+        """批量读取 BadgeCell 的 title。
+
+        上一帧能复用的直接复用；剩下的一次性拷成 (N, 108) 的缓冲区，逐行算整数 digest，
+        查 TitleManager.records_by_digest，只有没命中的才走 get_title（校验、复制、相似度匹配）。
+        """
+        titles: list[str] = []
+        pending: list[int] = []
+        for index, point in enumerate(points):
+            title = self._titles.get(point)
+            if title is None:
+                title = self._previous_titles.get(point)
+                if title is not None and self._badge_changed[point[1], point[0]]:
+                    title = None
+                if title is not None:
+                    self._titles[point] = title
+                else:
+                    pending.append(index)
+            titles.append(title)
+
+        if pending:
+            pending_points = [points[index] for index in pending]
+            for index, point, title in zip(pending, pending_points, self._resolve_titles(pending_points)):
+                titles[index] = title
+                self._titles[point] = title
+        return titles
+
+    @cached_property
+    def _badge_changed(self) -> np.ndarray:
+        # 8x8 的 BadgeCell 覆盖 2x2 个 cell，任意一个变了就不能复用。
+        changed = self.changed_cells
+        return changed[:-1, :-1] | changed[:-1, 1:] | changed[1:, :-1] | changed[1:, 1:]
+
+    def _resolve_titles(self, points: list[tuple[int, int]]) -> list[str]:
+        if self._title_state is None:
+            self._title_state = _current_title_state()
+        manager = self._title_state[0]
+        xs = np.fromiter((x for x, _ in points), dtype=np.intp, count=len(points))
+        ys = np.fromiter((y for _, y in points), dtype=np.intp, count=len(points))
+        buffer = self.grid.badge_buffer(xs, ys)
+
+        titles: list[str | None] = []
+        misses: list[int] = []
+        for index, row in enumerate(buffer):
+            digest = xxhash.xxh3_64_intdigest(row, seed=0)
+            title = manager.peek_title(digest)
+            if title is None:
+                misses.append(index)
+                title = digest_to_hash(digest)
+            titles.append(title)
+
+        if misses:
+            # 没命中的一起交给 get_titles，相似度匹配按类型各做一次矩阵乘法。
+            items = [
+                (buffer[index].reshape(6, 6, 3), self.getBadgeCell(*points[index]).cell_type, titles[index])
+                for index in misses
+            ]
+            for index, title in zip(misses, manager.get_titles(items)):
+                titles[index] = title
+        return titles
 
     def readCharCell(self, x: int, y: int) -> int:
         """DejaVu\\03_matrix\\05_char_cell.lua"""
-        start_x: int = x * 4
-        start_y: int = y * 4
-        end_x: int = start_x + 8
-        end_y: int = start_y + 8
-        cell_pix_array: np.ndarray = self.martix_pix_array[start_y:end_y, start_x:end_x]
-        cell = CharCell(x, y, cell_pix_array)
-        return cell.count
+        return CharCell(self.grid, x, y).count
 
     def readBarValue(self, x: int, y: int, length: int) -> float:
         """读取 DejaVu\\03_matrix\\06_bar_cell.lua 定义的bar的值"""
-        # nodes_middle_pix: list[np.ndarray] = [self.cell(x, top).full.array[3:5, :] for x in range(left, left + length)]
-        start_x: int = x * 4
-        start_y: int = y * 4
-        end_x: int = start_x + length * 4
-        end_y: int = start_y + 4
-        bar_pix_array: np.ndarray = self.martix_pix_array[start_y:end_y, start_x:end_x]
-        inner_pix_array: np.ndarray = bar_pix_array[1:3, :]
-        white_mask = np.all(inner_pix_array == (255, 255, 255), axis=2)
-        white_count: int = int(np.count_nonzero(white_mask))
-        total_count: int = int(inner_pix_array.shape[0] * inner_pix_array.shape[1])
-        return 100.0 * white_count / total_count if total_count > 0 else 0.0
-
-    def readCooldownSpell(self, x: int = 2, y: int = 0, length: int = 40) -> list[dict[str, Any]]:
-        """读取 DejaVu\\05_slots\\12_cooldown_spell.lua 定义的冷却技能"""
-        result: list[dict[str, Any]] = []
-        for i in range(length):
-            pos_x = x + i*2
-            pos_y = y
-            icon_cell = self.getBadgeCell(pos_x, pos_y)
-            if icon_cell.footnote.is_pure and icon_cell.footnote.is_black:
-                continue
-            cooldown_cell = self.getCell(pos_x, pos_y+2)
-            highlight_cell = self.getCell(pos_x+1, pos_y+2)
-            usable_cell = self.getCell(pos_x, pos_y+3)
-            known_cell = self.getCell(pos_x+1, pos_y+3)
-            spell = {
-                "is_charge": False,
-                "charges": 0,
-                "title": icon_cell.title,
-                "cooldown": cooldown_cell.remaining,
-                "highlight": highlight_cell.is_not_black,
-                "is_usable": usable_cell.is_not_black,
-                "is_known": known_cell.is_not_black,
-            }
-            result.append(spell)
-
+        return self.grid.bar_value(x, y, length)
+
+    def _decode(self, compiled: CompiledFields | CompiledSequence) -> Any:
+        # 同一帧里读第二次直接给结果（按需解码时不同属性会共用同一个字段组）。
+        if compiled in self._results:
+            return self._results[compiled]
+        previous = self._previous_results.get(compiled)
+        if previous is None:
+            result = compiled.decode(self)
+            if self.changed_fields is not None:
+                self.changed_fields.update(compiled.changed_names(None))
+        else:
+            changed = compiled.changed_names(self.changed_cells)
+            if changed:
+                result = compiled.decode(self)
+                self.changed_fields.update(changed)
+            else:
+                result = compiled.reuse(self, previous)
+        self._results[compiled] = result
         return result
 
-    def readChargeSpell(self, x: int = 62, y: int = 4, length: int = 11) -> list[dict[str, Any]]:
+    def readFields(self, fields: CompiledFields) -> dict[str, Any]:
+        """按 layout.py 里声明、已编译好的字段组一次性读出，key 顺序即声明顺序。"""
+        return self._decode(fields)
+
+    def readSequence(self, spec: SequenceSpec) -> Any:
+        """读取 layout.py 里声明的槽位序列。"""
+        return self._decode(compile_sequence(spec))
+
+    def readCooldownSpell(self, x: int = 2, y: int = 0, length: int = 40) -> list[SpellSnapshot]:
+        """读取 DejaVu\\05_slots\\12_cooldown_spell.lua 定义的冷却技能"""
+        return self._decode(compile_slots(COOLDOWN_SPELL, x, y, length))
+
+    def readChargeSpell(self, x: int = 62, y: int = 4, length: int = 11) -> list[SpellSnapshot]:
         """读取 DejaVu\\05_slots\\13_charge_spell.lua 定义的充电技能"""
-        result: list[dict[str, Any]] = []
-        for i in range(length):
-            pos_x = x + i*2
-            pos_y = y
-            icon_cell = self.getBadgeCell(pos_x, pos_y)
-            if icon_cell.footnote.is_pure and icon_cell.footnote.is_black:
-                continue
-            cooldown_cell = self.getCell(pos_x, pos_y+2)
-            highlight_cell = self.getCell(pos_x+1, pos_y+2)
-            usable_cell = self.getCell(pos_x, pos_y+3)
-            known_cell = self.getCell(pos_x+1, pos_y+3)
-            charge_cell = self.readCharCell(pos_x, pos_y+4)
-            spell = {
-                "is_charge": True,
-                "charges": charge_cell,
-                "title": icon_cell.title,
-                "cooldown": cooldown_cell.remaining,
-                "highlight": highlight_cell.is_not_black,
-                "is_usable": usable_cell.is_not_black,
-                "is_known": known_cell.is_not_black,
-            }
-            result.append(spell)
-        return result
+        return self._decode(compile_slots(CHARGE_SPELL, x, y, length))
 
-    def readSpell(self) -> list[dict[str, Any]]:
+    def readSpell(self) -> list[SpellSnapshot]:
         """读取 DejaVu\\05_slots\\13_charge_spell.lua 定义的技能"""
 
-        spell_list: list[dict[str, Any]] = []
-        spell_list.extend(self.readCooldownSpell())
-        spell_list.extend(self.readChargeSpell())
+        spell_list: list[SpellSnapshot] = []
+        spell_list.extend(self.readSequence(COOLDOWN_SPELLS))
+        spell_list.extend(self.readSequence(CHARGE_SPELLS))
         return spell_list
 
-    def readAura(self, x: int, y: int, length: int = 11) -> list[dict[str, Any]]:
+    def readAura(self, x: int, y: int, length: int = 11) -> list[AuraSnapshot]:
         """读取 DejaVu\\05_slots\\21_aura_sequence.lua 定义的法术"""
-        aura_list: list[dict[str, Any]] = []
-        for i in range(length):
-            pos_x = x + i*2
-            pos_y = y
-            icon_cell = self.getBadgeCell(pos_x, pos_y)
-            if icon_cell.footnote.is_pure and icon_cell.footnote.is_black:
-                continue
-            remain_cell = self.getCell(pos_x, pos_y+2)
-            type_cell = self.getCell(pos_x+1, pos_y+2)
-            count_cell = self.readCharCell(pos_x, pos_y+3)
-            auraData = {
-                "title": icon_cell.title,
-                "remain": remain_cell.remaining,
-                "color_string": type_cell.color_string,
-                "type": COLOR_MAP["SPELL_TYPE"].get(type_cell.color_string, "UNKNOWN"),
-                "count": count_cell,
-            }
-            aura_list.append(auraData)
-
-        return aura_list
+        return self._decode(compile_slots(AURA, x, y, length))
 
     def readBadgeCellList(self, x: int, y: int, length: int) -> list[str]:
         """读取类似DejaVu\\06_spec\\51_dispel_blacklist.lua的BadgeCell列表"""
-        result:  list[str] = []
-        for i in range(length):
-            pos_x = x + i*2
-            pos_y = y
-            icon_cell = self.getBadgeCell(pos_x, pos_y)
-            if icon_cell.footnote.is_pure and icon_cell.footnote.is_black:
-                continue
-            if not icon_cell.footnote.is_pure:
-                continue
-            result.append(icon_cell.title)
-        return result
+        return self._decode(compile_slots(BADGE_LIST, x, y, length))
 
-    def readCellList(self, x: int, y: int, length: int) -> dict[str, dict[str, Any] | None]:
+    def readCellList(self, x: int, y: int, length: int) -> list[CellSnapshot | None]:
         """
         为SPEC和SETTING服务，因为每个Cell在不同条件下，内容的意义不一样，所以干脆读出来。
+        下标就是 cell 序号，不是纯色的位置是 None。
         """
-        result: dict[str, dict[str, Any] | None] = {}
-        for i in range(length):
-            pos_x = x + i
-            pos_y = y
-            cell = self.getCell(pos_x, pos_y)
-            if cell.is_pure:
-                result[f"{i}"] = {
-                    "pure": True,
-                    "mean": cell.mean,
-                    "percent": cell.percent,
-                    "decimal": cell.decimal,
-                    "is_black": cell.is_black,
-                    "is_white": cell.is_white,
-                    "color_string": cell.color_string,
-                }
-            else:
-                result[f"{i}"] = None
-        return result
+        return self._decode(compile_slots(CELL_LIST, x, y, length))
 
     def readUTFhash(self, x: int, y: int) -> str | None:
         icon_cell = self.getBadgeCell(x, y)
-        if not icon_cell.footnote.is_pure:
+        if not icon_cell.footnote_is_pure:
             return None
         return icon_cell.hash
 
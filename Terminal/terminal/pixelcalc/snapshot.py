@@ -0,0 +1,296 @@
+"""一帧解码结果的对象模型。
+
+解码器直接把结果装进这些带 __slots__ 的对象，不再拼多层 dict；对象里只有 str/float/bool 和列表，
+可以直接 pickle 给引擎进程之间传。属性名和原来 extract_all_data 的 dict key 一一对应
+（unitToken、testCell、UTF_hash 这些保持原样，和插件端同步）。
+
+to_dict() 还原成原来的嵌套 dict，给 debug 页和其他界面用；from_dict() 反过来，
+老代码和测试手写的 dict 交给 Context 时走这里。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+__all__ = [
+    "AuraSnapshot",
+    "CellSnapshot",
+    "FrameSnapshot",
+    "SpellSnapshot",
+    "UnitSnapshot",
+    "pop_pending_title_record",
+]
+
+PARTY_TOKENS = ("party1", "party2", "party3", "party4")
+
+
+@dataclass(frozen=True, slots=True)
+class AuraSnapshot:
+    title: str
+    remain: float
+    color_string: str
+    type: str
+    count: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "title": self.title,
+            "remain": self.remain,
+            "color_string": self.color_string,
+            "type": self.type,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, aura: dict[str, Any]) -> AuraSnapshot:
+        return cls(
+            aura["title"],
+            float(aura.get("remain", 999.0)),
+            aura.get("color_string", "0,0,0"),
+            aura.get("type", "UNKNOWN"),
+            aura.get("count", 1),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SpellSnapshot:
+    is_charge: bool
+    charges: int
+    title: str
+    cooldown: float
+    highlight: bool
+    is_usable: bool
+    is_known: bool
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "is_charge": self.is_charge,
+            "charges": self.charges,
+            "title": self.title,
+            "cooldown": self.cooldown,
+            "highlight": self.highlight,
+            "is_usable": self.is_usable,
+            "is_known": self.is_known,
+        }
+
+    @classmethod
+    def from_dict(cls, spell: dict[str, Any]) -> SpellSnapshot:
+        return cls(
+            bool(spell.get("is_charge", False)),
+            int(spell.get("charges", 0)),
+            spell["title"],
+            float(spell.get("cooldown", 999.0)),
+            bool(spell.get("highlight", False)),
+            bool(spell.get("is_usable", False)),
+            bool(spell.get("is_known", False)),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CellSnapshot:
+    """SPEC / SETTING 里的一个纯色 cell，以及 flash cell。"""
+
+    pure: bool
+    mean: float
+    percent: float
+    decimal: float
+    is_black: bool
+    is_white: bool
+    color_string: str
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "pure": self.pure,
+            "mean": self.mean,
+            "percent": self.percent,
+            "decimal": self.decimal,
+            "is_black": self.is_black,
+            "is_white": self.is_white,
+            "color_string": self.color_string,
+        }
+
+    @classmethod
+    def from_dict(cls, cell: dict[str, Any]) -> CellSnapshot:
+        return cls(
+            cell["pure"], cell["mean"], cell["percent"], cell["decimal"], cell["is_black"], cell["is_white"], cell["color_string"]
+        )
+
+    @classmethod
+    def from_cell(cls, cell: Any) -> CellSnapshot | None:
+        """从 pixelcalc.cell.Cell 取值，不再引用整张 CellGrid。"""
+        if cell is None:
+            return None
+        return cls(cell.is_pure, cell.mean, cell.percent, cell.decimal, cell.is_black, cell.is_white, cell.color_string)
+
+
+def _cells_to_dict(cells: list[CellSnapshot | None]) -> dict[str, dict[str, Any] | None]:
+    return {f"{index}": (cell.to_dict() if cell is not None else None) for index, cell in enumerate(cells)}
+
+
+def _cells_from_dict(cells: dict[str, dict[str, Any] | None] | None) -> list[CellSnapshot | None]:
+    if not cells:
+        return []
+    result: list[CellSnapshot | None] = [None] * (max(int(key) for key in cells) + 1)
+    for key, cell in cells.items():
+        if cell is not None:
+            result[int(key)] = CellSnapshot.from_dict(cell)
+    return result
+
+
+@dataclass(frozen=True, slots=True)
+class UnitSnapshot:
+    """一个单位。敌方单位（target/focus/mouseover）没有 buff，buff 为 None；status 是 layout 里声明的字段。"""
+
+    unitToken: str
+    exists: bool
+    buff: list[AuraSnapshot] | None
+    debuff: list[AuraSnapshot]
+    status: dict[str, Any]
+
+    @classmethod
+    def missing(cls, unit_token: str, *, has_buff: bool) -> UnitSnapshot:
+        return cls(unit_token, False, [] if has_buff else None, [], {})
+
+    def to_dict(self) -> dict[str, Any]:
+        unit: dict[str, Any] = {"unitToken": self.unitToken, "exists": self.exists}
+        if self.buff is not None:
+            unit["buff"] = [aura.to_dict() for aura in self.buff]
+        unit["debuff"] = [aura.to_dict() for aura in self.debuff]
+        unit["status"] = self.status
+        return unit
+
+    @classmethod
+    def from_dict(cls, unit: dict[str, Any]) -> UnitSnapshot:
+        buff = unit.get("buff")
+        return cls(
+            unit["unitToken"],
+            bool(unit["exists"]),
+            [AuraSnapshot.from_dict(aura) for aura in buff] if buff is not None else None,
+            [AuraSnapshot.from_dict(aura) for aura in unit.get("debuff", [])],
+            unit.get("status", {}),
+        )
+
+
+@dataclass(slots=True)
+class FrameSnapshot:
+    """一帧的全部解码结果。除了 pending_utf_title_record 被取走时清空，构造后不再修改。"""
+
+    timestamp: datetime | None
+    spell: list[SpellSnapshot]
+    player: UnitSnapshot
+    target: UnitSnapshot
+    focus: UnitSnapshot
+    mouseover: UnitSnapshot
+    # party1..party4，按顺序。
+    party: tuple[UnitSnapshot, ...]
+    combat_time: float
+    use_mouse: bool
+    spec: list[CellSnapshot | None]
+    setting: list[CellSnapshot | None]
+    assisted_combat: str
+    flash: CellSnapshot | None
+    delay: bool
+    testCell: int
+    enable: bool
+    dispel_blacklist: list[str]
+    interrupt_blacklist: list[str]
+    spell_stop_list: list[str]
+    spell_queue_window: float
+    burst_time: float
+    latest_succeeded_cast: str
+    UTF_hash: str | None = None
+    UTF_string: str | None = None
+    # UTF 测试徽章读到的、标题库里还没有的记录；由解码线程取走入库。
+    pending_utf_title_record: dict[str, Any] | None = None
+
+    def unit(self, unit_token: str) -> UnitSnapshot:
+        """'player' / 'target' / 'focus' / 'mouseover' / 'party1'..'party4'。"""
+        if unit_token in PARTY_TOKENS:
+            return self.party[PARTY_TOKENS.index(unit_token)]
+        return getattr(self, unit_token)
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "timestamp": self.timestamp,
+            "spell": [spell.to_dict() for spell in self.spell],
+            "player": self.player.to_dict(),
+            "target": self.target.to_dict(),
+            "focus": self.focus.to_dict(),
+            "mouseover": self.mouseover.to_dict(),
+            "misc": {
+                "combat_time": self.combat_time,
+                "use_mouse": self.use_mouse,
+            },
+            "spec": _cells_to_dict(self.spec),
+            "setting": _cells_to_dict(self.setting),
+            "party": {unit.unitToken: unit.to_dict() for unit in self.party},
+            "assisted_combat": self.assisted_combat,
+            "flash": self.flash.to_dict() if self.flash is not None else None,
+            "delay": self.delay,
+            "testCell": self.testCell,
+            "enable": self.enable,
+            "dispel_blacklist": list(self.dispel_blacklist),
+            "interrupt_blacklist": list(self.interrupt_blacklist),
+            "spell_stop_list": list(self.spell_stop_list),
+            "spell_queue_window": self.spell_queue_window,
+            "burst_time": self.burst_time,
+            "latest_succeeded_cast": self.latest_succeeded_cast,
+        }
+        if self.pending_utf_title_record is not None:
+            data["_pending_utf_title_record"] = self.pending_utf_title_record
+        data["UTF_hash"] = self.UTF_hash
+        data["UTF_string"] = self.UTF_string
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> FrameSnapshot:
+        """手写或录下来的 dict 可能缺字段，缺的按空值处理，由读到的地方自己决定怎么办。"""
+        party = data.get("party", {})
+        misc = data.get("misc", {})
+        flash = data.get("flash")
+        return cls(
+            timestamp=data.get("timestamp"),
+            spell=[SpellSnapshot.from_dict(spell) for spell in data.get("spell", [])],
+            player=UnitSnapshot.from_dict(data["player"]) if "player" in data else UnitSnapshot.missing("player", has_buff=True),
+            target=UnitSnapshot.from_dict(data["target"]) if "target" in data else UnitSnapshot.missing("target", has_buff=False),
+            focus=UnitSnapshot.from_dict(data["focus"]) if "focus" in data else UnitSnapshot.missing("focus", has_buff=False),
+            mouseover=(
+                UnitSnapshot.from_dict(data["mouseover"]) if "mouseover" in data else UnitSnapshot.missing("mouseover", has_buff=False)
+            ),
+            party=tuple(
+                UnitSnapshot.from_dict(party[token]) if token in party else UnitSnapshot.missing(token, has_buff=True)
+                for token in PARTY_TOKENS
+            ),
+            combat_time=misc.get("combat_time"),
+            use_mouse=misc.get("use_mouse"),
+            spec=_cells_from_dict(data.get("spec")),
+            setting=_cells_from_dict(data.get("setting")),
+            assisted_combat=data.get("assisted_combat"),
+            flash=CellSnapshot.from_dict(flash) if isinstance(flash, dict) else None,
+            delay=data.get("delay"),
+            testCell=data.get("testCell"),
+            enable=data.get("enable"),
+            dispel_blacklist=list(data.get("dispel_blacklist", [])),
+            interrupt_blacklist=list(data.get("interrupt_blacklist", [])),
+            spell_stop_list=list(data.get("spell_stop_list", [])),
+            spell_queue_window=data.get("spell_queue_window"),
+            burst_time=data.get("burst_time"),
+            latest_succeeded_cast=data.get("latest_succeeded_cast"),
+            UTF_hash=data.get("UTF_hash"),
+            UTF_string=data.get("UTF_string"),
+            pending_utf_title_record=data.get("_pending_utf_title_record"),
+        )
+
+
+def pop_pending_title_record(data: Any) -> dict[str, Any] | None:
+    """取走并清掉待入库的 UTF 标题记录。
+
+    FrameSnapshot 和按需解码的 LazyFrameSnapshot 都有 pending_utf_title_record 属性；
+    还在产出 dict 的解码器（测试里的假解码器）也照样处理。
+    """
+    if isinstance(data, dict):
+        return data.pop("_pending_utf_title_record", None)
+    record, data.pending_utf_title_record = data.pending_utf_title_record, None
+    return record
@@ -3,9 +3,11 @@ import io
 import json
 import sqlite3
 import sys
-from dataclasses import dataclass
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Sequence
 
 import numpy as np
 import xxhash
@@ -17,6 +19,7 @@ from .error import (
     TitleRecordNotFoundError,
     TitleValidationError,
 )
+from .title_writer import TitleWriter, configure_connection
 
 DEBUFF_ON_FRIENDLY = ["MAGIC", "CURSE", "DISEASE", "POISON", "ENRAGE", "BLEED", "DEBUFF_ON_FRIENDLY"]
 BUFF_ON_FRIENDLY = ["BUFF_ON_FRIENDLY"]
@@ -37,6 +40,14 @@ CACHE_KIND_PERSISTENT = "persistent"
 CACHE_KIND_SIMILAR_MATCH = "similar_match"
 CACHE_KIND_MISS = "miss"
 
+# 临时记录（miss / 相似匹配）默认最多保留多少条。
+DEFAULT_TRANSIENT_CAPACITY = 4096
+# NDJSON 导入每批多少条，导出每写多少条报告一次进度。
+NDJSON_CHUNK_SIZE = 1000
+
+# 导入导出的进度回调：(已完成, 总数)。
+TitleProgressCallback = Callable[[int, int], None]
+
 
 @dataclass(slots=True)
 class TitleRecord:
@@ -44,9 +55,99 @@ class TitleRecord:
     title_type: str
     title: str
     valid_array: np.ndarray
-    png_bytes: bytes
     from_sqlite: bool
     cache_kind: str
+    # PNG 只有标题编辑器和导出用得到，第一次访问 png_bytes 时才读取/编码，之后缓存。
+    png_cache: bytes | None = field(default=None, repr=False)
+    png_loader: Callable[[], bytes] | None = field(default=None, repr=False)
+
+    @property
+    def png_bytes(self) -> bytes:
+        if self.png_cache is None:
+            loader = self.png_loader
+            self.png_cache = loader() if loader is not None else _valid_array_to_png_bytes(self.valid_array)
+            self.png_loader = None
+        return self.png_cache
+
+
+@dataclass(frozen=True, slots=True)
+class TitleCacheStats:
+    capacity: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class TransientTitleCache(object):
+    """miss / 相似匹配产生的临时记录，按最近使用淘汰，容量固定。
+
+    hits: 命中临时记录的次数；misses: 内存里都没有、需要走相似度匹配的次数；
+    evictions: 因为超出容量被淘汰的记录数。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_TRANSIENT_CAPACITY) -> None:
+        self.capacity: int = max(1, int(capacity))
+        self.records: OrderedDict[str, TitleRecord] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __contains__(self, record_hash: str) -> bool:
+        return record_hash in self.records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, record_hash: str) -> TitleRecord | None:
+        record = self.records.get(record_hash)
+        if record is not None:
+            self.records.move_to_end(record_hash)
+            self.hits += 1
+        return record
+
+    def put(self, record: TitleRecord) -> list[TitleRecord]:
+        """放入一条记录，返回被淘汰的记录。"""
+        self.records[record.hash] = record
+        self.records.move_to_end(record.hash)
+        return self._evict()
+
+    def pop(self, record_hash: str) -> TitleRecord | None:
+        return self.records.pop(record_hash, None)
+
+    def clear(self) -> None:
+        self.records.clear()
+
+    def resize(self, capacity: int) -> list[TitleRecord]:
+        self.capacity = max(1, int(capacity))
+        return self._evict()
+
+    def _evict(self) -> list[TitleRecord]:
+        evicted: list[TitleRecord] = []
+        while len(self.records) > self.capacity:
+            evicted.append(self.records.popitem(last=False)[1])
+        self.evictions += len(evicted)
+        return evicted
+
+    def stats(self) -> TitleCacheStats:
+        return TitleCacheStats(
+            capacity=self.capacity,
+            size=len(self.records),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    hash TEXT PRIMARY KEY,
+    title_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    valid_array BLOB NOT NULL,
+    png_bytes BLOB NOT NULL
+)
+"""
 
 
 def _resolve_default_db_path() -> Path:
@@ -67,11 +168,65 @@ def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a_flat, b_flat) / (norm_a * norm_b))
 
 
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """逐行 L2 归一化成 float32；全零的行保持为零，和 cosine_similarity 的 0.0 一致。"""
+    matrix = vectors.reshape(len(vectors), -1).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms != 0)
+    return matrix
+
+
+class _TitleVectorIndex(object):
+    """某个 title_type 下所有持久化记录的归一化向量矩阵，相似度查询是一次矩阵乘法。
+
+    增删只改 vectors，矩阵在下次查询时才重建，批量导入也只重建一次。
+    (hashes, matrix) 作为一个元组整体替换，search 只读一次，不会拿到一半新一半旧的结果。
+    """
+
+    def __init__(self) -> None:
+        self.vectors: dict[str, np.ndarray] = {}
+        self._built: tuple[list[str], np.ndarray] | None = None
+
+    def add_many(self, record_hashes: Sequence[str], valid_arrays: np.ndarray) -> None:
+        self.vectors.update(zip(record_hashes, _normalize_rows(valid_arrays)))
+        self._built = None
+
+    def discard(self, record_hash: str) -> None:
+        if self.vectors.pop(record_hash, None) is not None:
+            self._built = None
+
+    def search(self, queries: np.ndarray) -> tuple[list[str | None], np.ndarray]:
+        """queries 是 (k, 6, 6, 3)，返回每个查询最相似的 hash 和余弦相似度。"""
+        if not self.vectors:
+            return [None] * len(queries), np.full(len(queries), -1.0, dtype=np.float32)
+        built = self._built
+        if built is None:
+            hashes = list(self.vectors)
+            matrix = np.stack([self.vectors[record_hash] for record_hash in hashes])
+            built = self._built = (hashes, matrix)
+        hashes, matrix = built
+        scores = _normalize_rows(queries) @ matrix.T
+        best = np.argmax(scores, axis=1)
+        return [hashes[index] for index in best.tolist()], scores[np.arange(len(queries)), best]
+
+
 def ndarray_to_hash(valid_array: np.ndarray) -> str:
     checked_array = _normalize_valid_array(valid_array)
     return xxhash.xxh3_64_hexdigest(np.ascontiguousarray(checked_array), seed=0)
 
 
+def digest_to_hash(digest: int) -> str:
+    """xxh3_64 的整数 digest 转成对外使用的 16 位十六进制 hash，和 ndarray_to_hash 一致。"""
+    return f"{digest:016x}"
+
+
+def hash_to_digest(record_hash: str) -> int | None:
+    try:
+        return int(record_hash, 16)
+    except ValueError:
+        return None
+
+
 def _normalize_valid_array(valid_array: np.ndarray) -> np.ndarray:
     array = np.asarray(valid_array, dtype=np.uint8)
     if array.shape != (6, 6, 3):
@@ -86,14 +241,25 @@ def _normalize_title_type(title_type: str) -> str:
     return normalized
 
 
-def _valid_array_to_json(valid_array: np.ndarray) -> str:
-    return json.dumps(valid_array.tolist(), ensure_ascii=False, separators=(",", ":"))
-
-
 def _json_to_valid_array(payload: str) -> np.ndarray:
     return _normalize_valid_array(np.array(json.loads(payload), dtype=np.uint8))
 
 
+VALID_ARRAY_BYTES = 6 * 6 * 3
+
+
+def _valid_array_to_blob(valid_array: np.ndarray) -> bytes:
+    return np.ascontiguousarray(valid_array, dtype=np.uint8).tobytes()
+
+
+def _blobs_to_valid_arrays(blobs: Sequence[bytes]) -> np.ndarray:
+    """把若干条 108 字节的 BLOB 拼起来一次 frombuffer，得到 (N, 6, 6, 3) 的可写数组。"""
+    for blob in blobs:
+        if len(blob) != VALID_ARRAY_BYTES:
+            raise TitleValidationError(f"valid_array 必须是 {VALID_ARRAY_BYTES} 字节，当前是 {len(blob)}")
+    return np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), 6, 6, 3).copy()
+
+
 def _valid_array_to_png_bytes(valid_array: np.ndarray) -> bytes:
     image = Image.fromarray(valid_array, mode="RGB")
     buffer = io.BytesIO()
@@ -101,6 +267,34 @@ def _valid_array_to_png_bytes(valid_array: np.ndarray) -> bytes:
     return buffer.getvalue()
 
 
+def _record_to_row(record: TitleRecord, png_bytes: bytes = b"") -> tuple[Any, ...]:
+    """icon_titles 的一行；PNG 不在写入时编码，空 blob 留到查看时由 valid_array 生成。"""
+    return (
+        record.hash,
+        record.title_type,
+        record.title,
+        sqlite3.Binary(_valid_array_to_blob(record.valid_array)),
+        sqlite3.Binary(png_bytes),
+    )
+
+
+def _item_to_record(item: dict[str, Any]) -> TitleRecord:
+    """导入文件里的一条记录，校验 hash 和 valid_array 是否一致。"""
+    valid_array = _normalize_valid_array(np.array(item["valid_array"], dtype=np.uint8))
+    computed_hash = ndarray_to_hash(valid_array)
+    if item.get("hash") and item["hash"] != computed_hash:
+        raise TitleImportError("JSON 里的 hash 和 valid_array 不一致")
+    return TitleRecord(
+        hash=computed_hash,
+        title_type=_normalize_title_type(item["title_type"]),
+        title=str(item["title"]),
+        valid_array=valid_array,
+        from_sqlite=True,
+        cache_kind=CACHE_KIND_PERSISTENT,
+        png_cache=_decode_png_bytes(item["png_base64"]) if item.get("png_base64") else None,
+    )
+
+
 def _encode_png_bytes(png_bytes: bytes) -> str:
     return base64.b64encode(png_bytes).decode("ascii")
 
@@ -110,52 +304,114 @@ def _decode_png_bytes(payload: str) -> bytes:
 
 
 class TitleManager:
+    """标题库：SQLite 里的持久化记录加上内存索引。
+
+    界面线程（标题编辑、导入）、解码线程（UTF 标题入库）和 rotation 线程（按需解码时查标题）都会用到，
+    内存里的 hash/digest 索引、临时记录和向量索引都在 _lock 下读写。conn 只在创建它的线程里用。
+    """
+
     def __init__(
         self,
         db_path: str | Path | None = None,
         similarity_threshold: float = 0.999,
+        transient_capacity: int = DEFAULT_TRANSIENT_CAPACITY,
+        log: Callable[[str], None] | None = None,
     ) -> None:
         self.db_path = Path(db_path) if db_path is not None else DEFAULT_DB_PATH
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.similarity_threshold = similarity_threshold
         self._closed = False
+        self._lock = threading.RLock()
+        # 持久化记录每变一次加一，增量解码靠它判断上一帧的 title 还能不能复用。
+        self.revision: int = 0
+        # 持久化记录，和 SQLite 一致；miss / 相似匹配放在有容量上限的 transient_records 里。
         self.records_by_hash: dict[str, TitleRecord] = {}
+        self.transient_records = TransientTitleCache(transient_capacity)
+        # 上面两部分记录按整数 digest 索引，解码热路径只查这个 dict。
+        self.records_by_digest: dict[int, TitleRecord] = {}
         self.persistent_hashes_by_type: dict[str, set[str]] = {title_type: set() for title_type in TITLE_TYPES}
+        self._vector_index_by_type: dict[str, _TitleVectorIndex] = {title_type: _TitleVectorIndex() for title_type in TITLE_TYPES}
         self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
+        configure_connection(self.conn)
         self._create_table()
+        # 写操作先改内存，再交给后台线程批量落盘，这个连接只用来读。
+        self.writer = TitleWriter(self.db_path, log=log)
         self.rebuild_memory()
 
     def _create_table(self) -> None:
-        self.conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS icon_titles (
-                hash TEXT PRIMARY KEY,
-                title_type TEXT NOT NULL,
-                title TEXT NOT NULL,
-                valid_array_json TEXT NOT NULL,
-                png_bytes BLOB NOT NULL
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(icon_titles)")}
+        if "valid_array_json" in columns:
+            self._migrate_json_table()
+            return
+        self.conn.execute(_CREATE_TABLE_SQL.format(table="icon_titles"))
+        self.conn.commit()
+
+    def _migrate_json_table(self) -> None:
+        """旧表把 valid_array 存成 JSON 文本，启动时在一个事务里整表换成 108 字节的 BLOB。"""
+        rows = self.conn.execute(
+            "SELECT hash, title_type, title, valid_array_json, png_bytes FROM icon_titles"
+        ).fetchall()
+        try:
+            self.conn.execute("BEGIN")
+            self.conn.execute(_CREATE_TABLE_SQL.format(table="icon_titles_blob"))
+            self.conn.executemany(
+                "INSERT INTO icon_titles_blob(hash, title_type, title, valid_array, png_bytes) VALUES(?, ?, ?, ?, ?)",
+                (
+                    (
+                        row["hash"],
+                        row["title_type"],
+                        row["title"],
+                        sqlite3.Binary(_valid_array_to_blob(_json_to_valid_array(row["valid_array_json"]))),
+                        row["png_bytes"],
+                    )
+                    for row in rows
+                ),
             )
-            """
-        )
+            self.conn.execute("DROP TABLE icon_titles")
+            self.conn.execute("ALTER TABLE icon_titles_blob RENAME TO icon_titles")
+        except Exception:
+            self.conn.rollback()
+            raise
         self.conn.commit()
 
     def close(self) -> None:
         if self._closed:
             return
-        self.conn.close()
         self._closed = True
+        try:
+            self.writer.close()
+        finally:
+            self.conn.close()
+
+    def flush(self) -> None:
+        """等后台线程把已排队的写操作全部提交。"""
+        self.writer.flush()
 
-    def _row_to_record(self, row: sqlite3.Row) -> TitleRecord:
-        return TitleRecord(
+    def _row_to_record(self, row: sqlite3.Row, valid_array: np.ndarray) -> TitleRecord:
+        """row 里没有 png_bytes 列时，PNG 等到第一次查看才去 SQLite 里读。"""
+        record = TitleRecord(
             hash=row["hash"],
             title_type=row["title_type"],
             title=row["title"],
-            valid_array=_json_to_valid_array(row["valid_array_json"]),
-            png_bytes=bytes(row["png_bytes"]),
+            valid_array=valid_array,
             from_sqlite=True,
             cache_kind=CACHE_KIND_PERSISTENT,
         )
+        if "png_bytes" in row.keys():
+            # 空 blob 表示入库时没有编码过 PNG，由 valid_array 现算。
+            record.png_cache = bytes(row["png_bytes"]) or None
+        else:
+            record.png_loader = lambda: self._load_png_bytes(record.hash, record.valid_array)
+        return record
+
+    def _load_png_bytes(self, record_hash: str, valid_array: np.ndarray) -> bytes:
+        row = None
+        if not self._closed:
+            row = self.conn.execute("SELECT png_bytes FROM icon_titles WHERE hash = ?", (record_hash,)).fetchone()
+        if row is not None and row["png_bytes"]:
+            return bytes(row["png_bytes"])
+        return _valid_array_to_png_bytes(valid_array)
 
     def _record_to_public_dict(self, record: TitleRecord) -> dict[str, Any]:
         return {
@@ -169,41 +425,100 @@ class TitleManager:
         }
 
     def _clear_memory(self) -> None:
+        self.revision += 1
         self.records_by_hash.clear()
+        self.transient_records.clear()
+        self.records_by_digest.clear()
         self.persistent_hashes_by_type = {title_type: set() for title_type in TITLE_TYPES}
+        self._vector_index_by_type = {title_type: _TitleVectorIndex() for title_type in TITLE_TYPES}
 
     def _store_memory_record(self, record: TitleRecord) -> None:
-        existing = self.records_by_hash.get(record.hash)
-        if existing is not None and existing.from_sqlite:
-            self.persistent_hashes_by_type[existing.title_type].discard(existing.hash)
-        self.records_by_hash[record.hash] = record
         if record.from_sqlite:
+            self._store_persistent_records([record])
+            return
+        for evicted in self.transient_records.put(record):
+            self._drop_digest(evicted)
+        digest = hash_to_digest(record.hash)
+        if digest is not None:
+            self.records_by_digest[digest] = record
+
+    def _store_persistent_records(self, records: Sequence[TitleRecord]) -> None:
+        """批量放入持久化记录，每个 title_type 的向量索引每批只归一化、失效一次。"""
+        if not records:
+            return
+        pending_by_type: dict[str, dict[str, TitleRecord]] = {}
+        for record in records:
+            existing = self.records_by_hash.get(record.hash)
+            if existing is not None:
+                self.persistent_hashes_by_type[existing.title_type].discard(existing.hash)
+                self._vector_index_by_type[existing.title_type].discard(existing.hash)
+                pending_by_type.get(existing.title_type, {}).pop(existing.hash, None)
+            self.transient_records.pop(record.hash)
+            self.records_by_hash[record.hash] = record
             self.persistent_hashes_by_type[record.title_type].add(record.hash)
+            pending_by_type.setdefault(record.title_type, {})[record.hash] = record
+            digest = hash_to_digest(record.hash)
+            if digest is not None:
+                self.records_by_digest[digest] = record
+        for title_type, pending in pending_by_type.items():
+            if pending:
+                valid_arrays = np.stack([record.valid_array for record in pending.values()])
+                self._vector_index_by_type[title_type].add_many(list(pending), valid_arrays)
+        self.revision += 1
+
+    def _drop_digest(self, record: TitleRecord) -> None:
+        digest = hash_to_digest(record.hash)
+        if digest is not None and self.records_by_digest.get(digest) is record:
+            del self.records_by_digest[digest]
 
     def _delete_memory_record(self, record_hash: str) -> None:
         existing = self.records_by_hash.pop(record_hash, None)
-        if existing is not None and existing.from_sqlite:
+        self.transient_records.pop(record_hash)
+        digest = hash_to_digest(record_hash)
+        if digest is not None:
+            self.records_by_digest.pop(digest, None)
+        self.revision += 1
+        if existing is not None:
             self.persistent_hashes_by_type[existing.title_type].discard(existing.hash)
+            self._vector_index_by_type[existing.title_type].discard(existing.hash)
+
+    def set_transient_capacity(self, capacity: int) -> None:
+        with self._lock:
+            for evicted in self.transient_records.resize(capacity):
+                self._drop_digest(evicted)
+
+    def cache_stats(self) -> TitleCacheStats:
+        with self._lock:
+            return self.transient_records.stats()
 
     def rebuild_memory(self) -> None:
-        self._clear_memory()
+        """整表读进内存：所有 valid_array 一次 frombuffer，各类型的向量索引一次性建好。"""
+        self.flush()
         rows = self.conn.execute(
-            "SELECT hash, title_type, title, valid_array_json, png_bytes FROM icon_titles ORDER BY hash"
+            "SELECT hash, title_type, title, valid_array FROM icon_titles ORDER BY hash"
         ).fetchall()
-        for row in rows:
-            self._store_memory_record(self._row_to_record(row))
+        records: list[TitleRecord] = []
+        if rows:
+            valid_arrays = _blobs_to_valid_arrays([row["valid_array"] for row in rows])
+            records = [self._row_to_record(row, valid_array) for row, valid_array in zip(rows, valid_arrays)]
+        with self._lock:
+            self._clear_memory()
+            self._store_persistent_records(records)
 
     def list_database_records(self) -> list[dict[str, Any]]:
-        rows = self.conn.execute(
-            "SELECT hash, title_type, title, valid_array_json, png_bytes FROM icon_titles ORDER BY hash"
-        ).fetchall()
-        return [self._record_to_public_dict(self._row_to_record(row)) for row in rows]
+        """持久化记录，按 hash 排序；内存里的 records_by_hash 就是 SQLite 排队写完后的内容，不用等落盘。"""
+        with self._lock:
+            records = [self.records_by_hash[record_hash] for record_hash in sorted(self.records_by_hash)]
+        return [self._record_to_public_dict(record) for record in records]
 
     def list_memory_records(self) -> list[dict[str, Any]]:
-        return [self._record_to_public_dict(record) for record in self.records_by_hash.values()]
+        with self._lock:
+            records = [*self.records_by_hash.values(), *self.transient_records.records.values()]
+        return [self._record_to_public_dict(record) for record in records]
 
     def has_persistent_record(self, record_hash: str) -> bool:
-        record = self.records_by_hash.get(record_hash)
+        with self._lock:
+            record = self.records_by_hash.get(record_hash)
         return bool(record is not None and record.from_sqlite)
 
     def add_record(
@@ -213,49 +528,34 @@ class TitleManager:
         title_type: str,
         title: str,
         hash: str | None = None,
+        persist: bool = True,
     ) -> dict[str, Any]:
+        """persist=False 表示这条记录已经由别的连接（引擎进程）写进 SQLite，只更新内存。"""
         normalized_array = _normalize_valid_array(valid_array)
         normalized_title_type = _normalize_title_type(title_type)
         computed_hash = ndarray_to_hash(normalized_array)
         if hash is not None and hash != computed_hash:
             raise TitleHashMismatchError("传入的 hash 和 valid_array 计算结果不一致")
 
-        png_bytes = _valid_array_to_png_bytes(normalized_array)
         record = TitleRecord(
             hash=computed_hash,
             title_type=normalized_title_type,
             title=title,
             valid_array=normalized_array,
-            png_bytes=png_bytes,
             from_sqlite=True,
             cache_kind=CACHE_KIND_PERSISTENT,
         )
-        self.conn.execute(
-            """
-            INSERT INTO icon_titles(hash, title_type, title, valid_array_json, png_bytes)
-            VALUES(?, ?, ?, ?, ?)
-            ON CONFLICT(hash) DO UPDATE SET
-                title_type=excluded.title_type,
-                title=excluded.title,
-                valid_array_json=excluded.valid_array_json,
-                png_bytes=excluded.png_bytes
-            """,
-            (
-                record.hash,
-                record.title_type,
-                record.title,
-                _valid_array_to_json(record.valid_array),
-                sqlite3.Binary(record.png_bytes),
-            ),
-        )
-        self.conn.commit()
-        self._store_memory_record(record)
+        # 内存和写队列在同一把锁下改，并发的增删落盘顺序和内存里的顺序一致。
+        with self._lock:
+            self._store_memory_record(record)
+            if persist:
+                self.writer.upsert([_record_to_row(record)])
         return self._record_to_public_dict(record)
 
     def delete_record(self, record_hash: str) -> None:
-        self.conn.execute("DELETE FROM icon_titles WHERE hash = ?", (record_hash,))
-        self.conn.commit()
-        self._delete_memory_record(record_hash)
+        with self._lock:
+            self._delete_memory_record(record_hash)
+            self.writer.delete([record_hash])
 
     def update_record(
         self,
@@ -266,37 +566,76 @@ class TitleManager:
         title: str,
         hash: str | None = None,
     ) -> dict[str, Any]:
-        if current_hash not in {record["hash"] for record in self.list_database_records()}:
-            raise TitleRecordNotFoundError(f"找不到要更新的 hash: {current_hash}")
-        updated_record = self.add_record(valid_array=valid_array, title_type=title_type, title=title, hash=hash)
-        if updated_record["hash"] != current_hash:
-            self.delete_record(current_hash)
+        with self._lock:
+            if current_hash not in self.records_by_hash:
+                raise TitleRecordNotFoundError(f"找不到要更新的 hash: {current_hash}")
+            updated_record = self.add_record(valid_array=valid_array, title_type=title_type, title=title, hash=hash)
+            if updated_record["hash"] != current_hash:
+                self.delete_record(current_hash)
         return updated_record
 
-    def get_title(self, valid_array: np.ndarray, title_type: str, hash: str) -> str:
-        normalized_array = _normalize_valid_array(valid_array)
-        normalized_title_type = _normalize_title_type(title_type)
-
-        cached_record = self.records_by_hash.get(hash)
-        if cached_record is not None:
-            return cached_record.title
-
-        best_match: TitleRecord | None = None
-        best_score = -1.0
-        for candidate_hash in self.persistent_hashes_by_type[normalized_title_type]:
-            candidate = self.records_by_hash[candidate_hash]
-            score = cosine_similarity(normalized_array, candidate.valid_array)
-            if score > best_score:
-                best_match = candidate
-                best_score = score
+    def peek_title(self, digest: int) -> str | None:
+        """只查内存缓存，不校验、不复制数组；没命中返回 None，再走 get_title。"""
+        with self._lock:
+            record = self.records_by_digest.get(digest)
+            if record is None:
+                return None
+            if not record.from_sqlite:
+                self.transient_records.get(record.hash)
+            return record.title
 
-        if best_match is not None and best_score > self.similarity_threshold:
+    def get_title(self, valid_array: np.ndarray, title_type: str, hash: str) -> str:
+        return self.get_titles([(valid_array, title_type, hash)])[0]
+
+    def get_titles(self, items: Sequence[tuple[np.ndarray, str, str]]) -> list[str]:
+        """批量版 get_title，items 是 (valid_array, title_type, hash)。
+
+        缓存没命中的按 title_type 分组，每组和该类型的向量索引做一次矩阵乘法找最相似的记录。
+        """
+        with self._lock:
+            return self._get_titles(items)
+
+    def _get_titles(self, items: Sequence[tuple[np.ndarray, str, str]]) -> list[str]:
+        resolved: dict[str, str] = {}
+        misses: dict[str, tuple[np.ndarray, str]] = {}
+        for valid_array, title_type, record_hash in items:
+            if record_hash in resolved or record_hash in misses:
+                continue
+            record = self.records_by_hash.get(record_hash) or self.transient_records.get(record_hash)
+            if record is not None:
+                resolved[record_hash] = record.title
+                continue
+            misses[record_hash] = (_normalize_valid_array(valid_array), _normalize_title_type(title_type))
+
+        if misses:
+            self.transient_records.misses += len(misses)
+            hashes_by_type: dict[str, list[str]] = {}
+            for record_hash, (_, title_type) in misses.items():
+                hashes_by_type.setdefault(title_type, []).append(record_hash)
+            for title_type, record_hashes in hashes_by_type.items():
+                queries = np.stack([misses[record_hash][0] for record_hash in record_hashes])
+                best_hashes, best_scores = self._vector_index_by_type[title_type].search(queries)
+                for record_hash, best_hash, best_score in zip(record_hashes, best_hashes, best_scores.tolist()):
+                    resolved[record_hash] = self._store_lookup_result(
+                        record_hash, misses[record_hash][0], title_type, best_hash, best_score
+                    )
+
+        return [resolved[record_hash] for _, _, record_hash in items]
+
+    def _store_lookup_result(
+        self,
+        record_hash: str,
+        normalized_array: np.ndarray,
+        title_type: str,
+        best_hash: str | None,
+        best_score: float,
+    ) -> str:
+        if best_hash is not None and best_score > self.similarity_threshold:
             matched_record = TitleRecord(
-                hash=hash,
-                title_type=normalized_title_type,
-                title=best_match.title,
+                hash=record_hash,
+                title_type=title_type,
+                title=self.records_by_hash[best_hash].title,
                 valid_array=normalized_array,
-                png_bytes=_valid_array_to_png_bytes(normalized_array),
                 from_sqlite=False,
                 cache_kind=CACHE_KIND_SIMILAR_MATCH,
             )
@@ -304,11 +643,10 @@ class TitleManager:
             return matched_record.title
 
         miss_record = TitleRecord(
-            hash=hash,
-            title_type=normalized_title_type,
-            title=hash,
+            hash=record_hash,
+            title_type=title_type,
+            title=record_hash,
             valid_array=normalized_array,
-            png_bytes=_valid_array_to_png_bytes(normalized_array),
             from_sqlite=False,
             cache_kind=CACHE_KIND_MISS,
         )
@@ -333,43 +671,96 @@ class TitleManager:
         return output_file
 
     def import_json(self, input_path: str | Path) -> None:
+        """先整体校验，再一次性写进内存，SQL 作为一个批次交给后台线程，在同一个事务里提交。"""
         try:
             payload = json.loads(Path(input_path).read_text(encoding="utf-8"))
-            for item in payload:
-                valid_array = _normalize_valid_array(np.array(item["valid_array"], dtype=np.uint8))
-                title_type = _normalize_title_type(item["title_type"])
-                title = str(item["title"])
-                png_bytes = _decode_png_bytes(item["png_base64"]) if item.get("png_base64") else _valid_array_to_png_bytes(valid_array)
-                computed_hash = ndarray_to_hash(valid_array)
-                if item.get("hash") and item["hash"] != computed_hash:
-                    raise TitleImportError("JSON 里的 hash 和 valid_array 不一致")
-                self.conn.execute(
-                    """
-                    INSERT INTO icon_titles(hash, title_type, title, valid_array_json, png_bytes)
-                    VALUES(?, ?, ?, ?, ?)
-                    ON CONFLICT(hash) DO UPDATE SET
-                        title_type=excluded.title_type,
-                        title=excluded.title,
-                        valid_array_json=excluded.valid_array_json,
-                        png_bytes=excluded.png_bytes
-                    """,
-                    (
-                        computed_hash,
-                        title_type,
-                        title,
-                        _valid_array_to_json(valid_array),
-                        sqlite3.Binary(png_bytes),
-                    ),
-                )
+            records = [_item_to_record(item) for item in payload]
         except TitleImportError:
-            self.conn.rollback()
             raise
         except Exception as exc:
-            self.conn.rollback()
             raise TitleImportError(f"导入标题 JSON 失败: {exc}") from exc
 
-        self.conn.commit()
-        self.rebuild_memory()
+        self._import_records(records)
+
+    def export_ndjson(self, output_path: str | Path, progress: TitleProgressCallback | None = None) -> Path:
+        """每行一条记录，边遍历边写文件；progress(已写条数, 总条数)。
+
+        只带上已经生成过的 PNG，没有的由导入方按 valid_array 现算，导出时不做图片编码。
+        """
+        with self._lock:
+            records = [self.records_by_hash[record_hash] for record_hash in sorted(self.records_by_hash)]
+        total = len(records)
+        output_file = Path(output_path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with output_file.open("w", encoding="utf-8", newline="\n") as handle:
+            for index, record in enumerate(records, start=1):
+                item: dict[str, Any] = {
+                    "hash": record.hash,
+                    "title_type": record.title_type,
+                    "title": record.title,
+                    "valid_array": record.valid_array.tolist(),
+                }
+                if record.png_cache is not None:
+                    item["png_base64"] = _encode_png_bytes(record.png_cache)
+                handle.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")))
+                handle.write("\n")
+                if progress is not None and index % NDJSON_CHUNK_SIZE == 0:
+                    progress(index, total)
+        if progress is not None:
+            progress(total, total)
+        return output_file
+
+    def import_ndjson(
+        self,
+        input_path: str | Path,
+        progress: TitleProgressCallback | None = None,
+        chunk_size: int = NDJSON_CHUNK_SIZE,
+    ) -> int:
+        """逐行读取，每 chunk_size 条更新一次内存和向量索引，并作为一个 executemany 批次交给后台线程。
+
+        progress(已读字节数, 文件总字节数)。某一行出错时抛 TitleImportError，之前的批次已经导入。
+        返回导入的条数。
+        """
+        input_file = Path(input_path)
+        total = input_file.stat().st_size
+        imported = 0
+        chunk: list[TitleRecord] = []
+        with input_file.open("rb") as handle:
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    chunk.append(_item_to_record(json.loads(line)))
+                except Exception as exc:
+                    raise TitleImportError(f"导入标题 NDJSON 第 {line_number} 行失败: {exc}") from exc
+                if len(chunk) >= chunk_size:
+                    self._import_records(chunk)
+                    imported += len(chunk)
+                    chunk = []
+                    if progress is not None:
+                        progress(handle.tell(), total)
+        if chunk:
+            self._import_records(chunk)
+            imported += len(chunk)
+        if progress is not None:
+            progress(total, total)
+        return imported
+
+    def _import_records(self, records: Sequence[TitleRecord]) -> None:
+        with self._lock:
+            self._store_persistent_records(records)
+            self._evict_transient_types({record.title_type for record in records})
+            self.writer.upsert([_record_to_row(record, record.png_cache or b"") for record in records])
+
+    def _evict_transient_types(self, title_types: set[str]) -> None:
+        """导入后这些类型的 miss / 相似匹配可能有了新答案，丢掉临时记录让它们重新匹配。"""
+        stale = [record for record in self.transient_records.records.values() if record.title_type in title_types]
+        for record in stale:
+            self.transient_records.pop(record.hash)
+            self._drop_digest(record)
+        if stale:
+            # 上一帧解出来的 title 也不能再复用。
+            self.revision += 1
 
 
 _DEFAULT_TITLE_MANAGER: TitleManager | None = None
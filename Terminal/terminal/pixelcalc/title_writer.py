@@ -0,0 +1,157 @@
+import logging
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+from .error import TitleError
+
+__all__ = ["TitleWriter", "configure_connection", "UPSERT_TITLE_SQL", "DELETE_TITLE_SQL"]
+
+UPSERT_TITLE_SQL = """
+INSERT INTO icon_titles(hash, title_type, title, valid_array, png_bytes)
+VALUES(?, ?, ?, ?, ?)
+ON CONFLICT(hash) DO UPDATE SET
+    title_type=excluded.title_type,
+    title=excluded.title,
+    valid_array=excluded.valid_array,
+    png_bytes=excluded.png_bytes
+"""
+DELETE_TITLE_SQL = "DELETE FROM icon_titles WHERE hash = ?"
+
+# 队列里的一项：一条 SQL 和它的多组参数，executemany 一次执行。
+_WriteOp = tuple[str, Sequence[tuple[Any, ...]]]
+
+
+def configure_connection(conn: sqlite3.Connection) -> None:
+    """WAL 下读连接不会被写事务挡住，NORMAL 同步级别每个事务只在 checkpoint 时 fsync。"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+
+class TitleWriter(object):
+    """标题记录的后台写入线程。
+
+    TitleManager 先改内存，再把 SQL 丢进队列；线程每次把队列里已有的写操作
+    按顺序合进一个事务提交，UI 线程和解码线程都不用等 SQLite 落盘。
+    合并的事务失败时整批回滚，再逐个写操作单独重试，只丢掉真正出错的那几个；
+    出错的写操作马上通过 log 报告，并在下一次 flush() 或 close() 时抛出。
+    数据库打不开时线程直接退出，之后的 upsert/delete/flush/close 都立即抛出，不会卡在队列上。
+    """
+
+    # 一个事务最多合并多少个写操作。
+    MAX_BATCH: int = 256
+
+    def __init__(self, db_path: str | Path, log: Callable[[str], None] | None = None) -> None:
+        self.db_path = Path(db_path)
+        self._log = log or logging.warning
+        self._queue: queue.Queue[_WriteOp | None] = queue.Queue()
+        self._errors: list[BaseException] = []
+        self._errors_lock = threading.Lock()
+        self._closed = False
+        # 后台线程打开数据库失败的原因；为 None 表示线程正常在跑。
+        self._start_error: BaseException | None = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="TitleWriter", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def upsert(self, rows: Sequence[tuple[Any, ...]]) -> None:
+        """rows 是 (hash, title_type, title, valid_array_blob, png_bytes)。"""
+        self._put(UPSERT_TITLE_SQL, rows)
+
+    def delete(self, record_hashes: Sequence[str]) -> None:
+        self._put(DELETE_TITLE_SQL, [(record_hash,) for record_hash in record_hashes])
+
+    def flush(self) -> None:
+        """等队列里已有的写操作全部提交；后台写入失败时在这里抛出。"""
+        self._raise_start_error()
+        self._queue.join()
+        self._raise_pending_error()
+
+    def close(self) -> None:
+        """提交剩下的写操作后结束线程；还没报告过的写入失败在这里抛出。"""
+        if self._closed:
+            return
+        self._closed = True
+        self._raise_start_error()
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_pending_error()
+
+    def _raise_start_error(self) -> None:
+        if self._start_error is not None:
+            raise TitleError(f"无法打开标题数据库 {self.db_path}: {self._start_error}") from self._start_error
+
+    def _raise_pending_error(self) -> None:
+        with self._errors_lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise TitleError(f"写入标题数据库失败 {len(errors)} 次，第一次: {errors[0]}") from errors[0]
+
+    def _put(self, sql: str, rows: Sequence[tuple[Any, ...]]) -> None:
+        if self._closed:
+            raise TitleError("标题写入线程已关闭")
+        self._raise_start_error()
+        if rows:
+            self._queue.put((sql, rows))
+
+    def _run(self) -> None:
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                configure_connection(conn)
+            except BaseException:
+                conn.close()
+                raise
+        except Exception as exc:
+            # 构造函数等到这里才返回，这时队列里还没有写操作，记下原因让调用方去抛。
+            self._start_error = exc
+            return
+        finally:
+            self._ready.set()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while batch[-1] is not None and len(batch) < self.MAX_BATCH:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._apply([op for op in batch if op is not None], conn)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if batch[-1] is None:
+                    return
+        finally:
+            conn.close()
+
+    def _apply(self, ops: list[_WriteOp], conn: sqlite3.Connection) -> None:
+        if not ops:
+            return
+        try:
+            with conn:
+                for sql, rows in ops:
+                    conn.executemany(sql, rows)
+            return
+        except Exception as exc:
+            if len(ops) == 1:
+                self._report(ops[0], exc)
+                return
+        # 整批已经回滚，逐个重试，不让一个坏的写操作带走同一批里其他无关的记录。
+        for op in ops:
+            try:
+                with conn:
+                    conn.executemany(*op)
+            except Exception as exc:
+                self._report(op, exc)
+
+    def _report(self, op: _WriteOp, error: BaseException) -> None:
+        sql, rows = op
+        kind = "删除" if sql is DELETE_TITLE_SQL else "写入"
+        self._log(f"{kind}标题记录失败，{len(rows)} 条没有保存到数据库: {error}")
+        with self._errors_lock:
+            self._errors.append(error)
@@ -3,16 +3,26 @@ from __future__ import annotations
 from typing import Any
 
 
-from terminal.context import Context
+from terminal.context import Context, FrameHistory
+from terminal.context.tracking import AccessLog
+from terminal.pixelcalc.extractor import LazyFrameSnapshot
+from terminal.pixelcalc.snapshot import FrameSnapshot
 
 
 class BaseRotation:
     name = "BaseRotation"
     desc = "BaseRotation"
+    # 设为 True 表示 main_rotation 的结果只取决于它从 ctx 读到的字段（以及由这些字段算出来的实例状态）。
+    # 流水线会记下一次评估读过哪些字段，下一帧这些字段都没变时直接沿用上次的动作，见 RotationResultCache。
+    # 用了 time.time() 之类 ctx 以外的东西做判断的 rotation 不要打开。
+    # 沿用结果的帧不会调用 main_rotation，里面对实例状态的修改（计数、计时器等）这些帧上都不会发生。
+    track_dependencies = False
 
     def __init__(self) -> None:
 
         self.macroTable = {}
+        # 最近若干帧的数值历史，ctx.history 查的就是它；热重载时沿用旧实例的。
+        self.history = FrameHistory()
 
     def idle(self, reason: str = "") -> tuple[str, Any, str]:
         return "idle", 0.0, reason
@@ -23,13 +33,35 @@ class BaseRotation:
     def cast(self, macro: str) -> tuple[str, Any, str]:
         return "cast", 0.0, macro
 
-    def handle(self, decoded_data: dict[str, Any]) -> tuple[str, Any, str]:
-        ctx = Context(decoded_data)
+    def migrate_state(self, old_instance: "BaseRotation") -> None:
+        """热重载换了新类时，在新实例上调用一次，old_instance 是上一版的实例。
+
+        rotation 实例会一直复用到下一次热重载；需要跨重载保留的状态（调过的阈值、计时器等）
+        在这里从 old_instance 拷过来。默认什么都不做。
+        """
+
+    def handle(
+        self,
+        decoded_data: FrameSnapshot | LazyFrameSnapshot | dict[str, Any],
+        access_log: AccessLog | None = None,
+    ) -> tuple[str, Any, str]:
+        decoded_data = self.record_frame(decoded_data)
+        ctx = Context(decoded_data, access_log, self.history)
         action, timeout, value = self.main_rotation(ctx)
         if action not in {"idle", "wait", "cast"}:
             raise ValueError(f"Invalid action: {action}")
         return action, timeout, value
 
+    def record_frame(
+        self,
+        decoded_data: FrameSnapshot | LazyFrameSnapshot | dict[str, Any],
+    ) -> FrameSnapshot | LazyFrameSnapshot:
+        """把这一帧记进 history。RotationResultCache 沿用结果、不跑 main_rotation 的帧也会调用。"""
+        if isinstance(decoded_data, dict):
+            decoded_data = FrameSnapshot.from_dict(decoded_data)
+        self.history.record(decoded_data)
+        return decoded_data
+
     def main_rotation(self, ctx: Context) -> tuple[str, Any, str]:
         raise NotImplementedError("main_rotation not implemented")
 
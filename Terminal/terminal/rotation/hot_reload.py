@@ -3,10 +3,20 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 import sys
+import threading
 import types
+from typing import Callable, Protocol
 
 from .base import BaseRotation
 
+__all__ = [
+    "HotReloadEvent",
+    "PollingFileWatcher",
+    "RotationFileWatcher",
+    "RotationHotReloadTracker",
+    "WatcherFactory",
+]
+
 
 @dataclass(frozen=True)
 class HotReloadEvent:
@@ -14,8 +24,78 @@ class HotReloadEvent:
     message: str
 
 
+class RotationFileWatcher(Protocol):
+    """盯着一个 rotation 文件，变化时调用 on_change；close() 之后不再回调。"""
+
+    def close(self) -> None: ...
+
+
+# (文件路径, on_change) -> watcher。界面用 QFileSystemWatcher，headless / 引擎进程用 PollingFileWatcher。
+WatcherFactory = Callable[[Path, Callable[[], None]], RotationFileWatcher]
+
+
+class PollingFileWatcher(object):
+    """不依赖 Qt 的文件监视：后台线程按间隔 stat，mtime 或大小变了就调用 on_change。
+
+    on_change 在这个后台线程里执行，读文件、编译都不占用取帧和 rotation 的线程。
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[], None], interval: float = 0.5) -> None:
+        self._path = Path(path)
+        self._on_change = on_change
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._signature = self._stat()
+        self._thread = threading.Thread(target=self._run, name="RotationFileWatcher", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop_event.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(2.0)
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = self._path.stat()
+        except OSError:
+            # 编辑器先删后写的瞬间文件可能不存在，等下一轮再看。
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                continue
+            self._signature = signature
+            try:
+                self._on_change()
+            except Exception:
+                # 回调自己负责报告错误；这里只保证监视线程不退出。
+                pass
+
+
 class RotationHotReloadTracker:
-    def __init__(self, rotation_class: type[BaseRotation] | None = None) -> None:
+    """rotation 热重载。
+
+    取帧路径上的 get_runtime_rotation_class() 只在锁里交换两个引用，不读文件；
+    读源码、编译、exec 新模块由文件监视器回调 check_for_changes() 完成，
+    新类准备好之后才一次性换上，失败时继续用上一版。
+    """
+
+    def __init__(
+        self,
+        rotation_class: type[BaseRotation] | None = None,
+        watcher_factory: WatcherFactory | None = None,
+    ) -> None:
+        self._watcher_factory: WatcherFactory = watcher_factory or PollingFileWatcher
+        self._watcher: RotationFileWatcher | None = None
+        self._lock = threading.Lock()
+        # 同一时间只编译一份；监视器连续报多次变化时排队，源码没变就直接跳过。
+        self._reload_lock = threading.Lock()
+        self._pending_event: HotReloadEvent | None = None
+        # 启动以来热重载成功 / 失败的次数，给指标接口读。
+        self.reload_counts = {"reloaded": 0, "failed": 0}
         self._current_class: type[BaseRotation] | None = None
         self._last_loaded_class: type[BaseRotation] | None = None
         self._module_name = ""
@@ -28,47 +108,86 @@ class RotationHotReloadTracker:
 
     def set_rotation_class(self, rotation_class: type[BaseRotation] | None) -> None:
         if rotation_class is None:
-            self._clear()
+            self._close_watcher()
+            with self._reload_lock, self._lock:
+                self._clear()
             return
 
         module_path = self._resolve_module_path(rotation_class)
         current_source = self._read_source(module_path)
 
-        self._current_class = rotation_class
-        self._last_loaded_class = rotation_class
-        self._module_name = rotation_class.__module__
-        self._class_name = rotation_class.__name__
-        self._module_path = module_path
-        self._last_loaded_source = current_source
-        self._last_attempted_source = current_source
+        with self._reload_lock, self._lock:
+            self._current_class = rotation_class
+            self._last_loaded_class = rotation_class
+            self._module_name = rotation_class.__module__
+            self._class_name = rotation_class.__name__
+            self._module_path = module_path
+            self._last_loaded_source = current_source
+            self._last_attempted_source = current_source
+            self._pending_event = None
+        self._close_watcher()
+        self._watcher = self._watcher_factory(module_path, self.check_for_changes)
 
     def get_runtime_rotation_class(self) -> tuple[type[BaseRotation] | None, HotReloadEvent | None]:
-        if self._last_loaded_class is None or self._module_path is None:
-            return None, None
-
-        current_source = self._read_source(self._module_path)
-        if current_source == self._last_loaded_source:
-            return self._last_loaded_class, None
-        if current_source == self._last_attempted_source:
-            return self._last_loaded_class, None
-
-        self._last_attempted_source = current_source
-
-        try:
-            runtime_class = self._load_rotation_class(current_source)
-        except Exception as error:
-            return self._last_loaded_class, HotReloadEvent(
-                status="failed",
-                message=f"rotation 热重载失败: {self._class_name}，继续使用上一版: {error}",
+        """热路径：返回当前的类和上一次热重载留下的事件（只返回一次）。"""
+        with self._lock:
+            if self._last_loaded_class is None or self._module_path is None:
+                return None, None
+            reload_event, self._pending_event = self._pending_event, None
+            return self._last_loaded_class, reload_event
+
+    def check_for_changes(self) -> HotReloadEvent | None:
+        """文件监视器回调：源码变了就在调用方线程里编译，成功后原子地换上新类。"""
+        with self._reload_lock:
+            with self._lock:
+                module_path = self._module_path
+                last_loaded_source = self._last_loaded_source
+                last_attempted_source = self._last_attempted_source
+            if module_path is None:
+                return None
+
+            try:
+                current_source = self._read_source(module_path)
+            except (OSError, UnicodeDecodeError):
+                # 文件正在保存，等监视器下一次通知。
+                return None
+            if current_source == last_loaded_source or current_source == last_attempted_source:
+                return None
+
+            self._last_attempted_source = current_source
+
+            try:
+                runtime_class = self._load_rotation_class(current_source)
+            except Exception as error:
+                reload_event = HotReloadEvent(
+                    status="failed",
+                    message=f"rotation 热重载失败: {self._class_name}，继续使用上一版: {error}",
+                )
+                with self._lock:
+                    self._pending_event = reload_event
+                    self.reload_counts["failed"] += 1
+                return reload_event
+
+            reload_event = HotReloadEvent(
+                status="reloaded",
+                message=f"rotation 热重载成功: {self._class_name}",
             )
-
-        self._current_class = runtime_class
-        self._last_loaded_class = runtime_class
-        self._last_loaded_source = current_source
-        return runtime_class, HotReloadEvent(
-            status="reloaded",
-            message=f"rotation 热重载成功: {self._class_name}",
-        )
+            with self._lock:
+                self._current_class = runtime_class
+                self._last_loaded_class = runtime_class
+                self._last_loaded_source = current_source
+                self._pending_event = reload_event
+                self.reload_counts["reloaded"] += 1
+            return reload_event
+
+    def close(self) -> None:
+        """停掉文件监视器；之后仍然可以用 set_rotation_class 重新开始。"""
+        self._close_watcher()
+
+    def _close_watcher(self) -> None:
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.close()
 
     def _clear(self) -> None:
         self._current_class = None
@@ -78,6 +197,7 @@ class RotationHotReloadTracker:
         self._module_path = None
         self._last_loaded_source = ""
         self._last_attempted_source = ""
+        self._pending_event = None
 
     def _resolve_module_path(self, rotation_class: type[BaseRotation]) -> Path:
         module = sys.modules.get(rotation_class.__module__)
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import time
 from typing import Any
 
 import numpy as np
@@ -9,13 +8,28 @@ from PySide6.QtGui import QCloseEvent
 from PySide6.QtWidgets import QInputDialog, QMainWindow, QTabWidget
 
 from ..capture import get_monitors
-from ..keyboard import get_windows_by_title, send_hot_key
+from ..key_dispatch import KeyDispatcher
+from ..keyboard import PostMessageKeySender, get_windows_by_title
+from ..metrics import MetricsServer, render_metrics
+from ..pipeline import (
+    PIPELINE_MODE_ASYNCIO,
+    PIPELINE_MODE_UI,
+    ActionDispatcher,
+    AsyncPipelineScheduler,
+    FrameTracer,
+    PipelineRunner,
+    RotationResult,
+    normalize_invalid_reason,
+)
+from ..pipeline.tracing import EVENT_DISPATCH, STAGE_KEY_DOWN
+from ..pixelcalc.extractor import LazyFrameSnapshot
+from ..pixelcalc.snapshot import FrameSnapshot, pop_pending_title_record
 from ..pixelcalc.title_manager import get_default_title_manager
 from ..rotation.base import BaseRotation
 from ..rotation.hot_reload import HotReloadEvent, RotationHotReloadTracker
-from ..workers import CaptureWorker, FrameDecodeWorker, RotationWorker
+from ..workers import CaptureWorker, FrameDecodeWorker, QtRotationFileWatcher, RotationWorker
 from .dialogs import TitleEditorDialog
-from .tabs import AdvancedSettingsTab, DebugTab, HomeTab, OtherTab, PlayerAuraTab, PlayerStatusTab, PluginSpecTab, SpellTab, TargetStatusTab, TeammatesTab
+from .tabs import AdvancedSettingsTab, DebugTab, DiagnosticsTab, HomeTab, OtherTab, PlayerAuraTab, PlayerStatusTab, PluginSpecTab, SpellTab, TargetStatusTab, TeammatesTab
 
 
 class MainWindow(QMainWindow):
@@ -24,8 +38,14 @@ class MainWindow(QMainWindow):
     request_worker_start = Signal(object, int)
     request_worker_stop = Signal()
     request_worker_fps = Signal(int)
+    request_worker_frame_target = Signal(object)
     request_decode_frame = Signal(object, int)
     request_rotation_evaluate = Signal(object, int, object)
+    capture_frame_received = Signal(object, object)
+    pipeline_log = Signal(str)
+    pipeline_titles_changed = Signal()
+    pipeline_capture_started = Signal(object)
+    pipeline_capture_failed = Signal(str)
 
     def __init__(self) -> None:
         super().__init__()
@@ -42,7 +62,10 @@ class MainWindow(QMainWindow):
         self.capture_error = '相机未启动'
         self.capture_frame: Any = None
         self.decoded_matrix: Any = None
-        self.decoded_data: dict[str, Any] | None = None
+        self.decoded_data: FrameSnapshot | LazyFrameSnapshot | None = None
+        # 数据页拿到的是 dict；同一帧只转换一次。
+        self._decoded_dict_source: FrameSnapshot | LazyFrameSnapshot | None = None
+        self._decoded_dict: dict[str, Any] | None = None
         self.decode_state = 'idle'
         self.decode_error = '尚未解析'
         self.decode_result_is_stale = False
@@ -59,11 +82,25 @@ class MainWindow(QMainWindow):
         self._pending_decode_frame: Any = None
         self._pending_decode_frame_id = 0
         self._rotation_in_flight = False
-        self._pending_rotation_data: dict[str, Any] | None = None
+        self._pending_rotation_data: FrameSnapshot | LazyFrameSnapshot | None = None
         self._pending_rotation_frame_id = 0
         self._last_invalid_reason_key: str | None = None
-        self._last_action_signature: tuple[str, str] | None = None
-        self._wait_until_monotonic = 0.0
+        # 每一帧从截图到发按键的时间点，诊断页从这里读汇总。
+        self.frame_tracer = FrameTracer()
+        # 按键在专用线程里发，key-up 由时间轮排期，主线程和流水线线程都不再 sleep。
+        self._key_dispatcher = KeyDispatcher(
+            PostMessageKeySender(),
+            log=self.pipeline_log.emit,
+            on_key_down=lambda latency_ns: self.frame_tracer.observe(STAGE_KEY_DOWN, latency_ns),
+        )
+        self._action_dispatcher = ActionDispatcher(self._append_log, self._send_hot_key)
+        # 流水线模式下 capture/decode/rotation 在 worker 线程之间直连，UI 只定时取快照。
+        self.pipeline_mode = PIPELINE_MODE_UI
+        self._pipeline: PipelineRunner | None = None
+        # 按需解码：字段等 rotation 读到时才解码，数据页刷新时再整帧解完。
+        self.lazy_decode = False
+        # 默认关闭；高级设置里填了端口才起 HTTP 线程。
+        self._metrics_server: MetricsServer | None = None
 
         self.title_manager = get_default_title_manager()
         self.title_editor_dialog: TitleEditorDialog | None = None
@@ -78,8 +115,10 @@ class MainWindow(QMainWindow):
         self.other_tab = OtherTab()
         self.advanced_settings_tab = AdvancedSettingsTab()
         self.debug_tab = DebugTab()
+        self.diagnostics_tab = DiagnosticsTab()
+        self.diagnostics_tab.set_tracer(self.frame_tracer)
         self.advanced_settings_tab.set_title_manager(self.title_manager)
-        self._rotation_hot_reload = RotationHotReloadTracker(self.home_tab.current_rotation_class())
+        self._rotation_hot_reload = RotationHotReloadTracker(self.home_tab.current_rotation_class(), watcher_factory=QtRotationFileWatcher)
 
         self.tab_widget = QTabWidget()
         self.tab_widget.addTab(self.home_tab, '首页')
@@ -92,6 +131,7 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(self.other_tab, '其他')
         self.tab_widget.addTab(self.advanced_settings_tab, '高级设置')
         self.tab_widget.addTab(self.debug_tab, 'debug')
+        self.tab_widget.addTab(self.diagnostics_tab, '诊断')
         self.setCentralWidget(self.tab_widget)
 
         self._ui_refresh_timer = QTimer(self)
@@ -122,6 +162,15 @@ class MainWindow(QMainWindow):
         self.home_tab.refresh_windows_clicked.connect(self._handle_refresh_windows_requested)
         self.home_tab.rotation_combo.currentIndexChanged.connect(self._handle_rotation_changed)
         self.advanced_settings_tab.fps_changed.connect(self._handle_fps_changed)
+        self.advanced_settings_tab.title_library_changed.connect(self._handle_title_library_changed)
+        self.advanced_settings_tab.pipeline_mode_changed.connect(self._handle_pipeline_mode_changed)
+        self.advanced_settings_tab.lazy_decode_changed.connect(self._handle_lazy_decode_changed)
+        self.advanced_settings_tab.metrics_port_changed.connect(self._handle_metrics_port_changed)
+        self.capture_frame_received.connect(self._handle_capture_ready)
+        self.pipeline_log.connect(self._append_log)
+        self.pipeline_titles_changed.connect(self._handle_title_library_changed)
+        self.pipeline_capture_started.connect(self._handle_capture_started)
+        self.pipeline_capture_failed.connect(self._handle_capture_failed)
         self.tab_widget.currentChanged.connect(self._handle_tab_changed)
 
     def _load_monitors_from_system(self) -> None:
@@ -153,6 +202,8 @@ class MainWindow(QMainWindow):
         del index
         self.selected_rotation_class = self.home_tab.current_rotation_class()
         self._rotation_hot_reload.set_rotation_class(self.selected_rotation_class)
+        if self._pipeline is not None and self._pipeline.running:
+            self._pipeline.set_rotation_class(self.selected_rotation_class)
 
     def _handle_open_title_editor_requested(self) -> None:
         if self.title_editor_dialog is None:
@@ -184,12 +235,15 @@ class MainWindow(QMainWindow):
         self.capture_error = '相机未启动'
         self.capture_frame = None
         self._capture_frame_id = 0
+        self.frame_tracer.reset()
         self._reset_decode_state(clear_result=True)
         self._reset_decode_queue()
         self._reset_rotation_state()
         self.home_tab.set_running_state(True)
         self._refresh_visible_data_tab()
         self._append_log('收到启动请求。')
+        if self.pipeline_mode != PIPELINE_MODE_UI:
+            self._start_pipeline()
         self._start_worker_capture(self.monitor_region, self.fps)
 
     def _handle_stop_requested(self) -> None:
@@ -205,6 +259,57 @@ class MainWindow(QMainWindow):
         self._refresh_visible_data_tab()
         self._append_log('收到停止请求。')
         self._stop_worker_capture()
+        self._stop_pipeline()
+
+    def _handle_title_library_changed(self) -> None:
+        if self._pipeline is not None:
+            self._pipeline.reload_titles()
+        if self.title_editor_dialog is not None:
+            self.title_editor_dialog.refresh_database_tabs()
+            self.title_editor_dialog.refresh_live_tabs(force=True)
+
+    def _handle_pipeline_mode_changed(self, mode: str) -> None:
+        self.pipeline_mode = mode
+        if self.is_running:
+            self._append_log('流水线模式将在下次启动时生效。')
+
+    def _handle_lazy_decode_changed(self, enabled: bool) -> None:
+        self.lazy_decode = enabled
+        if self._decode_worker is not None:
+            self._decode_worker.lazy = enabled
+        if self._pipeline is not None:
+            self._pipeline.lazy = enabled
+
+    def _handle_metrics_port_changed(self, port: int) -> None:
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+            self._metrics_server = None
+        if port <= 0:
+            self.advanced_settings_tab.set_metrics_status('')
+            return
+
+        server = MetricsServer(self._render_metrics, port)
+        try:
+            server.start()
+        except OSError as error:
+            self.advanced_settings_tab.set_metrics_status(f'监听失败: {error}')
+            self._append_log(f'指标接口监听 {port} 失败: {error}')
+            return
+        self._metrics_server = server
+        self.advanced_settings_tab.set_metrics_status(f'http://127.0.0.1:{server.port}/metrics')
+
+    def _render_metrics(self) -> str:
+        # 在指标线程里调用，只读各处已有的计数。
+        hot_reload_counts = [self._rotation_hot_reload.reload_counts]
+        pipeline = self._pipeline
+        if pipeline is not None:
+            hot_reload_counts.append(pipeline.hot_reload_counts)
+        return render_metrics(
+            trace_summary=self.frame_tracer.summary(),
+            title_manager=self.title_manager,
+            hot_reload_counts=hot_reload_counts,
+            keys_sent=self._key_dispatcher.sent,
+        )
 
     def _handle_fps_changed(self, value: int) -> None:
         self.fps = value
@@ -222,18 +327,99 @@ class MainWindow(QMainWindow):
     def _log_rotation_hot_reload_event(self, event: HotReloadEvent) -> None:
         self._append_log(event.message)
 
+    def _send_hot_key(self, window_handle: int, hot_key: str) -> None:
+        self._key_dispatcher.send(window_handle, hot_key)
+
+    def _preload_rotation_keys(self, rotation: BaseRotation) -> None:
+        """rotation 实例建好时调用（可能在 worker 线程里），把 macroTable 的热键先解析好。"""
+        self._key_dispatcher.preload_macro_table(rotation.macroTable)
+
+    def _start_pipeline(self) -> None:
+        if self.selected_rotation_class is None:
+            return
+        use_asyncio = self.pipeline_mode == PIPELINE_MODE_ASYNCIO
+        if self._pipeline is not None and isinstance(self._pipeline, AsyncPipelineScheduler) != use_asyncio:
+            self._pipeline.close()
+            self._pipeline = None
+        if self._pipeline is None and use_asyncio:
+            # asyncio 模式自己按 FPS 截图，不用 CaptureWorker 的 QTimer。
+            self._pipeline = AsyncPipelineScheduler(
+                send_key=self._send_hot_key,
+                log=self.pipeline_log.emit,
+                title_manager=self.title_manager,
+                on_titles_changed=self.pipeline_titles_changed.emit,
+                on_capture_started=self.pipeline_capture_started.emit,
+                on_capture_failed=self.pipeline_capture_failed.emit,
+                watcher_factory=QtRotationFileWatcher,
+                on_rotation_created=self._preload_rotation_keys,
+                tracer=self.frame_tracer,
+                lazy=self.lazy_decode,
+            )
+        elif self._pipeline is None:
+            self._pipeline = PipelineRunner(
+                send_key=self._send_hot_key,
+                log=self.pipeline_log.emit,
+                title_manager=self.title_manager,
+                on_titles_changed=self.pipeline_titles_changed.emit,
+                watcher_factory=QtRotationFileWatcher,
+                on_rotation_created=self._preload_rotation_keys,
+                tracer=self.frame_tracer,
+                lazy=self.lazy_decode,
+            )
+        self._pipeline.start(self.selected_rotation_class, self.selected_window_handle, self.pipeline_mode)
+        self._append_log(f'流水线模式: {self.pipeline_mode}')
+
+    def _stop_pipeline(self) -> None:
+        if self._pipeline is not None:
+            self._pipeline.stop()
+
+    def _route_capture_frame(self, frame: Any, capture_ns: tuple[int, int]) -> None:
+        """在截图线程里执行：流水线运行时直接交给解码线程，否则转回主线程走原来的路径。"""
+        pipeline = self._pipeline
+        if pipeline is not None and pipeline.running:
+            pipeline.submit_frame(frame)
+            return
+        self.capture_frame_received.emit(frame, capture_ns)
+
+    def _pull_pipeline_snapshot(self) -> None:
+        pipeline = self._pipeline
+        if pipeline is None or not pipeline.running or not self.is_running:
+            return
+        snapshot = pipeline.snapshot()
+        if snapshot.frame_id > 0:
+            # 帧在 FrameRing 的槽位里，UI 不持有像素，只记录截图已经跑起来了。
+            self.capture_success = True
+            self.capture_error = ''
+        self._capture_frame_id = snapshot.frame_id
+        self.capture_frame = None
+        self.decoded_matrix = None
+        self.decoded_data = snapshot.decoded_data
+        self.decode_state = snapshot.decode_state
+        self.decode_error = snapshot.decode_error
+        self.decode_result_is_stale = snapshot.decode_result_is_stale
+
     def _start_worker_capture(self, monitor_region: dict[str, int], fps: int) -> None:
+        pipeline = self._pipeline
+        if isinstance(pipeline, AsyncPipelineScheduler) and pipeline.running:
+            pipeline.start_capture(monitor_region, fps)
+            return
         self._ensure_capture_worker_thread()
+        # 流水线运行时截图 worker 直接把像素写进流水线的 FrameRing。
+        self.request_worker_frame_target.emit(pipeline if pipeline is not None and pipeline.running else None)
         self.request_worker_fps.emit(fps)
         self.request_worker_start.emit(monitor_region, fps)
 
     def _stop_worker_capture(self) -> None:
+        if isinstance(self._pipeline, AsyncPipelineScheduler):
+            self._pipeline.stop_capture()
         if self._capture_worker_thread is None:
             return
 
         self.request_worker_stop.emit()
 
     def _forward_fps_to_worker(self, value: int) -> None:
+        if isinstance(self._pipeline, AsyncPipelineScheduler):
+            self._pipeline.set_fps(value)
         if self._capture_worker_thread is None:
             return
 
@@ -250,10 +436,11 @@ class MainWindow(QMainWindow):
         self.request_worker_start.connect(self._capture_worker.start_capture)
         self.request_worker_stop.connect(self._capture_worker.stop_capture)
         self.request_worker_fps.connect(self._capture_worker.set_fps)
+        self.request_worker_frame_target.connect(self._capture_worker.set_frame_target)
 
         self._capture_worker.log_message.connect(self._append_log)
         self._capture_worker.capture_started.connect(self._handle_capture_started)
-        self._capture_worker.capture_ready.connect(self._handle_capture_ready)
+        self._capture_worker.capture_ready.connect(self._route_capture_frame, Qt.ConnectionType.DirectConnection)
         self._capture_worker.capture_failed.connect(self._handle_capture_failed)
         self._capture_worker.capture_stopped.connect(self._handle_capture_stopped)
 
@@ -265,7 +452,7 @@ class MainWindow(QMainWindow):
             return
 
         self._decode_worker_thread = QThread(self)
-        self._decode_worker = FrameDecodeWorker()
+        self._decode_worker = FrameDecodeWorker(tracer=self.frame_tracer, lazy=self.lazy_decode)
         self._decode_worker.moveToThread(self._decode_worker_thread)
 
         self.request_decode_frame.connect(self._decode_worker.submit_frame)
@@ -282,13 +469,14 @@ class MainWindow(QMainWindow):
             return
 
         self._rotation_worker_thread = QThread(self)
-        self._rotation_worker = RotationWorker()
+        self._rotation_worker = RotationWorker(self._preload_rotation_keys, self.frame_tracer)
         self._rotation_worker.moveToThread(self._rotation_worker_thread)
 
         self.request_rotation_evaluate.connect(self._rotation_worker.evaluate_rotation)
 
         self._rotation_worker.rotation_ready.connect(self._handle_rotation_ready)
         self._rotation_worker.rotation_failed.connect(self._handle_rotation_failed)
+        self._rotation_worker.log_message.connect(self._append_log)
 
         self._rotation_worker_thread.finished.connect(self._rotation_worker.deleteLater)
         self._rotation_worker_thread.start()
@@ -299,11 +487,12 @@ class MainWindow(QMainWindow):
             f"left={bounds['left']} top={bounds['top']} right={bounds['right']} bottom={bounds['bottom']}"
         )
 
-    def _handle_capture_ready(self, frame: Any) -> None:
+    def _handle_capture_ready(self, frame: Any, capture_ns: tuple[int, int]) -> None:
         self.capture_frame = frame
         self.capture_success = True
         self.capture_error = ''
         self._capture_frame_id += 1
+        self.frame_tracer.capture(self._capture_frame_id, *capture_ns)
         self._submit_frame_to_decode_worker(frame, self._capture_frame_id)
 
     def _submit_frame_to_decode_worker(self, frame: Any, frame_id: int) -> None:
@@ -319,17 +508,20 @@ class MainWindow(QMainWindow):
         self._decode_in_flight = True
         self.request_decode_frame.emit(frame, frame_id)
 
-    def _submit_data_to_rotation_worker(self, data: dict[str, Any], frame_id: int) -> None:
+    def _submit_data_to_rotation_worker(self, data: FrameSnapshot | LazyFrameSnapshot, frame_id: int) -> None:
         if not self.is_running or self.selected_rotation_class is None:
+            self.frame_tracer.finish(frame_id)
             return
 
-        if self._wait_until_monotonic > time.monotonic():
+        if self._action_dispatcher.is_waiting():
+            self.frame_tracer.finish(frame_id)
             return
 
         runtime_rotation_class, reload_event = self._rotation_hot_reload.get_runtime_rotation_class()
         if reload_event is not None:
             self._log_rotation_hot_reload_event(reload_event)
         if runtime_rotation_class is None:
+            self.frame_tracer.finish(frame_id)
             return
         self.selected_rotation_class = runtime_rotation_class
 
@@ -351,6 +543,7 @@ class MainWindow(QMainWindow):
         self._reset_decode_state(clear_result=True)
         self._reset_decode_queue()
         self._reset_rotation_state()
+        self._stop_pipeline()
         self.home_tab.set_running_state(False)
         self._refresh_visible_data_tab()
         self._append_log(reason)
@@ -358,11 +551,11 @@ class MainWindow(QMainWindow):
     def _handle_capture_stopped(self) -> None:
         self._append_log('worker 已停止。')
 
-    def _handle_decode_succeeded(self, frame_id: int, matrix: Any, data: dict[str, Any]) -> None:
+    def _handle_decode_succeeded(self, frame_id: int, matrix: Any, data: FrameSnapshot | LazyFrameSnapshot) -> None:
         if not self.is_running:
             return
 
-        pending_utf_title_record = data.pop('_pending_utf_title_record', None)
+        pending_utf_title_record = pop_pending_title_record(data)
         if pending_utf_title_record is not None:
             self.title_manager.add_record(
                 valid_array=np.array(pending_utf_title_record['valid_array'], dtype=np.uint8),
@@ -387,11 +580,13 @@ class MainWindow(QMainWindow):
         if not self.is_running:
             return
 
+        self.frame_tracer.finish(frame_id)
         self.decode_state = 'invalid_frame'
         self.decode_error = reason
         self.decode_result_is_stale = True
 
-        reason_key = self._normalize_invalid_reason(reason)
+        reason_key = normalize_invalid_reason(reason)
+        self.frame_tracer.count_invalid(reason_key)
         if reason_key != self._last_invalid_reason_key:
             self._append_log(reason)
             self._last_invalid_reason_key = reason_key
@@ -402,6 +597,7 @@ class MainWindow(QMainWindow):
         if not self.is_running:
             return
 
+        self.frame_tracer.finish(frame_id)
         self.decode_state = 'error'
         self.decode_error = reason
         self.decode_result_is_stale = True
@@ -418,42 +614,17 @@ class MainWindow(QMainWindow):
         wait_seconds: float,
         message: str,
     ) -> None:
-        del frame_id
         if not self.is_running:
             return
 
-        if action == 'cast':
-            if macro_name is None:
-                self._finish_rotation_cycle()
-                return
-            if macro_key is None:
-                self._append_log(f'cast: {macro_name}，还没配置按键。')
-                self._finish_rotation_cycle()
-                return
-            signature = ('cast', macro_name)
-            if signature != self._last_action_signature:
-                self._append_log(f'cast: {macro_name}')
-                self._last_action_signature = signature
-            if self.selected_window_handle is not None:
-                send_hot_key(self.selected_window_handle, macro_key)
-            self._finish_rotation_cycle()
-            return
-
-        if action == 'wait':
-            self._wait_until_monotonic = time.monotonic() + wait_seconds
-            self._append_log(f'wait {wait_seconds:.2f}s: {message}')
-            self._last_action_signature = ('wait', message)
-            self._finish_rotation_cycle()
-            return
-
-        signature = ('idle', message)
-        if signature != self._last_action_signature:
-            self._append_log(f'idle: {message}')
-            self._last_action_signature = signature
+        result = RotationResult(frame_id, action, macro_name, macro_key, wait_seconds, message)
+        self._action_dispatcher.dispatch(result, self.selected_window_handle)
+        self.frame_tracer.mark(frame_id, EVENT_DISPATCH)
+        self.frame_tracer.finish(frame_id)
         self._finish_rotation_cycle()
 
     def _handle_rotation_failed(self, frame_id: int, reason: str) -> None:
-        del frame_id
+        self.frame_tracer.finish(frame_id)
         if not self.is_running:
             return
 
@@ -483,6 +654,7 @@ class MainWindow(QMainWindow):
         self._submit_data_to_rotation_worker(next_data, next_frame_id)
 
     def _refresh_visible_data_tab(self) -> None:
+        self._pull_pipeline_snapshot()
         current_widget = self.tab_widget.currentWidget()
         refresh_method = getattr(current_widget, 'refresh_from_decode_snapshot', None)
         if callable(refresh_method):
@@ -490,18 +662,20 @@ class MainWindow(QMainWindow):
 
     def _build_decode_snapshot(self) -> dict[str, Any]:
         return {
-            'decoded_data': self.decoded_data,
+            'decoded_data': self._decoded_data_dict(),
             'decode_state': self.decode_state,
             'decode_error': self.decode_error,
             'decode_result_is_stale': self.decode_result_is_stale,
         }
 
-    def _normalize_invalid_reason(self, reason: str) -> str:
-        if ': ' in reason:
-            return reason.split(': ', 1)[1].strip()
-        if ':' in reason:
-            return reason.split(':', 1)[1].strip()
-        return reason.strip()
+    def _decoded_data_dict(self) -> dict[str, Any] | None:
+        data = self.decoded_data
+        if data is None or isinstance(data, dict):
+            return data
+        if data is not self._decoded_dict_source:
+            self._decoded_dict_source = data
+            self._decoded_dict = data.to_dict()
+        return self._decoded_dict
 
     def _reset_decode_state(self, clear_result: bool) -> None:
         if clear_result:
@@ -521,8 +695,7 @@ class MainWindow(QMainWindow):
         self._rotation_in_flight = False
         self._pending_rotation_data = None
         self._pending_rotation_frame_id = 0
-        self._wait_until_monotonic = 0.0
-        self._last_action_signature = None
+        self._action_dispatcher.reset()
 
     def _shutdown_capture_worker_thread(self) -> None:
         if self._capture_worker_thread is None:
@@ -555,9 +728,19 @@ class MainWindow(QMainWindow):
         self._reset_rotation_state()
 
     def _shutdown_worker_thread(self) -> None:
+        self._stop_pipeline()
         self._shutdown_capture_worker_thread()
         self._shutdown_decode_worker_thread()
         self._shutdown_rotation_worker_thread()
+        # 截图线程已经退出，不会再写 FrameRing，这时才能释放共享内存。
+        if self._pipeline is not None:
+            self._pipeline.close()
+        self._rotation_hot_reload.close()
+        # 还按着的键在这里全部抬起。
+        self._key_dispatcher.stop()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+            self._metrics_server = None
 
     def closeEvent(self, event: QCloseEvent) -> None:
         text, ok = QInputDialog.getText(self, '确认关闭', '输入 exit 以关闭程序: ')
@@ -568,4 +751,6 @@ class MainWindow(QMainWindow):
         if self.title_editor_dialog is not None:
             self.title_editor_dialog.close()
         self._shutdown_worker_thread()
+        # 标题记录是后台线程写入的，退出前把排队的写操作提交完。
+        self.title_manager.flush()
         event.accept()
@@ -1,5 +1,6 @@
 from .advanced_settings_tab import AdvancedSettingsTab
 from .debug import DebugTab, format_debug_output
+from .diagnostics_tab import DiagnosticsTab
 from .home_tab import HomeTab
 from .other import OtherTab
 from .player_aura_tab import PlayerAuraTab
@@ -12,6 +13,7 @@ from .teammates_tab import TeammatesTab
 __all__ = [
     "AdvancedSettingsTab",
     "DebugTab",
+    "DiagnosticsTab",
     "format_debug_output",
     "HomeTab",
     "OtherTab",
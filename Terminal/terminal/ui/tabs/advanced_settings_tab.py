@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Iterator
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, QTimer, Signal
+
+from ...pipeline import PIPELINE_MODE_ASYNCIO, PIPELINE_MODE_FUSED, PIPELINE_MODE_PROCESS, PIPELINE_MODE_THREADED, PIPELINE_MODE_UI
 from PySide6.QtWidgets import (
+    QApplication,
+    QCheckBox,
+    QComboBox,
     QFileDialog,
     QGroupBox,
     QHBoxLayout,
     QLabel,
     QMessageBox,
+    QProgressDialog,
     QPushButton,
     QSlider,
+    QSpinBox,
     QVBoxLayout,
     QWidget,
 )
@@ -24,6 +33,10 @@ class AdvancedSettingsTab(QWidget):
     """
 
     fps_changed = Signal(int)
+    title_library_changed = Signal()
+    pipeline_mode_changed = Signal(str)
+    lazy_decode_changed = Signal(bool)
+    metrics_port_changed = Signal(int)
 
     def __init__(self) -> None:
         super().__init__()
@@ -60,6 +73,67 @@ class AdvancedSettingsTab(QWidget):
         self.fps_layout.addLayout(self.fps_row)
         self.fps_group.setLayout(self.fps_layout)
 
+        self.pipeline_group = QGroupBox('帧流水线')
+        self.pipeline_layout = QVBoxLayout()
+        self.pipeline_layout.setContentsMargins(12, 12, 12, 12)
+        self.pipeline_layout.setSpacing(12)
+
+        self.pipeline_help_label = QLabel(
+            '线程直连：截图、解码、rotation 在 worker 线程之间直接交接最新一帧，界面只定时取快照，刷新表格不再拖慢按键。\n'
+            '单线程融合：解码完在同一个线程里直接跑 rotation，延迟最低。\n'
+            '独立引擎进程：解码和 rotation 在子进程里跑，不和界面抢 GIL；子进程崩溃会自动重启。\n'
+            'asyncio 调度：截图节拍和各阶段交接由 asyncio 协程负责，过期帧不再跑 rotation。下次启动时生效。'
+        )
+        self.pipeline_help_label.setWordWrap(True)
+
+        self.pipeline_mode_combo = QComboBox()
+        self.pipeline_mode_combo.addItem('经主线程转发', PIPELINE_MODE_UI)
+        self.pipeline_mode_combo.addItem('线程直连', PIPELINE_MODE_THREADED)
+        self.pipeline_mode_combo.addItem('单线程融合', PIPELINE_MODE_FUSED)
+        self.pipeline_mode_combo.addItem('独立引擎进程', PIPELINE_MODE_PROCESS)
+        self.pipeline_mode_combo.addItem('asyncio 调度', PIPELINE_MODE_ASYNCIO)
+        self.pipeline_mode_combo.currentIndexChanged.connect(self._handle_pipeline_mode_changed)
+
+        # 数据页打开时界面照样会整帧解码，只是不在 rotation 的路径上。
+        self.lazy_decode_checkbox = QCheckBox('按需解码：只解码 rotation 读到的字段（独立引擎进程模式下无效）')
+        self.lazy_decode_checkbox.toggled.connect(self.lazy_decode_changed.emit)
+
+        self.pipeline_layout.addWidget(self.pipeline_help_label)
+        self.pipeline_layout.addWidget(self.pipeline_mode_combo)
+        self.pipeline_layout.addWidget(self.lazy_decode_checkbox)
+        self.pipeline_group.setLayout(self.pipeline_layout)
+
+        self.metrics_group = QGroupBox('指标接口')
+        self.metrics_layout = QVBoxLayout()
+        self.metrics_layout.setContentsMargins(12, 12, 12, 12)
+        self.metrics_layout.setSpacing(12)
+
+        self.metrics_help_label = QLabel(
+            '在 127.0.0.1 的这个端口上提供 Prometheus 格式的 /metrics：截图帧率、各阶段延迟、无效帧原因、'
+            '标题缓存命中率、热重载次数和已发按键数。0 表示关闭。'
+        )
+        self.metrics_help_label.setWordWrap(True)
+
+        self.metrics_row = QHBoxLayout()
+        self.metrics_row.setContentsMargins(0, 0, 0, 0)
+        self.metrics_row.setSpacing(12)
+
+        self.metrics_port_spin = QSpinBox()
+        self.metrics_port_spin.setRange(0, 65535)
+        self.metrics_port_spin.setSpecialValueText('关闭')
+        # 输完整个端口号再生效，不要每敲一位数字就重新监听一次。
+        self.metrics_port_spin.setKeyboardTracking(False)
+        self.metrics_port_spin.valueChanged.connect(self.metrics_port_changed.emit)
+
+        self.metrics_status_label = QLabel('')
+
+        self.metrics_row.addWidget(QLabel('端口'))
+        self.metrics_row.addWidget(self.metrics_port_spin)
+        self.metrics_row.addWidget(self.metrics_status_label, 1)
+        self.metrics_layout.addWidget(self.metrics_help_label)
+        self.metrics_layout.addLayout(self.metrics_row)
+        self.metrics_group.setLayout(self.metrics_layout)
+
         self.threshold_group = QGroupBox('余弦阈值')
         self.threshold_layout = QVBoxLayout()
         self.threshold_layout.setContentsMargins(12, 12, 12, 12)
@@ -103,8 +177,46 @@ class AdvancedSettingsTab(QWidget):
         self.import_export_layout.addWidget(self.import_button)
         self.import_export_group.setLayout(self.import_export_layout)
 
+        self.title_cache_group = QGroupBox('标题临时缓存')
+        self.title_cache_layout = QVBoxLayout()
+        self.title_cache_layout.setContentsMargins(12, 12, 12, 12)
+        self.title_cache_layout.setSpacing(12)
+
+        self.title_cache_help_label = QLabel(
+            '没有入库的图标（未命中/相似匹配）只在内存里保留最近用过的若干条。\n'
+            '淘汰数一直涨、命中率又低时，可以把容量调大。'
+        )
+        self.title_cache_help_label.setWordWrap(True)
+
+        self.title_cache_row = QHBoxLayout()
+        self.title_cache_row.setContentsMargins(0, 0, 0, 0)
+        self.title_cache_row.setSpacing(12)
+
+        self.title_cache_capacity_spin = QSpinBox()
+        self.title_cache_capacity_spin.setRange(256, 65536)
+        self.title_cache_capacity_spin.setSingleStep(256)
+        self.title_cache_capacity_spin.setSuffix(' 条')
+        self.title_cache_capacity_spin.valueChanged.connect(self._handle_title_cache_capacity_changed)
+
+        self.title_cache_stats_label = QLabel('暂无统计。')
+
+        self.title_cache_row.addWidget(QLabel('容量'))
+        self.title_cache_row.addWidget(self.title_cache_capacity_spin)
+        self.title_cache_row.addWidget(self.title_cache_stats_label, 1)
+        self.title_cache_layout.addWidget(self.title_cache_help_label)
+        self.title_cache_layout.addLayout(self.title_cache_row)
+        self.title_cache_group.setLayout(self.title_cache_layout)
+
+        # 统计只在本页可见时刷新。
+        self.title_cache_timer = QTimer(self)
+        self.title_cache_timer.setInterval(1000)
+        self.title_cache_timer.timeout.connect(self.refresh_title_cache_stats)
+
         self.main_layout.addWidget(self.fps_group)
+        self.main_layout.addWidget(self.pipeline_group)
+        self.main_layout.addWidget(self.metrics_group)
         self.main_layout.addWidget(self.threshold_group)
+        self.main_layout.addWidget(self.title_cache_group)
         self.main_layout.addWidget(self.import_export_group)
         self.main_layout.addStretch()
         self.setLayout(self.main_layout)
@@ -116,6 +228,42 @@ class AdvancedSettingsTab(QWidget):
         self.threshold_slider.setValue(int(round(threshold * 1000)))
         self.threshold_slider.blockSignals(False)
         self.threshold_value_label.setText(f'{threshold:.3f}')
+        self.title_cache_capacity_spin.blockSignals(True)
+        self.title_cache_capacity_spin.setValue(title_manager.cache_stats().capacity)
+        self.title_cache_capacity_spin.blockSignals(False)
+        self.refresh_title_cache_stats()
+
+    def refresh_title_cache_stats(self) -> None:
+        if self.title_manager is None:
+            return
+        stats = self.title_manager.cache_stats()
+        lookups = stats.hits + stats.misses
+        hit_rate = f'{stats.hits / lookups:.1%}' if lookups else '-'
+        self.title_cache_stats_label.setText(
+            f'已用 {stats.size}/{stats.capacity}，命中 {stats.hits}，未命中 {stats.misses}，'
+            f'命中率 {hit_rate}，淘汰 {stats.evictions}'
+        )
+
+    def set_metrics_status(self, text: str) -> None:
+        self.metrics_status_label.setText(text)
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        self.refresh_title_cache_stats()
+        self.title_cache_timer.start()
+
+    def hideEvent(self, event) -> None:
+        self.title_cache_timer.stop()
+        super().hideEvent(event)
+
+    def _handle_title_cache_capacity_changed(self, value: int) -> None:
+        if self.title_manager is None:
+            return
+        self.title_manager.set_transient_capacity(value)
+        self.refresh_title_cache_stats()
+
+    def _handle_pipeline_mode_changed(self, index: int) -> None:
+        self.pipeline_mode_changed.emit(str(self.pipeline_mode_combo.itemData(index)))
 
     def _handle_fps_slider_changed(self, value: int) -> None:
         self.fps_value_label.setText(f'{value} FPS')
@@ -136,13 +284,17 @@ class AdvancedSettingsTab(QWidget):
             self,
             '导出标题库',
             str(Path('title-manager-export.json').resolve()),
-            'JSON 文件 (*.json)',
+            _TITLE_LIBRARY_FILTER,
         )
         if not path:
             return
 
         try:
-            self.title_manager.export_json(path)
+            if _is_ndjson_path(path):
+                with self._title_progress('正在导出标题库…') as progress:
+                    self.title_manager.export_ndjson(path, progress=progress)
+            else:
+                self.title_manager.export_json(path)
         except Exception as exc:
             QMessageBox.warning(self, '导出失败', str(exc))
             return
@@ -157,15 +309,48 @@ class AdvancedSettingsTab(QWidget):
             self,
             '导入标题库',
             '',
-            'JSON 文件 (*.json)',
+            _TITLE_LIBRARY_FILTER,
         )
         if not path:
             return
 
         try:
-            self.title_manager.import_json(path)
+            if _is_ndjson_path(path):
+                with self._title_progress('正在导入标题库…') as progress:
+                    self.title_manager.import_ndjson(path, progress=progress)
+            else:
+                self.title_manager.import_json(path)
         except Exception as exc:
+            # NDJSON 出错前已经导入的批次仍然有效，标题编辑器也要刷新。
+            self.title_library_changed.emit()
             QMessageBox.warning(self, '导入失败', str(exc))
             return
 
+        self.title_library_changed.emit()
         QMessageBox.information(self, '导入成功', f'已从下列文件导入:\n{path}')
+
+    @contextmanager
+    def _title_progress(self, label: str) -> Iterator[Callable[[int, int], None]]:
+        """NDJSON 导入导出时的进度对话框，yield 的回调直接交给 TitleManager。"""
+        dialog = QProgressDialog(label, '', 0, 1000, self)
+        dialog.setWindowTitle('标题库')
+        dialog.setCancelButton(None)
+        dialog.setMinimumDuration(300)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+
+        def report(done: int, total: int) -> None:
+            dialog.setValue(int(1000 * done / total) if total > 0 else 1000)
+            QApplication.processEvents()
+
+        try:
+            yield report
+        finally:
+            dialog.close()
+            dialog.deleteLater()
+
+
+_TITLE_LIBRARY_FILTER = 'JSON 文件 (*.json);;NDJSON 文件 (*.ndjson *.jsonl)'
+
+
+def _is_ndjson_path(path: str) -> bool:
+    return Path(path).suffix.lower() in {'.ndjson', '.jsonl'}
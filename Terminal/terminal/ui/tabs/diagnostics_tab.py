@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from PySide6.QtWidgets import (
+    QFileDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QMessageBox,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ...pipeline.tracing import DROP_DECODE_OVERWRITE, DROP_EVICTED, DROP_ROTATION_OVERWRITE, FrameTracer, TraceSummary
+
+STAGE_LABELS = {
+    'capture': '截图',
+    'decode_wait': '等待解码',
+    'decode': '解码',
+    'rotation_wait': '等待 rotation',
+    'rotation': 'rotation',
+    'dispatch': '交给按键分发',
+    'key_down': '按键发出',
+    'total': '整帧',
+}
+
+DROP_LABELS = {
+    DROP_DECODE_OVERWRITE: '解码前被新帧覆盖',
+    DROP_ROTATION_OVERWRITE: 'rotation 前被新帧覆盖',
+    DROP_EVICTED: '在途记录溢出',
+}
+
+_COLUMNS = ('阶段', '样本数', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', '最大 (ms)')
+
+
+def format_drop_counts(drops: dict[str, int]) -> str:
+    return '  '.join(f'{DROP_LABELS.get(reason, reason)}: {count}' for reason, count in drops.items())
+
+
+class DiagnosticsTab(QWidget):
+    """“诊断”页：每个阶段最近一段时间的 p50/p95/p99 延迟、覆盖丢帧数，可以把逐帧记录导出成 CSV。
+
+    数据全部来自 FrameTracer，本页只在可见时随 UI 刷新定时器读一次汇总。
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        self.tracer: FrameTracer | None = None
+
+        self.help_label = QLabel('时间从截图开始计，按帧号串起截图、解码、rotation 和发按键；统计窗口是最近 2048 个样本。')
+        self.help_label.setWordWrap(True)
+
+        self.table = QTableWidget(0, len(_COLUMNS))
+        self.table.setHorizontalHeaderLabels(list(_COLUMNS))
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+
+        self.drops_label = QLabel('')
+        self.frames_label = QLabel('')
+
+        self.export_button = QPushButton('导出 CSV')
+        self.export_button.clicked.connect(self._handle_export_clicked)
+        self.clear_button = QPushButton('清空')
+        self.clear_button.clicked.connect(self._handle_clear_clicked)
+
+        self.toolbar_layout = QHBoxLayout()
+        self.toolbar_layout.addWidget(self.export_button)
+        self.toolbar_layout.addWidget(self.clear_button)
+        self.toolbar_layout.addStretch()
+
+        self.main_layout = QVBoxLayout()
+        self.main_layout.setContentsMargins(24, 24, 24, 24)
+        self.main_layout.setSpacing(12)
+        self.main_layout.addWidget(self.help_label)
+        self.main_layout.addLayout(self.toolbar_layout)
+        self.main_layout.addWidget(self.table, 1)
+        self.main_layout.addWidget(self.frames_label)
+        self.main_layout.addWidget(self.drops_label)
+        self.setLayout(self.main_layout)
+
+    def set_tracer(self, tracer: FrameTracer) -> None:
+        self.tracer = tracer
+        self.show_summary(tracer.summary())
+
+    def refresh_from_decode_snapshot(self, snapshot: dict[str, Any]) -> None:
+        del snapshot
+        if self.tracer is not None:
+            self.show_summary(self.tracer.summary())
+
+    def show_summary(self, summary: TraceSummary) -> None:
+        self.table.setRowCount(len(summary.stages))
+        for row, stage in enumerate(summary.stages):
+            values = (
+                STAGE_LABELS.get(stage.stage, stage.stage),
+                str(stage.count),
+                f'{stage.p50_ms:.2f}',
+                f'{stage.p95_ms:.2f}',
+                f'{stage.p99_ms:.2f}',
+                f'{stage.max_ms:.2f}',
+            )
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.frames_label.setText(f'已走完 {summary.completed} 帧，在途 {summary.in_flight} 帧')
+        self.drops_label.setText(format_drop_counts(summary.drops))
+
+    def _handle_export_clicked(self) -> None:
+        if self.tracer is None:
+            return
+
+        path, _selected_filter = QFileDialog.getSaveFileName(
+            self,
+            '导出帧延迟记录',
+            str(Path('frame-trace.csv').resolve()),
+            'CSV (*.csv)',
+        )
+        if not path:
+            return
+
+        try:
+            rows = self.tracer.write_csv(path)
+        except OSError as exc:
+            QMessageBox.warning(self, '导出失败', str(exc))
+            return
+
+        QMessageBox.information(self, '导出成功', f'已导出 {rows} 帧到:\n{path}')
+
+    def _handle_clear_clicked(self) -> None:
+        if self.tracer is None:
+            return
+        self.tracer.reset()
+        self.show_summary(self.tracer.summary())
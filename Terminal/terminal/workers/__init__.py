@@ -1,5 +1,6 @@
 from .capture_worker import CaptureWorker
 from .frame_decode_worker import FrameDecodeWorker
+from .rotation_file_watcher import QtRotationFileWatcher
 from .rotation_worker import RotationWorker
 
-__all__ = ["CaptureWorker", "FrameDecodeWorker", "RotationWorker"]
+__all__ = ["CaptureWorker", "FrameDecodeWorker", "QtRotationFileWatcher", "RotationWorker"]
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import time
+from typing import Any
+
 from PySide6.QtCore import QObject, QTimer, Qt, Signal
 
-from ..capture.capture_screen import build_monitor_dict, capture_screen
-from ..capture.find_template_bounds import find_template_bounds
+from ..capture.capture_loop import locate_capture_region
+from ..capture.capture_screen import capture_screen
 
 
 class CaptureWorker(QObject):
@@ -17,10 +20,13 @@ class CaptureWorker(QObject):
     3. 找标志位。
     4. 找到后只截小区域。
     5. 用 Qt 定时器按 FPS 持续循环。
+
+    设置了帧目标（PipelineRunner）时，小区域截图直接写进它的 FrameRing 槽位，
+    不再通过 capture_ready 发出新数组。
     """
 
     log_message = Signal(str)
-    capture_ready = Signal(object)
+    capture_ready = Signal(object, object)
     capture_started = Signal(object)
     capture_failed = Signal(str)
     capture_stopped = Signal()
@@ -32,6 +38,7 @@ class CaptureWorker(QObject):
         self._fps = 15
         self._monitor_region: dict[str, int] | None = None
         self._capture_region: dict[str, int] | None = None
+        self._frame_target: Any = None
 
         # 用 QTimer 而不是 while + sleep，
         # 这样 stop / fps 更新都还能继续走 Qt 自己的事件循环。
@@ -47,6 +54,11 @@ class CaptureWorker(QObject):
         self._fps = max(1, int(value))
         self._update_timer_interval()
 
+    def set_frame_target(self, target: Any) -> None:
+        """设置帧目标，需要提供 write_frame(height, width, fill)；传 None 恢复 capture_ready。"""
+
+        self._frame_target = target
+
     def start_capture(self, monitor_region: dict[str, int], fps: int) -> None:
         """启动截图。
 
@@ -66,26 +78,20 @@ class CaptureWorker(QObject):
         self.log_message.emit('开始整屏查找标志位。')
 
         try:
-            full_frame = capture_screen(monitor_region=self._monitor_region, region=None)
+            capture_region = locate_capture_region(self._monitor_region)
         except Exception as error:  # pragma: no cover - 具体系统错误文字依赖 Windows API
             self._fail_and_reset(f'整屏截图失败: {error}')
             return
 
-        bounds = find_template_bounds(full_frame)
-        if bounds is None:
+        if capture_region is None:
             self._fail_and_reset('未找到标志位，已自动停机。')
             return
 
-        left, top, right, bottom = bounds
-        self._capture_region = build_monitor_dict(
-            left=left,
-            top=top,
-            right=right,
-            bottom=bottom,
-        )
+        self._capture_region = capture_region
         self.log_message.emit(
             '已锁定截图区域: '
-            f'left={left} top={top} right={right} bottom={bottom}'
+            f"left={capture_region['left']} top={capture_region['top']} "
+            f"right={capture_region['right']} bottom={capture_region['bottom']}"
         )
         self.capture_started.emit(self._capture_region)
         self._capture_current_region()
@@ -119,16 +125,29 @@ class CaptureWorker(QObject):
             self._fail_and_reset('截图区域还没准备好。')
             return
 
+        monitor_region = self._monitor_region
+        capture_region = self._capture_region
+        frame_target = self._frame_target
         try:
+            if frame_target is not None:
+                frame_target.write_frame(
+                    capture_region['height'],
+                    capture_region['width'],
+                    lambda out: capture_screen(monitor_region=monitor_region, region=capture_region, out=out),
+                )
+                return
+            capture_start_ns = time.monotonic_ns()
             frame = capture_screen(
-                monitor_region=self._monitor_region,
-                region=self._capture_region,
+                monitor_region=monitor_region,
+                region=capture_region,
             )
+            capture_end_ns = time.monotonic_ns()
         except Exception as error:  # pragma: no cover - 具体系统错误文字依赖 Windows API
             self._fail_and_reset(f'小区域截图失败: {error}')
             return
 
-        self.capture_ready.emit(frame)
+        # 帧号由主线程分配，这里把截图起止时间点一起带过去。
+        self.capture_ready.emit(frame, (capture_start_ns, capture_end_ns))
 
     def _fail_and_reset(self, reason: str) -> None:
         """发生异常时统一走这里，避免状态只改一半。"""
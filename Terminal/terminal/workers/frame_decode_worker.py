@@ -4,8 +4,8 @@ from typing import Any
 
 from PySide6.QtCore import QObject, Signal
 
-from ..pixelcalc.extractor import extract_all_data
-from ..pixelcalc.matrix import MatrixDecoder
+from ..pipeline.stages import DECODE_INVALID_FRAME, DECODE_SUCCESS, FrameDecoder
+from ..pipeline.tracing import EVENT_DECODE_END, EVENT_DECODE_START, FrameTracer
 
 
 class FrameDecodeWorker(QObject):
@@ -13,38 +13,57 @@ class FrameDecodeWorker(QObject):
 
     这个 worker 只做解码，不碰 UI，也不负责排队策略。
     主线程决定哪些帧要丢掉，这里只处理真正交进来的那一帧。
+
+    incremental 打开时会保留上一帧成功解码的 Matrix，本帧只重新解码像素变化过的字段，
+    变化的字段名放在 matrix.changed_fields 里（None 表示整帧重解）。
+    lazy 打开时发出去的是 LazyFrameSnapshot，字段在 rotation 读到时才解码。
+    具体的校验和解码由 FrameDecoder 完成，流水线模式下解码线程直接用同一个类。
     """
 
     frame_decoded = Signal(int, object, object)
     frame_invalid = Signal(int, str)
     frame_failed = Signal(int, str)
 
-    def submit_frame(self, frame: Any, frame_id: int) -> None:
-        """解码一帧；校验不过就直接返回无效状态。"""
+    def __init__(
+        self,
+        incremental: bool = True,
+        parent: QObject | None = None,
+        tracer: FrameTracer | None = None,
+        lazy: bool = False,
+    ) -> None:
+        super().__init__(parent)
+        self._decoder = FrameDecoder(incremental=incremental, lazy=lazy)
+        self._tracer = tracer or FrameTracer(enabled=False)
 
-        matrix = MatrixDecoder(frame)
-        flash_cell = matrix.getCell(54, 9)
+    @property
+    def incremental(self) -> bool:
+        return self._decoder.incremental
 
-        if not (flash_cell.is_black or flash_cell.is_white):
-            self.frame_invalid.emit(frame_id, f'第 {frame_id} 帧校验失败: flash cell 不是纯黑或纯白。')
-            return
+    @incremental.setter
+    def incremental(self, value: bool) -> None:
+        self._decoder.incremental = value
 
-        if not matrix.getCell(0, 0).is_pure:
-            self.frame_invalid.emit(frame_id, f'第 {frame_id} 帧校验失败: 左上角锚点 cell 不是纯色。')
-            return
+    @property
+    def lazy(self) -> bool:
+        return self._decoder.lazy
 
-        if not matrix.getCell(82, 2).is_white:
-            self.frame_invalid.emit(frame_id, f'第 {frame_id} 帧校验失败: 右上角锚点 cell 不是白色。')
-            return
+    @lazy.setter
+    def lazy(self, value: bool) -> None:
+        self._decoder.lazy = value
 
-        if matrix.readCharCell(0, 2) == 0:
-            self.frame_invalid.emit(frame_id, f'第 {frame_id} 帧校验失败: 文字检测帧异常。尝试/reload')
-            return
+    def reset_incremental_state(self) -> None:
+        """丢掉上一帧，下一帧整帧重新解码。"""
+        self._decoder.reset_incremental_state()
 
-        try:
-            data = extract_all_data(matrix)
-        except Exception as error:
-            self.frame_failed.emit(frame_id, f'第 {frame_id} 帧解析异常: {error}')
-            return
+    def submit_frame(self, frame: Any, frame_id: int) -> None:
+        """解码一帧；校验不过就直接返回无效状态。"""
 
-        self.frame_decoded.emit(frame_id, matrix, data)
+        self._tracer.mark(frame_id, EVENT_DECODE_START)
+        result = self._decoder.decode(frame, frame_id)
+        self._tracer.mark(frame_id, EVENT_DECODE_END)
+        if result.status == DECODE_SUCCESS:
+            self.frame_decoded.emit(frame_id, result.matrix, result.data)
+        elif result.status == DECODE_INVALID_FRAME:
+            self.frame_invalid.emit(frame_id, result.reason)
+        else:
+            self.frame_failed.emit(frame_id, result.reason)
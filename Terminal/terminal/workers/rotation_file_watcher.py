@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer
+
+# 一次保存往往连着发好几次通知，最后一次通知之后再等这么久才去重载。
+RELOAD_DEBOUNCE_MS = 100
+
+
+class QtRotationFileWatcher(QObject):
+    """界面用的 rotation 文件监视器，交给 RotationHotReloadTracker 当 watcher_factory。
+
+    QFileSystemWatcher 由系统通知文件变化，不再轮询；同时盯着所在目录，编辑器“先删再写”或
+    “写临时文件再改名”导致文件监视失效时，等文件重新出现再挂上。连续的通知合并成一次，
+    on_change（读源码、编译）交给一个单线程的线程池跑，不卡 UI 线程。需要在 GUI 线程里创建。
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[], None]) -> None:
+        super().__init__()
+        self._path = str(Path(path))
+        self._on_change = on_change
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RotationHotReload")
+        self._pending: Future | None = None
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(RELOAD_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._reload)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.addPath(self._path)
+        self._watcher.addPath(str(Path(self._path).parent))
+        self._watcher.fileChanged.connect(self._handle_file_changed)
+        self._watcher.directoryChanged.connect(self._handle_directory_changed)
+
+    def close(self) -> None:
+        self._closed = True
+        self._debounce.stop()
+        self._watcher.fileChanged.disconnect(self._handle_file_changed)
+        self._watcher.directoryChanged.disconnect(self._handle_directory_changed)
+        paths = self._watcher.files() + self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+        self._executor.shutdown(wait=False)
+
+    def _handle_file_changed(self, path: str) -> None:
+        if self._closed:
+            return
+        # 文件被删掉时监视已经失效；文件回来时由 directoryChanged 重新挂上。
+        self._rewatch()
+        self._debounce.start()
+
+    def _handle_directory_changed(self, path: str) -> None:
+        if self._closed:
+            return
+        # 目录里别的文件变了不用管，只在文件监视丢了、文件又回来时重载一次。
+        if self._path not in self._watcher.files() and self._rewatch():
+            self._debounce.start()
+
+    def _rewatch(self) -> bool:
+        """文件存在且还没在监视列表里时重新挂上；返回文件现在是否被监视。"""
+        if self._path in self._watcher.files():
+            return True
+        return Path(self._path).exists() and self._watcher.addPath(self._path)
+
+    def _reload(self) -> None:
+        if self._closed:
+            return
+        self._rewatch()
+        pending = self._pending
+        # 上一次还排着没开始跑，它开始时读到的就是最新的文件，不用再排一次。
+        if pending is not None and not pending.running() and not pending.done():
+            return
+        self._pending = self._executor.submit(self._on_change)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Callable
 
 from PySide6.QtCore import QObject, Signal
 
+from ..pipeline.stages import RotationInstances, RotationResultCache
+from ..pixelcalc.extractor import LazyFrameSnapshot
+from ..pixelcalc.snapshot import FrameSnapshot
+from ..pipeline.tracing import EVENT_ROTATION_END, EVENT_ROTATION_START, FrameTracer
 from ..rotation.base import BaseRotation
 
 
@@ -12,28 +16,41 @@ class RotationWorker(QObject):
 
     rotation_ready = Signal(int, str, object, object, float, str)
     rotation_failed = Signal(int, str)
+    log_message = Signal(str)
+
+    def __init__(
+        self,
+        on_rotation_created: Callable[[BaseRotation], None] | None = None,
+        tracer: FrameTracer | None = None,
+    ) -> None:
+        super().__init__()
+        self._rotations = RotationInstances(on_rotation_created)
+        self._results = RotationResultCache()
+        self._tracer = tracer or FrameTracer(enabled=False)
 
     def evaluate_rotation(
         self,
-        decoded_data: dict[str, Any],
+        decoded_data: FrameSnapshot | LazyFrameSnapshot,
         frame_id: int,
         rotation_class: type[BaseRotation],
     ) -> None:
+        self._tracer.mark(frame_id, EVENT_ROTATION_START)
         try:
-            rotation = rotation_class()
-            action, timeout, value = rotation.handle(decoded_data)
+            rotation, migrate_message = self._rotations.get(rotation_class)
+            if migrate_message is not None:
+                self.log_message.emit(migrate_message)
+            result = self._results.evaluate(decoded_data, frame_id, rotation)
         except Exception as error:
+            self._tracer.mark(frame_id, EVENT_ROTATION_END)
             self.rotation_failed.emit(frame_id, f"第 {frame_id} 帧 rotation 异常: {error}")
             return
-
-        if action == "cast":
-            macro_name = str(value)
-            macro_key = rotation.getMacroKey(macro_name)
-            self.rotation_ready.emit(frame_id, action, macro_name, macro_key, 0.0, macro_name)
-            return
-
-        if action == "wait":
-            self.rotation_ready.emit(frame_id, action, None, None, float(timeout), str(value))
-            return
-
-        self.rotation_ready.emit(frame_id, action, None, None, 0.0, str(value))
+        self._tracer.mark(frame_id, EVENT_ROTATION_END)
+
+        self.rotation_ready.emit(
+            frame_id,
+            result.action,
+            result.macro_name,
+            result.macro_key,
+            result.wait_seconds,
+            result.message,
+        )
@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.pixelcalc.cell import CellRegion
+from terminal.pixelcalc.cell_grid import CellGrid
+from terminal.pixelcalc.matrix import MatrixDecoder
+
+
+def _build_random_matrix(seed: int, width_cells: int = 84, height_cells: int = 28) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    palette = np.array([[0, 0, 0], [255, 255, 255], [0, 255, 0], [60, 100, 220], [150, 150, 150]], dtype=np.uint8)
+    matrix = np.zeros((height_cells * 4, width_cells * 4, 3), dtype=np.uint8)
+    for y in range(height_cells):
+        for x in range(width_cells):
+            block = matrix[y * 4:y * 4 + 4, x * 4:x * 4 + 4]
+            if rng.random() < 0.7:
+                block[:] = palette[rng.integers(len(palette))]
+            else:
+                block[:] = palette[rng.integers(len(palette), size=(4, 4))]
+    return matrix
+
+
+def test_cell_view_matches_region_statistics() -> None:
+    matrix_data = _build_random_matrix(seed=1)
+    decoder = MatrixDecoder(matrix_data)
+
+    for y in range(28):
+        for x in range(84):
+            cell = decoder.getCell(x, y)
+            region = CellRegion(matrix_data[y * 4 + 1:y * 4 + 3, x * 4 + 1:x * 4 + 3])
+
+            assert cell.is_pure == region.is_pure
+            assert cell.mean == region.mean
+            assert cell.percent == region.percent
+            assert cell.color == region.color
+            assert cell.is_black == region.is_black
+            assert cell.is_white == region.is_white
+            assert cell.remaining == region.remaining
+            assert cell.white_count == region.white_count
+
+
+def test_badge_and_char_views_match_region_statistics() -> None:
+    matrix_data = _build_random_matrix(seed=2)
+    decoder = MatrixDecoder(matrix_data)
+
+    for y in range(27):
+        for x in range(83):
+            pix_array = matrix_data[y * 4:y * 4 + 8, x * 4:x * 4 + 8]
+            badge = decoder.getBadgeCell(x, y)
+            footnote = CellRegion(pix_array[-2:, -2:])
+
+            assert badge.is_black == CellRegion(pix_array[3:5, 3:5]).is_black
+            assert badge.footnote_is_pure == footnote.is_pure
+            assert badge.footnote_is_black == (footnote.is_pure and footnote.is_black)
+            assert badge.footnote_color_string == footnote.color_string
+            white_count = CellRegion(pix_array).white_count
+            expected_count = white_count if white_count <= 9 else (0 if white_count == 10 else 10)
+            assert decoder.readCharCell(x, y) == expected_count
+
+
+def test_read_bar_value_counts_middle_rows() -> None:
+    matrix_data = np.zeros((28 * 4, 84 * 4, 3), dtype=np.uint8)
+    matrix_data[16 * 4 + 1:16 * 4 + 3, 43 * 4:48 * 4] = 255
+    decoder = MatrixDecoder(matrix_data)
+
+    assert decoder.readBarValue(43, 16, 20) == 25.0
+
+
+def test_incremental_grid_matches_full_recompute() -> None:
+    previous_data = _build_random_matrix(seed=3)
+    current_data = previous_data.copy()
+    current_data[10 * 4:12 * 4, 20 * 4:23 * 4] = _build_random_matrix(seed=4)[10 * 4:12 * 4, 20 * 4:23 * 4]
+    previous = CellGrid(previous_data)
+
+    incremental = CellGrid(current_data, previous)
+    full = CellGrid(current_data)
+
+    assert incremental.changed is not None
+    assert set(zip(*incremental.changed.nonzero())) <= {(y, x) for y in (10, 11) for x in (20, 21, 22)}
+    for name in ("color", "is_pure", "mean", "white_count", "inner_white_count", "bar_white_count", "footnote_is_black",
+                 "badge_core_is_black", "char_white_count", "packed_color"):
+        assert np.array_equal(getattr(incremental, name), getattr(full, name)), name
@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.context import Context
+from terminal.context.error import ContextError
+from terminal.context.tracking import AccessLog
+
+
+def _spell(title: str, cooldown: float = 0.0) -> dict:
+    return {"title": title, "cooldown": cooldown, "is_usable": True, "is_known": True, "is_charge": False, "charges": 0}
+
+
+def _aura(title: str, remain: float, count: int = 1) -> dict:
+    return {"title": title, "remain": remain, "count": count, "type": "MAGIC", "color_string": "0,0,0"}
+
+
+def _unit(token: str, exists: bool = True, buff: list | None = None, debuff: list | None = None) -> dict:
+    return {"unitToken": token, "exists": exists, "status": {}, "buff": buff or [], "debuff": debuff or []}
+
+
+def _decoded_data() -> dict:
+    return {
+        "spell": [_spell("公共冷却时间", 0.1), _spell("真言术：盾", 3.0), _spell("真言术：盾", 0.0)],
+        "player": _unit("player", buff=[_aura("救赎", 5.0), _aura("救赎", 1.0), _aura("暗影之力", 2.0, 3)]),
+        "target": _unit("target", debuff=[_aura("暗言术：痛", 8.0)]),
+        "focus": _unit("focus", exists=False),
+        "mouseover": _unit("mouseover", exists=False),
+        "party": {
+            "party1": _unit("party1", buff=[_aura("救赎", 4.0)]),
+            "party2": _unit("party2", exists=False),
+            "party3": _unit("party3"),
+            "party4": _unit("party4", exists=False),
+        },
+    }
+
+
+def test_context_lookups_are_memoized_and_keep_first_match() -> None:
+    ctx = Context(_decoded_data())
+
+    shield = ctx.spell("真言术：盾")
+    assert shield is not None and shield.cooldown == 3.0
+    assert ctx.spell("真言术：盾") is shield
+    assert ctx.spell("不存在") is None
+    assert ctx.gcd_ready() is True
+    assert ctx.spell_cooldown_ready("真言术：盾") is False
+
+    assert ctx.player is ctx.player
+    assert ctx.party(1) is ctx.parties[0]
+    assert [unit.unitToken for unit in ctx.parties] == ["party1", "party3"]
+    ctx.parties.clear()
+    assert len(ctx.parties) == 2
+
+    player = ctx.player
+    assert player.buff[0] is player.buff[0]
+    player.buff.clear()
+    ctx.target.debuff.clear()
+    assert len(player.buff) == 3
+    assert player.hasBuff("救赎")
+    assert player.buffRemain("救赎") == 5.0
+    assert player.buffStack("暗影之力") == 3
+    assert player.buffByName("不存在") is None
+    assert ctx.target.debuffRemain("暗言术：痛") == 8.0
+    with pytest.raises(ContextError):
+        ctx.target.hasBuff("救赎")
+    with pytest.raises(ContextError):
+        ctx.focus.hasDebuff("暗言术：痛")
+
+
+def test_context_wrappers_use_slots() -> None:
+    ctx = Context(_decoded_data())
+
+    for wrapper in (ctx, ctx.spell("公共冷却时间"), ctx.player.buff[0]):
+        assert not hasattr(wrapper, "__dict__")
+
+    # rotation 在队友身上挂的字段同一帧里都还在。
+    ctx.party(1).health_score = 42.0
+    assert ctx.parties[0].health_score == 42.0
+    assert Context(_decoded_data()).party(1).__dict__ == {}
+
+
+def test_access_log_records_reads_and_detects_changes() -> None:
+    log = AccessLog()
+    ctx = Context(_decoded_data(), log)
+
+    assert ctx.spell_cooldown_ready("真言术：盾") is False
+    assert ctx.player.buffRemain("救赎") == 5.0
+    assert [unit.unitToken for unit in ctx.parties] == ["party1", "party3"]
+
+    assert ("unit", "player", "hasBuff", "救赎") in log.reads
+    assert ("unit", "party2", "exists") in log.reads
+    assert ("unit", "party1", "buff", "救赎") not in log.reads
+    assert log.countdown == 3.0
+    assert log.unchanged(Context(_decoded_data()))
+
+    changed = _decoded_data()
+    changed["party"]["party2"]["exists"] = True
+    assert not log.unchanged(Context(changed))
+    unrelated = _decoded_data()
+    unrelated["party"]["party1"]["buff"] = []
+    assert log.unchanged(Context(unrelated))
+
+    _ = ctx.decoded_data
+    assert not log.unchanged(Context(_decoded_data()))
@@ -9,19 +9,6 @@ from terminal.pixelcalc import extractor
 from terminal.pixelcalc.title_manager import TitleManager, ndarray_to_hash
 
 
-class _FakeCell:
-    def __init__(
-        self,
-        *,
-        mean: float = 0.0,
-        decimal: float = 0.0,
-        is_not_black: bool = False,
-    ) -> None:
-        self.mean = mean
-        self.decimal = decimal
-        self.is_not_black = is_not_black
-
-
 class _FakeBadgeCell:
     def __init__(self, *, title: str, cell_type: str, valid_array: np.ndarray) -> None:
         self.title = title
@@ -34,30 +21,30 @@ class _FakeMatrix:
         self._utf_hash = utf_hash
         self._utf_string = utf_string
         self._utf_badge_cell = utf_badge_cell
-        self._cell_map: dict[tuple[int, int], _FakeCell] = {
-            (56, 9): _FakeCell(mean=12.0),
-            (58, 9): _FakeCell(is_not_black=False),
-            (54, 9): _FakeCell(mean=255.0),
-            (55, 9): _FakeCell(is_not_black=False),
-            (57, 9): _FakeCell(mean=30.0),
-            (82, 0): _FakeCell(decimal=0.5),
-            (83, 0): _FakeCell(is_not_black=True),
-            (55, 10): _FakeCell(is_not_black=False),
-            (70, 10): _FakeCell(is_not_black=False),
-            (70, 12): _FakeCell(is_not_black=False),
+        self._field_values: dict[str, object] = {
+            "combat_time": 12.0,
+            "use_mouse": False,
+            "assisted_combat": "assist",
+            "flash": None,
+            "delay": False,
+            "testCell": 1,
+            "enable": True,
+            "spell_queue_window": 0.3,
+            "burst_time": 30.0,
+            "latest_succeeded_cast": "assist",
+            "target_exists": False,
+            "focus_exists": False,
+            "mouseover_exists": False,
         }
 
     def readSpell(self) -> list[dict]:
         return []
 
-    def readAura(self, x: int, y: int, length: int = 11) -> list[dict]:
-        return []
+    def readSequence(self, spec) -> list | dict:
+        return {} if spec.kind == "cell_list" else []
 
-    def readCellList(self, x: int, y: int, length: int) -> dict[str, dict]:
-        return {}
-
-    def readBadgeCellList(self, x: int, y: int, length: int) -> list[str]:
-        return []
+    def readFields(self, fields) -> dict[str, object]:
+        return {name: self._field_values.get(name) for name in fields.names}
 
     def readUTFhash(self, x: int, y: int) -> str | None:
         return self._utf_hash
@@ -70,12 +57,6 @@ class _FakeMatrix:
             return self._utf_badge_cell
         return _FakeBadgeCell(title="assist", cell_type="NONE", valid_array=np.zeros((6, 6, 3), dtype=np.uint8))
 
-    def getCell(self, x: int, y: int) -> _FakeCell:
-        return self._cell_map.get((x, y), _FakeCell())
-
-    def readCharCell(self, x: int, y: int) -> int:
-        return 1
-
 
 def test_extract_all_data_marks_pending_utf_title_record_when_hash_not_persisted(
     monkeypatch,
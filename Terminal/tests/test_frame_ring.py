@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.capture.frame_ring import SLOT_FREE, SLOT_READING, SLOT_READY, FrameRing
+
+
+def _write(ring: FrameRing, value: int) -> int:
+    slot = ring.begin_write()
+    slot.frame[...] = value
+    return ring.end_write(slot)
+
+
+def test_reader_gets_latest_frame_and_held_slots_are_not_overwritten() -> None:
+    ring = FrameRing.create(4, 6, slots=3)
+    try:
+        _write(ring, 1)
+        _write(ring, 2)
+        current = ring.acquire_latest()
+        assert current is not None
+        assert current.seq == 2
+        assert int(current.frame[0, 0, 0]) == 2
+        assert ring.acquire_latest(after_seq=current.seq) is None
+
+        # 读方占着 seq 2，写方只能轮流用另外两个槽位。
+        for value in (3, 4, 5):
+            _write(ring, value)
+        assert int(current.frame[0, 0, 0]) == 2
+
+        latest = ring.acquire_latest(after_seq=current.seq)
+        assert latest is not None
+        assert int(latest.frame[0, 0, 0]) == 5
+        assert sorted(ring.slot_states()) == [SLOT_READY, SLOT_READING, SLOT_READING]
+
+        ring.release(current)
+        ring.release(latest)
+        assert ring.slot_states().count(SLOT_FREE) == 2
+    finally:
+        ring.dispose()
+
+
+def test_attached_ring_sees_frames_written_by_the_owner() -> None:
+    ring = FrameRing.create(2, 3, slots=3)
+    try:
+        slot = ring.begin_write()
+        slot.frame[...] = np.arange(18, dtype=np.uint8).reshape(2, 3, 3)
+        ring.end_write(slot)
+
+        other = FrameRing.attach(ring.name)
+        try:
+            assert other.shape == (2, 3, 3)
+            view = other.acquire_latest()
+            assert view is not None
+            np.testing.assert_array_equal(view.frame, np.arange(18, dtype=np.uint8).reshape(2, 3, 3))
+            del view
+        finally:
+            other.dispose()
+    finally:
+        ring.dispose()
+
+
+def test_ring_requires_three_slots() -> None:
+    with pytest.raises(ValueError):
+        FrameRing.create(2, 2, slots=2)
@@ -0,0 +1,57 @@
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.capture.capture_loop import CaptureLoop
+from terminal.headless import build_parser, parse_region, resolve_rotation_class
+from terminal.pipeline import PIPELINE_MODE_FUSED, PipelineRunner
+from terminal.rotation.DeathKnightBlood import DeathKnightBlood
+
+
+def test_headless_arguments_resolve_rotation_and_region() -> None:
+    args = build_parser().parse_args(["--rotation", "DeathKnightBlood", "--region", "10,0,346,112", "--window", "0x10"])
+
+    assert resolve_rotation_class(args.rotation) is DeathKnightBlood
+    assert resolve_rotation_class("terminal.rotation.DeathKnightBlood:DeathKnightBlood") is DeathKnightBlood
+    assert args.region == {"left": 10, "top": 0, "right": 346, "bottom": 112}
+    assert args.window == 16
+    assert args.mode == PIPELINE_MODE_FUSED
+    with pytest.raises(ValueError):
+        resolve_rotation_class("NoSuchRotation")
+    with pytest.raises(ValueError):
+        parse_region("1,2,3")
+
+
+def test_capture_loop_writes_frames_into_the_pipeline_without_qt() -> None:
+    decoded = threading.Event()
+    runner = PipelineRunner(send_key=lambda window_handle, hot_key: None)
+    decode = runner._decoder.decode
+
+    def counting_decode(frame: np.ndarray, frame_id: int):
+        try:
+            return decode(frame, frame_id)
+        finally:
+            decoded.set()
+
+    def fake_capture(*, monitor_region: dict, region: dict, out: np.ndarray) -> np.ndarray:
+        out[...] = 0
+        return out
+
+    runner._decoder.decode = counting_decode
+    region = {"left": 0, "top": 0, "right": 84 * 4, "bottom": 28 * 4, "width": 84 * 4, "height": 28 * 4}
+    loop = CaptureLoop(runner, region, region, fps=60, capture=fake_capture)
+    runner.start(DeathKnightBlood, None, PIPELINE_MODE_FUSED)
+    loop.start()
+    try:
+        assert decoded.wait(2.0)
+    finally:
+        loop.stop()
+        runner.close()
+
+    assert loop.frames >= 1
+    assert runner.snapshot().decode_state == "invalid_frame"
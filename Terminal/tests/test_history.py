@@ -0,0 +1,85 @@
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.context import Context, FrameHistory
+from terminal.context.error import ContextError
+from terminal.context.tracking import AccessLog
+from terminal.pixelcalc.snapshot import FrameSnapshot
+from terminal.rotation.base import BaseRotation
+
+
+def _aura(title: str, remain: float, count: int = 1) -> dict:
+    return {"title": title, "remain": remain, "count": count, "type": "MAGIC", "color_string": "0,0,0"}
+
+
+def _frame(health: float, buff: list | None = None, party1: bool = True) -> FrameSnapshot:
+    return FrameSnapshot.from_dict({
+        "player": {"unitToken": "player", "exists": True, "status": {}, "buff": buff or [], "debuff": []},
+        "party": {
+            "party1": {"unitToken": "party1", "exists": party1, "status": {"unitHealthPercent": health}, "buff": [], "debuff": []},
+        },
+        "combat_time": 1.0,
+    })
+
+
+def test_history_keeps_the_latest_frames_in_order() -> None:
+    history = FrameHistory(capacity=4)
+    history.watch("party1.health")
+    for second in range(6):
+        history.record(_frame(100.0 - 10 * second), now=float(second))
+
+    times, values = history.window("party1.health")
+    assert times.tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert values.tolist() == [80.0, 70.0, 60.0, 50.0]
+    assert not values.flags.writeable
+    assert history.window("party1.health", 1.0)[1].tolist() == [60.0, 50.0]
+    assert history.slope("party1.health", 2.0) == pytest.approx(-10.0)
+    assert history.delta("party1.health", 3.0) == pytest.approx(-30.0)
+    assert history.mean("party1.health", 1.0) == pytest.approx(55.0)
+
+    # 单位不在时是 NaN，不参与斜率。
+    history.record(_frame(0.0, party1=False), now=6.0)
+    assert math.isnan(history.latest("party1.health"))
+    assert history.slope("party1.health", 2.0) == pytest.approx(-10.0)
+
+    with pytest.raises(ContextError):
+        history.watch("party1.nothing")
+
+
+def test_since_changed_counts_from_the_last_change() -> None:
+    history = FrameHistory(capacity=8)
+    history.record(_frame(100.0), now=0.0)
+    # 第一次查询时才开始记录，当前帧的值马上补上。
+    assert history.since_changed("player.buff.救赎") == 0.0
+    assert history.latest("player.buff.救赎") == 0.0
+
+    history.record(_frame(100.0, [_aura("救赎", 10.0, 2)]), now=1.0)
+    history.record(_frame(100.0, [_aura("救赎", 9.0, 2)]), now=2.5)
+    assert history.latest("player.buff.救赎") == 2.0
+    assert history.since_changed("player.buff.救赎") == pytest.approx(1.5)
+    assert history.latest("player.buff.救赎.remain") == 9.0
+    assert history.since_changed("player.buff.救赎.remain") == 0.0
+
+
+def test_rotation_records_frames_and_ctx_history_is_not_cacheable() -> None:
+    class TrendRotation(BaseRotation):
+        def main_rotation(self, ctx: Context) -> tuple[str, float, str]:
+            return self.idle(str(ctx.history.latest("party1.health")))
+
+    rotation = TrendRotation()
+    assert rotation.handle(_frame(90.0))[2] == "90.0"
+    access_log = AccessLog()
+    assert rotation.handle(_frame(80.0), access_log)[2] == "80.0"
+    assert access_log.opaque
+    assert len(rotation.history) == 2
+    assert rotation.history.window("party1.health")[1].tolist() == [90.0, 80.0]
+
+    # 没有 history 的 Context 只看得到当前这一帧。
+    ctx = Context(_frame(70.0))
+    assert len(ctx.history) == 1
+    assert ctx.history.slope("party1.health", 2.0) == 0.0
@@ -0,0 +1,70 @@
+import importlib.util
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.rotation.hot_reload import PollingFileWatcher, RotationHotReloadTracker
+
+ROTATION_SOURCE = '''
+from terminal.rotation.base import BaseRotation
+
+
+class HotReloadProbe(BaseRotation):
+    name = "probe"
+    version = {version!r}
+
+    def main_rotation(self, ctx):
+        return self.idle("probe")
+'''
+
+
+def _load_probe_module(path: Path, module_name: str):
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _wait_for_event(tracker: RotationHotReloadTracker, timeout: float = 3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        rotation_class, reload_event = tracker.get_runtime_rotation_class()
+        if reload_event is not None:
+            return rotation_class, reload_event
+        time.sleep(0.01)
+    raise AssertionError("没有等到热重载事件")
+
+
+def test_file_change_is_compiled_by_the_watcher_and_swapped_in(tmp_path, monkeypatch) -> None:
+    module_name = "hot_reload_probe_rotation"
+    path = tmp_path / f"{module_name}.py"
+    path.write_text(ROTATION_SOURCE.format(version="1"), encoding="utf-8")
+    module = _load_probe_module(path, module_name)
+    tracker = RotationHotReloadTracker(module.HotReloadProbe, watcher_factory=partial(PollingFileWatcher, interval=0.02))
+    reads: list[Path] = []
+    read_source = tracker._read_source
+    monkeypatch.setattr(tracker, "_read_source", lambda module_path: reads.append(module_path) or read_source(module_path))
+    try:
+        # 取帧路径上不读文件。
+        for _ in range(100):
+            assert tracker.get_runtime_rotation_class() == (module.HotReloadProbe, None)
+        assert reads == []
+
+        path.write_text(ROTATION_SOURCE.format(version="2-longer"), encoding="utf-8")
+        rotation_class, reload_event = _wait_for_event(tracker)
+        assert reload_event.status == "reloaded"
+        assert rotation_class is not module.HotReloadProbe
+        assert rotation_class.version == "2-longer"
+        assert tracker.get_runtime_rotation_class() == (rotation_class, None)
+
+        path.write_text("this is not python", encoding="utf-8")
+        failed_class, reload_event = _wait_for_event(tracker)
+        assert reload_event.status == "failed"
+        assert failed_class is rotation_class
+    finally:
+        tracker.close()
+        sys.modules.pop(module_name, None)
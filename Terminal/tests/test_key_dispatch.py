@@ -0,0 +1,80 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.key_dispatch import KeyDispatcher, KeyStroke, RecordingKeySender, TimerWheel, parse_hot_key
+
+
+def test_hot_keys_are_parsed_once_and_released_in_reverse_after_the_hold_time() -> None:
+    sender = RecordingKeySender()
+    dispatcher = KeyDispatcher(sender, hold_seconds=0.02)
+    try:
+        assert parse_hot_key("SHIFT-F1") == KeyStroke("SHIFT-F1", (0x10, 0x70))
+        assert dispatcher.stroke("SHIFT-F1") is dispatcher.stroke("SHIFT-F1")
+        with pytest.raises(KeyError):
+            dispatcher.send(1, "SHIFT-NOPE")
+
+        started = time.monotonic()
+        dispatcher.send(7, "SHIFT-F1")
+        # send 只是入队，不等 key-up。
+        assert time.monotonic() - started < 0.01
+        assert dispatcher.wait_idle(2.0)
+    finally:
+        dispatcher.stop()
+
+    assert [(event.vk_code, event.down) for event in sender.events] == [(0x10, True), (0x70, True), (0x70, False), (0x10, False)]
+    assert all(event.hwnd == 7 for event in sender.events)
+    hold = sender.events[2].monotonic - sender.events[1].monotonic
+    assert 0.019 <= hold < 0.5
+
+
+def test_dispatcher_keeps_up_with_a_burst_and_never_leaves_keys_down() -> None:
+    sender = RecordingKeySender()
+    dispatcher = KeyDispatcher(sender)
+    try:
+        for index in range(200):
+            dispatcher.send(index % 4, "F1" if index % 2 else "CTRL-F2")
+        assert dispatcher.wait_idle(5.0)
+    finally:
+        dispatcher.stop()
+
+    downs = sum(event.down for event in sender.events)
+    ups = len(sender.events) - downs
+    assert dispatcher.sent == 200
+    assert downs == ups == 300
+    held: set[tuple[int, int]] = set()
+    for event in sender.events:
+        key = (event.hwnd, event.vk_code)
+        if event.down:
+            held.add(key)
+        else:
+            held.discard(key)
+    assert held == set()
+
+
+def test_stop_releases_held_keys() -> None:
+    sender = RecordingKeySender()
+    dispatcher = KeyDispatcher(sender, hold_seconds=10.0)
+    dispatcher.send(3, "F5")
+    deadline = time.monotonic() + 2.0
+    while not sender.events and time.monotonic() < deadline:
+        time.sleep(0.001)
+    dispatcher.stop()
+    assert [(event.vk_code, event.down) for event in sender.events] == [(0x74, True), (0x74, False)]
+
+
+def test_timer_wheel_fires_items_once_they_are_due() -> None:
+    wheel: TimerWheel[str] = TimerWheel(tick_seconds=0.01, slots=8)
+    wheel.schedule(1.00, "a")
+    wheel.schedule(1.05, "b")
+    wheel.schedule(1.50, "c")
+    assert wheel.advance(0.99) == []
+    assert wheel.advance(1.00) == ["a"]
+    assert wheel.advance(1.20) == ["b"]
+    assert wheel.pending == 1
+    assert wheel.advance(3.00) == ["c"]
+    assert wheel.pending == 0
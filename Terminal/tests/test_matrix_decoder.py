@@ -1,11 +1,17 @@
 import sys
+import threading
 from pathlib import Path
 
 import numpy as np
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+from terminal.context import Context
+from terminal.pixelcalc import layout
+from terminal.pixelcalc.compiled_layout import compile_fields, compile_sequence
+from terminal.pixelcalc.extractor import extract_all_data, extract_lazy_snapshot
 from terminal.pixelcalc.matrix import MatrixDecoder
+from terminal.pixelcalc.title_manager import digest_to_hash, hash_to_digest, ndarray_to_hash, reset_default_title_manager
 
 
 def _build_matrix(width_cells: int = 84, height_cells: int = 28) -> np.ndarray:
@@ -69,3 +75,134 @@ def test_read_utf_string_returns_none_for_non_pure_cell() -> None:
     result = decoder.readUTFString(66, 26, 16)
 
     assert result is None
+
+
+def test_read_fields_decodes_enemy_status_in_declared_order() -> None:
+    matrix_data = _build_matrix()
+    _set_cell(matrix_data, 55, 10, (0, 255, 0))
+    _set_cell(matrix_data, 56, 10, (199, 86, 36))
+    _set_cell(matrix_data, 57, 10, (51, 51, 51))
+    _set_cell(matrix_data, 58, 11, (0, 255, 0))
+    _set_cell(matrix_data, 66, 11, (255, 255, 60))
+    decoder = MatrixDecoder(matrix_data)
+
+    status = decoder.readFields(compile_fields(layout.enemy_status_fields(55, 10)))
+
+    assert list(status) == [spec.name for spec in layout.enemy_status_fields(55, 10)]
+    assert status["unitExists"] is True
+    assert status["unitIsAlive"] is False
+    assert status["unitClass"] == "WARRIOR"
+    assert status["unitHealthPercent"] == decoder.getCell(57, 10).percent
+    assert status["unitCanAttack"] is True
+    assert status["unitCastIcon"] is None
+    assert status["unitCastDuration"] is None
+    # 没有引导图标时，可打断标记取默认值，不看像素。
+    assert status["unitChannelIsInterruptible"] is False
+
+
+def test_incremental_decode_reuses_unchanged_fields(tmp_path: Path) -> None:
+    manager = reset_default_title_manager(tmp_path / "title-manager.sqlite")
+    try:
+        previous_data = _build_matrix()
+        _set_cell(previous_data, 49, 15, (0, 255, 0))
+        previous = MatrixDecoder(previous_data)
+        extract_all_data(previous)
+
+        current_data = previous_data.copy()
+        _set_cell(current_data, 51, 14, (128, 128, 128))
+        current = MatrixDecoder(current_data, previous=previous)
+        data = extract_all_data(current)
+        expected = extract_all_data(MatrixDecoder(current_data))
+    finally:
+        manager.close()
+
+    assert previous.changed_fields is None
+    assert current.changed_fields == {"player.status.unitHealthPercent"}
+    for key in ("spell", "player", "party", "spec", "setting", "burst_time"):
+        assert data[key] == expected[key]
+
+
+def test_batched_badge_titles_match_single_badge_lookup(tmp_path: Path) -> None:
+    manager = reset_default_title_manager(tmp_path / "title-manager.sqlite")
+    try:
+        matrix_data = _build_matrix()
+        _set_cell(matrix_data, 10, 4, (60, 100, 220))
+        _set_cell(matrix_data, 13, 5, (255, 255, 255))
+        decoder = MatrixDecoder(matrix_data)
+        badge = decoder.getBadgeCell(12, 4)
+        manager.add_record(valid_array=badge.valid_array, title_type="PLAYER_SPELL", title="真言术：盾")
+
+        titles = decoder.readBadgeTitles([(9, 4), (12, 4)])
+    finally:
+        manager.close()
+
+    assert titles == [decoder.getBadgeCell(9, 4).hash, "真言术：盾"]
+    assert digest_to_hash(hash_to_digest(badge.hash)) == badge.hash
+
+
+def test_badge_titles_resolve_while_the_decode_thread_adds_titles(tmp_path: Path) -> None:
+    # 按需解码时标题在 rotation 线程里解析，同时解码线程在给 UTF 标题入库。
+    manager = reset_default_title_manager(tmp_path / "title-manager.sqlite")
+    rng = np.random.default_rng(5)
+    matrix_data = _build_matrix()
+    _set_cell(matrix_data, 13, 5, (255, 255, 255))
+    title_type = MatrixDecoder(matrix_data).getBadgeCell(12, 4).cell_type
+    arrays = [rng.integers(1, 255, (6, 6, 3), dtype=np.uint8) for _ in range(8)]
+    errors: list[BaseException] = []
+    stop = threading.Event()
+
+    def learn_titles() -> None:
+        try:
+            while not stop.is_set():
+                for index, array in enumerate(arrays):
+                    if not manager.has_persistent_record(ndarray_to_hash(array)):
+                        manager.add_record(valid_array=array, title_type=title_type, title=f"图标{index}")
+                for array in arrays:
+                    manager.delete_record(ndarray_to_hash(array))
+        except BaseException as error:
+            errors.append(error)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    learner = threading.Thread(target=learn_titles)
+    learner.start()
+    try:
+        for _ in range(600):
+            matrix_data[17:23, 49:55] = rng.integers(0, 255, (6, 6, 3), dtype=np.uint8)
+            decoder = MatrixDecoder(matrix_data)
+            assert decoder.readBadgeTitle(12, 4) == decoder.getBadgeCell(12, 4).hash
+    finally:
+        stop.set()
+        learner.join()
+        sys.setswitchinterval(switch_interval)
+        manager.close()
+    assert errors == []
+
+
+def test_lazy_snapshot_decodes_only_fields_that_are_read(tmp_path: Path) -> None:
+    manager = reset_default_title_manager(tmp_path / "title-manager.sqlite")
+    try:
+        matrix_data = _build_matrix()
+        _set_cell(matrix_data, 49, 15, (0, 255, 0))
+        decoder = MatrixDecoder(matrix_data)
+        ctx = Context(extract_lazy_snapshot(decoder))
+
+        status = ctx.player.status
+        combat_time = ctx.combat_time
+        party_exists = [unit.exists for unit in (ctx.party(i) for i in range(1, 5))]
+        decoded = set(decoder._results)
+
+        data = ctx.decoded_data
+        expected = extract_all_data(MatrixDecoder(matrix_data))
+    finally:
+        manager.close()
+
+    assert compile_sequence(layout.PLAYER_BUFF) not in decoded
+    assert compile_sequence(layout.party_buff_sequence(1, 19)) not in decoded
+    assert compile_sequence(layout.DISPEL_BLACKLIST) not in decoded
+    assert status == expected["player"]["status"]
+    assert combat_time == expected["misc"]["combat_time"]
+    assert party_exists == [expected["party"][f"party{i}"]["exists"] for i in range(1, 5)]
+    # 界面要整帧数据时照样能全部解出来，和直接整帧解码一致。
+    del data["timestamp"], expected["timestamp"]
+    assert data == expected
@@ -0,0 +1,85 @@
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.metrics import CONTENT_TYPE, MetricsServer, render_metrics
+from terminal.pipeline import FrameTracer
+from terminal.pipeline.tracing import EVENT_DECODE_END, EVENT_DECODE_START
+
+MS = 1_000_000
+
+
+class FakeTitleManager(object):
+    def cache_stats(self):
+        return SimpleNamespace(size=5, capacity=256, hits=3, misses=1, evictions=0)
+
+
+def _populated_tracer() -> FrameTracer:
+    tracer = FrameTracer()
+    for frame_id in range(1, 11):
+        base = frame_id * 50 * MS
+        tracer.capture(frame_id, base, base + MS)
+        tracer.mark(frame_id, EVENT_DECODE_START, base + 2 * MS)
+        tracer.mark(frame_id, EVENT_DECODE_END, base + 6 * MS)
+        tracer.finish(frame_id)
+    tracer.count_invalid('标志位"不对"')
+    tracer.count_invalid('标志位"不对"')
+    return tracer
+
+
+def test_render_metrics_reports_tracer_title_cache_hot_reload_and_keys() -> None:
+    text = render_metrics(
+        trace_summary=_populated_tracer().summary(),
+        title_manager=FakeTitleManager(),
+        hot_reload_counts=[{'reloaded': 2, 'failed': 0}, {'reloaded': 1, 'failed': 1}],
+        keys_sent=42,
+    )
+    lines = set(text.splitlines())
+
+    assert 'terminal_capture_fps 20.0' in lines
+    assert 'terminal_frames_captured_total 10' in lines
+    assert '# TYPE terminal_stage_latency_seconds histogram' in lines
+    # 解码每帧 4ms：2.5ms 的桶里没有，5ms 及以上的桶累计到全部 10 帧。
+    assert 'terminal_stage_latency_seconds_bucket{stage="decode",le="0.0025"} 0' in lines
+    assert 'terminal_stage_latency_seconds_bucket{stage="decode",le="0.005"} 10' in lines
+    assert 'terminal_stage_latency_seconds_bucket{stage="decode",le="1.0"} 10' in lines
+    assert 'terminal_stage_latency_seconds_bucket{stage="decode",le="+Inf"} 10' in lines
+    assert 'terminal_stage_latency_seconds_count{stage="decode"} 10' in lines
+    assert 'terminal_stage_latency_seconds_sum{stage="decode"} 0.04' in lines
+    assert 'terminal_invalid_frames_total{reason="标志位\\"不对\\""} 2' in lines
+    assert 'terminal_title_cache_hit_ratio 0.75' in lines
+    assert 'terminal_hot_reload_total{status="reloaded"} 3' in lines
+    assert 'terminal_hot_reload_total{status="failed"} 1' in lines
+    assert 'terminal_keys_sent_total 42' in lines
+
+
+def test_disabled_tracer_records_nothing() -> None:
+    tracer = FrameTracer(enabled=False)
+    tracer.capture(1, 0, MS)
+    tracer.count_invalid('x')
+
+    summary = tracer.summary()
+
+    assert summary.captured == 0
+    assert summary.invalid_reasons == {}
+
+
+def test_metrics_server_serves_render_output_on_its_own_thread() -> None:
+    server = MetricsServer(lambda: 'terminal_keys_sent_total 1\n', 0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/metrics', timeout=5) as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            assert response.read().decode('utf-8') == 'terminal_keys_sent_total 1\n'
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'http://127.0.0.1:{server.port}/other', timeout=5)
+    finally:
+        server.stop()
+
+    assert not server.running
@@ -0,0 +1,361 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.pipeline import async_scheduler
+from terminal.pipeline import (
+    BACKPRESSURE_LATEST,
+    PIPELINE_MODE_FUSED,
+    AsyncPipelineScheduler,
+    PIPELINE_MODE_PROCESS,
+    PIPELINE_MODE_THREADED,
+    DecodeResult,
+    LatestValueMailbox,
+    MailboxClosed,
+    PipelineRunner,
+    PipelineSnapshot,
+    RotationInstances,
+    RotationResultCache,
+    evaluate_rotation,
+)
+from terminal.key_dispatch import KeyDispatcher, RecordingKeySender
+from terminal.pipeline.engine import EngineFrameReply
+from terminal.pixelcalc.title_manager import TitleManager, ndarray_to_hash
+from terminal.rotation.DeathKnightBlood import DeathKnightBlood
+from terminal.rotation.base import BaseRotation
+
+
+class _CastRotation(BaseRotation):
+    def __init__(self) -> None:
+        super().__init__()
+        self.macroTable = {"真言术：盾": "F1"}
+
+    def handle(self, decoded_data: dict) -> tuple[str, float, str]:
+        return self.cast("真言术：盾")
+
+
+class _FakeDecoder:
+    incremental = False
+
+    def __init__(self) -> None:
+        self.decoded = threading.Event()
+
+    def reset_incremental_state(self) -> None:
+        pass
+
+    def decode(self, frame: np.ndarray, frame_id: int) -> DecodeResult:
+        self.decoded.set()
+        return DecodeResult(frame_id, "success", matrix=frame, data={"frame": int(frame[0, 0, 0])})
+
+
+def test_latest_value_mailbox_keeps_only_newest_value() -> None:
+    mailbox: LatestValueMailbox[int] = LatestValueMailbox()
+    mailbox.put(1)
+    mailbox.put(2)
+
+    assert mailbox.take() == 2
+    assert mailbox.dropped == 1
+
+    mailbox.close()
+    assert mailbox.put(3) is False
+    with pytest.raises(MailboxClosed):
+        mailbox.take()
+
+
+@pytest.mark.parametrize("mode", [PIPELINE_MODE_THREADED, PIPELINE_MODE_FUSED])
+def test_pipeline_sends_keys_without_the_ui_thread(mode: str) -> None:
+    sent = threading.Event()
+    keys: list[tuple[int, str]] = []
+    logs: list[str] = []
+
+    def send_key(window_handle: int, hot_key: str) -> None:
+        keys.append((window_handle, hot_key))
+        sent.set()
+
+    runner = PipelineRunner(send_key=send_key, log=logs.append)
+    runner._decoder = _FakeDecoder()
+    runner.start(_CastRotation, 42, mode)
+    try:
+        runner.submit_frame(np.full((4, 4, 3), 7, dtype=np.uint8))
+        assert sent.wait(2.0)
+        snapshot = runner.snapshot()
+    finally:
+        runner.close()
+
+    assert keys[0] == (42, "F1")
+    assert logs[0] == "cast: 真言术：盾"
+    assert snapshot.frame_id == 1
+    assert snapshot.decode_state == "success"
+    assert snapshot.decoded_data == {"frame": 7}
+    assert not runner.running
+
+
+def test_pipeline_logs_repeated_invalid_frames_once() -> None:
+    logs: list[str] = []
+    runner = PipelineRunner(send_key=lambda window_handle, hot_key: None, log=logs.append)
+    decoded = threading.Semaphore(0)
+    decode = runner._decoder.decode
+
+    def counting_decode(frame: np.ndarray, frame_id: int) -> DecodeResult:
+        try:
+            return decode(frame, frame_id)
+        finally:
+            decoded.release()
+
+    runner._decoder.decode = counting_decode
+    runner.start(_CastRotation, None, PIPELINE_MODE_FUSED)
+    try:
+        for _ in range(3):
+            runner.submit_frame(np.zeros((28 * 4, 84 * 4, 3), dtype=np.uint8))
+            assert decoded.acquire(timeout=2.0)
+    finally:
+        runner.close()
+    snapshot = runner.snapshot()
+
+    assert snapshot.decode_state == "invalid_frame"
+    assert snapshot.decode_result_is_stale is True
+    assert len(logs) == 1
+    assert "右上角锚点" in logs[0]
+
+
+def test_process_engine_decodes_in_a_child_process_and_restarts_after_a_crash(tmp_path: Path) -> None:
+    logs: list[str] = []
+    title_manager = TitleManager(db_path=tmp_path / "titles.sqlite")
+    runner = PipelineRunner(send_key=lambda window_handle, hot_key: None, log=logs.append, title_manager=title_manager)
+    frame = np.zeros((28 * 4, 84 * 4, 3), dtype=np.uint8)
+
+    def wait_for_invalid_frame(frame_id: int) -> PipelineSnapshot:
+        deadline = time.monotonic() + 10.0
+        while time.monotonic() < deadline:
+            snapshot = runner.snapshot()
+            if snapshot.decode_state == "invalid_frame" and snapshot.frame_id >= frame_id:
+                return snapshot
+            runner.submit_frame(frame)
+            time.sleep(0.05)
+        raise AssertionError(logs)
+
+    runner.start(_CastRotation, None, PIPELINE_MODE_PROCESS)
+    try:
+        first_pid = runner._engine.pid
+        assert first_pid != os.getpid()
+        wait_for_invalid_frame(1)
+
+        runner._engine._process.kill()
+        runner._engine._process.join()
+        snapshot = wait_for_invalid_frame(runner.snapshot().frame_id + 1)
+        assert runner._engine.pid != first_pid
+        assert runner._engine.restarts == 1
+    finally:
+        runner.close()
+        title_manager.close()
+
+    assert "右上角锚点" in snapshot.decode_error
+    assert "引擎进程异常，正在重启。" in logs
+
+
+def test_engine_title_record_is_applied_off_the_ui_thread(tmp_path: Path) -> None:
+    logs: list[str] = []
+    changed: list[bool] = []
+    title_manager = TitleManager(db_path=tmp_path / "titles.sqlite")
+    runner = PipelineRunner(
+        send_key=lambda window_handle, hot_key: None,
+        log=logs.append,
+        title_manager=title_manager,
+        on_titles_changed=lambda: changed.append(True),
+    )
+    valid_array = np.full((6, 6, 3), 90, dtype=np.uint8)
+    record = {"hash": ndarray_to_hash(valid_array), "title": "新法术", "title_type": "PLAYER_SPELL", "valid_array": valid_array.tolist()}
+    reply = EngineFrameReply(1, "success", "", None, False, None, ("引擎日志",), record)
+
+    # 引擎线程不是创建 TitleManager.conn 的线程，只能改内存。
+    engine_thread = threading.Thread(target=runner._handle_engine_reply, args=(reply,))
+    engine_thread.start()
+    engine_thread.join()
+    try:
+        assert logs == ["引擎日志"]
+        assert changed == [True]
+        assert title_manager.has_persistent_record(record["hash"])
+        title_manager.flush()
+        assert title_manager.conn.execute("SELECT COUNT(*) FROM icon_titles").fetchone()[0] == 0
+    finally:
+        runner.close()
+        title_manager.close()
+
+
+def test_asyncio_scheduler_paces_capture_and_sends_keys(monkeypatch: pytest.MonkeyPatch) -> None:
+    region = {"left": 0, "top": 0, "right": 4, "bottom": 4, "width": 4, "height": 4}
+    monkeypatch.setattr(async_scheduler, "locate_capture_region", lambda monitor_region, capture: region)
+    sent = threading.Event()
+    started: list[dict] = []
+    key_threads: list[str] = []
+
+    def send_key(window_handle: int, hot_key: str) -> None:
+        key_threads.append(threading.current_thread().name)
+        sent.set()
+
+    def fake_capture(*, monitor_region: dict, region: dict, out: np.ndarray) -> np.ndarray:
+        out[...] = 7
+        return out
+
+    scheduler = AsyncPipelineScheduler(
+        send_key=send_key,
+        capture=fake_capture,
+        on_capture_started=started.append,
+        backpressure=BACKPRESSURE_LATEST,
+    )
+    scheduler._decoder = _FakeDecoder()
+    scheduler.start(_CastRotation, 42)
+    try:
+        scheduler.start_capture(region, fps=60)
+        assert sent.wait(2.0)
+        snapshot = scheduler.snapshot()
+    finally:
+        scheduler.close()
+
+    assert started == [region]
+    # rotation 跑在自己的线程里，不占事件循环。
+    assert key_threads[0].startswith("PipelineAsyncRotation")
+    assert snapshot.decoded_data == {"frame": 7}
+    assert not scheduler.running
+
+
+def test_asyncio_scheduler_skips_rotation_for_stale_frames() -> None:
+    keys: list[str] = []
+    scheduler = AsyncPipelineScheduler(send_key=lambda window_handle, hot_key: keys.append(hot_key), max_frame_age_ms=-1.0)
+    decoder = _FakeDecoder()
+    scheduler._decoder = decoder
+    scheduler.start(_CastRotation, 42)
+    try:
+        scheduler.submit_frame(np.full((4, 4, 3), 7, dtype=np.uint8))
+        deadline = time.monotonic() + 2.0
+        while scheduler.stale_frames == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        scheduler.close()
+
+    assert decoder.decoded.is_set()
+    assert scheduler.stale_frames == 1
+    assert keys == []
+
+
+def _make_counting_rotation() -> type[BaseRotation]:
+    class CountingRotation(_CastRotation):
+        def __init__(self) -> None:
+            super().__init__()
+            self.frames = 0
+
+        def migrate_state(self, old_instance: BaseRotation) -> None:
+            self.frames = old_instance.frames
+
+        def handle(self, decoded_data: dict) -> tuple[str, float, str]:
+            self.frames += 1
+            return super().handle(decoded_data)
+
+    return CountingRotation
+
+
+def test_rotation_instances_are_reused_and_migrated_on_reload() -> None:
+    instances = RotationInstances()
+    first_class = _make_counting_rotation()
+
+    first, _ = instances.get(first_class)
+    evaluate_rotation({}, 1, first)
+    evaluate_rotation({}, 2, instances.get(first_class)[0])
+    assert instances.get(first_class)[0] is first
+    assert first.frames == 2
+
+    # 热重载得到同名的新类：新实例，状态迁移过来。
+    reloaded, message = instances.get(_make_counting_rotation())
+    assert reloaded is not first
+    assert message is None
+    assert reloaded.frames == 2
+    assert reloaded.history is first.history
+
+    # 换成别的 rotation 不迁移。
+    other, _ = instances.get(_CastRotation)
+    assert not hasattr(other, "frames")
+
+
+def test_rotation_instances_preload_the_macro_table_into_the_key_dispatcher() -> None:
+    dispatcher = KeyDispatcher(RecordingKeySender())
+    created = []
+    instances = RotationInstances(lambda rotation: (created.append(rotation), dispatcher.preload_macro_table(rotation.macroTable)))
+    try:
+        instance, _ = instances.get(DeathKnightBlood)
+    finally:
+        dispatcher.stop()
+
+    assert created == [instance]
+    for hot_key in instance.macroTable.values():
+        assert dispatcher._strokes[hot_key].hot_key == hot_key
+
+
+class _TrackedRotation(BaseRotation):
+    track_dependencies = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.macroTable = {"真言术：盾": "F1"}
+        self.evaluations = 0
+
+    def main_rotation(self, ctx) -> tuple[str, float, str]:
+        self.evaluations += 1
+        if ctx.player.healthPercent < 50 and ctx.spell_cooldown_ready("真言术：盾", ignore_gcd=True):
+            return self.cast("真言术：盾")
+        return self.idle("血量够")
+
+
+def _tracked_frame(health: float, cooldown: float = 0.0, party_buff_remain: float = 5.0) -> dict:
+    aura = {"title": "救赎", "remain": party_buff_remain, "color_string": "0,0,0", "type": "MAGIC", "count": 1}
+    return {
+        "spell": [{"title": "真言术：盾", "cooldown": cooldown, "is_usable": True, "is_known": True, "is_charge": False, "charges": 0}],
+        "player": {"unitToken": "player", "exists": True, "buff": [], "debuff": [], "status": {"unitHealthPercent": health}},
+        "party": {"party1": {"unitToken": "party1", "exists": True, "buff": [aura], "debuff": [], "status": {}}},
+    }
+
+
+def test_rotation_result_cache_reuses_result_until_a_read_field_changes() -> None:
+    now = [0.0]
+    cache = RotationResultCache(max_age=10.0, clock=lambda: now[0])
+    rotation = _TrackedRotation()
+
+    assert cache.evaluate(_tracked_frame(40.0), 1, rotation).macro_key == "F1"
+    # 只改了 rotation 没读过的队友光环：不重跑，帧号换成新的。
+    reused = cache.evaluate(_tracked_frame(40.0, party_buff_remain=3.0), 2, rotation)
+    assert (reused.frame_id, reused.macro_name, rotation.evaluations) == (2, "真言术：盾", 1)
+    # 沿用的帧也要进 history，趋势才不会断档。
+    assert len(rotation.history) == 2
+
+    # 读过的血量变了就重跑。
+    assert cache.evaluate(_tracked_frame(80.0), 3, rotation).action == "idle"
+    assert rotation.evaluations == 2
+    assert (cache.evaluated, cache.reused) == (2, 1)
+
+
+def test_rotation_result_cache_expires_with_the_shortest_countdown_read() -> None:
+    now = [0.0]
+    cache = RotationResultCache(max_age=10.0, clock=lambda: now[0])
+    rotation = _TrackedRotation()
+
+    assert cache.evaluate(_tracked_frame(40.0, cooldown=1.5), 1, rotation).action == "idle"
+    now[0] = 1.0
+    cache.evaluate(_tracked_frame(40.0, cooldown=1.5), 2, rotation)
+    assert rotation.evaluations == 1
+
+    # 冷却倒计时走完了，画面没变也要重跑。
+    now[0] = 1.6
+    cache.evaluate(_tracked_frame(40.0, cooldown=1.5), 3, rotation)
+    assert rotation.evaluations == 2
+
+    # 没打开 track_dependencies 的 rotation 每帧都跑。
+    counting = _make_counting_rotation()()
+    cache.evaluate({}, 4, counting)
+    cache.evaluate({}, 5, counting)
+    assert counting.frames == 2
@@ -0,0 +1,89 @@
+import pickle
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.context import Context
+from terminal.pixelcalc.snapshot import FrameSnapshot, pop_pending_title_record
+
+
+def _aura(title: str, remain: float) -> dict:
+    return {"title": title, "remain": remain, "color_string": "0,0,0", "type": "MAGIC", "count": 1}
+
+
+def _cell(decimal: float) -> dict:
+    return {"pure": True, "mean": 255.0, "percent": 100.0, "decimal": decimal, "is_black": False, "is_white": True, "color_string": "255,255,255"}
+
+
+def _decoded_data() -> dict:
+    party = {
+        f"party{index}": {"unitToken": f"party{index}", "exists": index == 1, "buff": [], "debuff": [], "status": {}}
+        for index in range(1, 5)
+    }
+    return {
+        "timestamp": None,
+        "spell": [{"is_charge": False, "charges": 0, "title": "真言术：盾", "cooldown": 0.0, "highlight": False, "is_usable": True, "is_known": True}],
+        "player": {"unitToken": "player", "exists": True, "buff": [_aura("救赎", 5.0)], "debuff": [], "status": {"health": 80.0}},
+        "target": {"unitToken": "target", "exists": True, "debuff": [_aura("暗言术：痛", 8.0)], "status": {}},
+        "focus": {"unitToken": "focus", "exists": False, "debuff": [], "status": {}},
+        "mouseover": {"unitToken": "mouseover", "exists": False, "debuff": [], "status": {}},
+        "misc": {"combat_time": 12.0, "use_mouse": False},
+        "spec": {"0": _cell(0.5), "1": None, "2": _cell(1.0)},
+        "setting": {},
+        "party": party,
+        "assisted_combat": "真言术：盾",
+        "flash": None,
+        "delay": False,
+        "testCell": 0,
+        "enable": True,
+        "dispel_blacklist": [],
+        "interrupt_blacklist": ["火球术"],
+        "spell_stop_list": [],
+        "spell_queue_window": 0.4,
+        "burst_time": 0.0,
+        "latest_succeeded_cast": "",
+        "UTF_hash": None,
+        "UTF_string": None,
+    }
+
+
+def test_snapshot_round_trips_the_nested_dict_and_pickles() -> None:
+    data = _decoded_data()
+    snapshot = FrameSnapshot.from_dict(data)
+
+    assert snapshot.to_dict() == data
+    assert snapshot.unit("party1").exists is True
+    assert snapshot.spec[1] is None and snapshot.spec[2].decimal == 1.0
+    assert snapshot.target.buff is None
+
+    copied = pickle.loads(pickle.dumps(snapshot))
+    assert copied == snapshot
+    assert not hasattr(copied, "__dict__")
+
+
+def test_context_reads_snapshot_attributes_directly() -> None:
+    snapshot = FrameSnapshot.from_dict(_decoded_data())
+    ctx = Context(snapshot)
+
+    assert ctx.snapshot is snapshot
+    assert ctx.combat_time == 12.0
+    assert ctx.player.buffRemain("救赎") == 5.0
+    assert ctx.target.debuffRemain("暗言术：痛") == 8.0
+    assert ctx.spec.cell(0).decimal == 0.5 and ctx.spec.cell(1) is None
+    assert [unit.unitToken for unit in ctx.parties] == ["party1"]
+    assert ctx.decoded_data == _decoded_data()
+    # 老代码一帧里会反复读 decoded_data，只转一次 dict。
+    assert ctx.decoded_data is ctx.decoded_data
+
+
+def test_pop_pending_title_record_clears_snapshot_and_dict() -> None:
+    record = {"hash": "abc", "title": "新法术"}
+    snapshot = FrameSnapshot.from_dict({**_decoded_data(), "_pending_utf_title_record": record})
+    data = {"frame": 7, "_pending_utf_title_record": record}
+
+    assert pop_pending_title_record(snapshot) == record
+    assert pop_pending_title_record(snapshot) is None
+    assert "_pending_utf_title_record" not in snapshot.to_dict()
+    assert pop_pending_title_record(data) == record
+    assert data == {"frame": 7}
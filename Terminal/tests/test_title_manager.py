@@ -0,0 +1,279 @@
+import json
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.pixelcalc.error import TitleError, TitleImportError
+from terminal.pixelcalc.title_manager import CACHE_KIND_MISS, CACHE_KIND_SIMILAR_MATCH, TitleManager, ndarray_to_hash
+from terminal.pixelcalc.title_writer import TitleWriter
+
+
+def test_get_titles_matches_similar_icons_per_title_type(tmp_path: Path) -> None:
+    rng = np.random.default_rng(7)
+    shield = rng.integers(1, 255, (6, 6, 3), dtype=np.uint8)
+    renew = rng.integers(1, 255, (6, 6, 3), dtype=np.uint8)
+    manager = TitleManager(tmp_path / "title-manager.sqlite")
+    try:
+        manager.add_record(valid_array=shield, title_type="PLAYER_SPELL", title="真言术：盾")
+        manager.add_record(valid_array=renew, title_type="BUFF_ON_FRIENDLY", title="恢复")
+
+        near_shield = shield.copy()
+        near_shield[0, 0, 0] += 1
+        unknown = rng.integers(0, 255, (6, 6, 3), dtype=np.uint8)
+        items = [
+            (near_shield, "PLAYER_SPELL", ndarray_to_hash(near_shield)),
+            (near_shield, "BUFF_ON_FRIENDLY", ndarray_to_hash(near_shield)),
+            (unknown, "PLAYER_SPELL", ndarray_to_hash(unknown)),
+        ]
+
+        titles = manager.get_titles(items)
+
+        assert titles == ["真言术：盾", "真言术：盾", ndarray_to_hash(unknown)]
+        assert manager.transient_records.records[ndarray_to_hash(near_shield)].cache_kind == CACHE_KIND_SIMILAR_MATCH
+        assert manager.transient_records.records[ndarray_to_hash(unknown)].cache_kind == CACHE_KIND_MISS
+
+        manager.delete_record(ndarray_to_hash(shield))
+        other = shield.copy()
+        other[1, 1, 1] += 1
+        assert manager.get_title(other, "PLAYER_SPELL", ndarray_to_hash(other)) == ndarray_to_hash(other)
+    finally:
+        manager.close()
+
+
+def test_transient_records_are_bounded_and_counted(tmp_path: Path) -> None:
+    manager = TitleManager(tmp_path / "title-manager.sqlite", transient_capacity=2)
+    arrays = [np.full((6, 6, 3), value, dtype=np.uint8) for value in (1, 2, 3)]
+    hashes = [ndarray_to_hash(array) for array in arrays]
+    try:
+        persistent = np.full((6, 6, 3), 200, dtype=np.uint8)
+        manager.add_record(valid_array=persistent, title_type="PLAYER_SPELL", title="持久")
+        for array, record_hash in zip(arrays, hashes):
+            manager.get_title(array, "NONE", record_hash)
+        manager.get_title(arrays[2], "NONE", hashes[2])
+
+        stats = manager.cache_stats()
+        assert (stats.capacity, stats.size, stats.hits, stats.misses, stats.evictions) == (2, 2, 1, 3, 1)
+        assert hashes[0] not in manager.transient_records
+        assert {record["hash"] for record in manager.list_memory_records()} == {ndarray_to_hash(persistent), *hashes[1:]}
+
+        manager.set_transient_capacity(1)
+        assert list(manager.transient_records.records) == [hashes[2]]
+        assert manager.cache_stats().evictions == 2
+    finally:
+        manager.close()
+
+
+def test_titles_resolve_while_another_thread_edits_records(tmp_path: Path) -> None:
+    rng = np.random.default_rng(11)
+    arrays = [rng.integers(1, 255, (6, 6, 3), dtype=np.uint8) for _ in range(8)]
+    manager = TitleManager(tmp_path / "title-manager.sqlite")
+    errors: list[BaseException] = []
+    stop = threading.Event()
+
+    def edit_records() -> None:
+        try:
+            while not stop.is_set():
+                for index, array in enumerate(arrays):
+                    manager.add_record(valid_array=array, title_type="PLAYER_SPELL", title=f"图标{index}")
+                for array in arrays:
+                    manager.delete_record(ndarray_to_hash(array))
+        except BaseException as error:
+            errors.append(error)
+
+    # 线程切换调得很频繁，让查询和增删尽量交错。
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    editor = threading.Thread(target=edit_records)
+    editor.start()
+    try:
+        for _ in range(3000):
+            query = rng.integers(0, 255, (6, 6, 3), dtype=np.uint8)
+            manager.get_titles([(query, "PLAYER_SPELL", ndarray_to_hash(query))])
+    finally:
+        stop.set()
+        editor.join()
+        sys.setswitchinterval(switch_interval)
+        manager.close()
+    assert errors == []
+
+
+def test_png_bytes_are_encoded_on_demand(tmp_path: Path) -> None:
+    icon = np.full((6, 6, 3), 90, dtype=np.uint8)
+    unknown = np.full((6, 6, 3), 30, dtype=np.uint8)
+    manager = TitleManager(tmp_path / "title-manager.sqlite")
+    try:
+        manager.add_record(valid_array=icon, title_type="PLAYER_SPELL", title="图标")
+        manager.get_title(unknown, "PLAYER_SPELL", ndarray_to_hash(unknown))
+        miss_record = manager.transient_records.records[ndarray_to_hash(unknown)]
+        assert miss_record.png_cache is None
+
+        manager.rebuild_memory()
+        persistent_record = manager.records_by_hash[ndarray_to_hash(icon)]
+        assert persistent_record.png_cache is None and persistent_record.png_loader is not None
+
+        png_bytes = persistent_record.png_bytes
+        assert png_bytes.startswith(b"\x89PNG")
+        assert persistent_record.png_bytes is png_bytes
+        assert persistent_record.png_loader is None
+        assert manager.list_database_records()[0]["png_bytes"] == png_bytes
+    finally:
+        manager.close()
+
+
+def test_json_schema_is_migrated_to_blob(tmp_path: Path) -> None:
+    db_path = tmp_path / "title-manager.sqlite"
+    icon = np.arange(108, dtype=np.uint8).reshape(6, 6, 3)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE icon_titles (hash TEXT PRIMARY KEY, title_type TEXT NOT NULL, title TEXT NOT NULL, "
+        "valid_array_json TEXT NOT NULL, png_bytes BLOB NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO icon_titles VALUES(?, ?, ?, ?, ?)",
+        (ndarray_to_hash(icon), "PLAYER_SPELL", "旧图标", json.dumps(icon.tolist()), b""),
+    )
+    conn.commit()
+    conn.close()
+
+    manager = TitleManager(db_path)
+    try:
+        columns = [row["name"] for row in manager.conn.execute("PRAGMA table_info(icon_titles)")]
+        assert columns == ["hash", "title_type", "title", "valid_array", "png_bytes"]
+        record = manager.records_by_hash[ndarray_to_hash(icon)]
+        assert record.title == "旧图标"
+        assert np.array_equal(record.valid_array, icon)
+        assert manager.get_title(icon, "PLAYER_SPELL", ndarray_to_hash(icon)) == "旧图标"
+    finally:
+        manager.close()
+
+
+def test_writes_are_applied_by_the_background_writer(tmp_path: Path) -> None:
+    db_path = tmp_path / "title-manager.sqlite"
+    arrays = [np.full((6, 6, 3), value, dtype=np.uint8) for value in (40, 50, 60)]
+    manager = TitleManager(db_path)
+    try:
+        for index, array in enumerate(arrays):
+            manager.add_record(valid_array=array, title_type="PLAYER_SPELL", title=f"图标{index}")
+        manager.delete_record(ndarray_to_hash(arrays[1]))
+        assert manager.has_persistent_record(ndarray_to_hash(arrays[0]))
+        assert not manager.has_persistent_record(ndarray_to_hash(arrays[1]))
+
+        manager.flush()
+        assert manager.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        rows = manager.conn.execute("SELECT hash, title FROM icon_titles ORDER BY title").fetchall()
+        assert [tuple(row) for row in rows] == [(ndarray_to_hash(arrays[0]), "图标0"), (ndarray_to_hash(arrays[2]), "图标2")]
+    finally:
+        manager.close()
+
+    reopened = TitleManager(db_path)
+    try:
+        assert {record["title"] for record in reopened.list_database_records()} == {"图标0", "图标2"}
+    finally:
+        reopened.close()
+
+
+def test_failed_write_keeps_the_rest_of_the_batch_and_is_reported(tmp_path: Path) -> None:
+    db_path = tmp_path / "title-manager.sqlite"
+    logs: list[str] = []
+    arrays = [np.full((6, 6, 3), value, dtype=np.uint8) for value in (70, 80)]
+    manager = TitleManager(db_path, log=logs.append)
+    try:
+        # 读连接先占住写锁，写入线程卡在第一个写操作上，后面两个排队合进同一个事务。
+        manager.conn.execute("BEGIN IMMEDIATE")
+        manager.add_record(valid_array=arrays[0], title_type="PLAYER_SPELL", title="好的")
+        manager.writer.upsert([("bad", "PLAYER_SPELL", None, b"", b"")])
+        manager.add_record(valid_array=arrays[1], title_type="PLAYER_SPELL", title="也好")
+        manager.conn.commit()
+        with pytest.raises(TitleError):
+            manager.flush()
+        rows = manager.conn.execute("SELECT title FROM icon_titles ORDER BY title").fetchall()
+        assert sorted(row[0] for row in rows) == sorted(["好的", "也好"])
+        assert len(logs) == 1 and "1 条没有保存" in logs[0]
+
+        manager.writer.upsert([("bad", "PLAYER_SPELL", None, b"", b"")])
+    finally:
+        with pytest.raises(TitleError):
+            manager.close()
+
+
+def test_writer_that_cannot_open_the_database_raises_instead_of_blocking(tmp_path: Path) -> None:
+    # 目录打不开成数据库，写入线程一启动就退出。
+    writer = TitleWriter(tmp_path)
+
+    with pytest.raises(TitleError):
+        writer.upsert([("hash", "PLAYER_SPELL", "标题", b"", b"")])
+    with pytest.raises(TitleError):
+        writer.flush()
+    with pytest.raises(TitleError):
+        writer.close()
+    writer.close()
+
+
+def test_ndjson_round_trip_imports_in_chunks(tmp_path: Path) -> None:
+    rng = np.random.default_rng(11)
+    arrays = rng.integers(1, 255, (5, 6, 6, 3), dtype=np.uint8)
+    source = TitleManager(tmp_path / "source.sqlite")
+    target = TitleManager(tmp_path / "target.sqlite")
+    try:
+        for index, array in enumerate(arrays):
+            source.add_record(valid_array=array, title_type="PLAYER_SPELL", title=f"技能{index}")
+        export_path = source.export_ndjson(tmp_path / "titles.ndjson")
+        assert len(export_path.read_text(encoding="utf-8").splitlines()) == len(arrays)
+
+        progress: list[tuple[int, int]] = []
+        imported = target.import_ndjson(export_path, progress=lambda done, total: progress.append((done, total)), chunk_size=2)
+
+        assert imported == len(arrays)
+        assert len(progress) == 3
+        assert progress[-1][0] == progress[-1][1] == export_path.stat().st_size
+        assert [record["title"] for record in target.list_database_records()] == [
+            record["title"] for record in source.list_database_records()
+        ]
+        near = arrays[3].copy()
+        near[0, 0, 0] ^= 1
+        assert target.get_title(near, "PLAYER_SPELL", ndarray_to_hash(near)) == "技能3"
+
+        target.flush()
+        assert target.conn.execute("SELECT COUNT(*) FROM icon_titles").fetchone()[0] == len(arrays)
+    finally:
+        source.close()
+        target.close()
+
+
+def test_import_replaces_earlier_misses_of_the_same_type(tmp_path: Path) -> None:
+    rng = np.random.default_rng(3)
+    fireball = rng.integers(1, 255, (6, 6, 3), dtype=np.uint8)
+    near = fireball.copy()
+    near[0, 0, 0] ^= 1
+    source = TitleManager(tmp_path / "source.sqlite")
+    target = TitleManager(tmp_path / "target.sqlite")
+    try:
+        source.add_record(valid_array=fireball, title_type="PLAYER_SPELL", title="Fireball")
+        export_path = source.export_json(tmp_path / "titles.json")
+        assert target.get_title(near, "PLAYER_SPELL", ndarray_to_hash(near)) == ndarray_to_hash(near)
+        revision = target.revision
+
+        target.import_json(export_path)
+
+        assert target.revision > revision
+        assert target.get_title(near, "PLAYER_SPELL", ndarray_to_hash(near)) == "Fireball"
+    finally:
+        source.close()
+        target.close()
+
+
+def test_ndjson_import_reports_bad_line(tmp_path: Path) -> None:
+    path = tmp_path / "titles.ndjson"
+    path.write_text('{"title_type": "PLAYER_SPELL", "title": "坏", "valid_array": [1, 2]}\n', encoding="utf-8")
+    manager = TitleManager(tmp_path / "title-manager.sqlite")
+    try:
+        with pytest.raises(TitleImportError, match="第 1 行"):
+            manager.import_ndjson(path)
+    finally:
+        manager.close()
@@ -0,0 +1,125 @@
+import csv
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from terminal.pipeline import PIPELINE_MODE_FUSED, DecodeResult, FrameTracer, PipelineRunner
+from terminal.pipeline.tracing import (
+    DROP_DECODE_OVERWRITE,
+    DROP_ROTATION_OVERWRITE,
+    EVENT_DECODE_END,
+    EVENT_DECODE_START,
+    EVENT_DISPATCH,
+    EVENT_ROTATION_END,
+    EVENT_ROTATION_START,
+)
+from terminal.rotation.base import BaseRotation
+
+MS = 1_000_000
+
+
+def _stage(summary, name):
+    return next(stage for stage in summary.stages if stage.stage == name)
+
+
+def test_tracer_turns_frame_stamps_into_stage_percentiles_and_csv(tmp_path: Path) -> None:
+    tracer = FrameTracer()
+    for frame_id in range(1, 101):
+        base = frame_id * 100 * MS
+        tracer.capture(frame_id, base, base + 2 * MS)
+        tracer.mark(frame_id, EVENT_DECODE_START, base + 3 * MS)
+        tracer.mark(frame_id, EVENT_DECODE_END, base + 3 * MS + frame_id * MS // 10)
+        tracer.mark(frame_id, EVENT_ROTATION_START, base + 20 * MS)
+        tracer.mark(frame_id, EVENT_ROTATION_END, base + 21 * MS)
+        tracer.mark(frame_id, EVENT_DISPATCH, base + 22 * MS)
+        tracer.finish(frame_id)
+
+    summary = tracer.summary()
+    assert summary.completed == 100
+    assert summary.in_flight == 0
+    assert _stage(summary, "capture").p50_ms == 2.0
+    decode = _stage(summary, "decode")
+    assert decode.count == 100
+    assert 4.9 < decode.p50_ms < 5.1
+    assert 9.4 < decode.p95_ms < 9.6
+    assert decode.max_ms == 10.0
+    assert _stage(summary, "total").p99_ms == 22.0
+
+    path = tmp_path / "trace.csv"
+    assert tracer.write_csv(path) == 100
+    with open(path, encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert rows[0]["frame_id"] == "1"
+    assert rows[0]["decode_ms"] == "0.100"
+    assert rows[0]["total_ms"] == "22.000"
+
+
+def test_tracer_counts_frames_overwritten_while_queued() -> None:
+    tracer = FrameTracer()
+    for frame_id in (1, 2, 3):
+        tracer.capture(frame_id, frame_id, frame_id + 1)
+    # 3 先被解码，1、2 还停在截图之后：被覆盖。
+    tracer.mark(3, EVENT_DECODE_START)
+    tracer.mark(3, EVENT_DECODE_END)
+    tracer.capture(4, 10, 11)
+    tracer.mark(4, EVENT_DECODE_START)
+    tracer.mark(4, EVENT_DECODE_END)
+    # 4 先进 rotation，3 解码完还没进 rotation：被覆盖。
+    tracer.mark(4, EVENT_ROTATION_START)
+
+    summary = tracer.summary()
+    assert summary.drops[DROP_DECODE_OVERWRITE] == 2
+    assert summary.drops[DROP_ROTATION_OVERWRITE] == 1
+    assert summary.in_flight == 1
+
+    disabled = FrameTracer(enabled=False)
+    disabled.capture(1, 0, 1)
+    disabled.finish(1)
+    assert disabled.summary().completed == 0
+
+
+class _CastRotation(BaseRotation):
+    def __init__(self) -> None:
+        super().__init__()
+        self.macroTable = {"cast": "F1"}
+
+    def handle(self, decoded_data: dict) -> tuple[str, float, str]:
+        return self.cast("cast")
+
+
+class _FakeDecoder:
+    incremental = False
+
+    def reset_incremental_state(self) -> None:
+        pass
+
+    def decode(self, frame: np.ndarray, frame_id: int) -> DecodeResult:
+        time.sleep(0.002)
+        return DecodeResult(frame_id, "success", matrix=frame, data={})
+
+
+def test_pipeline_runner_traces_every_stage_of_a_frame() -> None:
+    sent = threading.Event()
+    tracer = FrameTracer()
+    runner = PipelineRunner(send_key=lambda window_handle, hot_key: sent.set(), tracer=tracer)
+    runner._decoder = _FakeDecoder()
+    runner.start(_CastRotation, 42, PIPELINE_MODE_FUSED)
+    try:
+        runner.submit_frame(np.zeros((4, 4, 3), dtype=np.uint8))
+        assert sent.wait(2.0)
+        deadline = time.monotonic() + 2.0
+        while tracer.summary().completed == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+    finally:
+        runner.close()
+
+    summary = tracer.summary()
+    assert summary.completed == 1
+    for name in ("capture", "decode_wait", "decode", "rotation_wait", "rotation", "dispatch", "total"):
+        assert _stage(summary, name).count == 1, name
+    assert _stage(summary, "decode").p50_ms >= 2.0
@@ -0,0 +1,40 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from PySide6.QtWidgets import QApplication
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from terminal.pipeline import FrameTracer
+from terminal.pipeline.tracing import EVENT_DECODE_END, EVENT_DECODE_START
+from terminal.ui.tabs.diagnostics_tab import DiagnosticsTab
+
+
+@pytest.fixture(scope="session")
+def qapp() -> QApplication:
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+def test_diagnostics_tab_shows_stage_percentiles_and_drop_counts(qapp: QApplication) -> None:
+    tracer = FrameTracer()
+    tab = DiagnosticsTab()
+    tab.set_tracer(tracer)
+
+    tracer.capture(1, 0, 1_000_000)
+    tracer.mark(1, EVENT_DECODE_START, 2_000_000)
+    tracer.mark(1, EVENT_DECODE_END, 6_000_000)
+    tracer.finish(1)
+    tab.refresh_from_decode_snapshot({"decoded_data": None})
+
+    rows = {tab.table.item(row, 0).text(): row for row in range(tab.table.rowCount())}
+    decode_row = rows["解码"]
+    assert tab.table.item(decode_row, 1).text() == "1"
+    assert tab.table.item(decode_row, 2).text() == "4.00"
+    assert tab.frames_label.text() == "已走完 1 帧，在途 0 帧"
+    assert "解码前被新帧覆盖: 0" in tab.drops_label.text()
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from PySide6.QtWidgets import QApplication
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from terminal.workers.rotation_file_watcher import QtRotationFileWatcher
+
+
+@pytest.fixture(scope="session")
+def qapp() -> QApplication:
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+def _process_events_until(qapp: QApplication, condition, timeout: float = 3.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.01)
+
+
+def test_delete_then_write_save_is_rewatched_and_coalesced(qapp: QApplication, tmp_path: Path) -> None:
+    path = tmp_path / "Rotation.py"
+    path.write_text("A = 1\n", encoding="utf-8")
+    reloads: list[str] = []
+    reloaded = threading.Event()
+
+    def on_change() -> None:
+        reloads.append(threading.current_thread().name)
+        reloaded.set()
+
+    watcher = QtRotationFileWatcher(path, on_change)
+    try:
+        # 先删再写：删掉时文件监视丢了，文件还没回来。
+        path.unlink()
+        watcher._handle_file_changed(str(path))
+        watcher._handle_file_changed(str(path))
+        path.write_text("A = 2\n", encoding="utf-8")
+        watcher._handle_directory_changed(str(tmp_path))
+
+        _process_events_until(qapp, reloaded.is_set)
+        assert str(path) in watcher._watcher.files()
+        # 再等一个合并窗口，确认几次通知只触发了一次重载。
+        _process_events_until(qapp, lambda: False, timeout=0.3)
+        assert len(reloads) == 1
+        assert reloads[0].startswith("RotationHotReload")
+    finally:
+        watcher.close()